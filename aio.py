@@ -0,0 +1,233 @@
+"""One background asyncio loop for network I/O, and the HTTP client used on it.
+
+Dictionary lookups, audio downloads and AnkiConnect calls all run as
+coroutines on a single EventLoopThread, so any number of concurrent requests
+costs no extra threads. Code on other threads (Tk, hotkey, worker pool)
+calls in through `EventLoopThread.run()` / `submit()`.
+
+HTTP itself (keep-alive pools, TLS, chunked bodies, proxy tunnels) is
+aiohttp's. Timeouts cancel the request itself: the connection is closed
+and dropped from the pool rather than left reading in a background thread.
+
+The client follows a few redirects that stay on the same scheme and host,
+goes through the proxy named by HTTP_PROXY / HTTPS_PROXY (honouring
+NO_PROXY), and refuses bodies larger than `max_body`.
+"""
+
+import asyncio
+import concurrent.futures
+import json as jsonlib
+import threading
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies_environment, proxy_bypass_environment
+
+import aiohttp
+
+
+REDIRECTS = (301, 302, 303, 307, 308)
+LOOPBACK = ('localhost', '127.0.0.1', '::1')  # AnkiConnect and the local API never go through a proxy
+
+
+class HTTPError(Exception):
+    """The request could not be completed (connection, protocol or timeout)."""
+
+
+class LoopStopped(HTTPError):
+    """The event loop has been shut down."""
+
+
+class HTTPTimeout(HTTPError):
+    """The request did not complete within its timeout."""
+
+
+class Response:
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers  # lower-cased names
+        self.body = body
+
+    def json(self):
+        return jsonlib.loads(self.body)
+
+
+class EventLoopThread:
+    """An asyncio loop running on a daemon thread, started on first use."""
+
+    def __init__(self, name='io-loop'):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.clients = []  # HTTPClients whose connections are closed on stop
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._stopped:
+                raise LoopStopped("event loop is stopped")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Cancel whatever is still in flight, close pooled connections, then the loop
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(asyncio.gather(*(client.close() for client in self.clients),
+                                                        return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def in_loop(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future (cancelling it cancels the task)."""
+        try:
+            self._ensure_started()
+        except LoopStopped:
+            coro.close()
+            raise
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and wait for its result from another thread."""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("EventLoopThread.run() called from the loop itself; await instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise HTTPError(f"timed out after {timeout}s")
+        except concurrent.futures.CancelledError:
+            raise LoopStopped("event loop stopped before the request finished")
+
+    def stop(self, timeout=2):
+        """Cancel in-flight work and stop the loop. Safe to call more than once."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread = self._thread
+        if thread is None:
+            self.loop.close()
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        thread.join(timeout)
+
+
+_default_loop = None
+_default_lock = threading.Lock()
+
+
+def default_loop():
+    """Process-wide loop for clients constructed without one."""
+    global _default_loop
+    with _default_lock:
+        if _default_loop is None:
+            _default_loop = EventLoopThread()
+        return _default_loop
+
+
+class HTTPClient:
+    """Async HTTP client on aiohttp, with a keep-alive connection pool per host.
+
+    Adds what the app's upstreams need on top of aiohttp: redirects followed
+    only within a host, proxies from the environment (or `proxies`), a cap on
+    body size and errors as HTTPError. Must be used from coroutines running
+    on `loop_thread`; the session is created there on first use.
+    """
+
+    def __init__(self, loop_thread, max_per_host=16, user_agent='lexi-snap', max_redirects=3,
+                 max_body=16 * 1024 * 1024, proxies=None):
+        self.max_per_host = max_per_host
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self.max_body = max_body
+        self.proxies = getproxies_environment() if proxies is None else proxies
+        self._session = None
+        loop_thread.clients.append(self)
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.max_per_host),
+                headers={'User-Agent': self.user_agent},
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return self._session
+
+    async def request(self, method, url, json=None, body=None, headers=None, timeout=None):
+        """Send a request and return the Response. Raises HTTPError on failure or timeout."""
+        if json is not None:
+            body = jsonlib.dumps(json).encode('utf-8')
+            headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+        try:
+            return await asyncio.wait_for(self._follow(method, url, body, headers or {}), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPTimeout(f"{method} {url} timed out after {timeout}s") from None
+
+    async def _follow(self, method, url, body, headers):
+        """_request, following up to `max_redirects` redirects that keep the scheme and host.
+
+        A redirect elsewhere, or one too many, is returned as the response.
+        """
+        for _ in range(self.max_redirects + 1):
+            response = await self._request(method, url, body, headers)
+            location = response.headers.get('location')
+            if response.status not in REDIRECTS or not location:
+                return response
+            target = urljoin(url, location)
+            old, new = urlsplit(url), urlsplit(target)
+            if (new.scheme, new.hostname, new.port) != (old.scheme, old.hostname, old.port):
+                return response
+            if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+                headers = {name: value for name, value in headers.items() if name.lower() != 'content-type'}
+            url = target
+        return response
+
+    def _proxy_for(self, scheme, host):
+        """The URL of the proxy to use (credentials included), or None."""
+        proxy = self.proxies.get(scheme)
+        if not proxy or host in LOOPBACK or proxy_bypass_environment(host, self.proxies):
+            return None
+        return proxy if '://' in proxy else f"http://{proxy}"
+
+    async def _request(self, method, url, body, headers):
+        parts = urlsplit(url)
+        proxy = self._proxy_for(parts.scheme or 'http', parts.hostname)
+        try:
+            async with self._get_session().request(
+                    method, url, data=body, headers=headers, proxy=proxy, allow_redirects=False,
+                    timeout=aiohttp.ClientTimeout(total=None)) as response:
+                self._check_size(response.content_length or 0)
+                chunks, size = [], 0
+                async for chunk in response.content.iter_chunked(65536):
+                    size += len(chunk)
+                    self._check_size(size)
+                    chunks.append(chunk)
+                headers = {name.lower(): value for name, value in response.headers.items()}
+                return Response(response.status, headers, b''.join(chunks))
+        except (aiohttp.ClientError, OSError, ValueError) as e:
+            raise HTTPError(f"{method} {url}: {e or type(e).__name__}") from e
+
+    def _check_size(self, size):
+        if size > self.max_body:
+            raise HTTPError(f"response body over {self.max_body} bytes")
+
+    async def close(self):
+        """Close the session and its pooled connections (awaited on the loop thread at shutdown)."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
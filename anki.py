@@ -0,0 +1,148 @@
+"""AnkiConnect client."""
+
+import threading
+
+from aio import HTTPClient, HTTPError, LoopStopped, default_loop
+from latency import Endpoints
+
+
+ANKI_CONNECT_URL = "http://localhost:8765"
+# Actions that change nothing, so a slow one can safely be sent twice (hedged)
+READ_ONLY_ACTIONS = frozenset({
+    'version', 'deckNames', 'deckNamesAndIds', 'modelNames', 'modelFieldNames', 'findNotes',
+    'findCards', 'notesInfo', 'cardsInfo', 'areDue', 'getIntervals', 'getDeckStats',
+})
+
+
+class AnkiError(Exception):
+    """AnkiConnect could not be reached or returned an error."""
+
+
+class AnkiConnect:
+    """Thin AnkiConnect wrapper with pooled keep-alive connections and a model field cache.
+
+    Requests run on the shared network event loop; `ainvoke` is the coroutine
+    and the other methods are blocking wrappers for use from ordinary threads.
+    Each action has its own latency history: `timeout` (`ping_timeout` for
+    the status check) applies until it has some, then the timeout follows the
+    action's p99 (never dropping below `timeout` for actions that change
+    something), and slow read-only actions outside `multi` batches are
+    hedged (see latency.py).
+    """
+
+    def __init__(self, url=ANKI_CONNECT_URL, timeout=2, loop=None, ping_timeout=0.3):
+        self.url = url
+        self.timeout = timeout
+        self.endpoints = Endpoints(timeout, floor=1.0, ceiling=30.0, defaults={'version': ping_timeout})
+        self.loop = loop or default_loop()
+        self.http = HTTPClient(self.loop)
+        self._model_fields = {}
+        self._lock = threading.Lock()
+
+    async def ainvoke(self, action, timeout=None, **params):
+        """Call an AnkiConnect action and return its result, raising AnkiError on failure.
+
+        `timeout` overrides the action's adaptive timeout.
+        """
+        payload = {'action': action, 'version': 6}
+        if params:
+            payload['params'] = params
+        name, hedge = action, action in READ_ONLY_ACTIONS
+        if action == 'multi':
+            # Batches are bulk work (syncs, imports): a duplicate would only double Anki's load
+            name = 'multi:' + '+'.join(sorted({item['action'] for item in params.get('actions', ())}))
+        endpoint = self.endpoints.get(name)
+        if timeout is None and not hedge:
+            # A write that timed out may still have happened: never cut one shorter than `timeout`
+            timeout = max(self.timeout, endpoint.timeout())
+        try:
+            response = await endpoint.call(
+                lambda timeout: self.http.request('POST', self.url, json=payload, timeout=timeout),
+                timeout=timeout, hedge=hedge, accept=lambda response: response.status == 200)
+        except HTTPError as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
+        if response.status != 200:
+            raise AnkiError(f"AnkiConnect returned HTTP {response.status}")
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise AnkiError("AnkiConnect returned invalid JSON") from e
+        if data.get('error') is not None:
+            raise AnkiError(data['error'])
+        return data.get('result')
+
+    def invoke(self, action, timeout=None, **params):
+        """Blocking ainvoke() for callers that are not on the event loop."""
+        try:
+            return self.loop.run(self.ainvoke(action, timeout=timeout, **params))
+        except LoopStopped as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
+
+    async def amulti(self, actions, timeout=None):
+        """Run several actions in one request.
+
+        `actions` is a list of (action, params) pairs. Returns a list of
+        results, with an AnkiError instance in place of any action that failed.
+        """
+        results = await self.ainvoke('multi', timeout=timeout, actions=[
+            {'action': action, 'version': 6, 'params': params or {}}
+            for action, params in actions
+        ])
+        out = []
+        for item in results or []:
+            if isinstance(item, dict) and 'error' in item and 'result' in item:
+                out.append(AnkiError(item['error']) if item['error'] is not None else item['result'])
+            else:
+                out.append(item)
+        return out
+
+    def multi(self, actions, timeout=None):
+        """Blocking amulti()."""
+        try:
+            return self.loop.run(self.amulti(actions, timeout=timeout))
+        except LoopStopped as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
+
+    def ping(self, timeout=None):
+        """Quick check if Anki is responding."""
+        try:
+            self.invoke('version', timeout=timeout)
+            return True
+        except AnkiError:
+            return False
+
+    def deck_names(self):
+        return self.invoke('deckNames') or []
+
+    def model_field_names(self, model):
+        """Field names for a note model, cached per model."""
+        with self._lock:
+            fields = self._model_fields.get(model)
+        if fields is None:
+            fields = tuple(self.invoke('modelFieldNames', modelName=model) or ())
+            with self._lock:
+                self._model_fields[model] = fields
+        return fields
+
+    def prime_models(self, models):
+        """Seed the field cache from known {model: field names}, e.g. a metadata snapshot."""
+        with self._lock:
+            self._model_fields.update((model, tuple(fields)) for model, fields in models.items())
+
+    def invalidate_models(self, model=None):
+        """Forget cached field names (for one model, or all)."""
+        with self._lock:
+            if model is None:
+                self._model_fields.clear()
+            else:
+                self._model_fields.pop(model, None)
+
+    def add_note(self, note):
+        """Add a single note and return its id."""
+        return self.invoke('addNote', note=note)
+
+    def add_notes(self, notes):
+        """Add several notes in one request. Returns ids, with None for notes that failed."""
+        if not notes:
+            return []
+        return self.invoke('addNotes', notes=notes) or [None] * len(notes)
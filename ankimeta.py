@@ -0,0 +1,159 @@
+"""On-disk snapshot of Anki deck and model metadata for warm starts.
+
+The snapshot (deck names, note models and their field names, tags) is read from one JSON file at startup, so the deck lists and
+the add path have what they need before Anki has answered anything. It is
+then revalidated in the background with a single AnkiConnect `multi`
+request, and rewritten only when something actually changed.
+
+The file carries a schema version; a snapshot written by an incompatible
+version is ignored and rebuilt from Anki.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+from aio import LoopStopped
+from anki import AnkiError
+
+
+SCHEMA_VERSION = 1
+METADATA_FILE = Path.home() / '.lexi_snap_anki_metadata.json'
+
+
+class Snapshot:
+    """Immutable view of Anki's decks and models at `fetched_at` (0 if never fetched)."""
+
+    __slots__ = ('decks', 'models', 'tags', 'fetched_at')
+
+    def __init__(self, decks=(), models=None, tags=(), fetched_at=0.0):
+        self.decks = tuple(decks)
+        self.models = {name: tuple(fields) for name, fields in (models or {}).items()}
+        self.tags = tuple(tags)
+        self.fetched_at = fetched_at
+
+    def same_content(self, other):
+        return self.decks == other.decks and self.models == other.models and self.tags == other.tags
+
+    def to_json(self):
+        return {
+            'version': SCHEMA_VERSION,
+            'fetched_at': self.fetched_at,
+            'decks': list(self.decks),
+            'models': {name: list(fields) for name, fields in self.models.items()},
+            'tags': list(self.tags),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict) or data.get('version') != SCHEMA_VERSION:
+            return None
+        try:
+            return cls(data['decks'], data['models'], data.get('tags', ()), data.get('fetched_at', 0.0))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            return None
+
+
+class AnkiMetadata:
+    """The current Snapshot plus its file, and revalidation against AnkiConnect.
+
+    Reading `snapshot` (or `decks` / `field_names`) never touches the
+    network. Listeners added with `on_change(callback)` are called as
+    `callback(old, new)` after a revalidation that changed anything; they
+    run on the network event loop, so they must not block.
+    """
+
+    def __init__(self, anki, path=METADATA_FILE, seed_decks=()):
+        self.anki = anki
+        self.path = Path(path) if path else None
+        self._listeners = []
+        self._save_lock = threading.Lock()
+        # Older versions kept only a deck list in settings - use it until Anki answers
+        self.snapshot = self.load() or Snapshot(decks=seed_decks)
+        anki.prime_models(self.snapshot.models)
+
+    @property
+    def decks(self):
+        return list(self.snapshot.decks)
+
+    def field_names(self, model):
+        """Cached field names of a model, or None if it isn't in the snapshot."""
+        return self.snapshot.models.get(model)
+
+    def on_change(self, callback):
+        self._listeners.append(callback)
+
+    # ==================== FILE ====================
+
+    def load(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return Snapshot.from_json(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, snapshot):
+        if not self.path:
+            return
+        with self._save_lock:
+            tmp = self.path.with_suffix('.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot.to_json(), f, ensure_ascii=False, separators=(',', ':'))
+                tmp.replace(self.path)
+            except OSError as e:
+                print(f"Could not save Anki metadata: {e}")
+
+    # ==================== REVALIDATION ====================
+
+    async def arevalidate(self, models=()):
+        """Fetch decks, models, field names and tags; return the new Snapshot.
+
+        One `multi` request covers everything already known (plus `models`,
+        e.g. those the note templates use); only models that are new since
+        the last snapshot need a second request for their fields. Raises
+        AnkiError if Anki can't be reached.
+        """
+        current = self.snapshot
+        known_models = sorted(set(current.models) | set(models))
+        results = await self.anki.amulti(
+            [('deckNames', None), ('modelNames', None), ('getTags', None)]
+            + [('modelFieldNames', {'modelName': model}) for model in known_models]
+        )
+        for result in results[:2]:
+            if isinstance(result, AnkiError):
+                raise result
+        decks, model_names, tags = results[0] or [], results[1] or [], results[2]
+        fields = dict(zip(known_models, results[3:]))
+
+        new_models = [model for model in model_names if model not in fields]
+        if new_models:
+            fields.update(zip(new_models, await self.anki.amulti(
+                [('modelFieldNames', {'modelName': model}) for model in new_models])))
+
+        snapshot = Snapshot(
+            decks=decks,
+            models={model: fields[model] for model in model_names if isinstance(fields.get(model), list)},
+            tags=tags if isinstance(tags, list) else current.tags,
+            fetched_at=time.time(),
+        )
+        self.snapshot = snapshot
+        if not snapshot.same_content(current):
+            self.anki.prime_models(snapshot.models)
+            self.save(snapshot)
+            for callback in self._listeners:
+                try:
+                    callback(current, snapshot)
+                except Exception as e:
+                    print(f"Metadata listener error: {e}")
+        return snapshot
+
+    def revalidate(self, models=()):
+        """Blocking arevalidate()."""
+        try:
+            return self.anki.loop.run(self.arevalidate(models))
+        except LoopStopped as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
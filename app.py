@@ -2,77 +2,29 @@
 Create Anki flashcards from selected text with a global hotkey.
 """
 
+import argparse
+import gc
 import os
 import sys
-import json
 import time
 import threading
 import queue
-import winreg
 from pathlib import Path
-from datetime import datetime
 
 import customtkinter as ctk
-import requests
-from pynput import keyboard
-import pyperclip
-import pystray
 from PIL import Image, ImageDraw, ImageFont
 
+from core import NO_DEFAULT_DECK, CapturePipeline, CaptureRoute
+from diagnostics import SamplingProfiler, swallowed, write_bundle
+from export import FORMATS, ExportError, export_to
+from http_api import DEFAULT_PORT, ApiServer
+from ipc import CommandHandler, IPCError, IPCServer, send_commands
+from platforms import MODIFIERS, get_platform
+from reviews import STATE_LABELS
+from settings import SettingsManager
 
-VERSION = "1.1.0"
-
-
-class SettingsManager:
-    """Manage application settings."""
-
-    def __init__(self):
-        self.settings_file = Path.home() / '.lexi_snap_settings.json'
-        self.settings = self.load_settings()
-
-    def load_settings(self):
-        defaults = {
-            'hotkey': 'ctrl+alt+d',
-            'default_deck': None,
-            'start_on_startup': False,
-            'notification_badge_enabled': True,
-            'notification_toast_enabled': False,
-            'card_history': [],  # List of {word, definition, timestamp}
-            'cached_decks': [],  # Cached Anki deck list for faster startup
-        }
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, 'r') as f:
-                    defaults.update(json.load(f))
-            except:
-                pass
-        return defaults
-
-    def save_settings(self):
-        try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
-        except:
-            pass
-
-    def get(self, key, default=None):
-        return self.settings.get(key, default)
 
-    def set(self, key, value):
-        self.settings[key] = value
-        self.save_settings()
-
-    def add_to_history(self, word, definition):
-        """Add a card to history, keeping only the 10 most recent."""
-        history = self.settings.get('card_history', [])
-        history.insert(0, {
-            'word': word,
-            'definition': definition,
-            'timestamp': datetime.now().isoformat()
-        })
-        # Keep only 10 most recent
-        self.settings['card_history'] = history[:10]
-        self.save_settings()
+VERSION = "1.1.0"
 
 
 class LexiSnapApp:
@@ -93,22 +45,27 @@ class LexiSnapApp:
         'error': '#ef4444',
     }
 
-    STARTUP_REG_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
-    STARTUP_APP_NAME = "lexi-snap"
-
-    def __init__(self):
+    def __init__(self, platform=None, diagnostics=False):
+        self.platform = platform or get_platform()
         self.settings_manager = SettingsManager()
-        self.anki_url = "http://localhost:8765"
-        self.root = None
         self.gui_queue = queue.Queue()
-        self.hotkey_listener = None
+        self.pipeline = CapturePipeline(
+            self.settings_manager,
+            self.platform.clipboard,
+            notify=lambda event, a=None, b=None: self.gui_queue.put((event, a, b)),
+        )
+        self.root = None
         self.recording_hotkey = False
         self.recorded_keys = set()
         self.currently_pressed = set()
         self.hotkey_button = None
         self.hotkey_record_listener = None
-        self.tray_icon = None
+        self.ipc_server = None
+        self.api_server = None
         self.quitting = False
+        # Opt-in sampling profiler: --diagnostics for this run, or the diagnostics_enabled setting
+        self.profiler = SamplingProfiler()
+        self.diagnostics = diagnostics
         
         # Session card counter for badge
         self.session_card_count = 0
@@ -119,16 +76,23 @@ class LexiSnapApp:
         # Deck dropdown reference for async updates
         self.deck_dropdown = None
         self.deck_dropdown_values = []
+        self.deck_selector_box = None
         
         # Anki connection monitoring
-        self._anki_connected = False
         self._anki_monitor_running = False
         
-        # Current active tab
-        self.current_tab = "general"
+        # Current active tab (None while the settings UI is released)
+        self.current_tab = None
+        self._reopen_tab = "general"
         self.tab_frames = {}
         self.tab_buttons = {}
         self.content_frame = None
+        self.main_container = None
+        self.history_scroll = None
+        self.review_stats_label = None
+        self.lexicon_label = None
+        self.lexicon_progress = None  # (bar, status, button) of an open "Known Words" dialog
+        self._tray_icon_base = None
         
         # Icon paths - ICO for tray, PNG for display
         self.icon_path = self._get_icon_path(prefer_ico=False)  # PNG for UI display
@@ -164,33 +128,33 @@ class LexiSnapApp:
             
         return None
 
-    def get_app_path(self):
-        """Get the appropriate path for startup - exe or script."""
-        if getattr(sys, 'frozen', False):
-            return f'"{sys.executable}" --minimized'
-        else:
-            python_exe = sys.executable
-            script_path = os.path.abspath(__file__)
-            pythonw = python_exe.replace('python.exe', 'pythonw.exe')
-            if os.path.exists(pythonw):
-                return f'"{pythonw}" "{script_path}" --minimized'
-            return f'"{python_exe}" "{script_path}" --minimized'
+    @property
+    def _anki_connected(self):
+        return self.pipeline.anki_connected
+
+    @_anki_connected.setter
+    def _anki_connected(self, value):
+        self.pipeline.anki_connected = value
+
+    def _tray_base_image(self):
+        """The 64px tray icon, decoded once (the file's full-size frames aren't kept)."""
+        if self._tray_icon_base is None:
+            size = 64
+            # Try to load custom icon - prefer ICO for system tray
+            icon_to_load = self.icon_path_ico or self.icon_path
+            image = None
+            if icon_to_load and os.path.exists(icon_to_load):
+                try:
+                    with Image.open(icon_to_load) as source:
+                        image = source.convert('RGBA').resize((size, size), Image.Resampling.LANCZOS)
+                except Exception:
+                    swallowed()
+            self._tray_icon_base = image or self._create_fallback_icon(size)
+        return self._tray_icon_base
 
     def create_tray_icon_image(self, with_badge=False):
         """Create icon for the system tray, optionally with badge counter."""
-        size = 64
-        
-        # Try to load custom icon - prefer ICO for system tray
-        icon_to_load = self.icon_path_ico or self.icon_path
-        if icon_to_load and os.path.exists(icon_to_load):
-            try:
-                image = Image.open(icon_to_load).convert('RGBA')
-                image = image.resize((size, size), Image.Resampling.LANCZOS)
-            except:
-                # Fallback to generated icon
-                image = self._create_fallback_icon(size)
-        else:
-            image = self._create_fallback_icon(size)
+        image = self._tray_base_image().copy()
         
         # Add badge if enabled and there are cards added
         if with_badge and self.session_card_count > 0:
@@ -241,116 +205,104 @@ class LexiSnapApp:
 
     def update_tray_icon(self):
         """Update the tray icon with or without badge."""
-        if self.tray_icon:
-            badge_enabled = self.settings_manager.get('notification_badge_enabled', True)
-            new_icon = self.create_tray_icon_image(with_badge=badge_enabled)
-            self.tray_icon.icon = new_icon
+        badge_enabled = self.settings_manager.get('notification_badge_enabled', True)
+        self.platform.tray.set_image(self.create_tray_icon_image(with_badge=badge_enabled))
 
     def setup_tray_icon(self):
         """Setup the system tray icon."""
-        def show_window(icon, item):
-            self.gui_queue.put(('show_window', None, None))
-        
-        def quit_app(icon, item):
-            self.gui_queue.put(('quit_app', None, None))
-        
-        menu = pystray.Menu(
-            pystray.MenuItem("Show Settings", show_window, default=True),
-            pystray.MenuItem("Quit", quit_app)
-        )
-        
         badge_enabled = self.settings_manager.get('notification_badge_enabled', True)
-        self.tray_icon = pystray.Icon(
-            "lexi-snap",
+        self.platform.tray.start(
             self.create_tray_icon_image(with_badge=badge_enabled),
             "Lexi Snap",
-            menu
+            on_show=lambda: self.gui_queue.put(('show_window', None, None)),
+            on_quit=lambda: self.gui_queue.put(('quit_app', None, None)),
+            actions=[("Save Diagnostics", self._save_diagnostics_async)],
         )
-        
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+
+    def dump_diagnostics(self, directory=None):
+        """Write a diagnostics bundle (see diagnostics.py) to `directory` (default: home). Returns its path."""
+        return write_bundle(directory or Path.home(), self.profiler, self.pipeline)
+
+    def _save_diagnostics_async(self):
+        """Tray menu: write a bundle to the home directory in a background thread."""
+        def save():
+            try:
+                path = self.dump_diagnostics()
+            except OSError as e:
+                print(f"Could not save diagnostics: {e}")
+                self.gui_queue.put(('toast', "Could not save diagnostics", None))
+                return
+            print(f"Diagnostics saved to {path}")
+            self.gui_queue.put(('toast', f"Diagnostics saved to {path.name}", None))
+
+        threading.Thread(target=save, daemon=True).start()
 
     def quit_application(self):
         """Properly quit the application."""
         self.quitting = True
+        self.settings_manager.stop_watching()
+        self.profiler.stop()
         self._stop_anki_monitor()
-        if self.tray_icon:
-            try:
-                self.tray_icon.stop()
-            except:
-                pass
-        if self.hotkey_listener:
-            try:
-                self.hotkey_listener.stop()
-            except:
-                pass
+        if self.ipc_server:
+            self.ipc_server.stop()
+        if self.api_server:
+            self.api_server.stop()
+        self.pipeline.shutdown()
+        self.platform.tray.stop()
+        self.platform.hotkeys.unregister()
         if self.root:
             try:
                 self.root.quit()
                 self.root.destroy()
-            except:
-                pass
+            except Exception:
+                swallowed()
+        self.platform.instance_lock.release()
         sys.exit(0)
 
     def is_startup_enabled(self):
-        """Check if app is set to start on Windows startup."""
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.STARTUP_REG_KEY, 0, winreg.KEY_READ) as key:
-                winreg.QueryValueEx(key, self.STARTUP_APP_NAME)
-                return True
-        except FileNotFoundError:
-            return False
-        except Exception:
-            return False
+        """Check if app is set to start on login."""
+        return self.platform.autostart.is_enabled()
 
     def set_startup_enabled(self, enabled):
-        """Enable or disable starting on Windows startup."""
-        try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.STARTUP_REG_KEY, 0, winreg.KEY_SET_VALUE) as key:
-                if enabled:
-                    app_path = self.get_app_path()
-                    winreg.SetValueEx(key, self.STARTUP_APP_NAME, 0, winreg.REG_SZ, app_path)
-                else:
-                    try:
-                        winreg.DeleteValue(key, self.STARTUP_APP_NAME)
-                    except FileNotFoundError:
-                        pass
-            self.settings_manager.set('start_on_startup', enabled)
-            return True
-        except Exception as e:
-            print(f"Failed to update startup setting: {e}")
+        """Enable or disable starting on login."""
+        if not self.platform.autostart.set_enabled(enabled):
             return False
+        self.settings_manager.set('start_on_startup', enabled)
+        return True
 
-    def setup_hotkey(self):
-        """Setup global hotkey using pynput."""
-        if self.hotkey_listener:
+    def hotkey_routes(self):
+        """{hotkey: CaptureRoute} for the main hotkey and every entry in `hotkey_bindings`."""
+        routes = {}
+        hotkey_str = self.settings_manager.get('hotkey', '')
+        if hotkey_str:
+            routes[hotkey_str.lower()] = None  # default route: default deck, active template
+        for spec in self.settings_manager.get('hotkey_bindings', []):
             try:
-                self.hotkey_listener.stop()
-            except:
-                pass
-            self.hotkey_listener = None
+                route = CaptureRoute.from_spec(spec)
+            except ValueError as e:
+                print(f"Skipping hotkey binding: {e}")
+                continue
+            if route.hotkey.lower() in routes:
+                print(f"Skipping hotkey binding: {route.hotkey} is already bound")
+                continue
+            routes[route.hotkey.lower()] = route
+        return routes
+
+    def setup_hotkey(self):
+        """Register the configured global hotkeys (all on one keyboard listener)."""
+        self.platform.hotkeys.unregister()
         
-        hotkey_str = self.settings_manager.get('hotkey', '')
-        if not hotkey_str:
+        routes = self.hotkey_routes()
+        if not routes:
             print("No hotkey configured")
             return
         
-        parts = hotkey_str.lower().split('+')
-        pynput_parts = []
-        modifiers = {'ctrl', 'alt', 'shift', 'win', 'cmd'}
-        for part in parts:
-            part = part.strip()
-            if part in modifiers:
-                pynput_parts.append(f'<{part}>')
-            else:
-                pynput_parts.append(part)
-        pynput_hotkey = '+'.join(pynput_parts)
-        
         try:
-            self.hotkey_listener = keyboard.GlobalHotKeys({
-                pynput_hotkey: self.on_hotkey_pressed
+            registered = self.platform.hotkeys.register_many({
+                hotkey: (lambda route=route: self.on_hotkey_pressed(route))
+                for hotkey, route in routes.items()
             })
-            self.hotkey_listener.start()
-            print(f"Hotkey registered: {pynput_hotkey}")
+            print(f"Hotkeys registered: {', '.join(registered) or 'none'}")
         except Exception as e:
             print(f"Failed to setup hotkey: {e}")
 
@@ -367,18 +319,12 @@ class LexiSnapApp:
         if self.hotkey_button:
             self.hotkey_button.configure(text="Press keys...", fg_color=self.COLORS['accent'])
         
-        if self.hotkey_listener:
-            try:
-                self.hotkey_listener.stop()
-            except:
-                pass
-            self.hotkey_listener = None
+        self.platform.hotkeys.unregister()
         
-        def on_press(key):
+        def on_press(key_name):
             if not self.recording_hotkey:
                 return False
             
-            key_name = self._get_key_name(key)
             if key_name:
                 if self.first_key_time is None:
                     self.first_key_time = time.time()
@@ -387,11 +333,10 @@ class LexiSnapApp:
                 self.currently_pressed.add(key_name)
                 self._update_recording_display()
         
-        def on_release(key):
+        def on_release(key_name):
             if not self.recording_hotkey:
                 return False
             
-            key_name = self._get_key_name(key)
             if key_name:
                 self.currently_pressed.discard(key_name)
             
@@ -401,54 +346,23 @@ class LexiSnapApp:
             elapsed = time.time() - self.first_key_time
             
             if len(self.currently_pressed) == 0 and len(self.recorded_keys) >= 2 and elapsed > 0.5:
-                modifiers = {'ctrl', 'alt', 'shift', 'win', 'cmd'}
-                has_modifier = any(k in modifiers for k in self.recorded_keys)
-                has_regular = any(k not in modifiers for k in self.recorded_keys)
+                has_modifier = any(k in MODIFIERS for k in self.recorded_keys)
+                has_regular = any(k not in MODIFIERS for k in self.recorded_keys)
                 
                 if has_modifier and has_regular:
                     self.gui_queue.put(('finalize_hotkey', None, None))
                     return False
         
-        self.hotkey_record_listener = keyboard.Listener(on_press=on_press, on_release=on_release)
-        self.hotkey_record_listener.start()
+        self.hotkey_record_listener = self.platform.hotkeys.listen_keys(on_press, on_release)
 
     def _update_recording_display(self):
         """Update the button to show currently pressed keys."""
         if self.hotkey_button and self.recorded_keys:
-            modifiers = {'ctrl', 'alt', 'shift', 'win', 'cmd'}
-            mod_keys = sorted([k for k in self.recorded_keys if k in modifiers])
-            other_keys = sorted([k for k in self.recorded_keys if k not in modifiers])
+            mod_keys = sorted([k for k in self.recorded_keys if k in MODIFIERS])
+            other_keys = sorted([k for k in self.recorded_keys if k not in MODIFIERS])
             display = '+'.join(mod_keys + other_keys).upper()
             self.gui_queue.put(('update_hotkey_button', display, None))
 
-    def _get_key_name(self, key):
-        """Convert pynput key to readable name."""
-        try:
-            if hasattr(key, 'name') and key.name:
-                name = key.name.lower()
-                name_map = {
-                    'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
-                    'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt',
-                    'shift_l': 'shift', 'shift_r': 'shift',
-                    'cmd': 'win', 'cmd_l': 'win', 'cmd_r': 'win',
-                }
-                return name_map.get(name, name)
-            
-            if hasattr(key, 'char') and key.char:
-                return key.char.lower()
-            
-            if hasattr(key, 'vk') and key.vk:
-                vk = key.vk
-                if 65 <= vk <= 90:
-                    return chr(vk).lower()
-                if 48 <= vk <= 57:
-                    return chr(vk)
-                if 112 <= vk <= 123:
-                    return f'f{vk - 111}'
-        except Exception as e:
-            print(f"Key detection error: {e}")
-        return None
-
     def finalize_hotkey_recording(self):
         """Finalize the recorded hotkey."""
         if not self.recording_hotkey:
@@ -459,15 +373,14 @@ class LexiSnapApp:
         if self.hotkey_record_listener:
             try:
                 self.hotkey_record_listener.stop()
-            except:
-                pass
+            except Exception:
+                swallowed()
             self.hotkey_record_listener = None
         
         valid_hotkey = False
         if len(self.recorded_keys) >= 2:
-            modifiers = {'ctrl', 'alt', 'shift', 'win', 'cmd'}
-            mod_keys = sorted([k for k in self.recorded_keys if k in modifiers])
-            other_keys = sorted([k for k in self.recorded_keys if k not in modifiers])
+            mod_keys = sorted([k for k in self.recorded_keys if k in MODIFIERS])
+            other_keys = sorted([k for k in self.recorded_keys if k not in MODIFIERS])
             
             if mod_keys and other_keys:
                 hotkey_str = '+'.join(mod_keys + other_keys)
@@ -497,64 +410,12 @@ class LexiSnapApp:
         self.settings_manager.set('hotkey', '')
         if self.hotkey_button:
             self.hotkey_button.configure(text="Click to set", fg_color=self.COLORS['input'])
-        if self.hotkey_listener:
-            try:
-                self.hotkey_listener.stop()
-            except:
-                pass
-            self.hotkey_listener = None
+        self.platform.hotkeys.unregister()
 
-    def on_hotkey_pressed(self):
+    def on_hotkey_pressed(self, route=None):
         """Handle hotkey press - runs in keyboard's thread."""
         print(">>> HOTKEY DETECTED <<<", flush=True)
-        threading.Thread(target=self._process_hotkey, daemon=True).start()
-
-    def _process_hotkey(self):
-        """Process the hotkey in a background thread, then queue GUI work."""
-        try:
-            time.sleep(0.15)
-            pyperclip.copy("")
-            
-            kb = keyboard.Controller()
-            for key in [keyboard.Key.ctrl, keyboard.Key.alt, keyboard.Key.shift]:
-                try:
-                    kb.release(key)
-                except:
-                    pass
-            time.sleep(0.05)
-            with kb.pressed(keyboard.Key.ctrl):
-                kb.tap('c')
-            
-            time.sleep(0.2)
-            text = pyperclip.paste().strip()
-
-            if not text:
-                self.gui_queue.put(('toast', "No text selected", None))
-                return
-
-            definition = self.get_definition(text)
-            default_deck = self.settings_manager.get('default_deck')
-            
-            if default_deck and default_deck != "None (Ask every time)":
-                if self.add_to_anki(default_deck, text, definition):
-                    # Add to history
-                    self.settings_manager.add_to_history(text, definition)
-                    # Increment session counter
-                    self.session_card_count += 1
-                    # Update tray icon badge
-                    self.update_tray_icon()
-                    # Show toast notification if enabled
-                    if self.settings_manager.get('notification_toast_enabled', False):
-                        self.gui_queue.put(('toast', f"Added: {text}", None))
-                    # Refresh history tab if visible
-                    self.gui_queue.put(('refresh_history', None, None))
-                else:
-                    self.gui_queue.put(('toast', "Failed to add card", None))
-            else:
-                self.gui_queue.put(('deck_selector', text, definition))
-
-        except Exception as e:
-            self.gui_queue.put(('toast', f"Error: {str(e)}", None))
+        self.pipeline.submit_capture(route)
 
     def process_gui_queue(self):
         """Check the queue and process GUI operations in main thread."""
@@ -568,14 +429,14 @@ class LexiSnapApp:
                 elif item[0] == 'finalize_hotkey':
                     self.finalize_hotkey_recording()
                 elif item[0] == 'show_window':
-                    self.root.deiconify()
-                    self.root.lift()
-                    self.root.focus_force()
+                    self.show_window()
                 elif item[0] == 'quit_app':
                     self.quit_application()
                 elif item[0] == 'update_hotkey_button':
                     if self.hotkey_button:
                         self.hotkey_button.configure(text=item[1], fg_color=self.COLORS['accent'])
+                elif item[0] == 'card_added':
+                    self._on_card_added(item[1])
                 elif item[0] == 'refresh_history':
                     if self.current_tab == 'history':
                         self._refresh_history_content()
@@ -583,30 +444,28 @@ class LexiSnapApp:
                     self._update_anki_status()
                 elif item[0] == 'set_anki_status':
                     self._set_anki_status_label(item[1])
-                elif item[0] == 'update_deck_dropdown':
+                elif item[0] in ('update_deck_dropdown', 'decks_changed'):
                     self._update_deck_dropdown(item[1])
+                elif item[0] == 'lexicon_progress':
+                    self._on_lexicon_progress(item[1], *item[2])
+                elif item[0] == 'lexicon_done':
+                    self._on_lexicon_done(item[1], item[2])
+                elif item[0] == 'setting_changed':
+                    self._on_setting_changed(item[1])
         except queue.Empty:
             pass
         
         if not self.quitting and self.root:
             self.root.after(100, self.process_gui_queue)
 
-    def _get_work_area(self):
-        """Get the work area (screen area excluding taskbar) using Windows API."""
-        import ctypes
-        from ctypes import wintypes
-        
-        class RECT(ctypes.Structure):
-            _fields_ = [
-                ('left', ctypes.c_long),
-                ('top', ctypes.c_long),
-                ('right', ctypes.c_long),
-                ('bottom', ctypes.c_long)
-            ]
-        
-        rect = RECT()
-        ctypes.windll.user32.SystemParametersInfoW(0x0030, 0, ctypes.byref(rect), 0)  # SPI_GETWORKAREA
-        return rect.left, rect.top, rect.right, rect.bottom
+    def _on_card_added(self, word):
+        """Update the badge, toast and history after a card was added."""
+        self.session_card_count += 1
+        self.update_tray_icon()
+        if self.settings_manager.get('notification_toast_enabled', False):
+            self._show_toast(f"Added: {word}")
+        if self.current_tab == 'history':
+            self._refresh_history_content()
 
     def _show_toast(self, message):
         """Show a semi-transparent toast notification at bottom center of current monitor."""
@@ -626,48 +485,17 @@ class LexiSnapApp:
         # Padding from bottom edge
         padding = 24
         
-        # Get monitor info where the mouse cursor is located
-        try:
-            import ctypes
-            from ctypes import wintypes
-            
-            class POINT(ctypes.Structure):
-                _fields_ = [('x', ctypes.c_long), ('y', ctypes.c_long)]
-            
-            class MONITORINFO(ctypes.Structure):
-                _fields_ = [
-                    ('cbSize', ctypes.c_ulong),
-                    ('rcMonitor', wintypes.RECT),
-                    ('rcWork', wintypes.RECT),
-                    ('dwFlags', ctypes.c_ulong)
-                ]
-            
-            # Get cursor position
-            pt = POINT()
-            ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
-            
-            # Get monitor from cursor position
-            MONITOR_DEFAULTTONEAREST = 2
-            hMonitor = ctypes.windll.user32.MonitorFromPoint(pt, MONITOR_DEFAULTTONEAREST)
-            
-            # Get monitor info
-            mi = MONITORINFO()
-            mi.cbSize = ctypes.sizeof(MONITORINFO)
-            ctypes.windll.user32.GetMonitorInfoW(hMonitor, ctypes.byref(mi))
-            
-            # Use work area (excludes taskbar)
-            mon_left = mi.rcWork.left
-            mon_top = mi.rcWork.top
-            mon_right = mi.rcWork.right
-            mon_bottom = mi.rcWork.bottom
+        # Get the work area (excludes taskbar) of the monitor under the mouse cursor
+        work_area = self.platform.work_area_at_cursor()
+        if work_area:
+            mon_left, mon_top, mon_right, mon_bottom = work_area
             mon_width = mon_right - mon_left
             mon_height = mon_bottom - mon_top
             
             # Position at bottom center of this monitor
             x = mon_left + (mon_width - toast_width) // 2
             y = mon_bottom - toast_height - padding
-            
-        except Exception:
+        else:
             # Fallback: use tkinter screen dimensions
             toast.update_idletasks()
             screen_width = toast.winfo_screenwidth()
@@ -680,8 +508,12 @@ class LexiSnapApp:
         
         # Use a chroma key color to make window background transparent
         # This allows the rounded corners to show properly
-        chroma_key = "#010101"  # Nearly black, unlikely to be used elsewhere
-        toast.wm_attributes("-transparentcolor", chroma_key)
+        # (Windows only - elsewhere the corners just sit on the app background)
+        if self.platform.transparent_windows:
+            chroma_key = "#010101"  # Nearly black, unlikely to be used elsewhere
+            toast.wm_attributes("-transparentcolor", chroma_key)
+        else:
+            chroma_key = self.COLORS['bg']
         
         # Outer frame fills window with the transparent color
         outer = ctk.CTkFrame(toast, fg_color=chroma_key, corner_radius=0)
@@ -715,71 +547,18 @@ class LexiSnapApp:
             try:
                 if toast.winfo_exists():
                     toast.destroy()
-            except:
-                pass
+            except Exception:
+                swallowed()
         
         toast.after(1000, safe_destroy)
 
-    def get_definition(self, word):
-        """Get dictionary definition."""
-        try:
-            url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-            response = requests.get(url, timeout=3)
-            if response.status_code == 200:
-                data = response.json()[0]
-                return data['meanings'][0]['definitions'][0]['definition']
-        except:
-            pass
-        return "No definition found"
-
     def get_anki_decks(self):
         """Get list of Anki decks."""
-        try:
-            response = requests.post(
-                self.anki_url,
-                json={'action': 'deckNames', 'version': 6},
-                timeout=2
-            )
-            if response.status_code == 200:
-                return response.json().get('result', [])
-        except:
-            pass
-        return []
-
-    def add_to_anki(self, deck, word, definition):
-        """Add card to Anki."""
-        try:
-            note = {
-                'deckName': deck,
-                'modelName': 'Basic',
-                'fields': {'Front': word, 'Back': definition},
-                'tags': ['lexi-snap']
-            }
-            response = requests.post(
-                self.anki_url,
-                json={'action': 'addNote', 'version': 6, 'params': {'note': note}},
-                timeout=2
-            )
-            success = response.status_code == 200 and response.json().get('error') is None
-            # Update Anki status after operation
-            self.gui_queue.put(('update_anki_status', None, None))
-            return success
-        except:
-            # Update Anki status after failed operation
-            self.gui_queue.put(('update_anki_status', None, None))
-            return False
+        return self.pipeline.get_anki_decks()
 
     def _ping_anki(self):
         """Quick check if Anki is responding (short timeout for status checks)."""
-        try:
-            response = requests.post(
-                self.anki_url,
-                json={'action': 'version', 'version': 6},
-                timeout=0.3
-            )
-            return response.status_code == 200
-        except:
-            return False
+        return self.pipeline.ping_anki()
 
     def _update_anki_status(self):
         """Update the Anki connection status label (runs check in background thread)."""
@@ -797,20 +576,26 @@ class LexiSnapApp:
             self.anki_status_label.configure(text=status_text, text_color=status_color)
 
     def _fetch_decks_async(self):
-        """Fetch Anki decks in background thread and update UI."""
+        """Revalidate the deck/model snapshot in a background thread and update UI.
+
+        The dropdown already shows the snapshot from the last run; it is
+        only redrawn (via 'decks_changed') if Anki's decks differ.
+        """
         def fetch():
-            decks = self.get_anki_decks()
-            is_connected = bool(decks)
+            is_connected = self.pipeline.refresh_metadata() is not None
             self._anki_connected = is_connected
-            # Cache the deck list for faster startup next time
-            if decks:
-                self.settings_manager.set('cached_decks', decks)
-            # Update UI via queue
-            self.gui_queue.put(('update_deck_dropdown', decks, None))
             self.gui_queue.put(('set_anki_status', is_connected, None))
+            if is_connected:
+                self._sync_lexicon()
+                self.pipeline.replay_journal_async()
         
         threading.Thread(target=fetch, daemon=True).start()
 
+    def _sync_lexicon(self):
+        """Pick up notes edited in the known-word decks since their last import."""
+        if self.settings_manager.get('lexicon_decks'):
+            self.pipeline.import_lexicon_async()
+
     def _start_anki_monitor(self):
         """Start background monitoring of Anki connection."""
         if self._anki_monitor_running:
@@ -826,23 +611,22 @@ class LexiSnapApp:
                     if is_connected != was_connected:
                         self._anki_connected = is_connected
                         if is_connected:
-                            # Just connected - fetch full deck list
-                            decks = self.get_anki_decks()
-                            if decks:
-                                self.settings_manager.set('cached_decks', decks)
-                            self.gui_queue.put(('update_deck_dropdown', decks, None))
+                            # Just connected - revalidate the snapshot (redraws decks if changed)
+                            self.pipeline.refresh_metadata()
+                            self._sync_lexicon()
+                            # Captures the last run didn't finish (once, the first time Anki is up)
+                            self.pipeline.replay_journal_async()
                         else:
-                            # Just disconnected - show cached decks (grayed out via status)
-                            cached = self.settings_manager.get('cached_decks', [])
-                            self.gui_queue.put(('update_deck_dropdown', cached, None))
+                            # Just disconnected - show the snapshot's decks (grayed out via status)
+                            self.gui_queue.put(('update_deck_dropdown', self.pipeline.metadata.decks, None))
                         self.gui_queue.put(('set_anki_status', is_connected, None))
-                except:
-                    pass
+                except Exception:
+                    swallowed()
                 
                 # Poll every 2 seconds
                 time.sleep(2)
         
-        threading.Thread(target=monitor, daemon=True).start()
+        threading.Thread(target=monitor, daemon=True, name='anki-monitor').start()
 
     def _stop_anki_monitor(self):
         """Stop the Anki connection monitor."""
@@ -857,15 +641,11 @@ class LexiSnapApp:
             if is_connected != was_connected:
                 self._anki_connected = is_connected
                 if is_connected:
-                    # Just connected - fetch full deck list
-                    decks = self.get_anki_decks()
-                    if decks:
-                        self.settings_manager.set('cached_decks', decks)
-                    self.gui_queue.put(('update_deck_dropdown', decks, None))
+                    # Just connected - revalidate the snapshot (redraws decks if changed)
+                    self.pipeline.refresh_metadata()
                 else:
-                    # Just disconnected - show cached decks
-                    cached = self.settings_manager.get('cached_decks', [])
-                    self.gui_queue.put(('update_deck_dropdown', cached, None))
+                    # Just disconnected - show the snapshot's decks
+                    self.gui_queue.put(('update_deck_dropdown', self.pipeline.metadata.decks, None))
             
             self.gui_queue.put(('set_anki_status', is_connected, None))
         
@@ -873,20 +653,34 @@ class LexiSnapApp:
 
     def _update_deck_dropdown(self, decks):
         """Update the deck dropdown with fetched decks (called from GUI thread)."""
-        self.deck_dropdown_values = ["None (Ask every time)"] + decks
+        self.deck_dropdown_values = [NO_DEFAULT_DECK] + decks
         if self.deck_dropdown:
-            current_deck = self.settings_manager.get('default_deck') or "None (Ask every time)"
+            current_deck = self.settings_manager.get('default_deck') or NO_DEFAULT_DECK
             self.deck_dropdown.configure(values=self.deck_dropdown_values)
             # Restore selection if it exists in new list
             if current_deck in self.deck_dropdown_values:
                 self.deck_dropdown.set(current_deck)
             else:
-                self.deck_dropdown.set("None (Ask every time)")
+                self.deck_dropdown.set(NO_DEFAULT_DECK)
+        # An open "Add to Anki" dialog picks up the fresh list too
+        if decks and self.deck_selector_box is not None:
+            try:
+                self.deck_selector_box.configure(values=decks)
+            except Exception:
+                self.deck_selector_box = None
 
-    def _show_deck_selector(self, word, definition):
+    def _show_deck_selector(self, word, captured):
         """Show deck selector dialog."""
-        decks = self.get_anki_decks()
+        entry, audio, route, source, capture_id = captured
+        definition = self.pipeline.definition_for(entry, route)
+        # Open instantly from the snapshot; a background revalidation updates the list if needed
+        decks = self.pipeline.metadata.decks
+        if decks:
+            self.pipeline.refresh_metadata_async()
+        else:
+            decks = self.get_anki_decks()
         if not decks:
+            self.pipeline.journal.done(capture_id, 'failed')
             self._show_toast("Anki not running or no decks found")
             return
 
@@ -902,8 +696,8 @@ class LexiSnapApp:
         if self.icon_path_ico and os.path.exists(self.icon_path_ico):
             try:
                 dialog.iconbitmap(self.icon_path_ico)
-            except:
-                pass
+            except Exception:
+                swallowed()
 
         dialog.update_idletasks()
         x = (dialog.winfo_screenwidth() // 2) - 250
@@ -927,45 +721,154 @@ class LexiSnapApp:
         ctk.CTkLabel(container, text="SELECT DECK", font=("Segoe UI", 10),
                     text_color=self.COLORS['text_secondary']).pack(anchor="w", padx=20, pady=(10, 5))
 
-        deck_var = ctk.StringVar(value=decks[0])
-        ctk.CTkComboBox(container, values=decks, variable=deck_var, width=440,
-                       fg_color=self.COLORS['input']).pack(padx=20, pady=(0, 20))
+        preselected = route.deck if route.deck in decks else decks[0]
+        deck_var = ctk.StringVar(value=preselected)
+        self.deck_selector_box = ctk.CTkComboBox(container, values=decks, variable=deck_var, width=440,
+                                                 fg_color=self.COLORS['input'])
+        self.deck_selector_box.pack(padx=20, pady=(0, 20))
 
         button_frame = ctk.CTkFrame(container, fg_color=self.COLORS['card'])
         button_frame.pack(fill="x", padx=20, pady=(0, 10))
 
+        def close():
+            self.deck_selector_box = None
+            dialog.destroy()
+
+        def cancel():
+            close()
+            self.pipeline.journal.done(capture_id, 'cancelled')
+
         def add_card():
             deck = deck_var.get()
-            dialog.destroy()
-            if self.add_to_anki(deck, word, definition):
-                self.settings_manager.add_to_history(word, definition)
-                self.session_card_count += 1
-                self.update_tray_icon()
-                if self.settings_manager.get('notification_toast_enabled', False):
-                    self._show_toast(f"Added: {word}")
-                self.gui_queue.put(('refresh_history', None, None))
+            close()
+            note_id = self.pipeline.add_to_anki(deck, word, definition, entry, source=source, audio=audio,
+                                                template=self.pipeline.route_template(route),
+                                                capture_id=capture_id)
+            if note_id:
+                self.pipeline.record_added(word, definition, note_id, deck, route=route, source=source,
+                                           capture_id=capture_id)
             else:
+                self.pipeline.journal.done(capture_id, 'failed')
                 self._show_toast("Failed to add card")
 
-        ctk.CTkButton(button_frame, text="Cancel", command=dialog.destroy,
+        ctk.CTkButton(button_frame, text="Cancel", command=cancel,
                      fg_color=self.COLORS['input'], width=120).pack(side="right", padx=(10, 0))
         ctk.CTkButton(button_frame, text="Add Card", command=add_card,
                      fg_color=self.COLORS['primary'], width=120).pack(side="right")
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+
+    # ==================== KNOWN WORDS ====================
+
+    def _lexicon_text(self):
+        decks = self.settings_manager.get('lexicon_decks', [])
+        if not decks:
+            return "Skip words you already study in your own decks"
+        return f"{len(self.pipeline.lexicon):,} words from {len(decks)} deck{'s' if len(decks) != 1 else ''}"
+
+    def _show_lexicon_dialog(self):
+        """Pick the decks whose note fronts count as known words, and import them."""
+        decks = list(self.pipeline.metadata.decks or self.get_anki_decks())
+        if not decks:
+            self._show_toast("Anki not running or no decks found")
+            return
+        selected = set(self.settings_manager.get('lexicon_decks', []))
+
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Known Words")
+        dialog.geometry("420x460")
+        dialog.resizable(False, False)
+        dialog.attributes('-topmost', True)
+        dialog.grab_set()
+        dialog.focus_force()
+
+        if self.icon_path_ico and os.path.exists(self.icon_path_ico):
+            try:
+                dialog.iconbitmap(self.icon_path_ico)
+            except Exception:
+                swallowed()
+
+        container = ctk.CTkFrame(dialog, fg_color=self.COLORS['card'])
+        container.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(container, text="Known Words", font=("Segoe UI", 18, "bold")).pack(pady=(10, 5))
+        ctk.CTkLabel(container, text="Words in these decks are skipped when you capture them.",
+                     font=("Segoe UI", 11), text_color=self.COLORS['text_secondary'],
+                     wraplength=360).pack(padx=20, pady=(0, 10))
+
+        deck_list = ctk.CTkScrollableFrame(container, fg_color=self.COLORS['input'], height=200)
+        deck_list.pack(fill="x", padx=20)
+        deck_vars = {}
+        for deck in decks:
+            deck_vars[deck] = ctk.BooleanVar(value=deck in selected)
+            ctk.CTkCheckBox(deck_list, text=deck, variable=deck_vars[deck],
+                            font=("Segoe UI", 11)).pack(anchor="w", pady=2)
+
+        bar = ctk.CTkProgressBar(container, progress_color=self.COLORS['primary'])
+        bar.set(0)
+        bar.pack(fill="x", padx=20, pady=(15, 5))
+        status = ctk.CTkLabel(container, text="", font=("Segoe UI", 11),
+                              text_color=self.COLORS['text_secondary'])
+        status.pack(anchor="w", padx=20)
+
+        button_frame = ctk.CTkFrame(container, fg_color=self.COLORS['card'])
+        button_frame.pack(fill="x", padx=20, pady=(10, 10))
+
+        def close():
+            self.lexicon_progress = None
+            dialog.destroy()
+
+        def start_import():
+            chosen = [deck for deck, var in deck_vars.items() if var.get()]
+            self.pipeline.lexicon.forget([deck for deck in selected if deck not in chosen])
+            self.settings_manager.set('lexicon_decks', chosen)
+            if not chosen:
+                self._on_lexicon_done(0, None)
+                return
+            import_button.configure(state="disabled")
+            status.configure(text="Importing...")
+            self.pipeline.import_lexicon_async(chosen, full=True)
+
+        ctk.CTkButton(button_frame, text="Close", command=close,
+                      fg_color=self.COLORS['input'], width=120).pack(side="right", padx=(10, 0))
+        import_button = ctk.CTkButton(button_frame, text="Import", command=start_import,
+                                      fg_color=self.COLORS['primary'], width=120)
+        import_button.pack(side="right")
+        dialog.protocol("WM_DELETE_WINDOW", close)
+        self.lexicon_progress = (bar, status, import_button)
+
+    def _on_lexicon_progress(self, deck, done, total):
+        if self.lexicon_progress is None:
+            return
+        bar, status, _ = self.lexicon_progress
+        bar.set(done / total if total else 1)
+        status.configure(text=f"{deck}: {done:,} / {total:,} notes")
+
+    def _on_lexicon_done(self, notes, error):
+        if self.lexicon_label is not None:
+            self.lexicon_label.configure(text=self._lexicon_text())
+        if self.lexicon_progress is None:
+            return
+        bar, status, import_button = self.lexicon_progress
+        import_button.configure(state="normal")
+        if error:
+            status.configure(text=f"Import failed: {error}", text_color=self.COLORS['error'])
+        else:
+            bar.set(1)
+            status.configure(text=f"Read {notes:,} notes - {len(self.pipeline.lexicon):,} known words")
 
     # ==================== UI CREATION ====================
 
     def create_main_window(self):
-        """Create the main settings window with sidebar navigation."""
-        # Set AppUserModelID for Windows taskbar grouping and icon
-        try:
-            import ctypes
-            ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID('lexi-snap.App.1.0')
-        except:
-            pass
+        """Create the root window, hidden and empty; it runs the Tk event loop for the tray.
+
+        The settings UI is only built while the window is shown (show_window()).
+        """
+        self.platform.set_app_id('lexi-snap.App.1.0')
         
         self.root = ctk.CTk()
+        self.root.withdraw()
         self.root.title("Lexi Snap")
-        self.root.geometry("700x480")
+        self.root.geometry("700x560")
         self.root.resizable(False, False)
         
         # Set window icon (shows in taskbar and title bar)
@@ -978,12 +881,50 @@ class LexiSnapApp:
         # Center window
         self.root.update_idletasks()
         x = (self.root.winfo_screenwidth() // 2) - 350
-        y = (self.root.winfo_screenheight() // 2) - 240
+        y = (self.root.winfo_screenheight() // 2) - 280
         self.root.geometry(f"+{x}+{y}")
 
+        # Closing hides to the tray and frees the settings UI
+        self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
+
+    def show_window(self):
+        """Show the settings window, rebuilding its UI if it was released."""
+        if self.main_container is None:
+            self._build_window_contents()
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+
+    def hide_window(self):
+        """Hide to the tray and destroy the settings UI (tabs, history tiles, icon image).
+
+        Only the bare root window stays resident; widget references are
+        dropped so nothing updates destroyed widgets while the window is closed.
+        """
+        self.root.withdraw()
+        if self.main_container is None:
+            return
+        self._reopen_tab = self.current_tab or "general"
+        self.main_container.destroy()
+        self.main_container = None
+        self.content_frame = None
+        self.tab_frames = {}
+        self.tab_buttons = {}
+        self.hotkey_button = None
+        self.deck_dropdown = None
+        self.anki_status_label = None
+        self.history_scroll = None
+        self.review_stats_label = None
+        self.lexicon_label = None
+        self.current_tab = None
+        gc.collect()  # CTk widgets reference each other through their callbacks
+
+    def _build_window_contents(self):
+        """Build the sidebar and all tabs into the root window."""
         # Main container
         main_container = ctk.CTkFrame(self.root, fg_color=self.COLORS['bg'])
         main_container.pack(fill="both", expand=True)
+        self.main_container = main_container
 
         # Sidebar
         sidebar = ctk.CTkFrame(main_container, fg_color=self.COLORS['sidebar'], width=180)
@@ -1005,10 +946,8 @@ class LexiSnapApp:
         self._create_notifications_tab()
         self._create_history_tab()
 
-        # Show default tab
-        self.switch_tab("general")
-
-        self.root.protocol("WM_DELETE_WINDOW", self.root.withdraw)
+        # Show the default tab, or the one open when the window was last closed
+        self.switch_tab(self._reopen_tab)
 
     def _create_sidebar_header(self, sidebar):
         """Create the sidebar header with icon and app name."""
@@ -1018,13 +957,13 @@ class LexiSnapApp:
         # Try to load and display the icon
         if self.icon_path and os.path.exists(self.icon_path):
             try:
-                icon_img = Image.open(self.icon_path)
-                icon_img = icon_img.resize((40, 40), Image.Resampling.LANCZOS)
+                with Image.open(self.icon_path) as source:
+                    icon_img = source.resize((40, 40), Image.Resampling.LANCZOS)
                 icon_ctk = ctk.CTkImage(light_image=icon_img, dark_image=icon_img, size=(40, 40))
                 icon_label = ctk.CTkLabel(header_frame, image=icon_ctk, text="")
                 icon_label.pack(side="left", padx=(0, 10))
-            except:
-                pass
+            except Exception:
+                swallowed()
 
         ctk.CTkLabel(
             header_frame, 
@@ -1083,6 +1022,8 @@ class LexiSnapApp:
             self.session_card_count = 0
             self.update_tray_icon()
             self._refresh_history_content()
+            if self._anki_connected:
+                self.pipeline.sync_reviews_async()  # refreshes the tab again when done
         
         # Quick status check when switching to general tab
         if tab_id == "general":
@@ -1171,13 +1112,12 @@ class LexiSnapApp:
             text_color=self.COLORS['text']
         ).pack(side="left")
 
-        # Use cached decks for instant display, will be updated async
-        cached_decks = self.settings_manager.get('cached_decks', [])
-        self.deck_dropdown_values = ["None (Ask every time)"] + cached_decks
-        current_deck = self.settings_manager.get('default_deck') or "None (Ask every time)"
+        # Use the metadata snapshot for instant display, revalidated async
+        self.deck_dropdown_values = [NO_DEFAULT_DECK] + self.pipeline.metadata.decks
+        current_deck = self.settings_manager.get('default_deck') or NO_DEFAULT_DECK
 
         def update_deck(choice):
-            self.settings_manager.set('default_deck', None if choice == "None (Ask every time)" else choice)
+            self.settings_manager.set('default_deck', None if choice == NO_DEFAULT_DECK else choice)
 
         self.deck_dropdown = ctk.CTkComboBox(
             deck_frame, 
@@ -1194,13 +1134,112 @@ class LexiSnapApp:
         # Divider
         ctk.CTkFrame(card, fg_color=self.COLORS['border'], height=1).pack(fill="x", padx=20)
 
+        # Note template setting
+        template_frame = ctk.CTkFrame(card, fg_color=self.COLORS['card'])
+        template_frame.pack(fill="x", padx=20, pady=15)
+
+        ctk.CTkLabel(
+            template_frame, 
+            text="Note Template", 
+            font=("Segoe UI", 13),
+            text_color=self.COLORS['text']
+        ).pack(side="left")
+
+        def update_template(choice):
+            self.settings_manager.set('note_template', choice)
+
+        template_dropdown = ctk.CTkComboBox(
+            template_frame, 
+            values=list(self.pipeline.templates), 
+            command=update_template, 
+            width=180,
+            fg_color=self.COLORS['input'],
+            button_color=self.COLORS['primary'],
+            button_hover_color=self.COLORS['primary_hover']
+        )
+        template_dropdown.set(self.pipeline.active_template().name)
+        template_dropdown.pack(side="right")
+
+        # Divider
+        ctk.CTkFrame(card, fg_color=self.COLORS['border'], height=1).pack(fill="x", padx=20)
+
+        # Pronunciation audio setting
+        audio_frame = ctk.CTkFrame(card, fg_color=self.COLORS['card'])
+        audio_frame.pack(fill="x", padx=20, pady=15)
+
+        ctk.CTkLabel(
+            audio_frame, 
+            text="Pronunciation Audio", 
+            font=("Segoe UI", 13),
+            text_color=self.COLORS['text']
+        ).pack(side="left")
+
+        audio_var = ctk.BooleanVar(value=self.settings_manager.get('pronunciation_audio', False))
+
+        def toggle_audio():
+            self.settings_manager.set('pronunciation_audio', audio_var.get())
+
+        audio_switch = ctk.CTkSwitch(
+            audio_frame,
+            text="",
+            variable=audio_var,
+            command=toggle_audio,
+            width=51,
+            height=26,
+            switch_width=48,
+            switch_height=24,
+            corner_radius=12,
+            fg_color=("#d1d5db", "#4b5563"),  # Gray when OFF (light/dark mode)
+            progress_color=self.COLORS['primary'],  # Blue when ON
+            button_color=self.COLORS['text'],  # White button
+            button_hover_color=("#f3f4f6", "#e5e7eb"),  # Slight hover effect
+        )
+        audio_switch.pack(side="right")
+
+        # Divider
+        ctk.CTkFrame(card, fg_color=self.COLORS['border'], height=1).pack(fill="x", padx=20)
+
+        # Known words imported from the user's own decks
+        lexicon_frame = ctk.CTkFrame(card, fg_color=self.COLORS['card'])
+        lexicon_frame.pack(fill="x", padx=20, pady=15)
+
+        lexicon_text = ctk.CTkFrame(lexicon_frame, fg_color=self.COLORS['card'])
+        lexicon_text.pack(side="left")
+        ctk.CTkLabel(
+            lexicon_text,
+            text="Known Words",
+            font=("Segoe UI", 13),
+            text_color=self.COLORS['text']
+        ).pack(anchor="w")
+        self.lexicon_label = ctk.CTkLabel(
+            lexicon_text,
+            text=self._lexicon_text(),
+            font=("Segoe UI", 11),
+            text_color=self.COLORS['text_secondary']
+        )
+        self.lexicon_label.pack(anchor="w")
+
+        ctk.CTkButton(
+            lexicon_frame,
+            text="Import Decks...",
+            font=("Segoe UI", 11),
+            fg_color=self.COLORS['input'],
+            hover_color=self.COLORS['border'],
+            width=140,
+            height=32,
+            command=self._show_lexicon_dialog
+        ).pack(side="right")
+
+        # Divider
+        ctk.CTkFrame(card, fg_color=self.COLORS['border'], height=1).pack(fill="x", padx=20)
+
         # Start on startup setting
         startup_frame = ctk.CTkFrame(card, fg_color=self.COLORS['card'])
         startup_frame.pack(fill="x", padx=20, pady=15)
 
         ctk.CTkLabel(
             startup_frame, 
-            text="Start on Windows Startup", 
+            text="Start on Windows Startup" if self.platform.name == 'windows' else "Start on Login", 
             font=("Segoe UI", 13),
             text_color=self.COLORS['text']
         ).pack(side="left")
@@ -1367,7 +1406,17 @@ class LexiSnapApp:
             text="Your 10 most recently created flashcards",
             font=("Segoe UI", 12),
             text_color=self.COLORS['text_secondary']
-        ).pack(anchor="w", pady=(0, 15))
+        ).pack(anchor="w", pady=(0, 10))
+
+        # Review stats of all lexi-snap cards, from the last sync with Anki
+        self.review_stats_label = ctk.CTkLabel(
+            frame,
+            text="",
+            font=("Segoe UI", 12),
+            text_color=self.COLORS['text'],
+            justify="left"
+        )
+        self.review_stats_label.pack(anchor="w", pady=(0, 15))
 
         # Scrollable frame for cards
         self.history_scroll = ctk.CTkScrollableFrame(
@@ -1385,6 +1434,9 @@ class LexiSnapApp:
             widget.destroy()
 
         history = self.settings_manager.get('card_history', [])
+        reviews = self.pipeline.reviews
+        self.review_stats_label.configure(text=self._review_stats_text(reviews.summary()))
+        statuses = reviews.note_statuses() if history else {}
 
         if not history:
             ctk.CTkLabel(
@@ -1404,13 +1456,27 @@ class LexiSnapApp:
             )
             tile.pack(fill="x", pady=(0, 8))
 
+            header = ctk.CTkFrame(tile, fg_color="transparent")
+            header.pack(fill="x", padx=15, pady=(12, 2))
+
             # Word (front)
             ctk.CTkLabel(
-                tile,
+                header,
                 text=card.get('word', 'Unknown'),
                 font=("Segoe UI", 14, "bold"),
                 text_color=self.COLORS['text']
-            ).pack(anchor="w", padx=15, pady=(12, 2))
+            ).pack(side="left")
+
+            # Review state from Anki, once synced
+            state, due = statuses.get(card.get('note_id'), (None, False))
+            if state:
+                ctk.CTkLabel(
+                    header,
+                    text=STATE_LABELS[state] + (" · due" if due else ""),
+                    font=("Segoe UI", 11),
+                    text_color=self.COLORS['accent'] if due or state == 'relearning'
+                    else self.COLORS['text_secondary']
+                ).pack(side="right")
 
             # Definition (back) - truncated if too long
             definition = card.get('definition', '')
@@ -1426,14 +1492,96 @@ class LexiSnapApp:
                 justify="left"
             ).pack(anchor="w", padx=15, pady=(0, 12))
 
+    @staticmethod
+    def _review_stats_text(summary):
+        """One-line summary of the review stats for the History tab."""
+        if not summary['synced_at']:
+            return "Review stats appear once Anki is running."
+        states = summary['states']
+        return (f"{summary['cards']} cards: {states['mature']} learned, {states['young']} young, "
+                f"{states['learning']} learning, {states['new']} new, {states['relearning']} lapsed"
+                f"  |  {summary['due']} due  |  {summary['lapses']} lapses in {summary['reviews']} reviews")
+
+    def start_ipc_server(self):
+        """Accept commands from later launches (lexi-snap --add ...)."""
+        address = self.platform.ipc_address()
+        if not address:
+            return
+        handler = CommandHandler(
+            self.pipeline,
+            show_window=lambda: self.gui_queue.put(('show_window', None, None)),
+            dump_diagnostics=self.dump_diagnostics,
+        )
+        try:
+            self.ipc_server = IPCServer(address, handler)
+            self.ipc_server.start()
+        except Exception as e:
+            print(f"Command endpoint unavailable: {e}")
+            self.ipc_server = None
+
+    def start_api_server(self):
+        """Serve the local HTTP API if it is enabled in settings."""
+        if not self.settings_manager.get('api_enabled', False):
+            return
+        try:
+            self.api_server = ApiServer(
+                self.pipeline,
+                port=self.settings_manager.get('api_port') or DEFAULT_PORT,
+                token=self.settings_manager.get('api_token', ''),
+            )
+            self.api_server.start()
+            print(f"Local API on {self.api_server.url}")
+        except OSError as e:
+            print(f"Local API unavailable: {e}")
+            self.api_server = None
+
+    def _on_setting_changed(self, change):
+        """Apply an edit of the settings file to what depends on it (called from GUI thread).
+
+        Changes made in this window already took effect where they were made.
+        """
+        if change.origin != 'file':
+            return
+        key = change.key
+        if key in ('hotkey', 'hotkey_bindings'):
+            if not self.recording_hotkey:
+                self.setup_hotkey()
+            if key == 'hotkey' and self.hotkey_button:
+                self.hotkey_button.configure(text=change.new.upper() if change.new else "Click to set")
+        elif key == 'default_deck':
+            if self.deck_dropdown:
+                self.deck_dropdown.set(change.new if change.new in self.deck_dropdown_values else NO_DEFAULT_DECK)
+        elif key == 'notification_badge_enabled':
+            self.update_tray_icon()
+        elif key == 'start_on_startup':
+            self.platform.autostart.set_enabled(bool(change.new))
+        elif key in ('api_enabled', 'api_port', 'api_token'):
+            if self.api_server:
+                self.api_server.stop()
+                self.api_server = None
+            self.start_api_server()
+        elif key == 'diagnostics_enabled':
+            if change.new:
+                self.profiler.start()
+            elif not self.diagnostics:
+                self.profiler.stop()
+
     def run(self, start_minimized=False):
         """Start the application."""
+        if self.diagnostics or self.settings_manager.get('diagnostics_enabled', False):
+            self.profiler.start()
+            print("Diagnostics on: sampling profiler running")
+        self.start_ipc_server()
+        self.start_api_server()
+        # Edits to the settings file apply without a restart
+        self.settings_manager.subscribe(lambda change: self.gui_queue.put(('setting_changed', change, None)))
+        self.settings_manager.watch()
         self.setup_hotkey()
         self.create_main_window()
         self.setup_tray_icon()
         
-        if start_minimized:
-            self.root.withdraw()
+        if not start_minimized:
+            self.show_window()
         
         self.root.after(100, self.process_gui_queue)
         
@@ -1442,6 +1590,9 @@ class LexiSnapApp:
         
         # Start background Anki connection monitoring
         self.root.after(500, self._start_anki_monitor)
+
+        # Fix cards that missed their definition, while idle
+        self.root.after(1000, self.pipeline.refresher.start)
         
         print("Lexi Snap running!")
         hotkey = self.settings_manager.get('hotkey', '')
@@ -1458,32 +1609,148 @@ class LexiSnapApp:
         self.root.mainloop()
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='lexi-snap', description="Select a word, press a hotkey, get an Anki card.")
+    parser.add_argument('--minimized', action='store_true', help="start hidden in the system tray")
+    parser.add_argument('--add', nargs='+', metavar='WORD', help="add cards for these words and exit")
+    parser.add_argument('--import', dest='import_file', metavar='FILE',
+                        help="add a card for every line of FILE ('-' for stdin) and exit")
+    parser.add_argument('--deck', help="deck for --add/--import (default: the default deck)")
+    parser.add_argument('--export', metavar='FILE',
+                        help="write the card history to FILE ('-' for stdout) and exit")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="export format (default: from the file extension, else csv)")
+    parser.add_argument('--since-last', action='store_true',
+                        help="export only what was added since the previous export")
+    parser.add_argument('--definitions', action='store_true',
+                        help="export the cached definitions instead of the history")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="run the sampling profiler for this run (see --dump-diagnostics)")
+    parser.add_argument('--dump-diagnostics', nargs='?', const='', metavar='DIR',
+                        help="have the running app write a diagnostics bundle to DIR (default: home) and exit")
+    return parser.parse_args(argv)
+
+
+def read_words(path):
+    """Words from a file, one per line; blank lines and # comments are skipped."""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    with f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def build_commands(args):
+    words = list(args.add or [])
+    if args.import_file:
+        words += read_words(args.import_file)
+    return [{'op': 'add', 'words': words, 'deck': args.deck}] if words else []
+
+
+def report_results(messages):
+    """Print streamed command results. Returns (added, failed)."""
+    added = failed = 0
+    for message in messages:
+        if not message.get('ok'):
+            failed += 1
+            print(f"error: {message.get('error')}", flush=True)
+        elif message.get('op') == 'add':
+            if message['note_id']:
+                added += 1
+                print(f"added    {message['word']}: {message['definition']}", flush=True)
+            else:
+                failed += 1
+                print(f"rejected {message['word']} (duplicate?)", flush=True)
+    return added, failed
+
+
+def finish_commands(platform, added, failed):
+    # Windowed builds have no console to print to
+    if sys.stdout is None:
+        platform.show_message("Lexi Snap", f"Added {added} card(s), {failed} failed.")
+    sys.exit(1 if failed else 0)
+
+
+def forward_to_running_instance(platform, commands):
+    """Hand the work to the resident process, or just bring up its window."""
+    address = platform.ipc_address()
+    try:
+        if not address:
+            raise IPCError("no command endpoint on this platform")
+        if not commands:
+            list(send_commands(address, [{'op': 'show'}]))
+            sys.exit(0)
+        added, failed = report_results(send_commands(address, commands))
+    except IPCError as e:
+        print(e)
+        if not commands:
+            platform.show_message("Lexi Snap", "Lexi Snap is already running!\n\nCheck your system tray.")
+            sys.exit(0)
+        platform.show_message("Lexi Snap", f"Lexi Snap is running but did not take the command:\n\n{e}")
+        sys.exit(1)
+    finish_commands(platform, added, failed)
+
+
+def run_commands(platform, commands):
+    """No resident instance: run the commands here without starting the GUI."""
+    pipeline = CapturePipeline(SettingsManager(), platform.clipboard)
+    try:
+        added, failed = report_results(CommandHandler(pipeline).run(commands))
+    finally:
+        pipeline.shutdown()
+        platform.instance_lock.release()
+    finish_commands(platform, added, failed)
+
+
+def request_diagnostics(platform, directory):
+    """Have the running instance write a diagnostics bundle, and print where it went."""
+    if platform.instance_lock.acquire():
+        platform.instance_lock.release()
+        print("error: Lexi Snap is not running", file=sys.stderr)
+        return 1
+    address = platform.ipc_address()
+    command = {'op': 'diagnostics', 'directory': os.path.abspath(directory) if directory else None}
+    try:
+        if not address:
+            raise IPCError("no command endpoint on this platform")
+        for message in send_commands(address, [command]):
+            if not message.get('ok'):
+                print(f"error: {message.get('error')}", file=sys.stderr)
+                return 1
+            print(f"diagnostics written to {message['path']}")
+    except IPCError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_export(args):
+    """Write the history (or cached definitions) to a file; needs neither the GUI nor Anki."""
+    kind = 'definitions' if args.definitions else 'history'
+    try:
+        count = export_to(SettingsManager(), args.export, args.format, kind, args.since_last)
+    except ExportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.export != '-':
+        print(f"exported {count} {kind} row(s) to {args.export}")
+    return 0
+
+
 def main():
-    start_minimized = '--minimized' in sys.argv
-    
-    import ctypes
-    from ctypes import wintypes
-    
-    kernel32 = ctypes.windll.kernel32
-    mutex_name = "lexi-snap_SingleInstance_Mutex"
-    
-    handle = kernel32.CreateMutexW(None, True, mutex_name)
-    last_error = kernel32.GetLastError()
+    args = parse_args()
+    if args.export:
+        sys.exit(run_export(args))
+    commands = build_commands(args)
     
-    ERROR_ALREADY_EXISTS = 183
-    if last_error == ERROR_ALREADY_EXISTS:
-        ctypes.windll.user32.MessageBoxW(
-            0, 
-            "Lexi Snap is already running!\n\nCheck your system tray.", 
-            "Lexi Snap", 
-            0x40
-        )
-        if handle:
-            kernel32.CloseHandle(handle)
-        sys.exit(0)
-
-    app = LexiSnapApp()
-    app.run(start_minimized=start_minimized)
+    platform = get_platform()
+    if args.dump_diagnostics is not None:
+        sys.exit(request_diagnostics(platform, args.dump_diagnostics))
+    if not platform.instance_lock.acquire():
+        forward_to_running_instance(platform, commands)
+    if commands:
+        run_commands(platform, commands)
+
+    app = LexiSnapApp(platform, diagnostics=args.diagnostics)
+    app.run(start_minimized=args.minimized)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,175 @@
+"""Concurrency of the network event loop against a slow local dictionary stub.
+
+Scenarios:
+  concurrent  10, 100 and 200 concurrent lookups -> wall time and thread count
+              (the thread count must not grow with the number of lookups)
+  timeout     a lookup against a server slower than the timeout is cancelled
+              on time and leaves nothing running on the loop
+  shutdown    stopping the loop with lookups in flight fails them promptly
+              and ends the loop thread
+  http        a same-host redirect is followed and one to another host is
+              not, HTTP_PROXY is used for other hosts, and a body over the
+              client's limit is an error, as are a refused connection and a TLS
+              handshake with a plain-HTTP server
+
+Usage: python benchmarks/bench_async.py [--latency SECONDS]
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aio import EventLoopThread, HTTPClient, HTTPError
+from dictionary import DictionaryClient, DictionaryUnavailable, EntryCache
+from ratelimit import RequestBudget
+from stubs import StubDictionary
+
+
+def check(label, ok, detail):
+    print(f"[{'ok' if ok else 'FAIL'}] {label:<11} {detail}")
+    return ok
+
+
+def app_threads():
+    """Live threads, not counting the stub server's own."""
+    return sum(1 for t in threading.enumerate()
+               if 'process_request_thread' not in t.name and 'serve_forever' not in t.name)
+
+
+def client(stub, loop, timeout=3):
+    return DictionaryClient(base_url=stub.entries_url, cache=EntryCache(), timeout=timeout,
+                            budget=RequestBudget(rate=10000, burst=10000), loop=loop)
+
+
+def concurrent(latency):
+    ok = True
+    thread_counts = set()
+    with StubDictionary(latency=latency) as stub:
+        loop = EventLoopThread()
+        c = client(stub, loop)
+        c.lookup('warmup')
+        for n in (10, 100, 200):
+            peak = [0]
+            done = threading.Event()
+
+            def sample():
+                while not done.is_set():
+                    peak[0] = max(peak[0], app_threads() - 1)  # minus this sampler
+                    done.wait(0.005)
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            start = time.perf_counter()
+            results = c.lookup_many([f"n{n}-{i}" for i in range(n)])
+            elapsed = time.perf_counter() - start
+            done.set()
+            sampler.join()
+            found = sum(1 for r in results if r is not None and not isinstance(r, Exception))
+            thread_counts.add(peak[0])
+            ok &= check('concurrent', found == n,
+                        f"{n:>3} lookups: {found} found in {elapsed:.2f}s on {peak[0]} threads")
+        loop.stop()
+    return check('concurrent', len(thread_counts) == 1,
+                 f"thread count constant across batch sizes: {sorted(thread_counts)}") and ok
+
+
+def timeout():
+    with StubDictionary(latency=2.0) as stub:
+        loop = EventLoopThread()
+        c = client(stub, loop, timeout=0.3)
+        start = time.perf_counter()
+        try:
+            c.lookup('slow')
+            failed = False
+        except DictionaryUnavailable:
+            failed = True
+        elapsed = time.perf_counter() - start
+        pending = loop.run(_pending_tasks())
+        loop.stop()
+    return check('timeout', failed and elapsed < 0.6 and pending == 0,
+                 f"gave up after {elapsed:.2f}s, {pending} task(s) still running on the loop")
+
+
+async def _pending_tasks():
+    return len(asyncio.all_tasks()) - 1  # minus this one
+
+
+def shutdown(count=20):
+    with StubDictionary(latency=5.0) as stub:
+        loop = EventLoopThread()
+        c = client(stub, loop, timeout=10)
+        errors = []
+
+        def lookup(word):
+            try:
+                c.lookup(word)
+            except DictionaryUnavailable as e:
+                errors.append(e)
+        callers = [threading.Thread(target=lookup, args=(f"s{i}",)) for i in range(count)]
+        for t in callers:
+            t.start()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        loop.stop()
+        for t in callers:
+            t.join(2)
+        elapsed = time.perf_counter() - start
+        alive = loop._thread.is_alive()
+    return check('shutdown', len(errors) == count and not alive and elapsed < 1,
+                 f"{len(errors)}/{count} in-flight lookups cancelled in {elapsed:.2f}s, "
+                 f"loop thread {'still running' if alive else 'stopped'}")
+
+
+def http():
+    with StubDictionary(audio_words=['big']) as stub:
+        loop = EventLoopThread()
+        plain = HTTPClient(loop, proxies={})
+        redirected = loop.run(plain.request('GET', stub.wiktionary_url + 'pomme%20de%20terre'))
+        elsewhere = stub.url.replace('127.0.0.1', 'localhost') + stub.WIKTIONARY_PREFIX + 'chat'
+        cross = loop.run(plain.request('GET', f"{stub.url}/redirect?to={quote(elsewhere)}"))
+        proxied = HTTPClient(loop, proxies={'http': stub.url})
+        via_proxy = loop.run(proxied.request('GET', 'http://dictionary.test' + stub.WIKTIONARY_PREFIX + 'chat'))
+        small = HTTPClient(loop, max_body=1000, proxies={})
+        refused = failed(loop, small.request('GET', stub.audio_url_template.format(word='big')))
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            port = closed.getsockname()[1]
+        no_server = failed(loop, plain.request('GET', f"http://127.0.0.1:{port}/", timeout=2))
+        bad_tls = failed(loop, plain.request('GET', stub.url.replace('http:', 'https:') + '/', timeout=2))
+        loop.stop()
+    ok = check('redirect', redirected.status == 200 and cross.status == 302,
+               f"Wiktionary's 301 for a title with spaces followed; one to another host returned as "
+               f"{cross.status}")
+    ok &= check('proxy', via_proxy.status == 200 and stub.requests['proxied'] == 1,
+                f"{stub.requests['proxied']} request sent through the configured proxy")
+    ok &= check('errors', no_server and bad_tls,
+                "a refused connection and a failed TLS handshake raised HTTPError")
+    return check('body limit', refused, "an audio file over the client's 1000-byte limit refused") and ok
+
+
+def failed(loop, coro):
+    """Whether the request raised HTTPError."""
+    try:
+        loop.run(coro)
+    except HTTPError:
+        return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = [concurrent(args.latency), timeout(), shutdown(), http()]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark pronunciation fetching against local stub servers.
+
+Compares capture latency (lookup + audio) when audio is downloaded after the
+lookup versus prefetched alongside it: prefetching has to be faster. Checks
+that identical audio is stored in Anki only once, and that audio downloads,
+including prefetches of words without a recording, take no tokens from the
+dictionary's request budget.
+
+Usage: python benchmarks/bench_audio.py [--words N] [--latency SECONDS]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from anki import AnkiConnect
+from dictionary import DictionaryClient, EntryCache
+from media import MediaCache, PronunciationFetcher
+from ratelimit import RequestBudget
+from stubs import StubAnki, StubDictionary
+
+
+def run(words, dictionary, anki_url, prefetch):
+    """(latencies, budget tokens spent) of capturing `words`."""
+    tmp = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    # The stub has no rate limit; a large burst that never refills keeps the budget
+    # out of the timings and shows what was taken from it
+    budget = RequestBudget(rate=1e-9, burst=10000)
+    client = DictionaryClient(base_url=dictionary.entries_url, cache=EntryCache(), budget=budget)
+    fetcher = PronunciationFetcher(MediaCache(tmp / 'media'), AnkiConnect(anki_url),
+                                   predicted_url=dictionary.audio_url_template, budget=budget)
+    latencies = []
+    for word in words:
+        start = time.perf_counter()
+        prefetched = fetcher.prefetch(word) if prefetch else None
+        entry = client.lookup(word)
+        name = fetcher.resolve(entry, prefetched)
+        fetcher.sound_tag(name)
+        latencies.append(time.perf_counter() - start)
+    return latencies, round(budget.burst - budget._tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    words = [f"word{i}" for i in range(args.words)]
+    recorded = words[: args.words - args.words // 4]  # the rest have no recording
+    shared = set(words[: args.words // 2])
+    results = {}
+    with StubDictionary(latency=args.latency, audio_latency=args.latency,
+                        audio_words=recorded, shared_audio=shared) as dictionary:
+        for label, prefetch in (('sequential', False), ('prefetch', True)):
+            with StubAnki() as anki:
+                latencies, spent = run(words, dictionary, anki.url, prefetch)
+                uploads = anki.requests['storeMediaFile']
+            avg = sum(latencies) / len(latencies) * 1000
+            results[label] = (avg, uploads, spent)
+            print(f"{label:<11} avg {avg:7.1f} ms/capture  storeMediaFile calls: {uploads}  "
+                  f"budget tokens: {spent}")
+
+    expected = len(recorded) - len(shared) + 1
+    print(f"\n{len(shared)} words share one recording, {args.words - len(recorded)} have none: "
+          f"expected {expected} uploads and {args.words} tokens per run\n")
+    sequential, prefetched = results['sequential'], results['prefetch']
+    checks = [
+        ('uploads', all(uploads == expected for _, uploads, _ in results.values()),
+         f"{sequential[1]} and {prefetched[1]} storeMediaFile calls (expected {expected})"),
+        ('prefetch', prefetched[0] < sequential[0],
+         f"{prefetched[0]:.1f} ms per capture with prefetch vs {sequential[0]:.1f} ms sequential"),
+        ('budget', all(spent == args.words for _, _, spent in results.values()),
+         f"{sequential[2]} and {prefetched[2]} tokens for {args.words} lookups; audio took none"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
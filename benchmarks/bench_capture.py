@@ -0,0 +1,269 @@
+"""End-to-end capture benchmark: hotkey -> selection -> lookup -> Anki -> history.
+
+Drives the real CapturePipeline with the fake platform backend against the
+local dictionary and AnkiConnect stubs, one scenario at a time:
+
+  steady     one capture every 25 ms, fast and reliable upstreams
+  burst      every capture pressed at once
+  flaky      10% dictionary and 5% AnkiConnect requests fail with HTTP 500
+  throttled  the dictionary allows 5 req/s and answers 429 beyond that
+  audio      pronunciation audio enabled (download, cache, storeMediaFile)
+
+For each it reports throughput, capture latency percentiles (hotkey press to
+card added), peak capture-side thread count and bytes written to disk.
+
+Results can be saved as a JSON baseline and later runs compared against it;
+a metric that got worse by more than --tolerance is flagged and the script
+exits 1. Baselines are machine specific, so none is committed - save one
+on the machine you compare on (e.g. on the main branch before switching
+to a feature branch). With --check a missing baseline is a failure too,
+so a gate can't pass by comparing against nothing.
+
+Usage:
+  python benchmarks/bench_capture.py                  # run, compare with baseline if present
+  python benchmarks/bench_capture.py --save           # run and (re)write the baseline
+  python benchmarks/bench_capture.py --check          # run and compare; exit 1 without a baseline
+  python benchmarks/bench_capture.py --scenario flaky --captures 200
+"""
+
+import argparse
+import json
+import os
+import platform as platform_info
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from dictionary import NO_DEFINITION
+from platforms.fake import FakePlatform
+from ratelimit import RequestBudget
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'capture.json'
+
+SCENARIOS = {
+    'steady': {'interval': 0.025},
+    'burst': {'interval': 0.0},
+    'flaky': {'interval': 0.025, 'dictionary': {'error_rate': 0.10}, 'anki': {'error_rate': 0.05}},
+    'throttled': {'interval': 0.025, 'dictionary': {'rate_limit': 5}, 'budget_rate': 20},
+    'audio': {'interval': 0.025, 'audio': True},
+}
+
+# metric -> (direction, absolute change ignored as noise)
+METRICS = {
+    'throughput': ('higher', 1.0),
+    'p50_ms': ('lower', 10.0),
+    'p95_ms': ('lower', 25.0),
+    'p99_ms': ('lower', 25.0),
+    'peak_threads': ('lower', 1),
+    'bytes_written': ('lower', 4096),
+}
+
+
+def bytes_written():
+    """Bytes this process has passed to write() so far (Linux), else None."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def capture_threads():
+    """Live threads, not counting the stub servers' own."""
+    return sum(1 for t in threading.enumerate()
+               if 'process_request_thread' not in t.name and 'serve_forever' not in t.name)
+
+
+class ThreadSampler:
+    """Records the peak capture-side thread count while running."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, capture_threads() - 1)  # minus the sampler itself
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(name, captures, seed=1):
+    spec = SCENARIOS[name]
+    words = [f"{name}{i}" for i in range(captures)]
+    tmp = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    dictionary_options = dict(latency=0.02, jitter=0.02, seed=seed, **spec.get('dictionary', {}))
+    anki_options = dict(latency=0.005, jitter=0.01, seed=seed + 1, **spec.get('anki', {}))
+    if spec.get('audio'):
+        dictionary_options.update(audio_words=words, audio_latency=0.02)
+
+    with StubDictionary(**dictionary_options) as dictionary, StubAnki(**anki_options) as anki:
+        fake = FakePlatform(selections=words)
+        settings = SettingsManager(tmp / 'settings.json')
+        settings.set('default_deck', 'Default')
+        settings.set('pronunciation_audio', bool(spec.get('audio')))
+        pipeline = CapturePipeline(
+            settings, fake.clipboard, data_dir=tmp,
+            anki_url=anki.url,
+            dictionary_url=dictionary.entries_url,
+            audio_url=dictionary.audio_url_template,
+            budget=RequestBudget(rate=spec.get('budget_rate', 1000), burst=spec.get('budget_burst', 10)),
+        )
+
+        latencies = []
+        lock = threading.Lock()
+        futures = []
+
+        def on_hotkey():
+            pressed = time.perf_counter()
+            future = pipeline.submit_capture()
+
+            def done(_):
+                with lock:
+                    latencies.append(time.perf_counter() - pressed)
+            future.add_done_callback(done)
+            futures.append(future)
+
+        fake.hotkeys.register('ctrl+alt+d', on_hotkey)
+        written_before = bytes_written()
+        with ThreadSampler() as sampler:
+            start = time.perf_counter()
+            for _ in words:
+                fake.hotkeys.press()
+                if spec['interval']:
+                    time.sleep(spec['interval'])
+            note_ids = [f.result() for f in futures]
+            elapsed = time.perf_counter() - start
+        written_after = bytes_written()
+        pipeline.shutdown()
+
+        history = settings.get('card_history')
+        defined = sum(1 for item in history if item['definition'] != NO_DEFINITION)
+        disk = sum(p.stat().st_size for p in tmp.rglob('*') if p.is_file())
+        return {
+            'captures': captures,
+            'added': sum(1 for note_id in note_ids if note_id),
+            'defined_in_history': f"{defined}/{len(history)}",
+            'throughput': round(captures / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'peak_threads': sampler.peak,
+            'bytes_written': (written_after - written_before) if written_before is not None else None,
+            'disk_bytes': disk,
+            'dictionary_requests': dict(dictionary.requests),
+            'anki_requests': dict(anki.requests),
+        }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages versus the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base or base.get('captures') != result['captures']:
+            continue
+        for metric, (direction, noise) in METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None or abs(new - old) <= noise:
+                continue
+            worse = new < old * (1 - tolerance) if direction == 'higher' else new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name}: {metric} {old} -> {new}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help="run only this scenario (repeatable)")
+    parser.add_argument('--captures', type=int, default=60)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--check', action='store_true', help="fail if there is no baseline to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown before a metric is flagged (default 0.25)")
+    args = parser.parse_args()
+
+    results = {name: run_scenario(name, args.captures) for name in args.scenario or SCENARIOS}
+
+    # The table goes last so the pipeline's own log lines don't split it up
+    print(f"\n{'scenario':<10} {'added':>7} {'cap/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'threads':>7} {'written':>10}")
+    for name, r in results.items():
+        written = f"{r['bytes_written'] / 1024:.0f} KiB" if r['bytes_written'] is not None else 'n/a'
+        print(f"{name:<10} {r['added']:>3}/{r['captures']:<3} {r['throughput']:>7.1f} "
+              f"{r['p50_ms']:>5.0f}ms {r['p95_ms']:>5.0f}ms {r['p99_ms']:>5.0f}ms "
+              f"{r['peak_threads']:>7} {written:>10}")
+
+    if args.save:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+        baseline.setdefault('scenarios', {}).update(results)
+        baseline.update({
+            'revision': git_revision(),
+            'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform_info.python_version(),
+            'machine': f"{platform_info.system()} {platform_info.machine()} ({os.cpu_count()} cpus)",
+        })
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + '\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        if args.check:
+            print("[FAIL] nothing to compare with")
+            sys.exit(1)
+        return
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline, args.tolerance)
+    print(f"\nCompared with baseline from {baseline.get('revision') or 'unknown revision'}")
+    for message in regressions:
+        print(f"[REGRESSION] {message}")
+    if regressions:
+        sys.exit(1)
+    print("[ok] no regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Sentence extraction for captures: correctness, cost, and the end-to-end path.
+
+Runs extract_sentence() on labelled cases (abbreviations, initials,
+decimals, quotes, CJK punctuation, paragraph breaks, overlong sentences),
+times it on buffers from a paragraph to a megabyte, and adds a few captures
+with `capture_context` on through a CapturePipeline against local stubs, with
+a note template that uses {sentence} and {source_app}. Checks that the
+sentence and application reach the note and the history, on the Linux
+path (the word in PRIMARY, the paragraph in CLIPBOARD) and the Windows one
+(the paragraph on the clipboard, then overwritten by copying the word), and
+that a capture with the setting off records none.
+
+Usage: python benchmarks/bench_context.py [--calls 2000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context import describe_window, extract_sentence
+from core import CapturePipeline
+from platforms.fake import FakePlatform
+from ratelimit import RequestBudget
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+# (buffer, word, expected sentence)
+CASES = [
+    ("It rained. The serendipity of it all was striking! We left.", 'serendipity',
+     "The serendipity of it all was striking!"),
+    ("Dr. Smith found it ephemeral. Nobody else did.", 'ephemeral', "Dr. Smith found it ephemeral."),
+    ("J. R. R. Tolkien wrote about hobbits. Later he wrote more.", 'hobbits',
+     "J. R. R. Tolkien wrote about hobbits."),
+    ("Prices rose 3.5 percent, e.g. bread was pricier. Then they fell.", 'bread',
+     "Prices rose 3.5 percent, e.g. bread was pricier."),
+    ('He said "that is ubiquitous." She nodded.', 'ubiquitous', 'He said "that is ubiquitous."'),
+    ("Title line\n\nThe first paragraph has\na wrapped line with quixotic words\n\nNext paragraph.",
+     'quixotic', "The first paragraph has a wrapped line with quixotic words"),
+    ("猫が好きです。犬も好きです。", '犬', "犬も好きです。"),
+    ("Nothing to see here.", 'absent', ""),
+    ("The CAT sat. Then the cat left.", 'cat', "Then the cat left."),  # exact spelling wins
+    ("Serendipity struck. Then we left.", 'serendipity', "Serendipity struck."),
+    ("concatenate the cat", 'cat', "concatenate the cat"),
+    ("Short. " + "word " * 100 + "pivot " + "word " * 100 + "end.", 'pivot', None),  # truncated
+]
+
+FILLER = ("The committee met on Tuesday to review the proposal. Several members raised concerns "
+          "about the budget, e.g. the travel costs. Dr. Lee suggested a compromise! ")
+
+
+def check_cases():
+    failures = []
+    for buffer, word, expected in CASES:
+        got = extract_sentence(buffer, word)
+        if expected is None:
+            ok = len(got) <= 302 and got.startswith('…') and got.endswith('…') and 'pivot' in got
+        else:
+            ok = got == expected
+        if not ok:
+            failures.append((word, expected, got))
+    windows = [
+        (describe_window("Serendipity - Wikipedia - Mozilla Firefox", r"C:\Program Files\firefox.exe"),
+         ("Mozilla Firefox", "Serendipity - Wikipedia")),
+        (describe_window("notes.txt", "/usr/bin/gedit"), ("gedit", "notes.txt")),
+        (describe_window("", ""), ("", "")),
+    ]
+    failures += [('window', expected, got) for got, expected in windows if got != expected]
+    return failures
+
+
+def time_extract(buffer, word, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        extract_sentence(buffer, word)
+    return (time.perf_counter() - start) / calls
+
+
+def buffer_of(size, word, seed=1):
+    """About `size` characters of prose with `word` in a sentence three quarters of the way in."""
+    text = FILLER * (size // len(FILLER) + 1)
+    at = text.find('. ', size * 3 // 4) + 2
+    return text[:at] + f"Its {word} was obvious to everyone. " + text[at:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    failures = check_cases()
+    print(f"cases: {len(CASES) + 3 - len(failures)}/{len(CASES) + 3} correct")
+    for word, expected, got in failures:
+        print(f"  {word!r}: expected {expected!r}, got {got!r}")
+
+    timings = {}
+    for label, size in (('paragraph', 1_000), ('article', 64_000), ('1 MB', 1_000_000)):
+        calls = max(10, args.calls * 1_000 // size)
+        timings[label] = time_extract(buffer_of(size, 'serendipity'), 'serendipity', calls)
+        print(f"  {label:<10} {timings[label] * 1e6:>8.1f} us/extraction")
+
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    settings = SettingsManager(data_dir / 'settings.json')
+    settings.set('default_deck', 'Default')
+    settings.set('note_templates', [{'name': 'Context', 'model': 'Basic', 'fields': {
+        'Front': '{word}', 'Back': '{definition}<br>{sentence}<br><i>{source_app}</i>'}}])
+    settings.set('note_template', 'Context')
+    settings.set('capture_context', True)
+    fake = FakePlatform()
+    buffer = buffer_of(4_000, 'serendipity')
+    fake.clipboard.select('serendipity', buffer, 'Reading list - Mozilla Firefox', 'firefox.exe')
+    fake.clipboard.select('ephemeral', "Fame is ephemeral. So they say.", 'notes.txt', '/usr/bin/gedit')
+    with StubAnki() as anki, StubDictionary() as dictionary:
+        pipeline = CapturePipeline(
+            settings, fake.clipboard, data_dir=data_dir,
+            anki_url=anki.url, dictionary_url=dictionary.entries_url,
+            budget=RequestBudget(rate=1000, burst=1000),
+        )
+        start = time.perf_counter()
+        pipeline.process_capture()
+        pipeline.process_capture()
+        with_context = (time.perf_counter() - start) / 2
+        # Windows: the paragraph copied first is read before the word is copied over it
+        fake.clipboard.copies_selection = True
+        fake.clipboard.copy("We walked home. The sky was luminous tonight. Then it rained.")
+        fake.clipboard.select('luminous', window_title='Inbox - Outlook', process=r'C:\Office\OUTLOOK.EXE')
+        pipeline.process_capture()
+        copied_over = fake.clipboard.clipboard == 'luminous'
+        settings.set('capture_context', False)
+        fake.clipboard.select('quixotic', "A quixotic plan. Truly.", 'Other - App', 'app.exe')
+        pipeline.process_capture()
+        pipeline.shutdown()
+        backs = {note['fields']['Front']: note['fields']['Back'] for note in anki.notes.values()}
+    history = {item['word']: item for item in settings.get('card_history')}
+    print(f"\npipeline: {with_context * 1000:.1f} ms/capture with context")
+    for word, back in backs.items():
+        print(f"  {word:<12} {back}")
+    print()
+
+    checks = [
+        ('cases', not failures, f"{len(failures)} wrong"),
+        ('cost', timings['1 MB'] < 0.005,
+         f"{timings['1 MB'] * 1e3:.2f} ms on a 1 MB buffer (the scan stops a few KB from the word)"),
+        ('note', 'Its serendipity was obvious to everyone.' in backs.get('serendipity', '')
+         and 'Mozilla Firefox' in backs.get('serendipity', '')
+         and 'Fame is ephemeral.' in backs.get('ephemeral', '') and 'gedit' in backs.get('ephemeral', ''),
+         "sentence and application rendered into the notes"),
+        ('history', history.get('serendipity', {}).get('sentence') == 'Its serendipity was obvious to everyone.'
+         and history.get('serendipity', {}).get('source') == 'Mozilla Firefox',
+         "sentence and source stored with the history item"),
+        ('windows', 'The sky was luminous tonight.' in backs.get('luminous', '')
+         and 'Outlook' in backs.get('luminous', '') and copied_over,
+         "the clipboard's previous paragraph gives the sentence when the word is copied over it"),
+        ('off', 'quixotic' in backs and not {'sentence', 'source', 'window'} & set(history.get('quixotic', {})),
+         "with capture_context off nothing extra is recorded"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<10} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
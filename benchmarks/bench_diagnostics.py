@@ -0,0 +1,176 @@
+"""Diagnostics: sampling profiler overhead and attribution, swallowed-exception counts, bundle format.
+
+Runs a fixed CPU-bound job on worker threads next to `--idle-threads`
+waiting threads (an app's monitor, tray and network threads), with the
+profiler off and on, alternating `--rounds` times, and compares the median
+wall times; the slowdown has to stay under `--max-slowdown`. The profiler's
+own overhead figure has to stay near its 1% budget, also with ten times the
+threads, and the hot function has to show up in the samples of the thread
+running it. Swallowed exceptions are counted per call site. Finally a
+bundle is written through the IPC 'diagnostics' command and checked
+against the format in diagnostics.py.
+
+Usage: python benchmarks/bench_diagnostics.py [--rounds 5] [--idle-threads 20] [--max-slowdown 0.05]
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from diagnostics import SamplingProfiler, swallowed, swallowed_counts, write_bundle
+from ipc import CommandHandler
+from platforms.fake import FakePlatform
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+BUNDLE_FILES = {'manifest.json', 'profile.folded', 'swallowed.json', 'threads.txt', 'metrics.json',
+                'settings.json'}
+FOLDED_LINE = re.compile(r'^[^;\n]+(;[^;\n]+:[^;\n]+:\d+)* \d+$')
+
+
+def hot_loop(n):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def job(workers=2, n=2_000_000):
+    """Seconds to run hot_loop(n) on `workers` threads."""
+    threads = [threading.Thread(target=hot_loop, args=(n,), name=f"hot-{i}") for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def idle_threads(count):
+    """`count` threads waiting on an event, like an app's monitors; returns the event that ends them."""
+    stop = threading.Event()
+    for i in range(count):
+        threading.Thread(target=stop.wait, daemon=True, name=f"idle-{i}").start()
+    return stop
+
+
+def fails(kind):
+    try:
+        raise kind("boom")
+    except Exception:
+        swallowed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--idle-threads', type=int, default=20)
+    parser.add_argument('--max-slowdown', type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Overhead: the same job with the profiler off and on, alternating
+    stop_idle = idle_threads(args.idle_threads)
+    job()  # warm up
+    profiler = SamplingProfiler()
+    off, on = [], []
+    for _ in range(args.rounds):
+        off.append(job())
+        profiler.start()
+        on.append(job())
+        profiler.stop()
+    slowdown = statistics.median(on) / statistics.median(off) - 1
+    overhead = profiler.overhead()
+    print(f"job: {statistics.median(off) * 1000:.0f} ms off, {statistics.median(on) * 1000:.0f} ms on "
+          f"({slowdown:+.1%}); profiler used {overhead:.2%} of a CPU over {profiler.samples} samples "
+          f"with {args.idle_threads + 3} threads")
+
+    # Attribution: the hot threads' samples are in hot_loop
+    hot = [line for line in profiler.folded() if line.startswith('hot-')]
+    hot_samples = sum(int(line.rsplit(' ', 1)[1]) for line in hot)
+    in_loop = sum(int(line.rsplit(' ', 1)[1]) for line in hot if ':hot_loop:' in line)
+    print(f"attribution: {in_loop} of {hot_samples} samples of the hot threads in hot_loop")
+
+    # Many threads: sampled less often, at the same cost
+    many = SamplingProfiler()
+    stop_many = idle_threads(args.idle_threads * 10)
+    many.start()
+    time.sleep(2)
+    many.stop()
+    stop_many.set()
+    print(f"{args.idle_threads * 11} threads: {many.samples} samples in {many.duration():.1f}s, "
+          f"{many.overhead():.2%} of a CPU")
+    stop_idle.set()
+
+    # Swallowed exceptions, by call site
+    start = time.perf_counter()
+    for _ in range(1000):
+        fails(ValueError)
+    swallow_us = (time.perf_counter() - start) / 1000 * 1e6
+    for _ in range(10):
+        fails(KeyError)
+    site = next((s for s in swallowed_counts() if s['function'] == 'fails'), {})
+    print(f"swallowed: {swallowed_counts()}, {swallow_us:.1f} us per raise and count")
+
+    # A bundle, asked for over the command channel as `lexi-snap --dump-diagnostics` does
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    settings = SettingsManager(data_dir / 'settings.json')
+    settings.set('api_token', 'secret')
+    settings.set('card_history', [{'word': 'private'}])
+    with StubAnki() as anki, StubDictionary() as dictionary:
+        pipeline = CapturePipeline(settings, FakePlatform().clipboard, data_dir=data_dir,
+                                   anki_url=anki.url, dictionary_url=dictionary.entries_url)
+        pipeline.add_word('serendipity', 'Default')
+        handler = CommandHandler(pipeline, dump_diagnostics=lambda directory: write_bundle(
+            directory or data_dir, profiler, pipeline))
+        reply = next(handler.run([{'op': 'diagnostics', 'directory': str(data_dir / 'out')}]))
+        pipeline.shutdown()
+    path = Path(reply.get('path', ''))
+    with zipfile.ZipFile(path) as bundle:
+        names = set(bundle.namelist())
+        manifest = json.loads(bundle.read('manifest.json'))
+        folded = bundle.read('profile.folded').decode('utf-8').splitlines()
+        dumped_settings = json.loads(bundle.read('settings.json'))
+        metrics = json.loads(bundle.read('metrics.json'))
+        dumped_swallowed = json.loads(bundle.read('swallowed.json'))
+    bad_lines = [line for line in folded if not FOLDED_LINE.match(line)]
+    print(f"bundle: {path.name}, {path.stat().st_size / 1024:.0f} KiB, {len(folded)} stacks, "
+          f"manifest {manifest['profiler']}\n")
+
+    checks = [
+        ('slowdown', slowdown < args.max_slowdown,
+         f"{slowdown:+.1%} on a CPU-bound job with the profiler on (limit {args.max_slowdown:.0%})"),
+        ('overhead', overhead < profiler.max_overhead * 1.5, f"sampler used {overhead:.2%} of a CPU"),
+        ('threads', many.overhead() < many.max_overhead * 1.5,
+         f"{many.overhead():.2%} of a CPU with {args.idle_threads * 11} threads"),
+        ('attribution', hot_samples and in_loop >= hot_samples * 0.9,
+         f"{in_loop}/{hot_samples} hot-thread samples in hot_loop"),
+        ('swallowed', site.get('count') == 1010 and site.get('exception') == 'KeyError',
+         f"one site counted 1010 times, last exception {site.get('exception')}, {swallow_us:.1f} us each"),
+        ('bundle', names == BUNDLE_FILES and manifest['format'] == 1 and reply.get('ok')
+         and path.parent == data_dir / 'out', "the documented files, from the 'diagnostics' command"),
+        ('folded', folded and not bad_lines, f"{len(folded)} stacks in collapsed format, {len(bad_lines)} bad"),
+        ('contents', 'card_history' not in dumped_settings and dumped_settings['api_token'] == '<set>'
+         and 'latency' in metrics and metrics['counters'].get('cards_added') == 1
+         and any(s['function'] == 'fails' for s in dumped_swallowed),
+         "metrics and swallowed counts included; history and API token left out"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark parsed DictionaryEntry objects against keeping the raw API JSON.
+
+Reports parse cost per entry and retained memory per cached entry for:
+  raw      - the decoded JSON response (what you'd keep to avoid re-fetching)
+  entry    - the parsed __slots__ DictionaryEntry
+  reload   - re-parsing the compact form written to the on-disk cache
+
+Usage: python benchmarks/bench_entries.py [--entries N]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dictionary import DictionaryEntry, parse_entry
+
+
+POS = ['noun', 'verb', 'adjective', 'adverb']
+
+
+def make_payload(i):
+    """A response shaped like dictionaryapi.dev's, with a few meanings each."""
+    word = f"word{i}"
+    meanings = []
+    for m, pos in enumerate(POS[:1 + i % 4]):
+        meanings.append({
+            'partOfSpeech': pos,
+            'definitions': [
+                {
+                    'definition': f"Definition {d} of {word} as a {pos}, with some typical length text.",
+                    'synonyms': [f"syn{d}"] if d % 2 else [],
+                    'antonyms': [],
+                    'example': f"An example sentence using {word}." if d == 0 else None,
+                }
+                for d in range(3)
+            ],
+            'synonyms': [f"{word}-like", f"{pos}-ish"],
+            'antonyms': [],
+        })
+    return [{
+        'word': word,
+        'phonetic': f"/{word}/",
+        'phonetics': [
+            {'text': f"/{word}/", 'audio': f"https://api.dictionaryapi.dev/media/pronunciations/en/{word}-us.mp3",
+             'sourceUrl': 'https://commons.wikimedia.org/w/index.php?curid=1', 'license': {
+                 'name': 'BY-SA 3.0', 'url': 'https://creativecommons.org/licenses/by-sa/3.0'}},
+            {'text': f"/{word}/", 'audio': ''},
+        ],
+        'meanings': meanings,
+        'license': {'name': 'CC BY-SA 3.0', 'url': 'https://creativecommons.org/licenses/by-sa/3.0'},
+        'sourceUrls': [f"https://en.wiktionary.org/wiki/{word}"],
+    }]
+
+
+def measure(label, bodies, build):
+    gc.collect()
+    tracemalloc.start()
+    start_mem = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    kept = [build(i, body) for i, body in enumerate(bodies)]
+    elapsed = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0] - start_mem
+    tracemalloc.stop()
+    n = len(kept)
+    print(f"{label:<8} {elapsed / n * 1e6:9.1f} us/entry {retained / n:9.0f} B/entry")
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000)
+    args = parser.parse_args()
+
+    bodies = [json.dumps(make_payload(i)) for i in range(args.entries)]
+    print(f"{args.entries} entries, avg response {sum(map(len, bodies)) / len(bodies):.0f} bytes\n")
+
+    measure('raw', bodies, lambda i, body: json.loads(body))
+    entries = measure('entry', bodies, lambda i, body: parse_entry(f"word{i}", json.loads(body)))
+    compact_lines = [json.dumps(e.to_compact(), separators=(',', ':')) for e in entries]
+    measure('reload', compact_lines, lambda i, line: DictionaryEntry.from_compact(json.loads(line)))
+
+    print(f"\non-disk: raw {sum(map(len, bodies)) / len(bodies):.0f} B/entry, "
+          f"compact {sum(map(len, compact_lines)) / len(compact_lines):.0f} B/entry")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Export throughput and memory on a large history log.
+
+Writes a synthetic history log of `--rows` items (default 1,000,000), then
+exports it to CSV, JSON lines and Anki TSV, timing each; CSV has to manage
+`--min-rate` rows/s. Peak traced memory of a CSV export is measured at a
+tenth of the rows and at all of them: it has to stay under `--budget-mib`
+and not grow with the row count. Then a few cards are added through
+SettingsManager and a "since last export" run must write exactly those, in
+a small fraction of the full export's time. Cards updated after that are
+exported once each, in their last state, both since the last export and
+in a full export, also when two cards share a timestamp. Also exports the definition caches.
+
+Usage: python benchmarks/bench_export.py [--rows 1000000] [--min-rate 50000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dictionary import DictionaryEntry, EntryCache, Sense
+from export import export_history, export_to
+from history import HistoryLog
+from settings import SettingsManager
+
+
+def write_log(path, rows):
+    """A history log of `rows` realistic items, written in large chunks."""
+    words = ['serendipity', 'ephemeral', 'ubiquitous', 'quixotic', 'château', 'Straße', 'кошка']
+    chunk = []
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            item = {
+                'id': f"{i:032x}",
+                'word': f"{words[i % len(words)]}{i}",
+                'definition': "The occurrence of events by chance in a happy or beneficial way, "
+                              "as in \"a fortunate stroke of serendipity\".",
+                'timestamp': f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00",
+                'note_id': 1_700_000_000_000 + i,
+                'deck': 'Vocab',
+                'template': 'Basic',
+                'language': None if i % 7 < 4 else 'fr',
+            }
+            if i % 10 == 0:
+                item.update(sentence="It was pure serendipity that we met.", source='Mozilla Firefox')
+            chunk.append(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+            if len(chunk) == 10_000:
+                f.write(''.join(chunk))
+                chunk = []
+        f.write(''.join(chunk))
+
+
+def timed_export(log, path, fmt, since=0):
+    start = time.perf_counter()
+    with open(path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as out:
+        count, end = export_history(log, out, fmt, since)
+    return count, end, time.perf_counter() - start
+
+
+def traced_peak(log, path, until):
+    """Peak traced bytes of a CSV export of the log up to byte offset `until`."""
+    class Limited:
+        def latest(self, since=0, raw=False):
+            return log.latest(since, until, raw)
+    tracemalloc.start()
+    with open(path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as out:
+        tracemalloc.reset_peak()
+        export_history(Limited(), out, 'csv')
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def offset_after(log, rows):
+    for i, (offset, _) in enumerate(log.read(raw=True), 1):
+        if i == rows:
+            return offset
+    return log.size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--added', type=int, default=500)
+    parser.add_argument('--budget-mib', type=float, default=4.0)
+    parser.add_argument('--min-rate', type=int, default=50_000, help="CSV rows/s to pass")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    log_path = data_dir / '.lexi_snap_history.jsonl'
+    start = time.perf_counter()
+    write_log(log_path, args.rows)
+    print(f"history log: {args.rows} rows, {log_path.stat().st_size / 2 ** 20:.0f} MiB "
+          f"(written in {time.perf_counter() - start:.1f}s)\n")
+    log = HistoryLog(log_path)
+
+    results = {}
+    for fmt in ('csv', 'jsonl', 'tsv'):
+        out = data_dir / f'export.{fmt}'
+        count, end, seconds = timed_export(log, out, fmt)
+        results[fmt] = (count, end, seconds)
+        print(f"  {fmt:<6} {count} rows in {seconds:5.2f}s  {count / seconds / 1000:6.0f}k rows/s  "
+              f"{out.stat().st_size / 2 ** 20 / seconds:5.0f} MiB/s out")
+
+    with open(data_dir / 'export.csv', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        csv_rows = sum(1 for _ in reader)
+    with open(data_dir / 'export.tsv', encoding='utf-8') as f:
+        tsv_headers = [next(f) for _ in range(5)]
+    with open(data_dir / 'export.jsonl', encoding='utf-8') as f:
+        first_json = json.loads(next(f))
+
+    small_peak = traced_peak(log, os.devnull, offset_after(log, args.rows // 10))
+    full_peak = traced_peak(log, os.devnull, log.size())
+    print(f"\n  peak memory: {small_peak / 1024:.0f} KiB at {args.rows // 10} rows, "
+          f"{full_peak / 1024:.0f} KiB at {args.rows}")
+
+    # Incremental: the full CSV export above set no checkpoint, so take one now, add, resume
+    settings = SettingsManager(data_dir / 'settings.json')
+    export_to(settings, data_dir / 'full.csv')
+    for i in range(args.added):
+        settings.add_to_history(f"newword{i}", "A word added after the export.", 1 + i, 'Vocab', 'Basic')
+    start = time.perf_counter()
+    added_rows = export_to(settings, data_dir / 'since.csv', since_last=True)
+    incremental_s = time.perf_counter() - start
+    again = export_to(settings, data_dir / 'since2.csv', since_last=True)
+    with open(data_dir / 'since.csv', encoding='utf-8', newline='') as f:
+        since_words = [row[0] for row in csv.reader(f)][1:]
+    print(f"  since last export: {added_rows} rows in {incremental_s * 1000:.1f} ms, then {again}")
+
+    # Updates: one row per card, in its last state, whether exported since the last run or in full
+    recent = settings.get('card_history')
+    settings.update_history_item(recent[0], definition="Changed once.")
+    settings.update_history_item(recent[0], definition="Changed twice.")
+    settings.update_history_item(recent[1], definition="Changed once.")
+    export_to(settings, data_dir / 'updates.csv', since_last=True)
+    with open(data_dir / 'updates.csv', encoding='utf-8', newline='') as f:
+        updates = [row[:2] for row in csv.reader(f)][1:]
+    (data_dir / 'small').mkdir()
+    small = SettingsManager(data_dir / 'small' / 'settings.json')
+    for i in range(3):
+        small.add_to_history(f"word{i}", "Missing.", 1 + i, 'Vocab', 'Basic')
+    small.update_history_item(small.get('card_history')[1], definition="Found.")
+    export_to(small, data_dir / 'small.csv')
+    with open(data_dir / 'small.csv', encoding='utf-8', newline='') as f:
+        small_rows = [row[:2] for row in csv.reader(f)][1:]
+    print(f"  updates: {updates} since the last export; full export {small_rows}")
+
+    # Two cards added in the same clock tick are still two cards
+    tick = HistoryLog(data_dir / 'tick.jsonl')
+    first, second = ({'id': f"card{i}", 'word': f"tick{i}", 'definition': "Missing.",
+                      'timestamp': "2026-10-19T12:00:00"} for i in range(2))
+    tick.extend((first, second))
+    tick.append_update(dict(first, definition="Found."))
+    same_tick = ([item['definition'] for _, item in tick.latest()] == ["Missing.", "Found."]
+                 and len(list(tick.latest(raw=True))) == 2
+                 and [(item['word'], item['definition']) for item in tick.newest()]
+                 == [('tick1', "Missing."), ('tick0', "Found.")])
+
+    cache = EntryCache(data_dir / '.lexi_snap_definitions.jsonl')
+    for i in range(200):
+        cache.put(DictionaryEntry(f"word{i}", senses=(Sense('noun', f"Meaning {i}"),)))
+    definitions = export_to(settings, data_dir / 'definitions.jsonl', kind='definitions')
+    print(f"  definitions: {definitions} rows\n")
+
+    csv_rate = results['csv'][0] / results['csv'][2]
+    checks = [
+        ('rows', all(count == args.rows for count, _, _ in results.values()) and csv_rows == args.rows
+         and header[0] == 'word', f"every format wrote {args.rows} rows"),
+        ('formats', tsv_headers[0] == '#separator:tab\n' and first_json.get('word') == 'serendipity0',
+         "TSV carries Anki's import headers; JSONL round-trips"),
+        ('throughput', csv_rate > args.min_rate,
+         f"{csv_rate / 1000:.0f}k rows/s to CSV (at least {args.min_rate / 1000:.0f}k)"),
+        ('memory', full_peak < args.budget_mib * 2 ** 20 and full_peak - small_peak < 256 * 1024,
+         f"peak {full_peak / 1024:.0f} KiB, {(full_peak - small_peak) / 1024:+.0f} KiB from "
+         f"{args.rows // 10} to {args.rows} rows"),
+        ('incremental', added_rows == args.added and again == 0
+         and since_words == [f"newword{i}" for i in range(args.added)],
+         f"{added_rows} new rows exported, then {again}"),
+        ('updates', updates == [[recent[0]['word'], "Changed twice."], [recent[1]['word'], "Changed once."]]
+         and small_rows == [['word0', "Missing."], ['word2', "Missing."], ['word1', "Found."]],
+         "an updated card is one row with its last state"),
+        ('same tick', same_tick, "two cards with one timestamp stay apart through an update"),
+        ('since cost', incremental_s < results['csv'][2] / 20,
+         f"{incremental_s * 1000:.1f} ms vs {results['csv'][2] * 1000:.0f} ms for the full export"),
+        ('definitions', definitions == 200, f"{definitions} cached definitions exported"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Spelling correction: suggestion latency and index memory at 500k headwords.
+
+Builds a FuzzyIndex from a word list of `--headwords` made-up words
+(default 500,000), timing the build and measuring what the index holds.
+Then asks for suggestions for typos of indexed words - one edit
+(substitution, insertion, deletion or swapped letters) and two edits - and
+for junk that is near nothing, timing each. Checks that the intended word
+is suggested for one-edit typos, that p99 latency stays under `--max-ms`, and
+that the index takes under a third of the memory of the same index as a
+plain dict of word lists.
+Finally a misspelled capture goes through a CapturePipeline against a
+dictionary stub that 404s it: the card has to be added under the corrected
+word, with its definition.
+
+Usage: python benchmarks/bench_fuzzy.py [--headwords 500000] [--queries 2000] [--max-ms 20]
+"""
+
+import argparse
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from dictionary import NO_DEFINITION
+from fuzzy import PREFIX_LENGTH, FuzzyIndex, _deletes
+from platforms.fake import FakePlatform
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'tra', 'sel', 'por', 'qui', 'ven', 'dro', 'ash', 'ble',
+             'cor', 'ful', 'gen', 'hum', 'ist', 'jor', 'lum', 'nat', 'ous', 'pre', 'ric', 'sta']
+
+
+def headwords(count, rng):
+    """`count` distinct word-like strings of 2-5 syllables."""
+    words = {}
+    while len(words) < count:
+        words[''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))] = None
+    return list(words)
+
+
+def typo(word, rng):
+    """`word` with one random substitution, insertion, deletion or swap."""
+    i = rng.randrange(len(word))
+    kind = rng.choice('sidt')
+    if kind == 's':
+        return word[:i] + rng.choice(string.ascii_lowercase.replace(word[i], '')) + word[i + 1:]
+    if kind == 'i':
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if kind == 'd':
+        return word[:i] + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def naive_bytes(words):
+    """Traced bytes of a plain dict SymSpell index (variant -> list of words) of `words`."""
+    tracemalloc.start()
+    index = {}
+    for word in words:
+        for variant in _deletes(word[:PREFIX_LENGTH], 1):
+            index.setdefault(variant, []).append(word)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def index_bytes(index):
+    """Bytes held by the index's chunks (word text, offsets, letter sets and variant keys)."""
+    total = 0
+    for chunk in index._chunks:
+        total += sys.getsizeof(chunk.words)
+        for numbers in (chunk.offsets, chunk.letters, chunk.keys):
+            total += numbers.buffer_info()[1] * numbers.itemsize
+    return total
+
+
+def timed_suggestions(index, queries):
+    """(suggestions, per-query seconds) for each query."""
+    results, times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.suggest(query))
+        times.append(time.perf_counter() - start)
+    return results, times
+
+
+def percentile(times, p):
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headwords', type=int, default=500_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--max-ms', type=float, default=20.0, help="p99 suggestion latency allowed")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    words = headwords(args.headwords, rng)
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    word_list = data_dir / 'words.txt'
+    word_list.write_text('\n'.join(words) + '\n', encoding='utf-8')
+    # The dict version is measured on a tenth of the words (it's that big) and scaled up
+    sample = words[:len(words) // 10]
+    naive = naive_bytes(sample) * len(words) / len(sample)
+
+    index = FuzzyIndex()
+    start = time.perf_counter()
+    index.build([word_list])
+    build_s = time.perf_counter() - start
+    size = index_bytes(index)
+    print(f"index: {len(index)} headwords built in {build_s:.1f}s, {size / 2 ** 20:.1f} MiB "
+          f"({size / len(index):.0f} bytes/word; as a dict of word lists: about "
+          f"{naive / 2 ** 20:.0f} MiB)")
+
+    targets = [rng.choice(words) for _ in range(args.queries)]
+    one_edit = [typo(word, rng) for word in targets]
+    two_edits = [typo(typo(word, rng), rng) for word in targets[:args.queries // 2]]
+    junk = [''.join(rng.choice('xzqwvy') for _ in range(rng.randint(6, 10))) for _ in range(args.queries // 4)]
+    results1, times1 = timed_suggestions(index, one_edit)
+    results2, times2 = timed_suggestions(index, two_edits)
+    results_junk, times_junk = timed_suggestions(index, junk)
+
+    indexed = set(words)
+    real_typos = [(target, result) for target, query, result in zip(targets, one_edit, results1)
+                  if query not in indexed]
+    found1 = sum(target in result for target, result in real_typos)
+    found2 = sum(target in result for target, query, result in zip(targets, two_edits, results2)
+                 if query not in indexed)
+    all_times = times1 + times2 + times_junk
+    p50, p99 = percentile(all_times, 0.5) * 1000, percentile(all_times, 0.99) * 1000
+    print(f"suggest: p50 {p50:.2f} ms, p99 {p99:.2f} ms over {len(all_times)} queries")
+    print(f"  one edit   {found1}/{len(real_typos)} found the intended word "
+          f"(p99 {percentile(times1, 0.99) * 1000:.2f} ms)")
+    print(f"  two edits  {found2}/{len(two_edits)} (p99 {percentile(times2, 0.99) * 1000:.2f} ms)")
+    print(f"  junk       {sum(map(bool, results_junk))}/{len(junk)} got a suggestion "
+          f"(p99 {percentile(times_junk, 0.99) * 1000:.2f} ms)")
+
+    # Through the pipeline: the misspelling 404s, the correction is looked up and carded
+    (data_dir / '.lexi_snap_headwords.txt').write_text("receive\ndefinitely\nseparate\n", encoding='utf-8')
+    settings = SettingsManager(data_dir / 'settings.json')
+    events = []
+    with StubAnki() as anki, StubDictionary(unknown_words={'recieve', 'seperate'}) as dictionary:
+        pipeline = CapturePipeline(settings, FakePlatform().clipboard, data_dir=data_dir,
+                                   anki_url=anki.url, dictionary_url=dictionary.entries_url,
+                                   notify=lambda event, a=None, b=None: events.append((event, a)))
+        pipeline.fuzzy.ready.wait(5)
+        note_id, definition = pipeline.add_word('recieve', 'Default')
+        front = anki.notes[note_id]['fields']['Front'] if note_id else None
+        settings.set('spell_correction', False)
+        _, uncorrected = pipeline.add_word('seperate', 'Default')
+        requests = dictionary.requests['entries']
+        pipeline.shutdown()
+    toasts = [message for event, message in events if event == 'toast']
+    print(f"pipeline: 'recieve' -> card {front!r}, {requests} dictionary requests, toasts {toasts}\n")
+
+    checks = [
+        ('one edit', found1 >= len(real_typos) * 0.99,
+         f"{found1} of {len(real_typos)} one-edit typos suggested the intended word"),
+        ('two edits', found2 >= len(two_edits) * 0.5,
+         f"{found2} of {len(two_edits)} two-edit typos suggested the intended word"),
+        ('latency', p99 < args.max_ms, f"p99 {p99:.2f} ms at {len(index)} headwords (limit {args.max_ms:g} ms)"),
+        ('memory', size < naive / 3, f"{size / 2 ** 20:.1f} MiB index vs about {naive / 2 ** 20:.0f} MiB "
+                                     f"as a dict of word lists"),
+        ('pipeline', front == 'receive' and definition != NO_DEFINITION and uncorrected == NO_DEFINITION
+         and requests == 3, "misspelling added under the corrected word; off with spell_correction false"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
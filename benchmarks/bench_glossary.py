@@ -0,0 +1,171 @@
+"""User glossary: load time, lookup cost and hot reload.
+
+Writes glossaries of `--entries` words (default 100,000) as CSV and JSON and
+times loading each (best of three); both have to load in under `--max-load`
+seconds. Lookup cost (hits and misses) is compared against a glossary a
+tenth the size: a hash lookup shouldn't get slower with size. Then the CSV is edited while a
+Glossary watches it - the change has to show up without a restart, no
+lookup may wait for the re-parse, and a broken edit must leave the
+previous contents in place. Finally words go
+through a CapturePipeline against a dictionary stub: glossary words must be
+answered (and override the dictionary) without a single request.
+
+Usage: python benchmarks/bench_glossary.py [--entries 100000] [--max-load 0.5]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from glossary import Glossary
+from platforms.fake import FakePlatform
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+def write_csv(path, entries):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Term', 'Definition', 'POS', 'Example', 'Language'])
+        for i in range(entries):
+            writer.writerow([f"Term{i}", f"Definition of term {i}, as used in the clinic.",
+                             'noun' if i % 3 else '', f"An example with term{i}." if i % 10 == 0 else '',
+                             'fr' if i % 50 == 0 else ''])
+            if i % 20 == 0:
+                writer.writerow([f"term{i}", f"A second sense of term {i}.", 'verb', '', ''])
+
+
+def write_json(path, entries):
+    data = {f"term{i}": f"Definition of term {i}, as used in the clinic." for i in range(entries)}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def timed_load(path, repeat=3):
+    """A Glossary of one file and the best of `repeat` load times."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        glossary = Glossary([path], check_interval=3600)
+        best = min(best, time.perf_counter() - start)
+    return glossary, best
+
+
+def lookup_ns(glossary, entries, rounds=200_000):
+    """Mean cost of a lookup, half hits (spread over the glossary) and half misses."""
+    words = [f"TERM{i * 7919 % entries}" for i in range(500)] + [f"missing{i}" for i in range(500)]
+    start = time.perf_counter()
+    for _ in range(rounds // len(words)):
+        for word in words:
+            glossary.get(word, 'en')
+    return (time.perf_counter() - start) / (rounds // len(words) * len(words)) * 1e9
+
+
+def wait_for(glossary, word, definition, timeout=2.0):
+    """(seconds until the glossary answers `definition` for `word` or None, slowest lookup meanwhile)."""
+    start = time.perf_counter()
+    slowest = 0.0
+    while time.perf_counter() - start < timeout:
+        before = time.perf_counter()
+        entry = glossary.get(word)
+        slowest = max(slowest, time.perf_counter() - before)
+        if entry is not None and entry.definition == definition:
+            return time.perf_counter() - start, slowest
+        time.sleep(0.001)
+    return None, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--max-load', type=float, default=0.5, help="seconds allowed per load")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    small_path = data_dir / 'small.csv'
+    csv_path = data_dir / 'glossary.csv'
+    json_path = data_dir / 'glossary.json'
+    write_csv(small_path, args.entries // 10)
+    write_csv(csv_path, args.entries)
+    write_json(json_path, args.entries)
+
+    small, _ = timed_load(small_path)
+    from_csv, csv_s = timed_load(csv_path)
+    from_json, json_s = timed_load(json_path)
+    small_ns = lookup_ns(small, args.entries // 10)
+    large_ns = lookup_ns(from_csv, args.entries)
+    print(f"load:   CSV {csv_path.stat().st_size / 2 ** 20:.1f} MiB in {csv_s * 1000:.0f} ms, "
+          f"JSON {json_path.stat().st_size / 2 ** 20:.1f} MiB in {json_s * 1000:.0f} ms "
+          f"({len(from_csv)} and {len(from_json)} keys)")
+    print(f"lookup: {small_ns:.0f} ns at {args.entries // 10} entries, {large_ns:.0f} ns at {args.entries}")
+
+    entry = from_csv.get('term20')
+    fr_entry = from_csv.get('Term50', 'fr')
+    parsed = (entry.word == 'Term20' and len(entry.senses) == 2 and entry.senses[1].part_of_speech == 'verb'
+              and entry.examples == ('An example with term20.',) and fr_entry is not None
+              and from_csv.get('term50', 'en') is None and from_json.get('Term7').definition
+              == "Definition of term 7, as used in the clinic.")
+
+    # Hot reload: edit the file under a glossary that checks every 50 ms
+    live = Glossary([csv_path], check_interval=0.05)
+    live.watch()
+    with open(csv_path, 'a', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerow(['stat', 'Immediately (from Latin statim).', 'adverb', '', ''])
+    appeared, slowest = wait_for(live, 'STAT', 'Immediately (from Latin statim).')
+    live.stop_watching()
+    broken_json = Glossary([json_path], check_interval=0.05)
+    broken_json.watch()
+    json_path.write_text('{"term1": "half-written', encoding='utf-8')
+    time.sleep(0.1)
+    kept = broken_json.get('term1') is not None and broken_json.reload() == 0
+    broken_json.stop_watching()
+    print(f"reload: edit visible after {appeared * 1000:.0f} ms, slowest lookup meanwhile "
+          f"{slowest * 1000:.2f} ms" if appeared is not None else "reload: edit never became visible")
+
+    # Through the pipeline: glossary words never reach the dictionary
+    (data_dir / '.lexi_snap_glossary.csv').write_text(
+        "word,definition\ntachycardia,A heart rate over 100 beats per minute.\n"
+        "serendipity,Our team's word for a lucky bug.\n", encoding='utf-8')
+    settings = SettingsManager(data_dir / 'settings.json')
+    with StubAnki() as anki, StubDictionary() as dictionary:
+        pipeline = CapturePipeline(settings, FakePlatform().clipboard, data_dir=data_dir,
+                                   anki_url=anki.url, dictionary_url=dictionary.entries_url)
+        _, tachycardia = pipeline.add_word('tachycardia', 'Default')
+        _, serendipity = pipeline.add_word('Serendipity', 'Default')
+        glossary_requests = dictionary.requests['entries']
+        _, ephemeral = pipeline.add_word('ephemeral', 'Default')
+        requests = dictionary.requests['entries']
+        pipeline.shutdown()
+    print(f"pipeline: {glossary_requests} requests for 2 glossary words, {requests} after one other\n")
+
+    checks = [
+        ('load', csv_s < args.max_load and json_s < args.max_load,
+         f"{args.entries} entries in {csv_s * 1000:.0f} ms (CSV) and {json_s * 1000:.0f} ms (JSON)"),
+        ('lookup', large_ns < small_ns * 2,
+         f"{large_ns:.0f} ns per lookup at {args.entries} entries vs {small_ns:.0f} ns at {args.entries // 10}"),
+        ('parsing', parsed, "header aliases, repeated words as senses, language rows, JSON object"),
+        ('hot reload', appeared is not None, "an appended row was picked up without a restart"),
+        ('no stall', slowest < csv_s / 10,
+         f"slowest lookup during the reload {slowest * 1000:.2f} ms (a parse takes {csv_s * 1000:.0f} ms)"),
+        ('broken edit', kept, "a half-written file kept the previous contents"),
+        ('pipeline', glossary_requests == 0 and requests == 1
+         and tachycardia == "A heart rate over 100 beats per minute."
+         and serendipity == "Our team's word for a lucky bug." and ephemeral != serendipity,
+         f"glossary words (one overriding the dictionary) added with {glossary_requests} requests"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
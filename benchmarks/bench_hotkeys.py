@@ -0,0 +1,202 @@
+"""Per-keystroke cost of the global hotkey matcher.
+
+Feeds a synthetic stream of key events - ordinary typing, shifted letters,
+other modifier chords and now and then the hotkey itself - through
+HotkeyMatcher, and through a set-of-names matcher shaped like the previous
+pynput GlobalHotKeys path (name each key, then compare sets) for reference.
+Tokens mimic what the pynput listener passes: Key members for modifiers,
+virtual key codes for letters.
+
+The matcher runs once with just that hotkey and once with seven more
+bindings (ctrl+shift+1..7) registered alongside it. Checks that everything
+fires exactly as often as the hotkey was pressed, that the matcher allocates
+nothing per event (tracemalloc peak over a run), and that extra bindings
+don't make ordinary keys slower. Finally a modifier whose release the hook
+missed must neither fire the hotkey on a plain key nor block it, given the
+OS's view of the held keys.
+
+Usage: python benchmarks/bench_hotkeys.py [--events 2000000]
+"""
+
+import argparse
+import enum
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from platforms.hotkeys import MODIFIER_KEYS, HotkeyMatcher, parse_hotkey
+
+
+Key = enum.Enum('Key', ['ctrl_l', 'ctrl_r', 'alt_l', 'alt_r', 'shift_l', 'shift_r', 'cmd', 'space', 'enter'])
+
+MODIFIER_BITS = {member: MODIFIER_KEYS[member.name] for member in Key if member.name in MODIFIER_KEYS}
+NAME_ALIASES = {'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl', 'alt_l': 'alt', 'alt_r': 'alt',
+                'shift_l': 'shift', 'shift_r': 'shift', 'cmd': 'win'}
+
+
+class NameSetMatcher:
+    """Reference: normalize every key to a name, track a set, compare with the hotkey's."""
+
+    def __init__(self, hotkey, callback):
+        self.keys = set(hotkey.split('+'))
+        self.state = set()
+        self.callback = callback
+
+    @staticmethod
+    def name(token):
+        if isinstance(token, Key):
+            name = token.name.lower()
+            return NAME_ALIASES.get(name, name)
+        if 65 <= token <= 90:
+            return chr(token).lower()
+        return str(token)
+
+    def press(self, token):
+        name = self.name(token)
+        if name in self.keys and name not in self.state:
+            self.state.add(name)
+            if self.state == self.keys:
+                self.callback()
+
+    def release(self, token):
+        self.state.discard(self.name(token))
+
+
+def event_stream(length, hotkey_every, seed=1):
+    """Events as (is_press, token), and how many times the hotkey (ctrl+alt+d) is in them."""
+    rng = random.Random(seed)
+    events = []
+    hotkeys = 0
+    letters = [vk for vk in range(65, 91) if vk != ord('D')]
+    while len(events) < length:
+        roll = rng.random()
+        if roll < 1 / hotkey_every:
+            mods = [Key.ctrl_l, rng.choice([Key.alt_l, Key.alt_r])]
+            keys = mods + [ord('D')]
+            hotkeys += 1
+        elif roll < 0.05:
+            keys = [Key.shift_l, rng.choice(letters)]
+        elif roll < 0.07:
+            keys = [Key.ctrl_l, rng.choice([ord('C'), ord('V'), ord('D')])]  # not the hotkey
+        elif roll < 0.15:
+            keys = [rng.choice([Key.space, Key.enter])]
+        else:
+            keys = [rng.choice(letters + [ord('D')])]
+        events += [(True, key) for key in keys]
+        events += [(False, key) for key in reversed(keys)]
+    return events, hotkeys
+
+
+def make_matcher(hotkeys, callback):
+    """A HotkeyMatcher for hotkeys like 'ctrl+alt+d', with letters and digits as virtual key codes."""
+    matcher = HotkeyMatcher(MODIFIER_BITS)
+    for hotkey in hotkeys:
+        modifiers, trigger = parse_hotkey(hotkey)
+        matcher.add(modifiers, {ord(trigger.upper())}, callback)
+    return matcher
+
+
+def feed(matcher, events):
+    press, release = matcher.press, matcher.release
+    for is_press, token in events:
+        if is_press:
+            press(token)
+        else:
+            release(token)
+
+
+def traced_peak(matcher, events):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    feed(matcher, events)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    chunk, per_chunk = event_stream(20_000, hotkey_every=500)
+    repeats = max(1, args.events // len(chunk))
+    events = chunk * repeats
+    expected = per_chunk * repeats
+
+    fired = {'matcher': 0, 'matcher x8': 0, 'name sets': 0}
+
+    def count(name):
+        def callback():
+            fired[name] += 1
+        return callback
+
+    matchers = {
+        'matcher': make_matcher(['ctrl+alt+d'], count('matcher')),
+        'matcher x8': make_matcher(['ctrl+alt+d'] + [f"ctrl+shift+{i}" for i in range(1, 8)],
+                                   count('matcher x8')),
+        'name sets': NameSetMatcher('ctrl+alt+d', count('name sets')),
+    }
+    print(f"{len(events):,} events, hotkey pressed {expected:,} times\n")
+    timings = {}
+    for name, matcher in matchers.items():
+        start = time.perf_counter()
+        feed(matcher, events)
+        timings[name] = (time.perf_counter() - start) / len(events)
+        print(f"{name:<11} {timings[name] * 1e9:>7.0f} ns/event   fired {fired[name]:,}")
+
+    # Allocations per event: the peak over a long run minus that of a one-event run
+    # (feed() itself allocates its bound methods and iterator once per call). An object
+    # allocated per event would raise the peak by at least its own size - 28 bytes for
+    # the smallest, an uncached int - so a few bytes of interpreter bookkeeping is noise.
+    matcher = make_matcher(['ctrl+alt+d'], lambda: None)
+    feed(matcher, chunk)
+    allocated = traced_peak(matcher, chunk) - traced_peak(matcher, chunk[:1])
+
+    # Missed releases: ctrl and alt still "held" in the stream, nothing down per the OS
+    stuck_fired = [0]
+    os_held = [0]
+
+    def stuck_callback():
+        stuck_fired[0] += 1
+    stuck = HotkeyMatcher(MODIFIER_BITS, held=lambda: os_held[0])
+    stuck.add({'ctrl', 'alt'}, {ord('D')}, stuck_callback)
+    stuck.press(Key.ctrl_l)
+    stuck.press(Key.alt_l)
+    stuck.press(ord('D'))  # plain 'd' typed after the lock screen: no hotkey
+    stuck.release(ord('D'))
+    plain = stuck_fired[0]
+    stuck.press(Key.shift_l)  # shift released unseen, then the real hotkey
+    os_held[0] = MODIFIER_KEYS['ctrl_l'] | MODIFIER_KEYS['alt_l']
+    stuck.press(Key.ctrl_l)
+    stuck.press(Key.alt_l)
+    stuck.press(ord('D'))
+    print()
+
+    checks = [
+        ('fires', fired['matcher'] == fired['matcher x8'] == expected,
+         f"matcher fired {fired['matcher']:,} of {expected:,}, with 8 bindings {fired['matcher x8']:,}"),
+        ('reference', fired['name sets'] == expected, f"name-set matcher fired {fired['name sets']:,} of {expected:,}"),
+        ('allocation', allocated < 28,
+         f"peak grew {allocated} bytes over {len(chunk):,} events vs one event (an object per event is >= 28)"),
+        ('faster', timings['matcher'] < timings['name sets'],
+         f"{timings['name sets'] / timings['matcher']:.1f}x the name-set matcher's speed"),
+        ('stuck keys', plain == 0 and stuck_fired[0] == 1,
+         f"missed modifier releases: plain key fired {plain}, real hotkey fired {stuck_fired[0] - plain}"),
+        ('bindings', timings['matcher x8'] < timings['matcher'] * 1.25,
+         f"8 bindings cost {timings['matcher x8'] / timings['matcher']:.2f}x one binding per event"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<10} {detail}")
+        ok &= passed
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
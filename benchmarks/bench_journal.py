@@ -0,0 +1,188 @@
+"""Capture journal: cost per capture, and a capture killed at every stage of the pipeline.
+
+First times the four journal lines of `--captures` captures written in a
+burst, as the pipeline writes them (flushed per line, fsync batched),
+against fsync after every line, and counts the fsyncs the batching made.
+
+Then, for each kill point, a child process captures one word through a
+CapturePipeline (against stub Anki and dictionary servers that outlive it)
+and dies with os._exit at that point: right after the capture is
+journaled, in the middle of the dictionary lookup, before and after the
+note reaches Anki, after the note id is journaled, after the history
+entry is written, after the capture is finished, and while the deck
+dialog is open. A fresh pipeline on the same data directory then replays
+the journal. Every word has to end up as exactly one note in Anki and one
+history entry, with nothing left in the journal.
+
+Usage: python benchmarks/bench_journal.py [--captures 2000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import DEFAULT_ROUTE, CapturePipeline
+from context import NO_CONTEXT
+from history import HistoryLog
+from journal import CaptureJournal
+from platforms.fake import FakeClipboard
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+KILL_POINTS = ('captured', 'lookup', 'adding', 'anki', 'added', 'history', 'done', 'dialog')
+KILLED = 9
+
+
+def die_after(obj, name):
+    """Make obj.name exit the process as soon as the original returns."""
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        result = original(*args, **kwargs)
+        os._exit(KILLED)
+        return result
+    setattr(obj, name, wrapper)
+
+
+def child(args):
+    """Capture `args.word` and die at `args.child`."""
+    settings = SettingsManager(Path(args.data) / 'settings.json')
+    pipeline = CapturePipeline(settings, FakeClipboard([args.word]), data_dir=args.data,
+                               anki_url=args.anki, dictionary_url=args.dictionary,
+                               notify=lambda event, a=None, b=None: (
+                                   os._exit(KILLED) if event == 'deck_selector' else None))
+    stage = args.child
+    if stage in ('captured', 'adding', 'added', 'done'):
+        die_after(pipeline.journal, stage)
+    elif stage == 'lookup':
+        original = pipeline.lookup_entry
+
+        def lookup_entry(*a, **kw):
+            threading.Timer(0.1, os._exit, (KILLED,)).start()  # the stub takes 0.3s to answer
+            return original(*a, **kw)
+        pipeline.lookup_entry = lookup_entry
+    elif stage == 'anki':
+        die_after(pipeline.anki, 'add_note')
+    elif stage == 'history':
+        die_after(settings, 'add_to_history')
+    pipeline.process_capture()
+    sys.exit(0)  # not killed: the kill point was never reached
+
+
+def journal_cost(captures, data_dir):
+    """(µs per capture batched, µs per capture with fsync per line, fsyncs made) for a burst of captures."""
+    journal = CaptureJournal(data_dir / 'batched.jsonl')
+    start = time.perf_counter()
+    for i in range(captures):
+        capture_id = journal.captured(f"word{i}", 'Default', DEFAULT_ROUTE, NO_CONTEXT)
+        journal.adding(capture_id, f"word{i}", 'Default', "A definition.")
+        journal.added(capture_id, i)
+        journal.done(capture_id)
+    batched = (time.perf_counter() - start) / captures * 1e6
+    time.sleep(journal.sync_interval * 3)
+    journal.close()
+
+    eager = CaptureJournal(data_dir / 'eager.jsonl')
+    original = eager._write
+
+    def write_and_sync(record):
+        original(record)
+        eager.sync()
+    eager._write = write_and_sync
+    start = time.perf_counter()
+    for i in range(captures // 10):
+        capture_id = eager.captured(f"word{i}", 'Default', DEFAULT_ROUTE, NO_CONTEXT)
+        eager.adding(capture_id, f"word{i}", 'Default', "A definition.")
+        eager.added(capture_id, i)
+        eager.done(capture_id)
+    eager_cost = (time.perf_counter() - start) / (captures // 10) * 1e6
+    eager.close()
+    return batched, eager_cost, journal.syncs
+
+
+def killed_capture(stage, word, anki, dictionary):
+    """Kill a capture of `word` at `stage`, replay it; returns (exit code, notes, history entries, left over)."""
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    settings = SettingsManager(data_dir / 'settings.json')
+    settings.set('default_deck', None if stage == 'dialog' else 'Default')
+    code = subprocess.run([sys.executable, __file__, '--child', stage, '--word', word, '--data', str(data_dir),
+                           '--anki', anki.url, '--dictionary', dictionary.entries_url], timeout=60).returncode
+
+    events = []
+    settings = SettingsManager(data_dir / 'settings.json')
+    pipeline = CapturePipeline(settings, FakeClipboard(), data_dir=data_dir, anki_url=anki.url,
+                               dictionary_url=dictionary.entries_url,
+                               notify=lambda event, a=None, b=None: events.append((event, a, b)))
+    pipeline.replay_journal()
+    for event, shown, captured in events:
+        if event == 'deck_selector':
+            # What the deck dialog does when the user picks a deck
+            entry, audio, route, source, capture_id = captured
+            definition = pipeline.definition_for(entry, route)
+            note_id = pipeline.add_to_anki('Default', shown, definition, entry, source=source, audio=audio,
+                                           capture_id=capture_id)
+            if note_id:
+                pipeline.record_added(shown, definition, note_id, 'Default', route=route, source=source,
+                                      capture_id=capture_id)
+    left = pipeline.journal.pending()
+    pipeline.shutdown()
+    left += len(CaptureJournal(data_dir / '.lexi_snap_journal.jsonl').take_recovered())
+    notes = sum(1 for note in list(anki.notes.values()) if note['fields'].get('Front') == word)
+    history = sum(1 for _, item in HistoryLog(data_dir / '.lexi_snap_history.jsonl').read()
+                  if item.get('word') == word)
+    return code, notes, history, left
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--captures', type=int, default=2000)
+    parser.add_argument('--child', choices=KILL_POINTS, help=argparse.SUPPRESS)
+    parser.add_argument('--word', help=argparse.SUPPRESS)
+    parser.add_argument('--data', help=argparse.SUPPRESS)
+    parser.add_argument('--anki', help=argparse.SUPPRESS)
+    parser.add_argument('--dictionary', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    batched, eager, syncs = journal_cost(args.captures, data_dir)
+    print(f"journal: {batched:.0f} us per capture with batched fsync ({syncs} fsyncs for "
+          f"{args.captures * 4} lines), {eager:.0f} us with fsync per line")
+
+    results = {}
+    with StubAnki() as anki, StubDictionary(latency=0.3) as dictionary:
+        for stage in KILL_POINTS:
+            results[stage] = killed_capture(stage, f"lexeme{stage}", anki, dictionary)
+            code, notes, history, left = results[stage]
+            print(f"  killed at {stage:<9} exit {code}: {notes} note(s), {history} history entr"
+                  f"{'y' if history == 1 else 'ies'}, {left} left in the journal")
+    print()
+
+    checks = [
+        ('cost', batched < 1000, f"{batched:.0f} us of journal writes per capture"),
+        ('batching', syncs <= args.captures * 4 // 10,
+         f"{syncs} fsyncs for {args.captures * 4} lines written in a burst"),
+        ('killed', all(code == KILLED for code, _, _, _ in results.values()),
+         "every child died at its kill point"),
+    ]
+    for stage, (code, notes, history, left) in results.items():
+        checks.append((stage, notes == 1 and history == 1 and left == 0,
+                       f"exactly one note and one history entry after replay ({notes}, {history})"))
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Language detection and routing of mixed-language captures.
+
+Detection: accuracy on a small labelled word list, and its cost per word for
+plain English words (the common case) and for non-English ones.
+
+Routing: adds English, French, German, Spanish, Russian, Greek and Japanese
+words through a CapturePipeline against local dictionary and AnkiConnect
+stubs, then looks them all up again. Checks that every non-English word went
+straight to Wiktionary with no English request first, that every card got a
+definition, that each language landed in its own cache partition on disk,
+and that the second round was answered from those caches.
+
+Usage: python benchmarks/bench_languages.py [--latency SECONDS] [--words N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from dictionary import NO_DEFINITION
+from languages import detect_language
+from platforms.fake import FakePlatform
+from ratelimit import RequestBudget
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+# (word, expected language; None = plain English)
+LABELLED = [
+    ('serendipity', None), ('ephemeral', None), ('château', 'fr'), ('œuvre', 'fr'),
+    ('garçon', 'fr'), ('Straße', 'de'), ('Mädchen', 'de'), ('Übung', 'de'),
+    ('niño', 'es'), ('¿qué?', 'es'), ('mañana', 'es'), ('coração', 'pt'), ('não', 'pt'),
+    ('źdźbło', 'pl'), ('łódź', 'pl'), ('příliš', 'cs'), ('kağıt', 'tr'), ('kőbánya', 'hu'),
+    ('кошка', 'ru'), ('γάτα', 'el'), ('שלום', 'he'), ('كتاب', 'ar'), ('नमस्ते', 'hi'),
+    ('ねこ', 'ja'), ('食べる', 'ja'), ('カタカナ', 'ja'), ('汉字', 'zh'), ('한국어', 'ko'),
+    ('ภาษาไทย', 'th'), ('ქართული', 'ka'),
+]
+
+CAPTURES = {
+    'en': ['serendipity', 'ephemeral', 'ubiquitous'],
+    'fr': ['château', 'œuvre', 'garçon'],
+    'de': ['Straße', 'Mädchen'],
+    'es': ['niño', 'mañana'],
+    'ru': ['кошка', 'собака'],
+    'el': ['γάτα'],
+    'ja': ['ねこ', '食べる'],
+}
+
+
+def time_detection(words, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for word in words:
+            detect_language(word)
+    return (time.perf_counter() - start) / (rounds * len(words))
+
+
+def capture_round(pipeline, words):
+    added = []
+    for word in words:
+        note_id, definition = pipeline.add_word(word, 'Default')
+        added.append((word, note_id, definition))
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--words', type=int, default=200_000, help="detections timed per kind")
+    args = parser.parse_args()
+
+    wrong = [(word, expected, detect_language(word)) for word, expected in LABELLED
+             if detect_language(word) != expected]
+    english = [word for word, expected in LABELLED if expected is None] * 20
+    foreign = [word for word, expected in LABELLED if expected is not None]
+    ascii_ns = time_detection(english, max(1, args.words // len(english))) * 1e9
+    foreign_ns = time_detection(foreign, max(1, args.words // len(foreign))) * 1e9
+    print(f"detection: {len(LABELLED) - len(wrong)}/{len(LABELLED)} correct, "
+          f"{ascii_ns:.0f} ns/word English, {foreign_ns:.0f} ns/word other")
+    for word, expected, got in wrong:
+        print(f"  {word!r}: expected {expected}, got {got}")
+
+    words = [word for group in CAPTURES.values() for word in group]
+    non_english = len(words) - len(CAPTURES['en'])
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    settings = SettingsManager(data_dir / 'settings.json')
+    with StubAnki() as anki, StubDictionary(latency=args.latency) as dictionary:
+        pipeline = CapturePipeline(
+            settings, FakePlatform().clipboard, data_dir=data_dir,
+            anki_url=anki.url, dictionary_url=dictionary.entries_url,
+            wiktionary_url=dictionary.wiktionary_url, budget=RequestBudget(rate=1000, burst=1000),
+        )
+        for provider in pipeline.dictionary.providers.values():
+            provider.budget = RequestBudget(rate=1000, burst=1000)
+        start = time.perf_counter()
+        first = capture_round(pipeline, words)
+        first_s = time.perf_counter() - start
+        first_requests = dict(dictionary.requests)
+
+        start = time.perf_counter()
+        second = [pipeline.lookup_entry(word) for word in words]
+        second_s = time.perf_counter() - start
+        second_requests = sum(dictionary.requests.values()) - sum(first_requests.values())
+        partitions = {language: len(cache) for language, cache in pipeline.dictionary.partitions()}
+        pipeline.shutdown()
+
+    files = sorted(path.name for path in data_dir.glob('.lexi_snap_definitions*.jsonl'))
+    print(f"\ncaptures: {len(words)} words, {non_english} non-English, dictionary latency "
+          f"{args.latency * 1000:.0f} ms")
+    print(f"  first round  {first_s * 1000:>6.0f} ms  dictionaryapi {first_requests.get('entries', 0)}, "
+          f"wiktionary {first_requests.get('wiktionary', 0)} requests")
+    print(f"  second round {second_s * 1000:>6.0f} ms  {second_requests} requests")
+    print(f"  partitions   {partitions}")
+    print(f"  cache files  {', '.join(files)}\n")
+
+    missing = [word for word, note_id, definition in first if not note_id or definition == NO_DEFINITION]
+    missing += [word for word, entry in zip(words, second) if entry is None]
+    expected_partitions = {language: len(group) for language, group in CAPTURES.items()}
+    checks = [
+        ('detection', not wrong, f"{len(LABELLED) - len(wrong)} of {len(LABELLED)} labelled words"),
+        ('fast path', ascii_ns < 2000, f"{ascii_ns:.0f} ns to pass over an English word"),
+        ('routing', first_requests.get('entries', 0) == len(CAPTURES['en'])
+         and first_requests.get('wiktionary', 0) == non_english,
+         f"{first_requests.get('entries', 0)} English requests for {len(CAPTURES['en'])} English words, "
+         f"{first_requests.get('wiktionary', 0)} Wiktionary for {non_english} others"),
+        ('defined', not missing, f"cards without a definition: {missing or 'none'}"),
+        ('partitions', partitions == expected_partitions and len(files) == len(CAPTURES),
+         f"{len(partitions)} cache partitions, {len(files)} files"),
+        ('cached', second_requests == 0, f"second round made {second_requests} requests"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<10} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Adaptive timeouts and hedged requests against stubs with bimodal latency.
+
+Scenarios:
+  hedging   lookups against a dictionary stub where `--slow-rate` of requests
+            take `--slow` seconds instead of `--latency`: p50/p99 with fixed
+            timeouts and no hedges vs adaptive timeouts with hedging. Hedging
+            has to cut p99 at least in half while sending no more than 5% (plus
+            the burst) extra requests
+  throttled a hedge answered with a fast 429 doesn't beat the slow 200 of the
+            first attempt, but its Retry-After still throttles the budget
+  timeout   once a fast server's history is known, a request to it that hangs
+            is abandoned after the adaptive timeout, well before the fixed 3s
+  anki      the same bimodal AnkiConnect stub: slow read-only actions are
+            hedged, writes never are (every addNote reaches Anki exactly once)
+
+Usage: python benchmarks/bench_latency.py [--lookups 600] [--latency 0.005] [--slow 0.4] [--slow-rate 0.02]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aio import EventLoopThread, Response
+from anki import AnkiConnect
+from dictionary import DictionaryClient, DictionaryUnavailable, EntryCache
+from latency import Endpoints
+from ratelimit import RequestBudget
+from stubs import StubAnki, StubDictionary
+
+
+def check(label, ok, detail):
+    print(f"[{'ok' if ok else 'FAIL'}] {label:<11} {detail}")
+    return ok
+
+
+def percentile(times, p):
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def client(stub, loop, hedged=True):
+    c = DictionaryClient(base_url=stub.entries_url, cache=EntryCache(),
+                         budget=RequestBudget(rate=10000, burst=10000), loop=loop)
+    if not hedged:
+        c.endpoints = Endpoints(c.timeout, floor=c.timeout, ceiling=c.timeout, hedge_ratio=0, hedge_burst=0)
+    return c
+
+
+async def timed_lookups(c, words, concurrency):
+    """Per-lookup seconds for `words`, `concurrency` at a time."""
+    times = []
+
+    async def one(word):
+        start = time.perf_counter()
+        try:
+            await c.alookup(word)
+        except DictionaryUnavailable:
+            pass
+        times.append(time.perf_counter() - start)
+    for i in range(0, len(words), concurrency):
+        await asyncio.gather(*(one(word) for word in words[i:i + concurrency]))
+    return times
+
+
+def hedging(args):
+    results = {}
+    for hedged in (False, True):
+        with StubDictionary(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow,
+                            seed=1) as stub:
+            loop = EventLoopThread()
+            c = client(stub, loop, hedged)
+            # Warm up the history (and the connection pool) first
+            loop.run(timed_lookups(c, [f"warm{i}" for i in range(100)], 10))
+            sent = stub.requests['entries']
+            times = loop.run(timed_lookups(c, [f"w{i}" for i in range(args.lookups)], 10))
+            extra = stub.requests['entries'] - sent - args.lookups
+            endpoint = c.endpoints.get('dictionaryapi').snapshot()
+            loop.stop()
+        results[hedged] = (percentile(times, 0.5), percentile(times, 0.99), extra, endpoint)
+        print(f"{'hedged' if hedged else 'fixed':>6}: p50 {results[hedged][0] * 1000:6.1f} ms, "
+              f"p99 {results[hedged][1] * 1000:6.1f} ms, {extra} extra requests, endpoint {endpoint}")
+    fixed_p99, (_, hedged_p99, extra, endpoint) = results[False][1], results[True]
+    allowed = int(args.lookups * 0.05) + 2
+    ok = check('p99', hedged_p99 < fixed_p99 / 2,
+               f"{hedged_p99 * 1000:.0f} ms hedged vs {fixed_p99 * 1000:.0f} ms fixed")
+    ok &= check('load', extra <= allowed,
+                f"{extra} hedges for {args.lookups} lookups (cap {allowed}), {endpoint.get('hedge_wins', 0)} won")
+    return check('timeout', endpoint['timeout_ms'] < 3000,
+                 f"adaptive timeout {endpoint['timeout_ms']:.0f} ms (fixed 3000 ms)") and ok
+
+
+def hang(args):
+    with StubDictionary(latency=args.latency) as stub:
+        loop = EventLoopThread()
+        c = client(stub, loop)
+        # One at a time, so the history is the server's and not the first connections' setup
+        loop.run(timed_lookups(c, [f"h{i}" for i in range(100)], 1))
+        stub.latency = 5.0  # the server stops answering
+        start = time.perf_counter()
+        try:
+            c.lookup('hung')
+            failed = False
+        except DictionaryUnavailable:
+            failed = True
+        elapsed = time.perf_counter() - start
+        loop.stop()
+    return check('hang', failed and elapsed < 1.5,
+                 f"a hung request abandoned after {elapsed:.2f}s (fixed timeout: 3s)")
+
+
+def throttled_hedge(args):
+    with StubDictionary(latency=args.latency) as stub:
+        loop = EventLoopThread()
+        c = client(stub, loop)
+        loop.run(timed_lookups(c, [f"t{i}" for i in range(100)], 1))
+        stub.latency = 0.2  # the first attempt gets hedged...
+        original = c.http.request
+        calls = [0]
+
+        async def request(method, url, **kwargs):
+            calls[0] += 1
+            if calls[0] == 2:
+                return Response(429, {'retry-after': '1'}, b'')  # ...and the hedge is turned away
+            return await original(method, url, **kwargs)
+        c.http.request = request
+        start = time.perf_counter()
+        try:
+            entry = c.lookup('patience')
+        except DictionaryUnavailable:
+            entry = None
+        elapsed = time.perf_counter() - start
+        blocked = c.budget.blocked_for()
+        loop.stop()
+    return check('throttled', entry is not None and calls[0] == 2 and elapsed < 0.6 and blocked > 0.5,
+                 f"first attempt's 200 used after {elapsed * 1000:.0f} ms over the hedge's 429; "
+                 f"budget blocked for {blocked:.1f}s more")
+
+
+def anki(args, adds=100, reads=400):
+    with StubAnki(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow, seed=2) as stub:
+        loop = EventLoopThread()
+        connect = AnkiConnect(stub.url, loop=loop)
+
+        async def run():
+            async def add(i):
+                return await connect.ainvoke('addNote', note={
+                    'deckName': 'Default', 'modelName': 'Basic', 'fields': {'Front': f"a{i}", 'Back': ''},
+                    'tags': []})
+            for i in range(0, reads, 10):
+                await asyncio.gather(*(connect.ainvoke('deckNames') for _ in range(10)),
+                                     *(add(i + j) for j in range(10) if i + j < adds))
+        loop.run(run(), timeout=120)
+        snapshot = connect.endpoints.snapshot()
+        loop.stop()
+    reads_sent, adds_sent = stub.requests['deckNames'], stub.requests['addNote']
+    print(f"anki: {snapshot}")
+    return check('anki', adds_sent == adds == len(stub.notes) and reads <= reads_sent <= reads * 1.05 + 2,
+                 f"{reads_sent} deckNames requests for {reads} calls ({snapshot['deckNames'].get('hedges', 0)} "
+                 f"hedged), {adds_sent} addNote for {adds}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=600)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--slow', type=float, default=0.4)
+    parser.add_argument('--slow-rate', type=float, default=0.02)
+    args = parser.parse_args()
+
+    results = [hedging(args), throttled_hedge(args), hang(args), anki(args)]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
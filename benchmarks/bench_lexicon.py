@@ -0,0 +1,161 @@
+"""Importing the user's own decks into the known-word lexicon.
+
+Seeds a stub AnkiConnect with `--notes` notes (default 120,000) spread over
+three decks, with fronts in Anki's usual shapes (HTML, [sound:] tags,
+entities), then imports two of the decks. Checks that every note of the
+chosen decks was read (and none of the others), in few requests, with
+monotonic progress callbacks; that peak traced memory grows by well under
+a notesInfo record per note between a tenth of the notes and all of them;
+that known words are found and unknown ones aren't; that a second import
+only reads the notes edited since; that dropping a deck forgets its words;
+and that the lexicon reloads from disk.
+
+Usage: python benchmarks/bench_lexicon.py [--notes 120000] [--latency SECONDS]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aio import EventLoopThread
+from anki import AnkiConnect
+from lexicon import Lexicon
+from stubs import StubAnki
+
+
+def front(deck, i):
+    """A note front as users' decks have them: mostly plain, some formatted."""
+    word = f"{deck.lower()}{i}"
+    if i % 5 == 1:
+        return f"<b>{word.capitalize()}</b>"
+    if i % 5 == 2:
+        return f"{word} [sound:{word}.mp3]"
+    if i % 5 == 3:
+        return f"&nbsp;{word}&nbsp;"
+    return word
+
+
+def seed(anki_stub, notes):
+    """Spanish and French get 5/12 of the notes each, Default (not imported) the rest."""
+    sizes = {'Spanish': notes * 5 // 12, 'French': notes * 5 // 12}
+    sizes['Default'] = notes - sum(sizes.values())
+    for deck, size in sizes.items():
+        anki_stub.seed_notes((front(deck, i) for i in range(size)), tags=(), deck=deck)
+    return sizes
+
+
+def traced_import(anki_stub, notes, loop, data_dir):
+    """A first import of two decks of a collection with `notes` notes, with its peak traced memory."""
+    sizes = seed(anki_stub, notes)
+    lexicon = Lexicon(data_dir / f'lexicon-{notes}.tsv')
+    anki = AnkiConnect(anki_stub.url, timeout=60, loop=loop)
+    calls = []
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    read = lexicon.import_decks(anki, ['Spanish', 'French'],
+                                progress=lambda deck, done, total: calls.append((deck, done, total)))
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'sizes': sizes, 'read': read, 'seconds': seconds, 'peak': peak, 'calls': calls,
+        'served': anki_stub.notes_served, 'requests': anki_stub.requests['multi'] + anki_stub.requests['notesInfo'],
+        'lexicon': lexicon, 'anki': anki,
+    }
+
+
+def monotonic(calls, sizes):
+    for deck in ('Spanish', 'French'):
+        done = [d for name, d, total in calls if name == deck]
+        totals = {total for name, _, total in calls if name == deck}
+        if done != sorted(done) or done[-1] != sizes[deck] or totals != {sizes[deck]}:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=120_000)
+    parser.add_argument('--edited', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.002)
+    args = parser.parse_args()
+
+    loop = EventLoopThread(name='network')
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    decks = ('Default', 'Spanish', 'French')
+    with StubAnki(latency=args.latency, decks=decks) as anki_stub:
+        small = traced_import(anki_stub, args.notes // 10, loop, data_dir)
+    anki_stub = StubAnki(latency=args.latency, decks=decks).start()
+    large = traced_import(anki_stub, args.notes, loop, data_dir)
+    sizes, lexicon = large['sizes'], large['lexicon']
+    imported = sizes['Spanish'] + sizes['French']
+
+    # Times are with tracemalloc running, which slows the import several times over
+    print(f"{'notes':>8} {'imported':>8} {'traced':>8} {'rate':>10} {'requests':>8} {'peak':>9}")
+    for result in (small, large):
+        total = sum(result['sizes'].values())
+        print(f"{total:>8} {result['read']:>8} {result['seconds']:>7.2f}s "
+              f"{result['read'] / result['seconds'] / 1000:>7.0f}k/s {result['requests']:>8} "
+              f"{result['peak'] / 2 ** 20:>7.1f}MiB")
+    growth = (large['peak'] - small['peak']) / (large['read'] - small['read'])
+
+    try:
+        # Selections are plain text in any case: "French12", "SPANISH7", "spanish3,"
+        known = all(f"Spanish{i}" in lexicon and f"FRENCH{i}" in lexicon and f"spanish{i}," in lexicon
+                    for i in range(0, sizes['French'], 97))
+        unknown = sum(front('Default', i) in lexicon or f"missing{i}" in lexicon for i in range(10_000))
+
+        # Edit some notes in Anki, then import again: only those are read
+        spanish_ids = [nid for nid, note in anki_stub.notes.items() if note['deckName'] == 'Spanish']
+        for i, note_id in enumerate(spanish_ids[:args.edited]):
+            anki_stub.edit_note(note_id, f"edited{i}")
+        served = anki_stub.notes_served
+        read_again = lexicon.import_decks(large['anki'], ['Spanish', 'French'])
+        incremental = anki_stub.notes_served - served
+        edited_known = all(f"edited{i}" in lexicon for i in range(args.edited))
+        print(f"\nincremental: {read_again} notes read ({incremental} served) after {args.edited} edits")
+
+        words = len(lexicon)
+        reloaded = Lexicon(lexicon.path)
+        persisted = len(reloaded) == words and 'edited0' in reloaded and front('French', 4) in reloaded
+        reloaded.forget(['French'])
+        forgotten = front('French', 4) not in reloaded and front('Spanish', 4) in reloaded \
+            and list(reloaded.decks) == ['Spanish'] and len(reloaded) == words - sizes['French']
+    finally:
+        anki_stub.stop()
+    loop.stop()
+    print(f"lexicon: {words} words, {lexicon.path.stat().st_size / 2 ** 20:.1f} MiB on disk, "
+          f"{growth:.0f} bytes of peak memory per extra note\n")
+
+    checks = [
+        ('complete', large['read'] == imported and large['served'] == imported and words >= imported,
+         f"{large['read']} notes of the two decks read, none of the {sizes['Default']} others"),
+        ('requests', large['requests'] <= imported // 1000 + 4,
+         f"{large['requests']} notesInfo requests for {imported} notes"),
+        ('progress', monotonic(large['calls'], sizes),
+         f"{len(large['calls'])} progress callbacks, monotonic up to each deck's size"),
+        ('memory', growth < 200,
+         f"peak grew {growth:.0f} bytes per note from {small['read']} to {large['read']} notes"),
+        ('lookup', known and unknown == 0,
+         f"fronts with HTML, sound tags and entities matched as plain words; "
+         f"{unknown} of 20000 unknown words matched"),
+        ('incremental', read_again == args.edited and incremental == args.edited and edited_known,
+         f"re-import read {incremental} notes for {args.edited} edits"),
+        ('reload', persisted, f"{len(reloaded) + sizes['French']} words reloaded from disk"),
+        ('forget', forgotten, "dropping a deck forgot its words and kept the others"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
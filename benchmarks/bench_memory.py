@@ -0,0 +1,130 @@
+"""Resident memory of the capture pipeline: idle, and after many captures.
+
+Builds a CapturePipeline the way the tray process does, against local
+dictionary and AnkiConnect stubs, and runs 1,000 captures of distinct words
+through it. The stubs run in a child process, so everything measured here
+belongs to the pipeline: tracemalloc's total at startup and every 100
+captures, with the process RSS alongside where /proc is available.
+
+The definition cache is given a small capacity so it fills early in the run;
+after that every cache is at its bound, and the pipeline's allocations must
+stay flat. Checks that the second half of the run grew them by less than
+`--flat-kib` (and RSS by under 1 MiB), and that the total stays inside the
+`--budget-mib` budget.
+
+Usage: python benchmarks/bench_memory.py [--captures 1000] [--cache-capacity 200]
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from platforms.fake import FakePlatform
+from ratelimit import RequestBudget
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+def serve_stubs(conn):
+    """Child process: run the stubs, send their URLs, serve until told to stop."""
+    with StubAnki() as anki, StubDictionary() as dictionary:
+        conn.send((anki.url, dictionary.entries_url))
+        conn.recv()
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--captures', type=int, default=1000)
+    parser.add_argument('--cache-capacity', type=int, default=200)
+    parser.add_argument('--flat-kib', type=int, default=16)
+    parser.add_argument('--budget-mib', type=float, default=4.0)
+    args = parser.parse_args()
+
+    words = [f"word{i:05d}" for i in range(args.captures)]
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    settings = SettingsManager(data_dir / 'settings.json')
+    settings.set('default_deck', 'Default')
+    fake = FakePlatform(selections=words)
+
+    conn, child_conn = multiprocessing.Pipe()
+    stubs = multiprocessing.Process(target=serve_stubs, args=(child_conn,), daemon=True)
+    stubs.start()
+    anki_url, dictionary_url = conn.recv()
+
+    tracemalloc.start()
+    baseline = traced_bytes()
+    pipeline = CapturePipeline(
+        settings, fake.clipboard, data_dir=data_dir,
+        anki_url=anki_url, dictionary_url=dictionary_url,
+        budget=RequestBudget(rate=10_000, burst=10_000),
+    )
+    pipeline.dictionary.cache.capacity = args.cache_capacity
+    pipeline.ping_anki()  # starts the network loop, as the app's monitor does
+    samples = [(0, traced_bytes() - baseline, rss_bytes())]
+
+    added = 0
+    start = time.perf_counter()
+    for i in range(1, args.captures + 1):
+        added += bool(pipeline.process_capture())
+        if i % 100 == 0 or i == args.captures:
+            samples.append((i, traced_bytes() - baseline, rss_bytes()))
+    elapsed = time.perf_counter() - start
+    cached = len(pipeline.dictionary.cache)
+    pipeline.shutdown()
+    tracemalloc.stop()
+    conn.send('stop')
+    stubs.join(5)
+
+    print(f"{args.captures} captures in {elapsed:.1f}s, {added} added, "
+          f"definition cache {cached}/{args.cache_capacity}\n")
+    print(f"{'captures':>8} {'pipeline':>10} {'rss':>10}")
+    for i, traced, rss in samples:
+        print(f"{i:>8} {traced / 1024:>8.0f}KiB {rss / 2 ** 20 if rss else float('nan'):>8.1f}MiB")
+    print()
+
+    idle = samples[0][1]
+    _, halfway, halfway_rss = min(samples, key=lambda sample: abs(sample[0] - args.captures // 2))
+    _, final, final_rss = samples[-1]
+    rss_growth = final_rss - halfway_rss if final_rss and halfway_rss else 0
+    peak = max(traced for _, traced, _ in samples)
+    checks = [
+        ('added', added == args.captures, f"{added} of {args.captures} captures added a card"),
+        ('bounded', cached == args.cache_capacity, f"definition cache held at {cached} entries"),
+        ('flat', final - halfway < args.flat_kib * 1024,
+         f"second half of the run grew allocations by {(final - halfway) / 1024:.1f} KiB "
+         f"(limit {args.flat_kib} KiB)"),
+        ('rss', rss_growth < 2 ** 20, f"second half of the run grew RSS by {rss_growth / 1024:.0f} KiB"),
+        ('budget', peak < args.budget_mib * 2 ** 20,
+         f"idle {idle / 1024:.0f} KiB, peak {peak / 2 ** 20:.2f} MiB (budget {args.budget_mib} MiB)"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<10} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
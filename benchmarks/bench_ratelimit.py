@@ -0,0 +1,211 @@
+"""Exercise the dictionary request budget against a throttling stub server.
+
+Scenarios:
+  single-flight  N threads look up one word at once -> exactly one HTTP call
+  throttle       a burst of distinct words against a server that allows
+                 10 req/s, with and without the client budget
+  retry-after    after a 429 no request reaches the server until Retry-After
+  priority       interactive lookup latency while background work floods the budget
+  coalescing     a capture of a word a background refresh is waiting to fetch
+                 doesn't wait behind that refresh
+  queueing       background waiters behind a waiting capture sleep until it is
+                 served instead of polling the budget
+
+Usage: python benchmarks/bench_ratelimit.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dictionary import DictionaryClient, DictionaryUnavailable, EntryCache
+from ratelimit import BACKGROUND, INTERACTIVE, RequestBudget
+from stubs import StubDictionary
+
+
+def client(stub, budget):
+    return DictionaryClient(base_url=stub.entries_url, cache=EntryCache(), budget=budget)
+
+
+def check(label, ok, detail):
+    print(f"[{'ok' if ok else 'FAIL'}] {label:<14} {detail}")
+    return ok
+
+
+def single_flight(threads=50):
+    with StubDictionary(latency=0.1) as stub:
+        c = client(stub, RequestBudget(rate=100, burst=100))
+        barrier = threading.Barrier(threads)
+
+        def lookup():
+            barrier.wait()
+            return c.lookup('serendipity')
+
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(lambda _: lookup(), range(threads)))
+        calls = stub.requests['entries']
+        return check('single-flight', calls == 1 and all(results),
+                     f"{threads} concurrent lookups -> {calls} HTTP call(s)")
+
+
+def burst(words, server_rate, budget):
+    with StubDictionary(rate_limit=server_rate) as stub:
+        c = client(stub, budget)
+        failed = 0
+        start = time.perf_counter()
+
+        def lookup(word):
+            try:
+                return c.lookup(word)
+            except DictionaryUnavailable:
+                return None
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lookup, words))
+        failed = results.count(None)
+        return stub.requests['throttled'], failed, time.perf_counter() - start
+
+
+def throttle(server_rate=10, count=20):
+    words = [f"burst{i}" for i in range(count)]
+    naive_429, naive_failed, _ = burst(words, server_rate, RequestBudget(rate=1000, burst=1000))
+    limited_429, limited_failed, elapsed = burst(
+        words, server_rate, RequestBudget(rate=server_rate * 0.9, burst=1))
+    print(f"     no budget:   {naive_429} x 429, {naive_failed}/{count} lookups failed")
+    return check('throttle', limited_429 == 0 and limited_failed == 0,
+                 f"with budget: {limited_429} x 429, {limited_failed}/{count} failed, {elapsed:.1f}s")
+
+
+def retry_after(seconds=1):
+    with StubDictionary(rate_limit=2, retry_after=seconds) as stub:
+        c = client(stub, RequestBudget(rate=100, burst=100))
+
+        def lookup(word):
+            try:
+                return c.lookup(word)
+            except DictionaryUnavailable:
+                return None
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lookup, [f"retry{i}" for i in range(12)]))
+        # Requests already in flight when the first 429 arrives can't be recalled
+        first_429 = next(t for t, key in stub.events if key == 'throttled') + 0.05
+        during = [t for t, key in stub.events
+                  if key == 'entries' and first_429 < t < first_429 + seconds * 0.9]
+        return check('retry-after', not during,
+                     f"{stub.requests['throttled']} x 429, {len(during)} request(s) inside the "
+                     f"{seconds}s Retry-After window, {results.count(None)}/12 lookups failed")
+
+
+def priority():
+    with StubDictionary(latency=0.02) as stub:
+        c = client(stub, RequestBudget(rate=10, burst=5, reserve=2))
+        stop = threading.Event()
+
+        def background():
+            i = 0
+            while not stop.is_set():
+                try:
+                    c.refresh(f"bg{threading.get_ident()}-{i}", priority=BACKGROUND)
+                except DictionaryUnavailable:
+                    pass
+                i += 1
+
+        workers = [threading.Thread(target=background, daemon=True) for _ in range(4)]
+        for w in workers:
+            w.start()
+        time.sleep(1.0)  # let background drain the bucket
+        latencies = []
+        for i in range(5):
+            start = time.perf_counter()
+            c.lookup(f"fg{i}", priority=INTERACTIVE)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.3)
+        stop.set()
+        worst = max(latencies)
+        return check('priority', worst < 0.25,
+                     f"interactive latency under background load: worst {worst * 1000:.0f} ms")
+
+
+def coalescing():
+    with StubDictionary(latency=0.02) as stub:
+        # Two tokens: enough for a capture, not for background work (which leaves the reserve)
+        budget = RequestBudget(rate=0.1, burst=3, reserve=2)
+        budget.acquire()
+        c = client(stub, budget)
+
+        def refresh():
+            try:
+                c.refresh('serendipity', priority=BACKGROUND)
+            except DictionaryUnavailable:
+                pass
+        threading.Thread(target=refresh, daemon=True).start()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        try:
+            entry = c.lookup('serendipity', priority=INTERACTIVE)
+        except DictionaryUnavailable:
+            entry = None
+        elapsed = time.perf_counter() - start
+        return check('coalescing', entry is not None and elapsed < 1.0,
+                     f"capture answered in {elapsed * 1000:.0f} ms while a background refresh of the "
+                     f"same word waits ~10s for the budget")
+
+
+def queueing(waiters=4, captures=20, rate=20):
+    budget = RequestBudget(rate=rate, burst=1, reserve=0)
+    budget.throttle(0)  # empty bucket: a token every 1/rate seconds
+    checks = [0]
+    original = budget._take
+
+    def counted_take(priority, needed):
+        checks[0] += priority == BACKGROUND
+        return original(priority, needed)
+    budget._take = counted_take
+
+    async def capture_burst():
+        done = asyncio.Event()
+
+        async def busy():
+            # Blocking work on the loop (parsing a response, say) delays the captures' wakeups
+            while not done.is_set():
+                time.sleep(0.02)
+                await asyncio.sleep(0.005)
+        hog = asyncio.ensure_future(busy())
+        for _ in range(captures):
+            await budget.acquire_async(INTERACTIVE)
+        done.set()
+        await hog
+
+    # Captures waiting on the event loop are ahead of background threads the whole time
+    loop = threading.Thread(target=asyncio.run, args=(capture_burst(),))
+    loop.start()
+    time.sleep(0.01)
+    background = [threading.Thread(target=budget.acquire, args=(BACKGROUND, captures / rate + 1))
+                  for _ in range(waiters)]
+    start = time.perf_counter()
+    for t in background:
+        t.start()
+    loop.join()
+    elapsed = time.perf_counter() - start
+    for t in background:
+        t.join()
+    # A background waiter looks again when a capture leaves the queue, not in between
+    limit = waiters * (captures + 5)
+    return check('queueing', checks[0] <= limit,
+                 f"{checks[0]} checks by {waiters} background waiters behind {captures} captures "
+                 f"queued for {elapsed:.1f}s (at most {limit})")
+
+
+def main():
+    results = [single_flight(), throttle(), retry_after(), priority(), coalescing(), queueing()]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Incremental review sync: cost per sync against collection size and changed cards.
+
+Seeds a stub AnkiConnect with lexi-snap notes (plus untagged ones that must
+be ignored), runs a first full sync, then studies a few cards - reviews,
+lapses, cards falling due - and syncs again. The same changes are then
+made in a collection four times the size. Checks that the first sync pulled
+every tagged card, that an incremental sync pulled exactly the changed
+cards with the same number of requests at both sizes, that a sync with
+nothing changed sends no card records, that the summary matches the stub's
+cards, that a full pass drops deleted notes, and that the stats survive a
+restart.
+
+Usage: python benchmarks/bench_reviews.py [--cards 20000] [--changed 60] [--latency SECONDS]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aio import EventLoopThread
+from anki import AnkiConnect
+from reviews import STATES, ReviewStats, card_state
+from stubs import StubAnki
+
+
+def timed_pull(reviews, anki_stub, full=False):
+    """(changed, seconds, requests, card records sent) for one sync."""
+    requests, served = reviews.requests, anki_stub.cards_served
+    start = time.perf_counter()
+    changed = reviews.pull(full)
+    return (changed, time.perf_counter() - start, reviews.requests - requests,
+            anki_stub.cards_served - served)
+
+
+def study(anki_stub, card_ids, changed):
+    """Review `changed` cards (every fifth one lapses) and make as many others due."""
+    for i, card_id in enumerate(card_ids[:changed]):
+        anki_stub.review(card_id, lapse=i % 5 == 0, interval=None if i % 5 else 1)
+    anki_stub.set_due(card_ids[changed:2 * changed])
+
+
+def expected_summary(anki_stub):
+    counts = dict.fromkeys(STATES, 0)
+    for card in anki_stub.cards.values():
+        if 'lexi-snap' in anki_stub.notes[card['note']]['tags']:
+            counts[card_state(card['type'], card['queue'], card['interval'])] += 1
+    return counts
+
+
+def run(size, args, loop, data_dir):
+    with StubAnki(latency=args.latency, seed=1) as anki_stub:
+        card_ids = anki_stub.seed_notes(f"word{i}" for i in range(size))
+        anki_stub.seed_notes((f"other{i}" for i in range(size // 4)), tags=('unrelated',))
+        reviews = ReviewStats(AnkiConnect(anki_stub.url, timeout=30, loop=loop),
+                              data_dir / f'reviews-{size}.jsonl')
+        first = timed_pull(reviews, anki_stub)
+        idle = timed_pull(reviews, anki_stub)
+        study(anki_stub, card_ids, args.changed)
+        incremental = timed_pull(reviews, anki_stub)
+        matches = reviews.summary()['states'] == expected_summary(anki_stub)
+        due = reviews.summary()['due'] == args.changed
+        statuses = reviews.note_statuses()
+
+        deleted = [card_id // 10 for card_id in card_ids[-10:]]
+        for note_id in deleted:
+            anki_stub.delete_note(note_id)
+        full = timed_pull(reviews, anki_stub, full=True)
+        removed = reviews.summary()['cards'] == size - len(deleted)
+
+        restarted = ReviewStats(AnkiConnect(anki_stub.url, timeout=30, loop=loop),
+                                data_dir / f'reviews-{size}.jsonl')
+        persisted = restarted.summary() == reviews.summary()
+        anki_stub.review(card_ids[0])
+        after_restart = timed_pull(restarted, anki_stub)
+    return {
+        'first': first, 'idle': idle, 'incremental': incremental, 'full': full,
+        'after_restart': after_restart, 'matches': matches and due, 'removed': removed,
+        'persisted': persisted, 'lapsed': statuses.get(card_ids[0] // 10) == ('relearning', False),
+        'summary': reviews.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=20_000)
+    parser.add_argument('--changed', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.002)
+    args = parser.parse_args()
+
+    loop = EventLoopThread(name='network')
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    sizes = (args.cards, args.cards * 4)
+    results = {size: run(size, args, loop, data_dir) for size in sizes}
+    loop.stop()
+
+    print(f"{'cards':>8} {'sync':<13} {'changed':>7} {'time':>9} {'requests':>8} {'records':>8}")
+    for size, result in results.items():
+        for label in ('first', 'idle', 'incremental', 'full', 'after_restart'):
+            changed, seconds, requests, served = result[label]
+            print(f"{size:>8} {label:<13} {changed:>7} {seconds * 1000:>7.0f}ms {requests:>8} {served:>8}")
+    print(f"\nsummary ({args.cards} cards): {results[args.cards]['summary']}\n")
+
+    small, large = (results[size] for size in sizes)
+    checks = [
+        ('first', small['first'][3] == args.cards and large['first'][3] == args.cards * 4,
+         f"first sync pulled {small['first'][3]} and {large['first'][3]} card records"),
+        ('idle', small['idle'][3] == 0 and large['idle'][3] == 0 and small['idle'][2] == 1,
+         f"a sync with nothing changed made {small['idle'][2]} request and sent no card records"),
+        ('incremental', small['incremental'][3] == args.changed and large['incremental'][3] == args.changed,
+         f"{args.changed} studied cards -> {small['incremental'][3]} and {large['incremental'][3]} "
+         f"records at {sizes[0]} and {sizes[1]} cards"),
+        ('scaling', small['incremental'][2] == large['incremental'][2],
+         f"{small['incremental'][2]} requests per incremental sync at both sizes"),
+        ('summary', small['matches'] and large['matches'] and small['lapsed'],
+         "states, due count and per-note status match the stub's cards"),
+        ('full pass', small['removed'] and large['removed'] and small['full'][3] == 0,
+         "full pass dropped deleted notes without re-sending unchanged cards"),
+        ('restart', small['persisted'] and small['after_restart'][3] == 1,
+         "stats reloaded from disk; the next sync pulled only the one new review"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Watched settings: cost of a poll, edit pickup, three-way merges and reconfiguration.
+
+Times an unchanged poll (one stat of the file) and counts how many polls an
+idle watcher makes over `--idle` seconds, against polling at the minimum
+interval throughout. Then edits the file under a watching SettingsManager:
+the edit has to arrive as typed SettingChange events within the backoff
+limit; a save from the app right after an unseen edit has to keep both;
+a key changed on both sides keeps the app's value; a half-written file and
+a wrongly typed value change nothing. Finally the same edits reach a
+running CapturePipeline, whose templates, dictionary routes and glossary
+follow without being rebuilt.
+
+Usage: python benchmarks/bench_settings.py [--idle 6]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from platforms.fake import FakePlatform
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+def edit(path, **changes):
+    """Change keys in the file the way an editor or a sync tool would, bumping the mtime."""
+    data = json.loads(path.read_text())
+    data.update(changes)
+    path.write_text(json.dumps(data, indent=2))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def wait_for(condition, timeout=3.0):
+    """Seconds until condition() holds, or None."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if condition():
+            return time.perf_counter() - start
+        time.sleep(0.005)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--idle', type=float, default=6.0, help="seconds to watch an unchanged file")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+    path = data_dir / 'settings.json'
+    settings = SettingsManager(path)
+    settings.set('default_deck', 'Default')
+
+    # Poll cost, and how often an idle watcher looks at all
+    rounds = 20_000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        settings.check()
+    poll_us = (time.perf_counter() - start) / rounds * 1e6
+    stats = [0]
+    original_stat = settings._stat
+
+    def counted_stat():
+        stats[0] += 1
+        return original_stat()
+    settings._stat = counted_stat
+    settings.watch(interval=0.05, max_interval=0.8)
+    time.sleep(args.idle)
+    idle_polls = stats[0]
+    settings._stat = original_stat
+    fixed_polls = int(args.idle / 0.05)
+    print(f"poll: {poll_us:.1f} us unchanged; {idle_polls} polls in {args.idle:g}s idle "
+          f"(a fixed 50 ms poll: {fixed_polls})")
+
+    # An external edit arrives as events; the watcher is at its slowest by now
+    events = []
+    settings.subscribe(events.append)
+    edit(path, hotkey='ctrl+shift+l', notification_toast_enabled=True)
+    picked_up = wait_for(lambda: len(events) >= 2)
+    typed = sorted((e.key, e.old, e.new, e.origin) for e in events) == [
+        ('hotkey', 'ctrl+alt+d', 'ctrl+shift+l', 'file'),
+        ('notification_toast_enabled', False, True, 'file')]
+    print(f"edit: picked up after {picked_up * 1000:.0f} ms: {events}" if picked_up is not None
+          else "edit: never picked up")
+    settings.stop_watching()
+
+    # Unseen edit, then a save from the app: both survive
+    edit(path, study_languages=['fr'])
+    settings.set('pronunciation_audio', True)
+    on_disk = json.loads(path.read_text())
+    merged = on_disk['study_languages'] == ['fr'] and on_disk['pronunciation_audio'] is True \
+        and settings.get('study_languages') == ['fr']
+
+    # Both sides change one key: the app's value stays, and is what gets saved
+    settings.settings['default_deck'] = 'Local'
+    edit(path, default_deck='Remote', capture_context=True)
+    settings.save_settings()
+    on_disk = json.loads(path.read_text())
+    conflict = settings.get('default_deck') == 'Local' == on_disk['default_deck'] \
+        and settings.get('capture_context') is True
+
+    # A half-written file or a value of the wrong type changes nothing
+    before = dict(settings.settings)
+    text = path.read_text()
+    path.write_text(text[:len(text) // 2])
+    broken = settings.check() == [] and settings.settings == before
+    path.write_text(text)
+    settings.check()
+    edit(path, notification_badge_enabled='yes please')
+    wrong_type = settings.check() == [] and settings.get('notification_badge_enabled') is True
+
+    # A running pipeline follows the edits in place
+    (data_dir / 'team.csv').write_text("word,definition\nsprint,Two weeks of work.\n", encoding='utf-8')
+    with StubAnki() as anki, StubDictionary() as dictionary:
+        pipeline = CapturePipeline(settings, FakePlatform().clipboard, data_dir=data_dir,
+                                   anki_url=anki.url, dictionary_url=dictionary.entries_url)
+        objects = (pipeline.dictionary, pipeline.templates, pipeline.refresher)
+        edit(path, note_templates=[{'name': 'Vocab', 'model': 'Basic',
+                                    'fields': {'Front': '{word}', 'Back': '{definition}'}}],
+             dictionary_providers={'es': 'dictionaryapi'}, glossary_files=[str(data_dir / 'team.csv')])
+        applied = len(settings.check())
+        _, sprint = pipeline.add_word('sprint', 'Default')
+        reconfigured = ('Vocab' in pipeline.templates and 'Vocab' in pipeline.refresher.templates
+                        and pipeline.dictionary.provider_for('es').name == 'dictionaryapi'
+                        and sprint == "Two weeks of work." and dictionary.requests['entries'] == 0
+                        and objects == (pipeline.dictionary, pipeline.templates, pipeline.refresher))
+        pipeline.shutdown()
+    print(f"pipeline: {applied} changes applied; 'sprint' -> {sprint!r}\n")
+
+    checks = [
+        ('poll', poll_us < 50, f"{poll_us:.1f} us per unchanged check"),
+        ('backoff', idle_polls < fixed_polls / 4,
+         f"{idle_polls} polls in {args.idle:g}s idle vs {fixed_polls} at a fixed interval"),
+        ('pickup', picked_up is not None and picked_up < 1.0 and typed,
+         "an edit arrived as typed SettingChange events within the backoff limit"),
+        ('merge', merged, "a save right after an unseen edit kept both changes"),
+        ('conflict', conflict, "a key changed on both sides kept the app's value"),
+        ('broken', broken, "a half-written file changed nothing"),
+        ('types', wrong_type, "a value of the wrong type was ignored"),
+        ('pipeline', reconfigured, "templates, routes and glossary followed without rebuilding"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<11} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Startup to first card: cold start vs warm start from the Anki metadata snapshot.
+
+Starts a CapturePipeline the way the app does (metadata revalidation kicked
+off in the background) and presses the hotkey straight away, against a
+local AnkiConnect stub with many decks and note models:
+
+  cold   no snapshot on disk (first run, or pre-snapshot versions)
+  warm   a second start in the same data directory
+
+For each it reports the decks known at startup, the AnkiConnect calls made
+on the add path before the note was added, the time from startup to the
+first added card, and how many requests the background revalidation took.
+
+Usage: python benchmarks/bench_warmstart.py [--anki-latency SECONDS] [--models N] [--decks N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import CapturePipeline
+from platforms.fake import FakePlatform
+from ratelimit import RequestBudget
+from settings import SettingsManager
+from stubs import StubAnki, StubDictionary
+
+
+def start_and_add(data_dir, anki, dictionary, word):
+    settings = SettingsManager(data_dir / 'settings.json')
+    settings.set('default_deck', 'Default')
+    fake = FakePlatform(selections=[word])
+    anki.requests.clear()
+    anki.events.clear()
+
+    start = time.perf_counter()
+    pipeline = CapturePipeline(
+        settings, fake.clipboard, data_dir=data_dir,
+        anki_url=anki.url, dictionary_url=dictionary.entries_url,
+        budget=RequestBudget(rate=1000, burst=1000),
+    )
+    decks_at_startup = len(pipeline.metadata.decks)
+    refresh = pipeline.refresh_metadata_async()
+    note_id = pipeline.process_capture()
+    first_add = time.perf_counter() - start
+    refresh.result(10)
+    pipeline.shutdown()
+
+    before_add = []
+    for _, key in anki.events:
+        if key == 'addNote':
+            break
+        before_add.append(key)
+    return {
+        'added': bool(note_id),
+        'decks_at_startup': decks_at_startup,
+        # Calls the add path itself made (the revalidation's own go through 'multi')
+        'add_path_calls': sum(1 for key in before_add if key not in ('multi', 'version')),
+        'first_add_ms': first_add * 1000,
+        'revalidation_requests': anki.requests['multi'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--anki-latency', type=float, default=0.05)
+    parser.add_argument('--models', type=int, default=20)
+    parser.add_argument('--decks', type=int, default=50)
+    args = parser.parse_args()
+
+    models = {'Basic': ['Front', 'Back']}
+    models.update({f"Model {i}": ['Front', 'Back', 'Extra'] for i in range(args.models - 1)})
+    decks = ['Default'] + [f"Deck::{i}" for i in range(args.decks - 1)]
+    data_dir = Path(tempfile.mkdtemp(prefix='lexi-snap-bench-'))
+
+    with StubAnki(latency=args.anki_latency, decks=decks, models=models, tags=['lexi-snap']) as anki, \
+            StubDictionary() as dictionary:
+        cold = start_and_add(data_dir, anki, dictionary, 'first')
+        warm = start_and_add(data_dir, anki, dictionary, 'second')
+
+    print(f"{len(decks)} decks, {len(models)} models, AnkiConnect latency {args.anki_latency * 1000:.0f} ms\n")
+    print(f"{'':<6} {'decks at start':>14} {'add-path calls':>14} {'first add':>10} {'revalidation':>13}")
+    for name, r in (('cold', cold), ('warm', warm)):
+        print(f"{name:<6} {r['decks_at_startup']:>14} {r['add_path_calls']:>14} "
+              f"{r['first_add_ms']:>8.0f}ms {r['revalidation_requests']:>9} req")
+    print()
+
+    checks = [
+        ('added', cold['added'] and warm['added'], "both starts added their card"),
+        ('snapshot', warm['decks_at_startup'] == len(decks),
+         f"warm start knows all {len(decks)} decks before Anki answers"),
+        ('add path', warm['add_path_calls'] == 0,
+         f"warm add made {warm['add_path_calls']} metadata call(s) before addNote"),
+        ('revalidate', warm['revalidation_requests'] == 1,
+         f"warm revalidation took {warm['revalidation_requests']} request(s)"),
+    ]
+    ok = True
+    for label, passed, detail in checks:
+        print(f"[{'ok' if passed else 'FAIL'}] {label:<10} {detail}")
+        ok &= bool(passed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
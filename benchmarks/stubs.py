@@ -0,0 +1,459 @@
+"""Local HTTP stand-ins for dictionaryapi.dev, Wiktionary and AnkiConnect.
+
+Both servers run on 127.0.0.1 with an OS-assigned port in a daemon thread
+and count the requests they serve, so benchmarks can check call counts as
+well as timings. Each can add random latency jitter, make a fraction of
+requests slow (`slow_rate` of them take `slow_latency` - a bimodal server),
+and fail a fraction of requests with HTTP 500 (counted as 'errors'); pass
+`seed` for repeatable runs.
+"""
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def dictionary_payload(word):
+    """A response shaped like dictionaryapi.dev's for a made-up word."""
+    return [{
+        'word': word,
+        'phonetic': f"/{word}/",
+        'phonetics': [{'text': f"/{word}/", 'audio': ''}],
+        'meanings': [
+            {
+                'partOfSpeech': 'noun',
+                'definitions': [
+                    {'definition': f"The first sense of {word}.", 'synonyms': [], 'antonyms': [],
+                     'example': f"A sentence with {word} in it."},
+                    {'definition': f"Another sense of {word}.", 'synonyms': [], 'antonyms': []},
+                ],
+                'synonyms': [],
+                'antonyms': [],
+            },
+        ],
+    }]
+
+
+def wiktionary_payload(word, languages):
+    """A response shaped like Wiktionary's page/definition API, with a section per language."""
+    return {
+        language: [{
+            'partOfSpeech': 'Noun',
+            'language': language,
+            'definitions': [
+                {'definition': f"<a href=\"/wiki/{word}\">{word}</a> &amp; its first sense ({language})",
+                 'examples': [f"<i>{word}</i> in a sentence."]},
+                {'definition': f"Another sense of {word}."},
+            ],
+        }]
+        for language in languages
+    }
+
+
+class StubServer:
+    """Base class: an HTTP server on a background thread with request counting."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, slow_rate=0.0, slow_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.events = []  # (monotonic time, key) per counted request
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one write; avoids Nagle/delayed-ACK stalls on keep-alive
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._dispatch(self, 'GET')
+
+            def do_POST(self):
+                stub._dispatch(self, 'POST')
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, key):
+        with self.lock:
+            self.requests[key] += 1
+            self.events.append((time.monotonic(), key))
+
+    def delay(self, latency=None):
+        """Sleep for the configured latency (or the slow one) plus up to `jitter` seconds."""
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0.0
+            slow = latency is None and self.slow_rate and self.random.random() < self.slow_rate
+        if slow:
+            self.count('slow')
+            latency = self.slow_latency
+        time.sleep((self.latency if latency is None else latency) + extra)
+
+    def _fail(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            self.count('errors')
+        return failed
+
+    def _dispatch(self, handler, method):
+        body = b''
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length:
+            body = handler.rfile.read(length)
+        path = handler.path
+        if path.startswith('http://'):
+            # Absolute-form request target: the client took this server for its proxy
+            self.count('proxied')
+            path = '/' + path[len('http://'):].partition('/')[2]
+        if self._fail():
+            status, headers, payload = 500, {}, b'Internal Server Error'
+        else:
+            status, headers, payload = self.handle(method, path, body)
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def handle(self, method, path, body):
+        raise NotImplementedError
+
+
+class StubDictionary(StubServer):
+    """Serves /api/v2/entries/en/<word>, /media/pronunciations/en/<word>-us.mp3 and
+    Wiktionary's /api/rest_v1/page/definition/<word> (counted as 'wiktionary').
+
+    Words listed in `audio_words` get an audio URL in their entry; every audio
+    file for words in `shared_audio` has identical bytes. With `rate_limit`
+    set, entry requests beyond that many per second get a 429 with a
+    `Retry-After` of `retry_after` seconds, like the real API under load.
+    Wiktionary pages have a section for each of `wiktionary_languages`; a
+    title with spaces is redirected to its underscored form, as Wiktionary does.
+    /redirect?to=<url> redirects anywhere.
+    """
+
+    ENTRY_PREFIX = '/api/v2/entries/en/'
+    MEDIA_PREFIX = '/media/pronunciations/en/'
+    WIKTIONARY_PREFIX = '/api/rest_v1/page/definition/'
+
+    def __init__(self, latency=0.0, audio_latency=0.0, audio_words=(), shared_audio=(),
+                 unknown_words=(), rate_limit=None, retry_after=1,
+                 wiktionary_languages=('fr', 'de', 'es', 'ru', 'el', 'ja'), **options):
+        super().__init__(latency, **options)
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._window_start = 0.0
+        self._window_count = 0
+        self.audio_latency = audio_latency
+        self.audio_words = set(audio_words)
+        self.shared_audio = set(shared_audio)
+        self.unknown_words = set(unknown_words)
+        self.wiktionary_languages = tuple(wiktionary_languages)
+
+    @property
+    def entries_url(self):
+        return self.url + self.ENTRY_PREFIX
+
+    @property
+    def wiktionary_url(self):
+        return self.url + self.WIKTIONARY_PREFIX
+
+    @property
+    def audio_url_template(self):
+        return self.url + self.MEDIA_PREFIX + '{word}-us.mp3'
+
+    def _over_limit(self):
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit
+
+    def handle(self, method, path, body):
+        if path.startswith(self.ENTRY_PREFIX):
+            word = unquote(path[len(self.ENTRY_PREFIX):])
+            self.count('entries')
+            if self._over_limit():
+                self.count('throttled')
+                return 429, {'Retry-After': str(self.retry_after)}, b''
+            self.delay()
+            if word in self.unknown_words:
+                return 404, {'Content-Type': 'application/json'}, json.dumps(
+                    {'title': 'No Definitions Found'}).encode()
+            payload = dictionary_payload(word)
+            if word in self.audio_words:
+                payload[0]['phonetics'].append(
+                    {'text': f"/{word}/", 'audio': self.audio_url_template.format(word=word)})
+            return 200, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+        if path.startswith(self.MEDIA_PREFIX):
+            word = unquote(path[len(self.MEDIA_PREFIX):]).rsplit('-', 1)[0]
+            self.count('audio')
+            self.delay(self.audio_latency)
+            if word not in self.audio_words:
+                return 404, {}, b''
+            data = b'ID3 shared' if word in self.shared_audio else f"ID3 {word}".encode()
+            return 200, {'Content-Type': 'audio/mpeg'}, data * 256
+        if path.startswith(self.WIKTIONARY_PREFIX):
+            word = unquote(path[len(self.WIKTIONARY_PREFIX):])
+            if ' ' in word:
+                self.count('redirects')
+                return 301, {'Location': quote(word.replace(' ', '_'))}, b''
+            self.count('wiktionary')
+            self.delay()
+            if word in self.unknown_words:
+                return 404, {}, b''
+            return 200, {'Content-Type': 'application/json'}, json.dumps(
+                wiktionary_payload(word, self.wiktionary_languages)).encode()
+        if path.startswith('/redirect?to='):
+            self.count('redirects')
+            return 302, {'Location': unquote(path[len('/redirect?to='):])}, b''
+        return 404, {}, b''
+
+
+class StubAnki(StubServer):
+    """Minimal AnkiConnect: enough actions for adding notes and media, and reading card reviews.
+
+    Every note gets one card (id = note id * 10). `seed_notes()` fills the
+    collection without HTTP, and `review()` / `set_due()` / `edit_note()` /
+    `delete_note()` change it the way studying in Anki would; `cards_served`
+    and `notes_served` count the records sent by cardsInfo and notesInfo.
+    """
+
+    def __init__(self, latency=0.0, decks=('Default',), models=None, tags=(), **options):
+        super().__init__(latency, **options)
+        self.decks = list(decks)
+        self.models = models or {'Basic': ['Front', 'Back']}
+        self.tags = list(tags)
+        self.notes = {}
+        self.cards = {}
+        self.cards_served = 0
+        self.notes_served = 0
+        self.media = {}
+        self._edited = {}
+        self._first_fields = set()
+        self._next_id = 1_700_000_000_000
+
+    def _add_note(self, note):
+        key = (note['modelName'], next(iter(note['fields'].values())))
+        with self.lock:
+            if key in self._first_fields:
+                raise ValueError('cannot create note because it is a duplicate')
+            self._first_fields.add(key)
+            self._next_id += 1
+            self.notes[self._next_id] = note
+            self._new_card(self._next_id, note, time.time())
+            self._edited[self._next_id] = time.time()
+            return self._next_id
+
+    def _new_card(self, note_id, note, added):
+        self.cards[note_id * 10] = {
+            'note': note_id, 'deckName': note.get('deckName', 'Default'), 'type': 0, 'queue': 0,
+            'interval': 0, 'reps': 0, 'lapses': 0, 'mod': int(added), 'added': added,
+            'rated': None, 'due': False,
+        }
+
+    def seed_notes(self, words, tags=('lexi-snap',), deck='Default', age_days=(30, 400)):
+        """Add notes directly (no HTTP), added `age_days` ago; returns their card ids."""
+        now = time.time()
+        card_ids = []
+        with self.lock:
+            for word in words:
+                self._next_id += 1
+                note = {'deckName': deck, 'modelName': 'Basic', 'tags': list(tags),
+                        'fields': {'Front': word, 'Back': ''}}
+                self.notes[self._next_id] = note
+                added = now - self.random.uniform(*age_days) * 86400
+                self._new_card(self._next_id, note, added)
+                self._edited[self._next_id] = added
+                card_ids.append(self._next_id * 10)
+        return card_ids
+
+    def review(self, card_id, lapse=False, interval=None):
+        """Answer a card: a lapse sends it to relearning, otherwise its interval grows."""
+        with self.lock:
+            card = self.cards[card_id]
+            card['reps'] += 1
+            if lapse:
+                card.update(type=3, queue=1, interval=1, lapses=card['lapses'] + 1)
+            else:
+                card.update(type=2, queue=2, interval=interval or max(1, card['interval'] * 2))
+            now = time.time()
+            card['rated'] = now
+            card['due'] = False
+            card['mod'] = max(int(now), card['mod'] + 1)
+
+    def set_due(self, card_ids, due=True):
+        with self.lock:
+            for card_id in card_ids:
+                self.cards[card_id]['due'] = due
+
+    def edit_note(self, note_id, front):
+        """Change a note's first field, as editing it in Anki's browser would."""
+        with self.lock:
+            fields = self.notes[note_id]['fields']
+            fields[next(iter(fields))] = front
+            self._edited[note_id] = time.time()
+
+    def delete_note(self, note_id):
+        with self.lock:
+            self.notes.pop(note_id, None)
+            self.cards.pop(note_id * 10, None)
+            self._edited.pop(note_id, None)
+
+    def _find_notes(self, query):
+        """The subset of Anki's search the app uses: deck:"...", edited:N and "quoted" substrings."""
+        decks = [d.replace('\\"', '"').replace('\\\\', '\\')
+                 for d in re.findall(r'deck:"((?:[^"\\]|\\.)*)"', query)]
+        query = re.sub(r'deck:"(?:[^"\\]|\\.)*"', '', query)
+        edited = [int(days) for days in re.findall(r'edited:(\d+)', query)]
+        terms = re.findall(r'"((?:[^"\\]|\\.)*)"', query)
+        terms = [t.replace('\\"', '"').replace('\\\\', '\\') for t in terms]
+        now = time.time()
+        with self.lock:
+            return [nid for nid, note in self.notes.items()
+                    if all(note.get('deckName', 'Default') == deck for deck in decks)
+                    and all(now - self._edited.get(nid, 0) < days * 86400 for days in edited)
+                    and all(any(t in v for v in note['fields'].values()) for t in terms)]
+
+    def _find_cards(self, query):
+        """The subset of Anki's search the app uses: tag:, is:due and (rated:N OR added:N)."""
+        tags = re.findall(r'tag:(\S+)', query)
+        recent = [(kind, int(days)) for kind, days in re.findall(r'(rated|added):(\d+)', query)]
+        due_only = 'is:due' in query
+        now = time.time()
+        with self.lock:
+            return [
+                card_id for card_id, card in self.cards.items()
+                if all(tag in self.notes[card['note']]['tags'] for tag in tags)
+                and (not due_only or card['due'])
+                and (not recent or any(card[kind] is not None and now - card[kind] < days * 86400
+                                       for kind, days in recent))
+            ]
+
+    def run_action(self, action, params, nested=False):
+        if not nested:
+            self.count(action)  # one count per request; actions inside a multi aren't counted
+        if action == 'version':
+            return 6
+        if action == 'deckNames':
+            return list(self.decks)
+        if action == 'modelNames':
+            return list(self.models)
+        if action == 'getTags':
+            return list(self.tags)
+        if action == 'modelFieldNames':
+            if params['modelName'] not in self.models:
+                raise ValueError(f"model was not found: {params['modelName']}")
+            return list(self.models[params['modelName']])
+        if action == 'addNote':
+            return self._add_note(params['note'])
+        if action == 'addNotes':
+            ids = []
+            for note in params['notes']:
+                try:
+                    ids.append(self._add_note(note))
+                except ValueError:
+                    ids.append(None)
+            return ids
+        if action == 'findNotes':
+            return self._find_notes(params['query'])
+        if action == 'findCards':
+            return self._find_cards(params['query'])
+        if action == 'cardsModTime':
+            with self.lock:
+                return [{'cardId': cid, 'mod': self.cards[cid]['mod']}
+                        for cid in params['cards'] if cid in self.cards]
+        if action == 'cardsInfo':
+            fields = ('note', 'deckName', 'type', 'queue', 'interval', 'reps', 'lapses', 'mod')
+            with self.lock:
+                infos = [dict({'cardId': cid}, **{name: self.cards[cid][name] for name in fields})
+                         if cid in self.cards else {} for cid in params['cards']]
+                self.cards_served += sum(1 for info in infos if info)
+            return infos
+        if action == 'notesInfo':
+            with self.lock:
+                self.notes_served += sum(1 for nid in params['notes'] if nid in self.notes)
+                return [
+                    {'noteId': nid, 'modelName': self.notes[nid]['modelName'],
+                     'tags': self.notes[nid]['tags'],
+                     'fields': {name: {'value': value, 'order': i}
+                                for i, (name, value) in enumerate(self.notes[nid]['fields'].items())}}
+                    if nid in self.notes else {}
+                    for nid in params['notes']
+                ]
+        if action == 'updateNoteFields':
+            note = params['note']
+            with self.lock:
+                if note['id'] not in self.notes:
+                    raise ValueError(f"note was not found: {note['id']}")
+                self.notes[note['id']]['fields'].update(note['fields'])
+                self._edited[note['id']] = time.time()
+            return None
+        if action == 'storeMediaFile':
+            with self.lock:
+                self.media[params['filename']] = params['data']
+            return params['filename']
+        if action == 'multi':
+            results = []
+            for item in params['actions']:
+                try:
+                    results.append({'result': self.run_action(item['action'], item.get('params') or {}, True),
+                                    'error': None})
+                except Exception as e:
+                    results.append({'result': None, 'error': str(e)})
+            return results
+        raise ValueError(f"unsupported action: {action}")
+
+    def handle(self, method, path, body):
+        self.delay()
+        try:
+            request = json.loads(body or b'{}')
+            result, error = self.run_action(request.get('action'), request.get('params') or {}), None
+        except Exception as e:
+            result, error = None, str(e)
+        payload = json.dumps({'result': result, 'error': error}).encode()
+        return 200, {'Content-Type': 'application/json'}, payload
@@ -22,6 +22,7 @@ def build():
         '--clean',
         '--hidden-import=pynput.keyboard._win32',
         '--hidden-import=pynput.mouse._win32',
+        '--hidden-import=platforms.windows',
     ]
 
     if icon_path:
@@ -0,0 +1,145 @@
+"""Source context of a capture: the sentence around the word and the window it came from.
+
+Everything here is pure string work on what the platform handed over in
+the capture pass (see platforms.base.Capture), so it costs no extra copy,
+sleep or system call, and can be benchmarked on its own.
+"""
+
+import re
+
+
+# Characters that end a sentence; '.' only counts when followed by a likely sentence start
+SENTENCE_END = re.compile(r'[.!?…]+["\'”’»)\]]*(?=\s|$)|[。！？]+|\n[ \t]*\n')
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'jr', 'sr', 'vs', 'etc', 'e.g', 'i.e', 'cf',
+    'fig', 'no', 'vol', 'p', 'pp', 'ch', 'approx', 'ca', 'inc', 'ltd', 'co', 'mt',
+})
+TITLE_SEPARATORS = (' - ', ' — ', ' – ', ' | ')
+SCAN_LIMIT = 2000  # characters searched on each side of the word
+
+
+def _ends_sentence(buffer, match):
+    """False for periods of abbreviations, initials and the like."""
+    mark = match.group()
+    if not mark.startswith('.') or mark.startswith('...'):
+        return True
+    following = buffer[match.end():match.end() + 3].lstrip()
+    if following and following[0].islower():
+        return False
+    start = match.start()
+    word_start = start
+    while word_start > 0 and (buffer[word_start - 1].isalpha() or buffer[word_start - 1] == '.'):
+        word_start -= 1
+    before = buffer[word_start:start].lower()
+    return len(before) > 1 and before not in ABBREVIATIONS
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def _find_word(buffer, word):
+    """Index of `word` in `buffer` as a whole word, preferring the exact spelling; -1 if absent."""
+    # The selection was usually copied out of this very text: a plain find is enough
+    at = buffer.find(word)
+    first = at
+    while at >= 0:
+        end = at + len(word)
+        if (at == 0 or not _is_word_char(buffer[at - 1])) and \
+                (end == len(buffer) or not _is_word_char(buffer[end])):
+            return at
+        at = buffer.find(word, at + 1)
+    found = re.search(r'(?<!\w)' + re.escape(word) + r'(?!\w)', buffer, re.IGNORECASE)
+    if found:
+        return found.start()
+    if first >= 0:
+        return first  # scripts without spaces between words
+    return buffer.lower().find(word.lower())
+
+
+def extract_sentence(buffer, word, max_chars=300):
+    """The sentence of `buffer` that contains `word`, whitespace-normalized.
+
+    Returns '' if the word isn't in the buffer. A sentence longer than
+    `max_chars` is cut down to a window around the word, marked with '…'.
+    """
+    if not buffer or not word:
+        return ''
+    index = _find_word(buffer, word)
+    if index < 0:
+        return ''
+    end_of_word = index + len(word)
+
+    left = max(0, index - SCAN_LIMIT)
+    start = left
+    for match in reversed(list(SENTENCE_END.finditer(buffer, left, index))):
+        if _ends_sentence(buffer, match):
+            start = match.end()
+            break
+    right = min(len(buffer), end_of_word + SCAN_LIMIT)
+    end = right
+    for match in SENTENCE_END.finditer(buffer, end_of_word, right):
+        if _ends_sentence(buffer, match):
+            end = match.end()
+            break
+
+    sentence = ' '.join(buffer[start:end].split())
+    if len(sentence) <= max_chars:
+        return sentence
+    at = _find_word(sentence, word)
+    half = max(0, (max_chars - len(word)) // 2)
+    cut_start = max(0, min(at - half, len(sentence) - max_chars))
+    cut_end = cut_start + max_chars
+    excerpt = sentence[cut_start:cut_end].strip()
+    return ('…' if cut_start > 0 else '') + excerpt + ('…' if cut_end < len(sentence) else '')
+
+
+def describe_window(title, process=None):
+    """(application, document) for a window: 'Page - Mozilla Firefox' -> ('Mozilla Firefox', 'Page').
+
+    Titles without a recognizable application suffix fall back to the
+    process name ('firefox.exe' -> 'firefox').
+    """
+    title = ' '.join((title or '').split())
+    for separator in TITLE_SEPARATORS:
+        document, found, application = title.rpartition(separator)
+        if found and application and document:
+            return application, document
+    if process:
+        name = process.replace('\\', '/').rsplit('/', 1)[-1]
+        if name.lower().endswith('.exe'):
+            name = name[:-4]
+        return name, title
+    return '', title
+
+
+class SourceContext:
+    """Where a capture came from: its sentence, application and window title."""
+
+    __slots__ = ('sentence', 'source_app', 'window_title')
+
+    def __init__(self, sentence='', source_app='', window_title=''):
+        self.sentence = sentence
+        self.source_app = source_app
+        self.window_title = window_title
+
+    def __bool__(self):
+        return bool(self.sentence or self.source_app or self.window_title)
+
+    @classmethod
+    def from_capture(cls, capture, max_chars=300):
+        application, _ = describe_window(capture.window_title, capture.process)
+        return cls(extract_sentence(capture.buffer, capture.text, max_chars), application,
+                   ' '.join((capture.window_title or '').split()))
+
+    def to_history(self):
+        """Compact form for a history item: only the parts that are set."""
+        data = {'sentence': self.sentence, 'source': self.source_app, 'window': self.window_title}
+        return {key: value for key, value in data.items() if value}
+
+    @classmethod
+    def from_history(cls, item):
+        return cls(item.get('sentence', ''), item.get('source', ''), item.get('window', ''))
+
+
+NO_CONTEXT = SourceContext()
@@ -0,0 +1,657 @@
+"""Headless capture pipeline: selection -> dictionary lookup -> Anki -> history.
+
+Nothing in here imports a GUI toolkit or an OS-specific module; the selection
+comes from a platform Clipboard and results are reported through a
+`notify(event, a, b)` callback, so the pipeline runs the same under the tray
+app, on Linux, or inside a benchmark with fake platform services.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from aio import EventLoopThread, LoopStopped
+from anki import ANKI_CONNECT_URL, AnkiConnect, AnkiError
+from ankimeta import AnkiMetadata
+from context import NO_CONTEXT, SourceContext
+from dictionary import (DICTIONARY_API_URL, NO_DEFINITION, WIKTIONARY_API_URL, DictionaryClient,
+                        DictionaryUnavailable, EntryCache)
+from fuzzy import FuzzyIndex
+from glossary import Glossary
+from journal import CaptureJournal
+from languages import detect_language
+from lexicon import Lexicon, deck_query, note_front
+from metrics import Metrics
+from media import PREDICTED_AUDIO_URL, MediaCache, PronunciationFetcher
+from ratelimit import BACKGROUND, INTERACTIVE
+from refresher import DefinitionRefresher
+from reviews import ReviewStats
+from templates import DEFAULT_TEMPLATE, TemplateError, build_context, load_templates
+
+
+NO_DEFAULT_DECK = "None (Ask every time)"
+
+
+class CaptureRoute:
+    """What one hotkey does with the selection.
+
+    Entries of the `hotkey_bindings` setting look like
+
+        {"hotkey": "ctrl+alt+f", "deck": "French", "language": "fr",
+         "template": "Vocab", "mode": "word", "confirm": false}
+
+    Every key but "hotkey" is optional: no deck means the default deck, no
+    language detects it from the selection, no template the active one. In "passage"
+    mode the selection is added as-is without a dictionary lookup; with
+    "confirm" the deck dialog is shown before every add.
+    """
+
+    MODES = ('word', 'passage')
+
+    def __init__(self, hotkey='', deck=None, language=None, template=None, mode='word', confirm=False):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown capture mode {mode!r} (expected one of {', '.join(self.MODES)})")
+        self.hotkey = hotkey
+        self.deck = deck
+        self.language = language
+        self.template = template
+        self.mode = mode
+        self.confirm = bool(confirm)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build a route from a settings entry. Raises ValueError if it is malformed."""
+        try:
+            return cls(spec['hotkey'], spec.get('deck'), spec.get('language'), spec.get('template'),
+                       spec.get('mode', 'word'), spec.get('confirm', False))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid hotkey binding: {spec!r}") from e
+
+    def to_spec(self):
+        return {'hotkey': self.hotkey, 'deck': self.deck, 'language': self.language,
+                'template': self.template, 'mode': self.mode, 'confirm': self.confirm}
+
+    @property
+    def passage(self):
+        return self.mode == 'passage'
+
+
+DEFAULT_ROUTE = CaptureRoute()
+
+
+class CapturePipeline:
+    """Everything between the hotkey press and the new card, without any GUI.
+
+    Events passed to `notify`:
+        ('toast', message, None)
+        ('card_added', word, definition)
+        ('deck_selector', word, (entry, audio, route, source, capture_id))  - no deck (or confirm), ask the user
+        ('decks_changed', decks, None)           - Anki's deck list differs from the snapshot
+        ('update_anki_status', None, None)
+        ('refresh_history', None, None)
+        ('lexicon_progress', deck, (done, total)) - a deck import moved on
+        ('lexicon_done', notes, error)           - an import finished (error is None or a message)
+    """
+
+    def __init__(self, settings_manager, clipboard, notify=None, data_dir=None,
+                 anki_url=ANKI_CONNECT_URL, dictionary_url=DICTIONARY_API_URL,
+                 wiktionary_url=WIKTIONARY_API_URL, audio_url=PREDICTED_AUDIO_URL, workers=2,
+                 budget=None):
+        data_dir = Path(data_dir) if data_dir else Path.home()
+        self.settings_manager = settings_manager
+        self.clipboard = clipboard
+        self.notify = notify or (lambda event, a=None, b=None: None)
+        self.metrics = Metrics()
+        # All network I/O (dictionary, audio, AnkiConnect) runs on this one loop
+        self.loop = EventLoopThread(name='network')
+        self.anki = AnkiConnect(anki_url, loop=self.loop)
+        self.anki_connected = False  # kept current by the app's connection monitor
+        self.glossary_file = data_dir / '.lexi_snap_glossary.csv'
+        self.headwords_file = data_dir / '.lexi_snap_headwords.txt'
+        self.dictionary = DictionaryClient(
+            base_url=dictionary_url,
+            cache=EntryCache(data_dir / '.lexi_snap_definitions.jsonl'),
+            budget=budget,
+            loop=self.loop,
+            wiktionary_url=wiktionary_url,
+            routes=settings_manager.get('dictionary_providers'),
+            # The user's own definitions, ahead of the cache and the dictionaries
+            glossary=Glossary([self.glossary_file] + list(settings_manager.get('glossary_files', []))),
+        )
+        self.dictionary.glossary.watch()
+        # Headwords to suggest spellings from when the dictionary has no entry (built in the background)
+        self.fuzzy = FuzzyIndex()
+        self.fuzzy.build_async(self._headword_sources())
+        self.templates = load_templates(settings_manager.get('note_templates'))
+        # Decks and model fields from the last run, so the first add needs no lookups in Anki
+        self.metadata = AnkiMetadata(
+            self.anki, data_dir / '.lexi_snap_anki_metadata.json',
+            seed_decks=settings_manager.get('cached_decks', []),
+        )
+        self.metadata.on_change(self._on_metadata_changed)
+        self.pronunciations = PronunciationFetcher(
+            MediaCache(data_dir / '.lexi_snap_media'), self.anki,
+            predicted_url=audio_url, budget=self.dictionary.budget, loop=self.loop
+        )
+        self.refresher = DefinitionRefresher(
+            self.dictionary, self.anki, settings_manager, self.templates,
+            is_idle=lambda: self.anki_connected and self.is_idle(),
+            on_updated=lambda: self.notify('refresh_history', None, None),
+        )
+        # Review state of the app's cards in Anki, for the History tab's stats
+        self.reviews = ReviewStats(self.anki, data_dir / '.lexi_snap_reviews.jsonl')
+        # Words the user already studies in decks this app didn't create
+        self.lexicon = Lexicon(data_dir / '.lexi_snap_lexicon.tsv')
+        # Every hotkey capture until its card is in the history, to finish it after a crash
+        self.journal = CaptureJournal(data_dir / '.lexi_snap_journal.jsonl')
+
+        # One small pool serves every capture instead of a thread per hotkey press
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='capture')
+
+        # Capture activity, so background work only runs while idle
+        self._active_captures = 0
+        self._last_capture_time = 0.0
+        self._activity_lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._first_add_seen = False
+        # Settings read once above are re-applied in place when they change
+        settings_manager.subscribe(self._on_setting_changed, keys=(
+            'dictionary_providers', 'glossary_files', 'headword_lists', 'note_templates'))
+
+    def _headword_sources(self):
+        return [
+            self.dictionary.glossary.headwords(),
+            (key for key, _ in self.dictionary.cache.entries()),
+            self.headwords_file,
+            *self.settings_manager.get('headword_lists', []),
+        ]
+
+    def _on_setting_changed(self, change):
+        """Reconfigure the one part a setting feeds, without rebuilding the pipeline."""
+        if change.key == 'dictionary_providers':
+            self.dictionary.set_routes(change.new)
+        elif change.key == 'glossary_files':
+            self.dictionary.glossary.set_paths([self.glossary_file] + list(change.new or []))
+        elif change.key == 'headword_lists':
+            # Built aside and swapped in, so suggestions keep working meanwhile
+            index = FuzzyIndex()
+
+            def build():
+                index.build(self._headword_sources())
+                self.fuzzy = index
+            threading.Thread(target=build, daemon=True, name='fuzzy-index').start()
+        elif change.key == 'note_templates':
+            # In place: the refresher holds this same dict
+            templates = load_templates(change.new)
+            self.templates.update(templates)
+            for name in set(self.templates) - set(templates):
+                del self.templates[name]
+
+    def shutdown(self):
+        """Stop background work and cancel in-flight requests."""
+        self.refresher.stop()
+        self.dictionary.glossary.stop_watching()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.loop.stop()
+        self.journal.close()
+
+    def metrics_snapshot(self):
+        """Counters and timings plus the state of caches, budget and endpoints (the API's /metrics)."""
+        snapshot = self.metrics.snapshot()
+        snapshot.update({
+            'anki_connected': self.anki_connected,
+            'entry_cache_size': sum(len(cache) for _, cache in self.dictionary.partitions()),
+            'dictionary_blocked_for': round(self.dictionary.budget.blocked_for(), 2),
+            'latency': {'dictionary': self.dictionary.endpoints.snapshot(),
+                        'anki': self.anki.endpoints.snapshot()},
+            'missing_definitions': self.refresher.missing_count(),
+        })
+        return snapshot
+
+    # ==================== CAPTURE ====================
+
+    def submit_capture(self, route=None):
+        """Queue a capture of the current selection on the worker pool.
+
+        Every hotkey binding shares this pool, the entry cache and the
+        request budget; `route` only changes what happens to the selection.
+        """
+        return self.executor.submit(self.process_capture, route)
+
+    def is_idle(self, quiet_period=120):
+        """True when no capture is running and none happened for `quiet_period` seconds."""
+        with self._activity_lock:
+            return (self._active_captures == 0
+                    and time.time() - self._last_capture_time > quiet_period)
+
+    def process_capture(self, route=None):
+        """Capture the selection and add it. Returns the new note id, or None."""
+        with self._activity_lock:
+            self._active_captures += 1
+            self._last_capture_time = time.time()
+        self.metrics.incr('captures')
+        try:
+            with self.metrics.timer('capture'):
+                return self._capture_and_add(route or DEFAULT_ROUTE)
+        except Exception as e:
+            self.notify('toast', f"Error: {str(e)}", None)
+            return None
+        finally:
+            with self._activity_lock:
+                self._active_captures -= 1
+                self._last_capture_time = time.time()
+
+    def _capture_and_add(self, route):
+        """Copy the selection, look it up and add the card (or ask for a deck)."""
+        with_context = self.settings_manager.get('capture_context', False) and not route.passage
+        capture = self.clipboard.capture(with_context=with_context)
+        text = capture.text
+        if not text:
+            self.notify('toast', "No text selected", None)
+            return None
+        source = SourceContext.from_capture(capture) if with_context else NO_CONTEXT
+        if not route.passage and self.is_known(text):
+            self.notify('toast', f"Already studying: {text}", None)
+            return None
+
+        deck = route.deck or self.settings_manager.get('default_deck')
+        if route.confirm or not deck or deck == NO_DEFAULT_DECK:
+            self._ask_for_deck(self.journal.captured(text, None, route, source), text, route, source)
+            return None
+
+        capture_id = self.journal.captured(text, deck, route, source)
+        note_id, _ = self.add_word(text, deck, route=route, source=source, capture_id=capture_id)
+        if not note_id:
+            self.notify('toast', "Failed to add card", None)
+        return note_id
+
+    def _ask_for_deck(self, capture_id, word, route, source):
+        """Look the word up and hand it to the deck dialog, which finishes the capture."""
+        entry, audio = self.prepare(word, route)
+        word = self.corrected_word(word, entry)
+        self.notify('deck_selector', word, (entry, audio, route, source, capture_id))
+
+    def prepare(self, word, route=None):
+        """Look up a word and, if enabled, its pronunciation. Returns (entry, audio).
+
+        Passages aren't looked up: (None, None).
+        """
+        route = route or DEFAULT_ROUTE
+        if route.passage:
+            return None, None
+        language = self.language_for(word, route)
+        # Start the pronunciation download alongside the definition lookup (English audio only)
+        prefetched = None
+        if self.settings_manager.get('pronunciation_audio', False) and language == self.dictionary.language:
+            prefetched = self.pronunciations.prefetch(word, self.dictionary.cache.get(word))
+
+        entry = self.lookup_entry(word, language=language)
+        audio = self.pronunciations.resolve(entry, prefetched) if prefetched else None
+        return entry, audio
+
+    def add_word(self, word, deck, route=None, source=None, capture_id=None, find_existing=False):
+        """Look up a word and add its card to `deck`. Returns (note_id, definition).
+
+        `source` is the SourceContext (sentence, application) the word was captured in.
+        A journaled capture passes its `capture_id`; see add_to_anki() for `find_existing`.
+        """
+        route = route or DEFAULT_ROUTE
+        entry, audio = self.prepare(word, route)
+        word = self.corrected_word(word, entry)
+        definition = self.definition_for(entry, route)
+        note_id = self.add_to_anki(deck, word, definition, entry, source=source, audio=audio,
+                                   template=self.route_template(route), capture_id=capture_id,
+                                   find_existing=find_existing)
+        if note_id:
+            self.record_added(word, definition, note_id, deck, route=route, source=source,
+                              capture_id=capture_id)
+        elif capture_id is not None:
+            self.journal.done(capture_id, 'failed')
+        return note_id, definition
+
+    def corrected_word(self, word, entry):
+        """The word a card is for: the entry's headword if the lookup corrected the spelling."""
+        if entry is None or EntryCache._key(entry.word) == EntryCache._key(word):
+            return word
+        self.notify('toast', f"Corrected \"{word}\" to \"{entry.word}\"", None)
+        return entry.word
+
+    @staticmethod
+    def definition_for(entry, route=None):
+        """The definition text stored for a card: empty for passages, which have none to find."""
+        if entry is not None:
+            return entry.definition
+        return '' if route is not None and route.passage else NO_DEFINITION
+
+    def route_template(self, route):
+        """The note template a route asks for, or the active one (counted as template_unknown)."""
+        if route is not None and route.template:
+            template = self.templates.get(route.template)
+            if template is not None:
+                return template
+            self.metrics.incr('template_unknown')
+        return self.active_template()
+
+    # ==================== LOOKUP ====================
+
+    def language_for(self, word, route=None):
+        """The language to look a word up in: the route's, else detected from its letters.
+
+        Detection prefers the `study_languages` setting where a script is
+        shared (Cyrillic, Han); plain ASCII is the dictionary's own language.
+        """
+        if route is not None and route.language:
+            return route.language
+        return (detect_language(word, self.settings_manager.get('study_languages') or ())
+                or self.dictionary.language)
+
+    def lookup_entry(self, word, priority=INTERACTIVE, language=None):
+        """Get the full parsed dictionary entry (all senses), or None.
+
+        Without a `language` it is detected from the word. If the dictionary
+        is throttled or unreachable the card is still added without a
+        definition; the background refresher fills it in later.
+        """
+        language = language or self.language_for(word)
+        entry = self.dictionary.local(word, language)
+        if entry is not None:
+            self.metrics.incr('lookup_cache_hits')
+            return entry
+        try:
+            return self.loop.run(self.alookup_entry(word, priority, language))
+        except LoopStopped:
+            return None
+
+    async def alookup_entry(self, word, priority=INTERACTIVE, language=None):
+        """lookup_entry() for code running on the network loop."""
+        language = language or self.language_for(word)
+        entry = self.dictionary.local(word, language)
+        if entry is not None:
+            self.metrics.incr('lookup_cache_hits')
+            return entry
+        self.metrics.incr('lookup_cache_misses')
+        try:
+            with self.metrics.timer('lookup'):
+                entry = await self.dictionary.alookup(word, priority=priority, language=language)
+                if entry is None and self.settings_manager.get('spell_correction', True):
+                    entry = await self._alookup_correction(word, priority, language)
+                return entry
+        except DictionaryUnavailable as e:
+            self.metrics.incr('lookup_unavailable')
+            print(f"Dictionary unavailable for {word!r}: {e}")
+            return None
+
+    async def _alookup_correction(self, word, priority, language):
+        """The entry for the closest indexed spelling of a word the dictionary doesn't have, or None."""
+        for suggestion in self.fuzzy.suggest(word, limit=2):
+            entry = await self.dictionary.alookup(suggestion, priority=priority, language=language)
+            if entry is not None:
+                self.metrics.incr('lookup_corrected')
+                return entry
+        return None
+
+    async def _alookup_all(self, words, priority):
+        return await asyncio.gather(*(self.alookup_entry(word, priority) for word in words))
+
+    def get_definition(self, word):
+        """Get dictionary definition."""
+        return self.dictionary.get_definition(word)
+
+    # ==================== ANKI ====================
+
+    def get_anki_decks(self):
+        """Get the current list of Anki decks (refreshing the metadata snapshot), or [] if unreachable."""
+        snapshot = self.refresh_metadata()
+        return list(snapshot.decks) if snapshot else []
+
+    def refresh_metadata(self):
+        """Revalidate the deck/model snapshot against Anki. Returns it, or None if Anki is unreachable."""
+        try:
+            with self.metrics.timer('metadata_refresh'):
+                return self.metadata.revalidate(self._template_models())
+        except AnkiError:
+            return None
+
+    def refresh_metadata_async(self):
+        """refresh_metadata() on the network loop without waiting for it."""
+        async def refresh():
+            try:
+                await self.metadata.arevalidate(self._template_models())
+            except AnkiError:
+                pass
+        return self.loop.submit(refresh())
+
+    def sync_reviews(self, full=False):
+        """Pull review data of changed cards from Anki. Returns how many changed, or None if unreachable."""
+        try:
+            with self.metrics.timer('review_sync'):
+                return self.reviews.pull(full)
+        except AnkiError:
+            return None
+
+    def sync_reviews_async(self):
+        """sync_reviews() on the network loop without waiting; the history is refreshed afterwards."""
+        async def sync():
+            try:
+                await self.reviews.apull()
+            except AnkiError:
+                return
+            self.notify('refresh_history', None, None)
+        return self.loop.submit(sync())
+
+    def is_known(self, word):
+        """True if `word` is in one of the imported decks and known words are skipped."""
+        return self.settings_manager.get('skip_known_words', True) and word in self.lexicon
+
+    def import_lexicon_async(self, decks=None, full=False):
+        """Import note fronts of `decks` (default: the `lexicon_decks` setting) on the network loop.
+
+        Progress and the result are reported as 'lexicon_progress' and
+        'lexicon_done' events.
+        """
+        decks = list(self.settings_manager.get('lexicon_decks', []) if decks is None else decks)
+
+        def progress(deck, done, total):
+            self.notify('lexicon_progress', deck, (done, total))
+
+        async def run():
+            try:
+                with self.metrics.timer('lexicon_import'):
+                    notes = await self.lexicon.aimport_decks(self.anki, decks, full, progress)
+            except AnkiError as e:
+                self.notify('lexicon_done', 0, str(e))
+                return
+            self.notify('lexicon_done', notes, None)
+        return self.loop.submit(run())
+
+    def _template_models(self):
+        return {template.model for template in self.templates.values()}
+
+    def _on_metadata_changed(self, old, new):
+        # Templates checked against fields that have since changed must be checked again
+        for template in self.templates.values():
+            if old.models.get(template.model) != new.models.get(template.model):
+                template.invalidate()
+        if old.decks != new.decks:
+            self.notify('decks_changed', list(new.decks), None)
+
+    def ping_anki(self, timeout=None):
+        """Quick check if Anki is responding (short, adaptive timeout for status checks)."""
+        return self.anki.ping(timeout=timeout)
+
+    def active_template(self):
+        """The note template selected in settings (falls back to Basic)."""
+        name = self.settings_manager.get('note_template') or DEFAULT_TEMPLATE['name']
+        return self.templates.get(name) or self.templates[DEFAULT_TEMPLATE['name']]
+
+    def _build_note(self, template, deck, word, entry, source=None, audio='', definition=None):
+        """Render one note from captured data with an already validated template."""
+        source = source or NO_CONTEXT
+        context = build_context(word, entry, deck=deck, source_app=source.source_app, audio=audio,
+                                definition=definition, sentence=source.sentence,
+                                window_title=source.window_title)
+        return template.build_note(deck, context)
+
+    def add_to_anki(self, deck, word, definition, entry=None, source=None, audio=None, template=None,
+                    capture_id=None, find_existing=False):
+        """Add card to Anki using `template` (default: the active note template).
+
+        `audio` is the media cache file name of the word's pronunciation, if any.
+        With `find_existing` (a replayed capture whose add may have reached
+        Anki) an identical note already there is used instead of adding one.
+        Returns the new note id, or None if the card could not be added.
+        """
+        template = template or self.active_template()
+        note_id = None
+        try:
+            template.validate(self.anki)
+            sound = self.pronunciations.sound_tag(audio) if audio else ''
+            note = self._build_note(template, deck, word, entry, source, sound, definition)
+            if find_existing:
+                note_id = self._find_note(note)
+            if not note_id:
+                if capture_id is not None:
+                    self.journal.adding(capture_id, word, deck, definition)
+                with self.metrics.timer('anki_add'):
+                    note_id = self.anki.add_note(note)
+            if note_id and capture_id is not None:
+                self.journal.added(capture_id, note_id)
+            self._note_first_add(note_id)
+        except TemplateError as e:
+            print(f"Note template error: {e}")
+        except AnkiError as e:
+            print(f"Failed to add note: {e}")
+            # The model may have been edited in Anki - re-check it next time
+            self.anki.invalidate_models(template.model)
+            template.invalidate()
+        self.metrics.incr('cards_added' if note_id else 'add_failed')
+        # Update Anki status after operation
+        self.notify('update_anki_status', None, None)
+        return note_id
+
+    def _find_note(self, note):
+        """Id of a note in Anki with the same deck, model and first field as `note`, or None."""
+        front = next(iter(note['fields'].values()), '')
+        term = '"' + front.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        note_ids = self.anki.invoke('findNotes', query=f"{deck_query(note['deckName'])} {term}") or []
+        if not note_ids:
+            return None
+        for info in self.anki.invoke('notesInfo', notes=note_ids) or []:
+            if info and info.get('modelName') == note['modelName'] and note_front(info) == front:
+                return info['noteId']
+        return None
+
+    def add_batch_to_anki(self, deck, items):
+        """Add several (word, entry) cards in one request. Returns the new note ids (None on failure).
+
+        The template is validated against its model once for the whole batch.
+        """
+        template = self.active_template()
+        try:
+            template.validate(self.anki)
+            notes = [self._build_note(template, deck, word, entry) for word, entry in items]
+            with self.metrics.timer('anki_add_batch'):
+                results = self.anki.add_notes(notes)
+        except (TemplateError, AnkiError) as e:
+            print(f"Failed to add notes: {e}")
+            template.invalidate()
+            results = [None] * len(items)
+        added = sum(1 for note_id in results if note_id)
+        self._note_first_add(added)
+        self.metrics.incr('cards_added', added)
+        self.metrics.incr('add_failed', len(results) - added)
+        self.notify('update_anki_status', None, None)
+        return results
+
+    def add_words(self, words, deck, chunk_size=10):
+        """Look up and add a list of words, yielding (word, note_id, definition) per word.
+
+        Lookups run at background priority, so a bulk import waits for the
+        dictionary budget instead of starving hotkey captures. A chunk's
+        lookups run concurrently on the network loop, then go to Anki in one
+        addNotes call; note_id is None for rejected notes (usually duplicates).
+        """
+        words = list(words)
+        for start in range(0, len(words), chunk_size):
+            chunk = words[start:start + chunk_size]
+            try:
+                entries = self.loop.run(self._alookup_all(chunk, BACKGROUND))
+            except LoopStopped:
+                return
+            note_ids = self.add_batch_to_anki(deck, list(zip(chunk, entries)))
+            for word, entry, note_id in zip(chunk, entries, note_ids):
+                definition = entry.definition if entry else NO_DEFINITION
+                if note_id:
+                    self.record_added(word, definition, note_id, deck, announce=False)
+                yield word, note_id, definition
+        self.notify('refresh_history', None, None)
+
+    def _note_first_add(self, added):
+        """Record the time from startup to the first successful add (the warm-start figure)."""
+        if added and not self._first_add_seen:
+            self._first_add_seen = True
+            self.metrics.observe('startup_to_first_add', time.perf_counter() - self._started)
+
+    def record_added(self, word, definition, note_id, deck, announce=True, route=None, source=None,
+                     capture_id=None):
+        """Store a successfully added card in history and tell the UI.
+
+        Bulk adds pass announce=False to skip the per-card badge and toast.
+        """
+        self.settings_manager.add_to_history(
+            word, definition, note_id, deck, self.route_template(route).name,
+            language=self.language_for(word, route),
+            context=source.to_history() if source else None,
+        )
+        if capture_id is not None:
+            self.journal.done(capture_id)
+        if announce:
+            self.notify('card_added', word, definition)
+
+    # ==================== RECOVERY ====================
+
+    def replay_journal(self):
+        """Finish the captures a previous run was interrupted in. Returns how many there were.
+
+        Call once Anki is reachable. Each capture resumes at the stage it
+        reached: a capture that may have been added is looked for in Anki
+        before adding it, and one whose note id is known is only put in the
+        history if it isn't there already.
+        """
+        recovered = self.journal.take_recovered()
+        for capture in recovered:
+            try:
+                self._replay(capture)
+            except Exception as e:
+                print(f"Could not replay capture of {capture.get('word')!r}: {e}")
+                self.journal.done(capture['id'], 'failed')
+        if recovered:
+            print(f"Replayed {len(recovered)} interrupted capture(s)")
+        return len(recovered)
+
+    def replay_journal_async(self):
+        """replay_journal() on the capture pool without waiting for it."""
+        return self.executor.submit(self.replay_journal)
+
+    def _replay(self, capture):
+        capture_id, stage, word, deck = capture['id'], capture['stage'], capture['word'], capture.get('deck')
+        route = CaptureRoute.from_spec(capture['route'])
+        source = SourceContext.from_history(capture.get('source') or {})
+        self.metrics.incr('captures_replayed')
+        if stage == 'added':
+            note_id = capture['note_id']
+            # Newest first: a capture that got this far is at the end of the log, if it's there
+            if any(item.get('note_id') == note_id for item in self.settings_manager.history_log.newest()):
+                self.journal.done(capture_id)  # only its 'done' line was lost
+            else:
+                self.record_added(word, capture.get('definition', NO_DEFINITION), note_id, deck,
+                                  route=route, source=source, capture_id=capture_id)
+        elif deck is None:
+            self._ask_for_deck(capture_id, word, route, source)
+        else:
+            note_id, _ = self.add_word(word, deck, route=route, source=source, capture_id=capture_id,
+                                       find_existing=stage == 'adding')
+            if not note_id:
+                self.notify('toast', f"Failed to add card for \"{word}\"", None)
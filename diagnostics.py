@@ -0,0 +1,234 @@
+"""Opt-in diagnostics for the resident app: a sampling profiler over every thread,
+counts of swallowed exceptions by call site, and a bundle of both to attach to a
+report that the app is slow or misbehaving.
+
+The profiler runs only while the `diagnostics_enabled` setting is on (or the
+app was started with --diagnostics). Swallowed exceptions are always
+counted: `swallowed()` is one dict update, and only on an exception path.
+
+A bundle is a zip file, lexi-snap-diagnostics-YYYYMMDD-HHMMSS.zip, holding:
+
+    manifest.json   {"format": 1, "created": ISO time, "python": version,
+                     "platform": sys.platform, "uptime_s": seconds since start,
+                     "profiler": {"running", "interval_ms", "samples",
+                                  "duration_s", "overhead", "dropped_stacks"},
+                     "threads": [thread names]}
+                    `overhead` is the fraction of one CPU the sampler used
+    profile.folded  one line per distinct stack, root first:
+                        thread;file:function:line;...;file:function:line count
+                    where count is how many samples saw the thread in exactly
+                    that stack (idle threads show up in their wait). This is
+                    the "collapsed" format read by flamegraph.pl, speedscope
+                    and inferno; file is the last two parts of the path
+    swallowed.json  [{"site": "file:line", "function", "exception": type name,
+                      "message": the last one, "count"}], most frequent first
+    threads.txt     every thread's stack when the bundle was written
+    metrics.json    the pipeline's counters, timings and endpoint latencies
+                    (what the local API serves at /metrics)
+    settings.json   the settings, without the card history and API token
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import traceback
+import zipfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+BUNDLE_FORMAT = 1
+_started = time.time()
+_swallowed = {}  # (filename, line) -> [function, exception type, message, count]
+_swallowed_lock = threading.Lock()
+
+
+def _short(filename):
+    """The last two parts of a source path: enough to tell files apart, without the user's home."""
+    parts = filename.replace('\\', '/').rsplit('/', 2)
+    return '/'.join(parts[-2:])
+
+
+def swallowed():
+    """Count the exception being handled, at the line that called this. For `except` blocks that drop it."""
+    frame = sys._getframe(1)
+    error = sys.exc_info()[1]
+    key = (frame.f_code.co_filename, frame.f_lineno)
+    with _swallowed_lock:
+        site = _swallowed.get(key)
+        if site is None:
+            site = _swallowed[key] = [frame.f_code.co_name, '', '', 0]
+        site[1] = type(error).__name__ if error is not None else ''
+        site[2] = str(error)[:200]
+        site[3] += 1
+
+
+def swallowed_counts():
+    """The swallowed exceptions as in swallowed.json, most frequent first."""
+    with _swallowed_lock:
+        sites = [(key, list(site)) for key, site in _swallowed.items()]
+    sites.sort(key=lambda item: -item[1][3])
+    return [{'site': f"{_short(filename)}:{line}", 'function': function, 'exception': exception,
+             'message': message, 'count': count}
+            for (filename, line), (function, exception, message, count) in sites]
+
+
+class SamplingProfiler:
+    """Samples the stack of every thread from a daemon thread.
+
+    Each sample times itself, and the wait before the next one is stretched
+    so that sampling never takes more than `max_overhead` of one CPU (a
+    process with many threads is sampled less often, not more expensively).
+    At most `max_stacks` distinct stacks are kept; samples of new stacks
+    beyond that are only counted as dropped.
+    """
+
+    def __init__(self, interval=0.01, max_overhead=0.01, max_depth=64, max_stacks=20000):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self.dropped = 0
+        self._stacks = Counter()  # (thread name, ((file, function, line), ...) root first) -> samples
+        self._busy = 0.0
+        self._running_time = 0.0
+        self._since = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._since = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True,
+                                        name='diagnostics-profiler')
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread = None
+        self._running_time += time.perf_counter() - self._since
+        self._since = None
+
+    def _run(self, stop):
+        me = threading.get_ident()
+        wait = self.interval
+        while not stop.wait(wait):
+            start = time.perf_counter()
+            self._sample(me)
+            cost = time.perf_counter() - start
+            self._busy += cost
+            wait = max(self.interval, cost / self.max_overhead) - cost
+
+    def _sample(self, skip):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            self.samples += 1
+            for ident, frame in frames.items():
+                if ident == skip:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_name, frame.f_lineno))
+                    frame = frame.f_back
+                stack.reverse()
+                key = (names.get(ident, str(ident)), tuple(stack))
+                if key in self._stacks or len(self._stacks) < self.max_stacks:
+                    self._stacks[key] += 1
+                else:
+                    self.dropped += 1
+        del frames
+
+    def duration(self):
+        """Seconds the profiler has been running, in total."""
+        running = time.perf_counter() - self._since if self._since is not None else 0.0
+        return self._running_time + running
+
+    def overhead(self):
+        """Fraction of one CPU spent sampling while running."""
+        duration = self.duration()
+        return self._busy / duration if duration else 0.0
+
+    def folded(self):
+        """The profile in collapsed-stack format (see the module docstring), heaviest stacks first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        for (thread, stack), count in stacks:
+            frames = ';'.join(f"{_short(filename)}:{function}:{line}" for filename, function, line in stack)
+            yield f"{thread};{frames} {count}\n" if frames else f"{thread} {count}\n"
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = self.dropped = 0
+            self._busy = self._running_time = 0.0
+            if self._since is not None:
+                self._since = time.perf_counter()
+
+    def summary(self):
+        return {
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000, 1),
+            'samples': self.samples,
+            'duration_s': round(self.duration(), 1),
+            'overhead': round(self.overhead(), 4),
+            'dropped_stacks': self.dropped,
+        }
+
+
+def thread_dump():
+    """Every thread's current stack, as threads.txt has it."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    parts = []
+    for ident, frame in sys._current_frames().items():
+        parts.append(f"Thread {names.get(ident, '?')} ({ident}):\n")
+        parts.extend(traceback.format_stack(frame))
+        parts.append('\n')
+    return ''.join(parts)
+
+
+def write_bundle(directory, profiler=None, pipeline=None):
+    """Write a diagnostics bundle (see the module docstring) into `directory`. Returns its path."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    path = directory / f"lexi-snap-diagnostics-{now.strftime('%Y%m%d-%H%M%S')}.zip"
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': now.isoformat(),
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'uptime_s': round(time.time() - _started, 1),
+        'profiler': profiler.summary() if profiler is not None else None,
+        'threads': sorted(thread.name for thread in threading.enumerate()),
+    }
+    tmp = path.with_suffix('.tmp')
+    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr('manifest.json', json.dumps(manifest, indent=2))
+        bundle.writestr('profile.folded', ''.join(profiler.folded()) if profiler is not None else '')
+        bundle.writestr('swallowed.json', json.dumps(swallowed_counts(), indent=2))
+        bundle.writestr('threads.txt', thread_dump())
+        if pipeline is not None:
+            bundle.writestr('metrics.json', json.dumps(pipeline.metrics_snapshot(), indent=2, default=str))
+            settings = {key: value for key, value in pipeline.settings_manager.settings.items()
+                        if key != 'card_history'}
+            if settings.get('api_token'):
+                settings['api_token'] = '<set>'
+            bundle.writestr('settings.json', json.dumps(settings, indent=2, default=str))
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,551 @@
+"""Dictionary lookup and the compact entry model used for cached definitions.
+
+Lookups are routed by language: English goes to dictionaryapi.dev (with
+phonetics and pronunciation audio), every other language to Wiktionary,
+whose pages have a section per language with English glosses. Each
+language has its own cache partition, so a French "chat" never shadows
+the English one.
+"""
+
+import asyncio
+import html
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from aio import HTTPClient, HTTPError, LoopStopped, default_loop
+from latency import Endpoints
+from ratelimit import BACKGROUND, INTERACTIVE, RequestBudget, SingleFlight, parse_retry_after
+
+
+DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+WIKTIONARY_API_URL = "https://en.wiktionary.org/api/rest_v1/page/definition/"
+NO_DEFINITION = "No definition found"
+HTML_TAG = re.compile(r'<[^>]+>')
+
+
+class DictionaryUnavailable(Exception):
+    """The dictionary could not answer right now (throttled, timed out or down)."""
+
+
+class Sense:
+    """A single meaning of a word: part of speech, definition and extras."""
+
+    __slots__ = ('part_of_speech', 'definition', 'example', 'synonyms', 'antonyms')
+
+    def __init__(self, part_of_speech, definition, example=None, synonyms=(), antonyms=()):
+        self.part_of_speech = part_of_speech
+        self.definition = definition
+        self.example = example
+        self.synonyms = synonyms
+        self.antonyms = antonyms
+
+    def to_compact(self):
+        """Positional list form, trailing empty fields dropped."""
+        data = [self.part_of_speech, self.definition, self.example,
+                list(self.synonyms), list(self.antonyms)]
+        while len(data) > 2 and not data[-1]:
+            data.pop()
+        return data
+
+    @classmethod
+    def from_compact(cls, data):
+        return cls(
+            sys.intern(data[0]),
+            data[1],
+            data[2] if len(data) > 2 else None,
+            tuple(data[3]) if len(data) > 3 else (),
+            tuple(data[4]) if len(data) > 4 else (),
+        )
+
+
+class DictionaryEntry:
+    """Every sense returned for a word, parsed once and kept in compact form."""
+
+    __slots__ = ('word', 'phonetic', 'audio_urls', 'senses', 'fetched_at')
+
+    def __init__(self, word, phonetic=None, audio_urls=(), senses=(), fetched_at=None):
+        self.word = word
+        self.phonetic = phonetic
+        self.audio_urls = audio_urls
+        self.senses = senses
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    @property
+    def definition(self):
+        """The first definition - what a Basic card shows on the back."""
+        return self.senses[0].definition if self.senses else NO_DEFINITION
+
+    @property
+    def part_of_speech(self):
+        return self.senses[0].part_of_speech if self.senses else ''
+
+    @property
+    def examples(self):
+        return tuple(s.example for s in self.senses if s.example)
+
+    @property
+    def synonyms(self):
+        seen = {}
+        for sense in self.senses:
+            for synonym in sense.synonyms:
+                seen.setdefault(synonym, None)
+        return tuple(seen)
+
+    def as_fields(self):
+        """Flatten the entry into the string fields card templates can use."""
+        senses = []
+        for i, sense in enumerate(self.senses, 1):
+            line = f"{i}. ({sense.part_of_speech}) {sense.definition}" if sense.part_of_speech \
+                else f"{i}. {sense.definition}"
+            senses.append(line)
+        return {
+            'word': self.word,
+            'definition': self.definition,
+            'part_of_speech': self.part_of_speech,
+            'phonetic': self.phonetic or '',
+            'senses': '\n'.join(senses),
+            'examples': '\n'.join(self.examples),
+            'example': self.examples[0] if self.examples else '',
+            'synonyms': ', '.join(self.synonyms),
+        }
+
+    def to_compact(self):
+        return [self.word, self.phonetic, list(self.audio_urls),
+                [s.to_compact() for s in self.senses], round(self.fetched_at)]
+
+    @classmethod
+    def from_compact(cls, data):
+        return cls(
+            data[0],
+            data[1],
+            tuple(data[2]),
+            tuple(Sense.from_compact(s) for s in data[3]),
+            data[4],
+        )
+
+
+def parse_entry(word, payload):
+    """Parse a dictionaryapi.dev response (a list of entries) into one DictionaryEntry.
+
+    All entries and meanings are merged so every sense is stored exactly once.
+    Returns None if the payload has no definitions.
+    """
+    phonetic = None
+    audio_urls = {}
+    senses = []
+    for item in payload:
+        if not phonetic and item.get('phonetic'):
+            phonetic = item['phonetic']
+        for ph in item.get('phonetics') or ():
+            if not phonetic and ph.get('text'):
+                phonetic = ph['text']
+            if ph.get('audio'):
+                audio_urls.setdefault(ph['audio'], None)
+        for meaning in item.get('meanings') or ():
+            pos = sys.intern(meaning.get('partOfSpeech') or '')
+            meaning_synonyms = tuple(meaning.get('synonyms') or ())
+            for i, d in enumerate(meaning.get('definitions') or ()):
+                text = d.get('definition')
+                if not text:
+                    continue
+                synonyms = tuple(d.get('synonyms') or ())
+                if i == 0 and meaning_synonyms:
+                    synonyms = synonyms + tuple(s for s in meaning_synonyms if s not in synonyms)
+                senses.append(Sense(
+                    pos,
+                    text,
+                    d.get('example') or None,
+                    synonyms,
+                    tuple(d.get('antonyms') or ()),
+                ))
+    if not senses:
+        return None
+    headword = payload[0].get('word') or word
+    return DictionaryEntry(headword, phonetic, tuple(audio_urls), tuple(senses))
+
+
+def _plain_text(markup):
+    return ' '.join(html.unescape(HTML_TAG.sub('', markup)).split())
+
+
+def parse_wiktionary(word, language, payload):
+    """Parse the `language` section of a Wiktionary definition page into a DictionaryEntry.
+
+    Definitions and examples arrive as HTML and are reduced to plain text.
+    Returns None if the page has nothing for that language.
+    """
+    senses = []
+    for section in payload.get(language) or ():
+        pos = sys.intern((section.get('partOfSpeech') or '').lower())
+        for d in section.get('definitions') or ():
+            text = _plain_text(d.get('definition') or '')
+            if not text:
+                continue
+            examples = [_plain_text(e) for e in d.get('examples') or ()]
+            senses.append(Sense(pos, text, next((e for e in examples if e), None)))
+    if not senses:
+        return None
+    return DictionaryEntry(word, senses=tuple(senses))
+
+
+class EntryCache:
+    """Bounded LRU cache of parsed entries.
+
+    Entries are persisted as an append-only JSON-lines log of their compact
+    form, so a new lookup costs one short write instead of rewriting the file.
+    Once the log has grown well past the live set, a put() starts compacting
+    it on a daemon thread; puts meanwhile go to the old log and are carried
+    over to the new one.
+    """
+
+    def __init__(self, path=None, capacity=2000):
+        self.path = path
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self._pending = None  # lines put while a compaction runs, else None
+        if path:
+            self.load()
+
+    @staticmethod
+    def _line(key, entry):
+        return json.dumps([key, entry.to_compact()], ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _needs_compaction(self):
+        return self._log_lines > 2 * len(self._entries) + 100
+
+    @staticmethod
+    def _key(word):
+        return word.strip().lower()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, word):
+        return self._key(word) in self._entries
+
+    def get(self, word):
+        key = self._key(word)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, entry, key=None):
+        key = self._key(key or entry.word)
+        line = self._line(key, entry) if self.path else None
+        compact = False
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            if self.path:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(line)
+                    self._log_lines += 1
+                except OSError:
+                    pass
+                if self._pending is not None:
+                    self._pending.append(line)
+                elif self._needs_compaction():
+                    self._pending = []
+                    compact = True
+        if compact:
+            # Off the caller's thread: puts come from the network event loop
+            threading.Thread(target=self.compact, name='entry-cache-compact', daemon=True).start()
+
+    def entries(self):
+        """Snapshot of (key, entry) pairs, oldest first."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def load(self):
+        """Replay the log, compacting it if it has grown well past the live set."""
+        if not self.path or not self.path.exists():
+            return
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        key, compact = json.loads(line)
+                        self._entries[key] = DictionaryEntry.from_compact(compact)
+                        self._entries.move_to_end(key)
+                    except (ValueError, TypeError, IndexError):
+                        continue
+                    if len(self._entries) > self.capacity:
+                        self._entries.popitem(last=False)
+        except OSError:
+            return
+        self._log_lines = lines
+        if self._needs_compaction():
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with one line per live entry.
+
+        The lock is only held to take a snapshot and, at the end, to add the
+        lines put meanwhile and swap the files.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = list(self._entries.items())
+            if self._pending is None:
+                self._pending = []
+        tmp = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.writelines(self._line(key, entry) for key, entry in snapshot)
+                with self._lock:
+                    f.writelines(self._pending)
+                    f.close()
+                    tmp.replace(self.path)
+                    self._log_lines = len(snapshot) + len(self._pending)
+                    self._pending = None
+        except OSError:
+            with self._lock:
+                self._pending = None
+
+
+class DictionaryApiProvider:
+    """dictionaryapi.dev, for the languages it has (in practice English)."""
+
+    name = 'dictionaryapi'
+
+    def __init__(self, base_url=DICTIONARY_API_URL, budget=None):
+        self.base_url = base_url  # entries URL, ending in '/<language>/'
+        self.budget = budget if budget is not None else RequestBudget()
+
+    def url(self, word, language):
+        base = self.base_url.rstrip('/').rsplit('/', 1)[0]
+        return f"{base}/{language}/{quote(word, safe='')}"
+
+    def parse(self, word, language, payload):
+        return parse_entry(word, payload)
+
+
+class WiktionaryProvider:
+    """The English Wiktionary's definition API: every language, glossed in English."""
+
+    name = 'wiktionary'
+
+    def __init__(self, base_url=WIKTIONARY_API_URL, budget=None):
+        self.base_url = base_url
+        # A separate budget: Wiktionary's limits have nothing to do with dictionaryapi.dev's
+        self.budget = budget if budget is not None else RequestBudget(rate=5, burst=10)
+
+    def url(self, word, language):
+        return self.base_url + quote(word, safe='')
+
+    def parse(self, word, language, payload):
+        return parse_wiktionary(word, language, payload)
+
+
+class DictionaryClient:
+    """Looks words up in the dictionary for their language, caching the parsed entries.
+
+    `routes` maps language codes to provider names; the client's own
+    language goes to dictionaryapi.dev and anything unrouted to Wiktionary.
+    Each provider has its own RequestBudget (`budget` is dictionaryapi.dev's),
+    and concurrent lookups of the same word are coalesced into a single HTTP
+    call. Requests run as coroutines on the network event loop (`afetch`,
+    `alookup`, ...); the plain methods are blocking wrappers for other
+    threads and answer cache hits without touching the loop.
+
+    `cache` holds the client's own language. Other languages get their own
+    EntryCache of `partition_capacity` entries on first use, persisted next
+    to it (definitions.jsonl -> definitions.fr.jsonl). A `glossary` (see
+    glossary.py) is consulted before the cache and every provider.
+
+    `timeout` is the timeout until a provider has some latency history;
+    after that each provider's timeout follows its own p99, and interactive
+    lookups slower than its p95 are hedged (see latency.py).
+    """
+
+    def __init__(self, base_url=DICTIONARY_API_URL, cache=None, timeout=3, budget=None,
+                 max_retry_wait=2.0, loop=None, language='en', wiktionary_url=WIKTIONARY_API_URL,
+                 routes=None, partition_capacity=500, glossary=None):
+        self.language = language
+        self.glossary = glossary
+        self.partition_capacity = partition_capacity
+        self.cache = cache if cache is not None else EntryCache()
+        self.timeout = timeout
+        self.endpoints = Endpoints(timeout, floor=0.5, ceiling=6.0)
+        self.budget = budget if budget is not None else RequestBudget()
+        self.max_retry_wait = max_retry_wait
+        self.loop = loop or default_loop()
+        self.http = HTTPClient(self.loop)
+        self.providers = {
+            DictionaryApiProvider.name: DictionaryApiProvider(base_url, self.budget),
+            WiktionaryProvider.name: WiktionaryProvider(wiktionary_url),
+        }
+        self.set_routes(routes)
+        self._caches = {language: self.cache}
+        self._caches_lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def set_routes(self, routes):
+        """Route languages to providers ({code: provider name}) on top of the client's own language."""
+        self.routes = dict({self.language: DictionaryApiProvider.name}, **(routes or {}))
+
+    def provider_for(self, language=None):
+        name = self.routes.get(language or self.language, WiktionaryProvider.name)
+        return self.providers.get(name) or self.providers[WiktionaryProvider.name]
+
+    def cache_for(self, language=None):
+        """The cache partition for a language, created (and loaded) on first use."""
+        language = language or self.language
+        cache = self._caches.get(language)
+        if cache is None:
+            with self._caches_lock:
+                cache = self._caches.get(language)
+                if cache is None:
+                    path = self.cache.path
+                    if path:
+                        path = path.with_name(f"{path.stem}.{language}{path.suffix}")
+                    cache = self._caches[language] = EntryCache(path, self.partition_capacity)
+        return cache
+
+    def local(self, word, language=None):
+        """The glossary's or the cache's entry for a word, or None; never makes a request."""
+        if self.glossary is not None:
+            entry = self.glossary.get(word, language or self.language)
+            if entry is not None:
+                return entry
+        return self.cache_for(language).get(word)
+
+    def partitions(self):
+        """(language, cache) for every language looked up so far."""
+        with self._caches_lock:
+            return list(self._caches.items())
+
+    async def afetch(self, word, priority=INTERACTIVE, language=None):
+        """Fetch and parse a word from its language's dictionary, bypassing the cache.
+
+        Returns None if the dictionary has no entry for the word and raises
+        DictionaryUnavailable if it couldn't be asked (rate limited, throttled,
+        network error). Interactive lookups retry once after a short Retry-After.
+        """
+        language = language or self.language
+        provider = self.provider_for(language)
+        wait = self.timeout if priority == INTERACTIVE else None
+        endpoint = self.endpoints.get(provider.name)
+        url = provider.url(word, language)
+        # Only captures are worth a hedge, and only if the budget has a token to spare right now
+        hedge = (lambda: provider.budget.acquire(INTERACTIVE, timeout=0)) if priority == INTERACTIVE else False
+
+        def accept(response):
+            """Whether a response can win a hedge race; a throttle from either attempt is obeyed."""
+            if response.status in (429, 503):
+                provider.budget.throttle(parse_retry_after(response.headers.get('retry-after'), default=5.0))
+                return False
+            return response.status < 500
+        for attempt in range(2):
+            if not await provider.budget.acquire_async(priority, timeout=wait):
+                raise DictionaryUnavailable("Dictionary request budget exhausted")
+            try:
+                response = await endpoint.call(
+                    lambda timeout: self.http.request('GET', url, timeout=timeout), hedge=hedge, accept=accept)
+            except HTTPError as e:
+                raise DictionaryUnavailable(str(e)) from e
+            if response.status == 200:
+                try:
+                    return provider.parse(word, language, response.json())
+                except (ValueError, AttributeError, IndexError, TypeError):
+                    return None
+            if response.status == 404:
+                return None
+            if response.status in (429, 503):
+                retry_after = parse_retry_after(response.headers.get('retry-after'), default=5.0)
+                provider.budget.throttle(retry_after)
+                if priority == INTERACTIVE and attempt == 0 and retry_after <= self.max_retry_wait:
+                    continue
+                raise DictionaryUnavailable(f"Dictionary throttled (retry after {retry_after:.0f}s)")
+            raise DictionaryUnavailable(f"Dictionary returned HTTP {response.status}")
+        raise DictionaryUnavailable("Dictionary throttled")
+
+    async def _fetch_and_cache(self, word, priority, language):
+        entry = await self.afetch(word, priority, language)
+        if entry is not None:
+            self.cache_for(language).put(entry, key=word)
+        return entry
+
+    def _flight(self, word, priority, language):
+        """Fetch and cache a word, sharing a request already running for it at the same priority.
+
+        A capture never waits on a background fetch (which queues behind the
+        background backlog with no timeout); a background fetch does join a
+        capture's, since that one is served first anyway.
+        """
+        key = (language or self.language, EntryCache._key(word))
+        if priority != INTERACTIVE and self._flights.running(key + (INTERACTIVE,)):
+            priority = INTERACTIVE
+        return self._flights.do(key + (priority,), lambda: self._fetch_and_cache(word, priority, language))
+
+    async def alookup(self, word, priority=INTERACTIVE, language=None):
+        """Return the DictionaryEntry for a word, or None if nothing was found.
+
+        `language` picks the dictionary and cache partition (default: the
+        client's). Raises DictionaryUnavailable if the dictionary couldn't be asked.
+        """
+        entry = self.local(word, language)
+        if entry is not None:
+            return entry
+        return await self._flight(word, priority, language)
+
+    async def arefresh(self, word, priority=BACKGROUND, language=None):
+        """Re-fetch a word even if cached, updating the cache; glossary words aren't fetched."""
+        if self.glossary is not None:
+            entry = self.glossary.get(word, language or self.language)
+            if entry is not None:
+                return entry
+        return await self._flight(word, priority, language)
+
+    async def alookup_many(self, words, priority=INTERACTIVE):
+        """Look words up concurrently on the loop.
+
+        Returns entries (or None) in order, with a DictionaryUnavailable
+        instance in place of any lookup that failed.
+        """
+        return await asyncio.gather(*(self.alookup(word, priority) for word in words),
+                                    return_exceptions=True)
+
+    def _run(self, coro):
+        try:
+            return self.loop.run(coro)
+        except LoopStopped as e:
+            raise DictionaryUnavailable(str(e)) from e
+
+    def fetch(self, word, priority=INTERACTIVE, language=None):
+        return self._run(self.afetch(word, priority, language))
+
+    def lookup(self, word, priority=INTERACTIVE, language=None):
+        entry = self.local(word, language)
+        if entry is not None:
+            return entry
+        return self._run(self.alookup(word, priority, language))
+
+    def refresh(self, word, priority=BACKGROUND, language=None):
+        return self._run(self.arefresh(word, priority, language))
+
+    def lookup_many(self, words, priority=INTERACTIVE):
+        return self._run(self.alookup_many(words, priority))
+
+    def get_definition(self, word):
+        """Get the first definition for a word as plain text."""
+        try:
+            entry = self.lookup(word)
+        except DictionaryUnavailable:
+            entry = None
+        return entry.definition if entry else NO_DEFINITION
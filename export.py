@@ -0,0 +1,243 @@
+"""Streaming export of the card history and cached definitions.
+
+Formats: 'csv' (one column per field, with a header row), 'jsonl' (one
+object per line) and 'tsv', a tab-separated file with Anki's import
+headers (Front, Back, Deck, Tags), so File -> Import in Anki recreates the
+cards, e.g. in another profile.
+
+History rows are read from the history log (see history.py) and written as
+they're read, so memory use doesn't depend on how long the history is.
+Incremental runs ("since last export") resume from the log offset where the
+previous export of the same kind and format stopped; definitions resume
+from the fetch time of the previous export. Checkpoints live in
+~/.lexi_snap_export.json.
+"""
+
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dictionary import DictionaryEntry
+from templates import APP_TAG
+
+
+FORMATS = ('csv', 'jsonl', 'tsv')
+KINDS = ('history', 'definitions')
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.json': 'jsonl', '.ndjson': 'jsonl',
+              '.tsv': 'tsv', '.txt': 'tsv'}
+HISTORY_COLUMNS = ('word', 'definition', 'deck', 'language', 'timestamp', 'note_id', 'template',
+                   'sentence', 'source', 'window')
+DEFINITION_COLUMNS = ('word', 'language', 'part_of_speech', 'phonetic', 'definition', 'senses',
+                      'examples', 'synonyms', 'fetched_at')
+BUFFER_SIZE = 1 << 20
+
+
+class ExportError(Exception):
+    """The export could not be written (unknown format, unwritable file, ...)."""
+
+
+def format_for(path, fmt=None):
+    """The export format: `fmt` if given, else from the file extension (CSV by default)."""
+    fmt = fmt or EXTENSIONS.get(Path(str(path)).suffix.lower(), 'csv')
+    if fmt not in FORMATS:
+        raise ExportError(f"unknown export format {fmt!r} (use one of: {', '.join(FORMATS)})")
+    return fmt
+
+
+def _html(value):
+    """A cell for Anki's HTML import: no tabs, line breaks as <br>."""
+    return str(value).replace('\t', ' ').replace('\r\n', '\n').replace('\n', '<br>')
+
+
+class RowWriter:
+    """Writes dict rows to a text stream in one of FORMATS.
+
+    `card` maps a row to its (front, back, deck) for the Anki TSV format.
+    `write_all` keeps the per-row loop inside the csv module where it can.
+    """
+
+    def __init__(self, out, fmt, columns, card):
+        self.out = out
+        self.fmt = fmt
+        self.columns = columns
+        self.card = card
+        if fmt == 'csv':
+            self._csv = csv.writer(out, lineterminator='\n')
+            self._csv.writerow(columns)
+        elif fmt == 'tsv':
+            self._csv = csv.writer(out, delimiter='\t', lineterminator='\n')
+            out.write("#separator:tab\n#html:true\n#columns:Front\tBack\tDeck\tTags\n"
+                      "#deck column:3\n#tags column:4\n")
+
+    def _cells(self, row):
+        return map(row.get, self.columns)  # csv writes None as ''
+
+    def _card_cells(self, row):
+        front, back, deck = self.card(row)
+        return _html(front), _html(back), deck or '', APP_TAG
+
+    def write_all(self, rows):
+        if self.fmt == 'jsonl':
+            self.out.writelines(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                for row in rows)
+        elif self.fmt == 'csv':
+            self._csv.writerows(map(self._cells, rows))
+        else:
+            self._csv.writerows(map(self._card_cells, rows))
+
+
+def _history_card(item):
+    return item.get('word', ''), item.get('definition') or '', item.get('deck')
+
+
+def _definition_card(row):
+    return row['word'], row['senses'] or row['definition'], None
+
+
+def export_history(log, out, fmt='csv', since=0):
+    """Write history items from byte offset `since` of `log` to `out`.
+
+    A card updated later in the range (e.g. its definition filled in) is
+    written once, in its final state. In an incremental export an update of
+    a card exported before is a row again; in JSON lines it has
+    `"updated": true`.
+    Returns (rows written, offset to resume from next time).
+    """
+    progress = [0, since]  # rows, end offset
+
+    def items(raw):
+        for progress[1], item in log.latest(since, raw=raw):
+            progress[0] += 1
+            yield item
+
+    if fmt == 'jsonl':
+        out.writelines(items(raw=True))  # the log is JSON lines already
+    else:
+        RowWriter(out, fmt, HISTORY_COLUMNS, _history_card).write_all(items(raw=False))
+    return progress[0], progress[1]
+
+
+def read_definitions(path):
+    """{key: DictionaryEntry} of one definition cache file, last line per word winning.
+
+    The cache files are compacted to about their (bounded) capacity, so this
+    is small whatever the history size.
+    """
+    compact = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    key, data = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                compact[key] = data
+    except OSError:
+        return {}
+    entries = {}
+    for key, data in compact.items():
+        try:
+            entries[key] = DictionaryEntry.from_compact(data)
+        except (TypeError, IndexError):
+            continue
+    return entries
+
+
+def definition_files(data_dir, default_language='en'):
+    """(language, path) of every definition cache file in `data_dir`."""
+    for path in sorted(Path(data_dir).glob('.lexi_snap_definitions*.jsonl')):
+        parts = path.name.split('.')  # ['', 'lexi_snap_definitions', 'fr', 'jsonl']
+        yield (parts[2] if len(parts) == 4 else default_language), path
+
+
+def export_definitions(files, out, fmt='csv', since=0.0):
+    """Write the entries of (language, path) cache files fetched after `since` to `out`.
+
+    Returns (rows written, newest fetch time seen).
+    """
+    progress = [0, since]  # rows, newest fetch time
+
+    def rows():
+        for language, path in files:
+            for entry in read_definitions(path).values():
+                if entry.fetched_at <= since:
+                    continue
+                row = entry.as_fields()
+                del row['example']
+                row['language'] = language
+                row['fetched_at'] = datetime.fromtimestamp(entry.fetched_at).isoformat(timespec='seconds')
+                progress[0] += 1
+                progress[1] = max(progress[1], entry.fetched_at)
+                yield row
+
+    RowWriter(out, fmt, DEFINITION_COLUMNS, _definition_card).write_all(rows())
+    return progress[0], progress[1]
+
+
+class ExportCheckpoints:
+    """Where the last export of each kind and format stopped, in a small JSON file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        return self.load().get(key, {}).get('position', 0)
+
+    def set(self, key, position):
+        data = self.load()
+        data[key] = {'position': position, 'exported_at': time.time()}
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            print(f"Could not save export checkpoint: {e}")
+
+
+def export_to(settings_manager, path, fmt=None, kind='history', since_last=False):
+    """Export history or definitions to `path` ('-' for stdout). Returns the number of rows.
+
+    With `since_last`, only what was added since the previous export of the
+    same kind and format is written, and the checkpoint moves on only once
+    the file is complete.
+    """
+    fmt = format_for(path, fmt)
+    if kind not in KINDS:
+        raise ExportError(f"unknown export kind {kind!r} (use one of: {', '.join(KINDS)})")
+    data_dir = settings_manager.settings_file.parent
+    checkpoints = ExportCheckpoints(data_dir / '.lexi_snap_export.json')
+    key = f"{kind}.{fmt}"
+    since = checkpoints.get(key) if since_last else 0
+    log = settings_manager.history_log
+    if kind == 'history' and since > log.size():
+        since = 0  # the log was replaced since the last export
+
+    def write(out):
+        if kind == 'history':
+            return export_history(log, out, fmt, since)
+        return export_definitions(definition_files(data_dir), out, fmt, since)
+
+    if str(path) == '-':
+        count, position = write(sys.stdout)
+        sys.stdout.flush()
+    else:
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8', newline='', buffering=BUFFER_SIZE) as out:
+                count, position = write(out)
+            tmp.replace(path)
+        except OSError as e:
+            raise ExportError(f"could not write {path}: {e}") from e
+    checkpoints.set(key, position)
+    return count
@@ -0,0 +1,246 @@
+"""Spelling correction for selections the dictionary doesn't know (typos, OCR slips).
+
+A symmetric-delete index in the style of SymSpell: every headword is
+stored under its first PREFIX_LENGTH letters and each variant of those with
+one letter deleted. A query generates its own variants with up to two
+deletions, finds the headwords sharing one, and keeps those within
+`max_distance` edits (Damerau-Levenshtein, adjacent swaps counting once).
+That finds every word one edit away and most two edits away, without the
+index size of storing two-deletion variants of every headword.
+
+Headwords are added in chunks of CHUNK_SIZE. A chunk keeps its words as one
+'\\n'-joined string with an array of offsets, and its variants as a sorted
+array of 64-bit keys (40 bits of the variant's hash, then the word's
+position in the chunk), so 500k headwords take tens of MB rather than
+hundreds. Lookups bisect every chunk; a chunk is usable as soon as it is
+built, so a large word list can load in the background.
+
+Most words sharing a variant are far from the query, and the edit distance
+is the expensive part of a lookup. Each chunk also keeps a 32-bit set of
+the letters in every word: an edit can remove at most one letter the other
+word lacks, so a candidate with more than `max_distance` such letters (or
+lengths too far apart) is dropped without computing its distance.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+
+HEADWORDS_FILE = Path.home() / '.lexi_snap_headwords.txt'
+PREFIX_LENGTH = 7
+CHUNK_SIZE = 1 << 16
+MIN_LENGTH = 3  # shorter selections have too many neighbours to correct
+_HASH_MASK = (1 << 40) - 1
+_SLOT_MASK = CHUNK_SIZE - 1
+
+
+def _letters(word):
+    """Bit set of the letters in `word`, folded into 32 bits (a clash only weakens the filter)."""
+    mask = 0
+    for ch in set(word):
+        mask |= 1 << (ord(ch) & 31)
+    return mask
+
+
+def _deletes(word, depth):
+    """`word` and every variant of it with up to `depth` letters deleted."""
+    variants = {word}
+    edge = {word}
+    for _ in range(depth):
+        edge = {w[:i] + w[i + 1:] for w in edge for i in range(len(w))} - variants
+        variants |= edge
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance (optimal string alignment), or limit + 1 if above `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Typos touch a letter or two: only what lies between the common prefix and suffix matters
+    shorter = min(len(a), len(b))
+    i = 0
+    while i < shorter and a[i] == b[i]:
+        i += 1
+    j = 0
+    while j < shorter - i and a[-1 - j] == b[-1 - j]:
+        j += 1
+    a, b = a[i:len(a) - j], b[i:len(b) - j]
+    if not a or not b:
+        return min(len(a) or len(b), limit + 1)
+    # Only cells within `limit` of the diagonal can stay within `limit`
+    over = limit + 1
+    width = len(b)
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(width + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (width + 1)
+        if i <= limit:
+            current[0] = i
+        low, high = max(1, i - limit), min(width, i + limit)
+        best = current[0]
+        for j in range(low, high + 1):
+            cb = b[j - 1]
+            value = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class _Chunk:
+    """Up to CHUNK_SIZE headwords, their letter sets and their sorted variant keys."""
+
+    __slots__ = ('words', 'offsets', 'letters', 'keys')
+
+    def __init__(self, words):
+        self.words = '\n'.join(words)
+        self.letters = array('I', map(_letters, words))
+        self.offsets = array('I', [0])
+        keys = []
+        position = 0
+        for slot, word in enumerate(words):
+            position += len(word) + 1
+            self.offsets.append(position)
+            keys.extend([(hash(variant) & _HASH_MASK) << 16 | slot
+                         for variant in _deletes(word[:PREFIX_LENGTH], 1)])
+        keys.sort()
+        self.keys = array('q', keys)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def word(self, slot):
+        return self.words[self.offsets[slot]:self.offsets[slot + 1] - 1]
+
+    def slots(self, variant_hash):
+        """Slots of the words with a variant of this (masked) hash."""
+        keys = self.keys
+        low = variant_hash << 16
+        i = bisect_left(keys, low)
+        while i < len(keys) and keys[i] >> 16 == variant_hash:
+            yield keys[i] & _SLOT_MASK
+            i += 1
+
+
+class FuzzyIndex:
+    """Headwords to suggest corrections from; earlier headwords win ties.
+
+    Words are case-folded. build() indexes word lists a chunk at a time.
+    """
+
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self._chunks = []
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks)
+
+    @staticmethod
+    def _clean(words):
+        for word in words:
+            word = word.strip().casefold()
+            if len(word) >= MIN_LENGTH and '\n' not in word:
+                yield word
+
+    def _add_chunk(self, words):
+        chunk = _Chunk(list(dict.fromkeys(words)))
+        with self._lock:
+            self._chunks = self._chunks + [chunk]  # readers keep the list they started with
+
+    def build(self, sources):
+        """Index the headwords of every source: iterables of words or paths of word lists.
+
+        Word list files have one word per line; anything after a tab (e.g.
+        a frequency) is ignored, and missing files are skipped.
+        """
+        try:
+            batch = []
+            for source in sources:
+                if isinstance(source, (str, Path)):
+                    try:
+                        f = open(source, 'r', encoding='utf-8', errors='replace')
+                    except OSError:
+                        continue
+                    with f:
+                        words = [line.split('\t', 1)[0] for line in f]
+                else:
+                    words = source
+                for word in self._clean(words):
+                    batch.append(word)
+                    if len(batch) == CHUNK_SIZE:
+                        self._add_chunk(batch)
+                        batch = []
+            if batch:
+                self._add_chunk(batch)
+        finally:
+            self.ready.set()
+
+    def build_async(self, sources):
+        """build() on a background thread; suggestions use whatever is indexed so far."""
+        thread = threading.Thread(target=self.build, args=(list(sources),), daemon=True,
+                                  name='fuzzy-index')
+        thread.start()
+        return thread
+
+    def suggest(self, word, limit=3):
+        """Up to `limit` headwords within max_distance edits of `word`, closest first.
+
+        Suggestions keep a capitalised selection capitalised. A word that is
+        itself a headword, or too short, gets no suggestions.
+        """
+        query = word.strip().casefold()
+        if len(query) < MIN_LENGTH or ' ' in query:
+            return []
+        chunks = self._chunks  # replaced, never mutated, as chunks are added
+        prefix = query[:PREFIX_LENGTH]
+        max_distance = self.max_distance
+        letters = _letters(query)
+        shortest, longest = len(query) - max_distance, len(query) + max_distance
+        candidates = {}  # word -> position in the index, for ties
+        ranked = []
+        searched = set()
+        # One deletion from the query finds every word one edit away; only look
+        # further (two deletions, many more candidates) if that found nothing
+        for depth in range(1, max(max_distance, 1) + 1):
+            hashes = {hash(variant) & _HASH_MASK for variant in _deletes(prefix, depth)} - searched
+            searched |= hashes
+            found = {}
+            for number, chunk in enumerate(chunks):
+                offsets, chunk_letters = chunk.offsets, chunk.letters
+                for variant_hash in hashes:
+                    for slot in chunk.slots(variant_hash):
+                        other = chunk_letters[slot]
+                        if (bin(letters & ~other).count('1') > max_distance
+                                or bin(other & ~letters).count('1') > max_distance
+                                or not shortest <= offsets[slot + 1] - offsets[slot] - 1 <= longest):
+                            continue
+                        word_at = chunk.word(slot)
+                        if word_at not in candidates:
+                            candidates[word_at] = found[word_at] = number * CHUNK_SIZE + slot
+            for candidate, position in found.items():
+                distance = edit_distance(query, candidate, max_distance)
+                if distance == 0:
+                    return []
+                if distance <= max_distance:
+                    ranked.append((distance, position, candidate))
+            if ranked and min(ranked)[0] <= depth:
+                break
+
+        ranked.sort()
+        suggestions = [candidate for _, _, candidate in ranked[:limit]]
+        if word.strip()[:1].isupper():
+            suggestions = [candidate[:1].upper() + candidate[1:] for candidate in suggestions]
+        return suggestions
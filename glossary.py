@@ -0,0 +1,215 @@
+"""User glossary: definitions from the user's own CSV/JSON files, ahead of any dictionary.
+
+For jargon the public dictionaries don't have (medicine, law, company
+terms), or to override what they say. A glossary file is one of:
+
+    CSV/TSV   word,definition[,part_of_speech,example,language] - a header row
+              naming the columns is optional; repeated words become senses
+    JSON      {"word": "definition", "other": ["sense 1", "sense 2"], ...}
+              or [{"word": ..., "definition": ..., "part_of_speech": ...}, ...]
+
+Each file is parsed into a dict keyed by the lower-cased word - prefixed
+with the language for rows that only apply to one - holding plain tuples;
+a DictionaryEntry is only built for a hit. While watched, files are checked
+for changes (size and mtime) every `check_interval` seconds off the lookup
+path and re-read when they change, so edits apply without a restart. If a file no longer parses, its
+previous contents stay in use.
+"""
+
+import csv
+import json
+import os
+import threading
+from itertools import chain
+from operator import itemgetter
+from pathlib import Path
+
+from dictionary import DictionaryEntry, Sense
+
+
+GLOSSARY_FILE = Path.home() / '.lexi_snap_glossary.csv'
+COLUMNS = ('word', 'definition', 'part_of_speech', 'example', 'language')
+ALIASES = {'term': 'word', 'front': 'word', 'meaning': 'definition', 'back': 'definition',
+           'pos': 'part_of_speech', 'part of speech': 'part_of_speech', 'lang': 'language'}
+
+
+class GlossaryError(Exception):
+    """A glossary file could not be parsed."""
+
+
+def _column(name):
+    name = name.strip().lower()
+    return ALIASES.get(name, name)
+
+
+def _csv_rows(f, delimiter):
+    """(word, definition, part_of_speech, example, language) rows of a CSV/TSV file, unstripped."""
+    reader = csv.reader(f, delimiter=delimiter)
+    first = next(reader, None)
+    if first is None:
+        return iter(())
+    header = [_column(cell) for cell in first]
+    if 'word' in header and 'definition' in header:
+        # Missing columns read the padding's last cell
+        pick = itemgetter(*(header.index(name) if name in header else -1 for name in COLUMNS))
+    else:
+        pick = itemgetter(*range(len(COLUMNS)))
+        reader = chain((first,), reader)
+    padding = [''] * len(COLUMNS)  # short rows read blanks from here
+    return (pick(row + padding) for row in reader)
+
+
+def _json_rows(data):
+    """The same rows from either JSON layout."""
+    if isinstance(data, dict):
+        for word, value in data.items():
+            for sense in value if isinstance(value, list) else (value,):
+                if isinstance(sense, dict):
+                    yield from _json_rows([dict(sense, word=word)])
+                elif sense:
+                    yield str(word), str(sense), '', '', ''
+    elif isinstance(data, list):
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            item = {_column(key): value for key, value in item.items()}
+            yield tuple(str(item.get(name) or '') for name in COLUMNS)
+    else:
+        raise GlossaryError("expected an object or a list of objects")
+
+
+def _index_key(word, language=None):
+    """EntryCache's key for the word, prefixed with the language for language-specific rows."""
+    key = word.strip().lower()
+    return f"{language.lower()}\t{key}" if language else key
+
+
+def read_glossary(path):
+    """Parse a glossary file into {key: (word, senses)} (see _index_key).
+
+    `senses` is a tuple of (part_of_speech, definition, example) tuples.
+    Raises GlossaryError (or OSError) if the file can't be read.
+    """
+    path = Path(path)
+    index = {}
+    try:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if path.suffix.lower() == '.json':
+                rows = _json_rows(json.load(f))
+            else:
+                rows = _csv_rows(f, '\t' if path.suffix.lower() in ('.tsv', '.txt') else ',')
+            for word, definition, pos, example, language in rows:
+                word, definition = word.strip(), definition.strip()
+                if not word or not definition:
+                    continue
+                key = _index_key(word, language and language.strip())
+                sense = (pos and pos.strip(), definition, example and example.strip() or None)
+                found = index.get(key)
+                index[key] = (found[0], found[1] + (sense,)) if found else (word, (sense,))
+    except (ValueError, csv.Error) as e:
+        raise GlossaryError(f"{path.name}: {e}") from e
+    return index
+
+
+class Glossary:
+    """Lookups in the user's glossary files, reloaded when they change.
+
+    Later files override earlier ones for the same word. Lookups only read
+    the current indexes; `watch()` re-reads changed files on a daemon thread
+    and swaps the new indexes in with one assignment, so a lookup on the
+    network loop never waits for a parse.
+    """
+
+    def __init__(self, paths=(GLOSSARY_FILE,), check_interval=1.0):
+        self.paths = [Path(path).expanduser() for path in paths]
+        self.check_interval = check_interval
+        self._indexes = {}     # path -> (index of its last good parse, mtime); replaced, never changed
+        self._signatures = {}  # path -> (size, mtime_ns) it was parsed at, or None if missing
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self.reload()
+
+    def __len__(self):
+        return sum(len(index) for index, _ in self._indexes.values())
+
+    def _signature(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def reload(self, force=False):
+        """Re-read files that changed since they were last read. Returns how many were re-read."""
+        with self._lock:
+            indexes = dict(self._indexes)
+            reread = 0
+            for path in self.paths:
+                signature = self._signature(path)
+                if signature == self._signatures.get(path, False) and not force:
+                    continue
+                self._signatures[path] = signature
+                if signature is None:
+                    indexes.pop(path, None)
+                    continue
+                try:
+                    indexes[path] = (read_glossary(path), signature[1] / 1e9)
+                    reread += 1
+                except (OSError, GlossaryError) as e:
+                    print(f"Could not load glossary {path}: {e}")
+            self._indexes = indexes
+            return reread
+
+    def watch(self):
+        """Check the files every `check_interval` seconds on a daemon thread."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.check_interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Glossary watcher error: {e}")
+
+        self._watcher = threading.Thread(target=run, name='glossary-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        self._watcher = None
+
+    def set_paths(self, paths):
+        """Use these files from now on; files no longer listed are forgotten."""
+        with self._lock:
+            self.paths = [Path(path).expanduser() for path in paths]
+            self._indexes = {path: found for path, found in self._indexes.items() if path in self.paths}
+            for path in set(self._signatures) - set(self.paths):
+                del self._signatures[path]
+        self.reload()
+
+    def headwords(self):
+        """Every word in the glossary files (for the spelling index)."""
+        for index, _ in self._indexes.values():
+            for headword, _ in index.values():
+                yield headword
+
+    def get(self, word, language=None):
+        """The glossary's DictionaryEntry for a word, or None.
+
+        Rows for `language` win over rows without a language.
+        """
+        key = _index_key(word)
+        indexes = self._indexes
+        for path in reversed(self.paths):
+            index, mtime = indexes.get(path, (None, None))
+            if not index:
+                continue
+            found = (language and index.get(f"{language}\t{key}")) or index.get(key)
+            if found:
+                headword, senses = found
+                return DictionaryEntry(headword, senses=tuple(Sense(*sense) for sense in senses),
+                                       fetched_at=mtime)
+        return None
@@ -0,0 +1,165 @@
+"""Append-only log of every card added: the full history behind the settings' last-10 list.
+
+One JSON object per line, oldest first. A history item that changes later
+(e.g. the background refresher fills in a missing definition) is appended
+again in full with `"updated": true`, so the last line for an item is its
+current state. Items are told apart by their `id`, a random hex string
+given when the item is first written (the timestamp is only data: two
+cards added in the same clock tick share it). Items from before ids were
+given fall back to their `timestamp`. Readers stream the file and can
+start at a byte offset from an earlier read, which is what makes "since
+last export" runs cheap; `latest()` skips the lines a later update in the
+same range replaced.
+"""
+
+import json
+import re
+import threading
+from pathlib import Path
+
+
+HISTORY_FILE = Path.home() / '.lexi_snap_history.jsonl'
+_raw_decode = json.JSONDecoder().raw_decode  # no trailing-whitespace regex per line
+# Only a key can hold these unescaped quotes, so a plain substring test finds update lines
+UPDATED_MARK = '"updated":true'
+_ID = re.compile(r'"id":"([^"\\]*)"')
+_TIMESTAMP = re.compile(r'"timestamp":"([^"\\]*)"')
+
+
+def item_key(item):
+    """What tells a history item apart from the others: its id (its timestamp for old items)."""
+    return item.get('id') or item.get('timestamp')
+
+
+def _line_key(line):
+    """item_key() of an unparsed line."""
+    match = _ID.search(line) or _TIMESTAMP.search(line)
+    return match.group(1) if match else None
+
+
+class HistoryLog:
+    """The history log file; appends are thread-safe, reads stream in constant memory."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return self.path.exists()
+
+    def append(self, item):
+        self.extend((item,))
+
+    def append_update(self, item):
+        """Append the new state of an item already in the log."""
+        self.extend((dict(item, updated=True),))
+
+    def extend(self, items):
+        lines = ''.join(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n'
+                        for item in items)
+        with self._lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+            except OSError as e:
+                print(f"Could not write history log: {e}")
+
+    def size(self):
+        """Current end of the log in bytes: the offset a later read can resume from."""
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def read(self, since=0, until=None, raw=False):
+        """Yield (end offset, item) for each complete line between two byte offsets.
+
+        `since` must be 0 or an offset this method returned. Reading stops at
+        `until` (default: the size when called) and before a trailing line that
+        is still being written; malformed lines are skipped. With `raw` the
+        items are the lines themselves (str, newline included), unparsed.
+        """
+        until = self.size() if until is None else until
+        if since >= until:
+            return
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return
+        with f:
+            f.seek(since)
+            offset = since
+            for line in f:
+                if offset + len(line) > until or not line.endswith(b'\n'):
+                    return
+                offset += len(line)
+                try:
+                    line = line.decode('utf-8')
+                    item = line if raw else _raw_decode(line)[0]
+                except ValueError:
+                    continue
+                if raw or isinstance(item, dict):
+                    yield offset, item
+
+    def latest(self, since=0, until=None, raw=False):
+        """read(), skipping lines of items that an update later in the same range replaced.
+
+        Updates are rare, so a first pass over the range only remembers
+        where each updated item's last line is; memory stays proportional
+        to the updates, not to the log.
+        """
+        until = self.size() if until is None else until
+        last = {}
+        for offset, line in self.read(since, until, raw=True):
+            if UPDATED_MARK in line:
+                key = _line_key(line)
+                if key:
+                    last[key] = offset
+        for offset, item in self.read(since, until, raw):
+            if last:
+                key = _line_key(item) if raw else item_key(item)
+                if key in last and last[key] != offset:
+                    continue
+            yield offset, item
+
+    def newest(self, block=64 * 1024):
+        """Yield the items newest first, each once and in its latest state.
+
+        Reads the file backwards in blocks, so the most recent cards cost
+        the same however long the log is. An update is held back until the
+        item's own line is reached, so items come in the order they were
+        added; a trailing line still being written is skipped.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return
+        updates = {}  # item_key() -> latest state, for items not reached yet
+        with f:
+            end = f.seek(0, 2)
+            buffer = b''
+            trailing = True
+            while end > 0:
+                start = max(0, end - block)
+                f.seek(start)
+                buffer = f.read(end - start) + buffer
+                end = start
+                lines = buffer.split(b'\n')
+                if trailing:
+                    if len(lines) == 1 and start:
+                        continue  # no newline yet in the unfinished last line
+                    lines.pop()
+                    trailing = False
+                buffer = lines.pop(0) if start and lines else b''
+                for line in reversed(lines):
+                    try:
+                        item = _raw_decode(line.decode('utf-8'))[0]
+                    except ValueError:
+                        continue
+                    if not isinstance(item, dict):
+                        continue
+                    key = item_key(item)
+                    if item.get('updated'):
+                        updates.setdefault(key, item)
+                    else:
+                        yield updates.pop(key, item)
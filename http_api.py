@@ -0,0 +1,277 @@
+"""Optional localhost HTTP/JSON API over the capture pipeline.
+
+Lets browser extensions, e-reader sync scripts and the like look words up and
+add cards through the running app, sharing its entry cache, dictionary
+request budget and AnkiConnect session.
+
+Connections (HTTP/1.1 keep-alive) are served on the pipeline's network event
+loop, the same one its dictionary and AnkiConnect requests run on, so lookups
+are awaited directly without any thread. Adds, which also write history and
+render templates, run on a small fixed worker pool, so a burst of requests
+queues there instead of starting a thread per call.
+
+Endpoints (JSON in and out):
+    GET  /lookup?word=&language=?    -> {"word", "found", "fields"}   language detected if omitted
+    POST /add        {"word", "deck"?}            -> {"word", "note_id", "definition"}
+    POST /batch-add  {"words": [...], "deck"?}    -> {"results": [{"word", "note_id", "definition"}]}
+    GET  /history?limit=&q=          -> {"history": [...]}   newest first, from the whole history log
+    GET  /stats?sync=                -> review stats of the app's cards   sync=1 pulls changes from Anki first
+    GET  /metrics                    -> counters, timings, cache, budget and per-endpoint latency state
+
+Only requests addressed to localhost are served, POST bodies must be JSON
+(so a web page can't send them without a CORS preflight, which is never
+answered), and when `api_token` is set every request needs
+`Authorization: Bearer <token>`.
+"""
+
+import asyncio
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+from aio import HTTPError
+from anki import AnkiError
+from core import NO_DEFAULT_DECK
+
+
+DEFAULT_PORT = 8766
+MAX_BODY = 1 << 20
+MAX_BATCH = 500
+LOCAL_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+    415: 'Unsupported Media Type', 500: 'Internal Server Error', 502: 'Bad Gateway',
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    """Serves the API on 127.0.0.1 from the pipeline's network event loop."""
+
+    def __init__(self, pipeline, port=DEFAULT_PORT, token='', workers=4):
+        self.pipeline = pipeline
+        self.port = port
+        self.token = token or ''
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self.loop = pipeline.loop
+        self._server = None
+        self._connections = set()
+        self.routes = {
+            ('GET', '/lookup'): self.lookup,
+            ('POST', '/add'): self.add,
+            ('POST', '/batch-add'): self.batch_add,
+            ('GET', '/history'): self.history,
+            ('GET', '/stats'): self.stats,
+            ('GET', '/metrics'): self.metrics,
+        }
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self):
+        """Start serving. Raises OSError if the port can't be bound."""
+        self._server = self.loop.run(
+            asyncio.start_server(self._handle_connection, '127.0.0.1', self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        """Stop listening and drop open connections; the loop itself belongs to the pipeline."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._server is None:
+            return
+        try:
+            self.loop.run(self._close(), timeout=2)
+        except HTTPError:
+            pass  # loop already stopped, which closed everything anyway
+
+    async def _close(self):
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    # ==================== HTTP ====================
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self._dispatch(method, target, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.CancelledError):
+            pass  # client went away, or the server is stopping
+        except ApiError as e:
+            # Malformed framing - answer once, then drop the connection
+            self._write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ApiError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise ApiError(400, "malformed Content-Length")
+        if length < 0:
+            raise ApiError(400, "malformed Content-Length")
+        if length > MAX_BODY:
+            raise ApiError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+
+    async def _dispatch(self, method, target, headers, body):
+        self.pipeline.metrics.incr('api_requests')
+        try:
+            self._check_request(method, headers)
+            url = urlsplit(target)
+            handler = self.routes.get((method, url.path))
+            if handler is None:
+                if any(path == url.path for _, path in self.routes):
+                    raise ApiError(405, f"{method} not allowed on {url.path}")
+                raise ApiError(404, f"no such endpoint: {url.path}")
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            data = {}
+            if method == 'POST':
+                try:
+                    data = json.loads(body or b'{}')
+                except ValueError:
+                    raise ApiError(400, "body is not valid JSON")
+                if not isinstance(data, dict):
+                    raise ApiError(400, "body must be a JSON object")
+            return 200, await handler(query, data)
+        except ApiError as e:
+            self.pipeline.metrics.incr('api_errors')
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            self.pipeline.metrics.incr('api_errors')
+            print(f"API error: {e}")
+            return 500, {'error': str(e)}
+
+    def _check_request(self, method, headers):
+        try:
+            host = urlsplit('//' + headers.get('host', '')).hostname  # strips the port, and [] of IPv6
+        except ValueError:
+            host = None
+        if host not in LOCAL_HOSTS:
+            raise ApiError(403, "only localhost requests are served")
+        if self.token:
+            supplied = headers.get('authorization', '')
+            if not hmac.compare_digest(supplied.encode(), f"Bearer {self.token}".encode()):
+                raise ApiError(401, "missing or wrong API token")
+        if method == 'POST' and not headers.get('content-type', '').startswith('application/json'):
+            raise ApiError(415, "POST bodies must be application/json")
+
+    async def _in_worker(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ==================== ENDPOINTS ====================
+
+    def _deck(self, data):
+        deck = data.get('deck') or self.pipeline.settings_manager.get('default_deck')
+        if not deck or deck == NO_DEFAULT_DECK:
+            raise ApiError(409, "no deck given and no default deck set")
+        return deck
+
+    @staticmethod
+    def _word(value):
+        if not isinstance(value, str) or not value.strip():
+            raise ApiError(400, "'word' must be a non-empty string")
+        return value.strip()
+
+    async def lookup(self, query, data):
+        word = self._word(query.get('word'))
+        entry = await self.pipeline.alookup_entry(word, language=query.get('language') or None)
+        return {'word': word, 'found': entry is not None, 'fields': entry.as_fields() if entry else None}
+
+    async def add(self, query, data):
+        word = self._word(data.get('word'))
+        note_id, definition = await self._in_worker(self.pipeline.add_word, word, self._deck(data))
+        if not note_id:
+            raise ApiError(502, "Anki did not add the note (duplicate, or Anki not running)")
+        return {'word': word, 'note_id': note_id, 'definition': definition}
+
+    async def batch_add(self, query, data):
+        words = data.get('words')
+        if not isinstance(words, list) or not words:
+            raise ApiError(400, "'words' must be a non-empty list")
+        if len(words) > MAX_BATCH:
+            raise ApiError(413, f"at most {MAX_BATCH} words per batch")
+        words = [self._word(w) for w in words]
+        deck = self._deck(data)
+        results = await self._in_worker(lambda: list(self.pipeline.add_words(words, deck)))
+        return {'results': [
+            {'word': word, 'note_id': note_id, 'definition': definition}
+            for word, note_id, definition in results
+        ]}
+
+    async def history(self, query, data):
+        try:
+            limit = max(0, int(query.get('limit', 50)))
+        except ValueError:
+            raise ApiError(400, "'limit' must be an integer")
+        needle = query.get('q', '').lower()
+        log = self.pipeline.settings_manager.history_log
+
+        def matching():
+            items = (item for item in log.newest() if not needle or needle in item.get('word', '').lower())
+            return list(islice(items, limit))
+        return {'history': await self._in_worker(matching)}
+
+    async def stats(self, query, data):
+        reviews = self.pipeline.reviews
+        if query.get('sync') in ('1', 'true'):
+            try:
+                with self.pipeline.metrics.timer('review_sync'):
+                    await reviews.apull()
+            except AnkiError as e:
+                raise ApiError(502, str(e))
+        return reviews.summary()
+
+    async def metrics(self, query, data):
+        # Counting missing definitions reads what was appended to the history log
+        return await self._in_worker(self.pipeline.metrics_snapshot)
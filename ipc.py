@@ -0,0 +1,196 @@
+"""Command channel between a second launch and the running instance.
+
+The resident app listens on a per-user local endpoint (a named pipe on
+Windows, a Unix socket on Linux - see Platform.ipc_address). A second launch
+such as `lexi-snap --add serendipity` connects, sends one request holding a
+batch of commands and prints the results as they stream back, so the work
+runs on the resident process's warm caches and connections.
+
+Wire format: JSON documents over multiprocessing.connection's framed
+messages (send_bytes/recv_bytes; nothing is pickled). The connection is
+authenticated with a random per-user key stored in ~/.lexi_snap_ipc_key.
+
+Request:   {"version": 1, "commands": [{"op": "add", "words": [...], "deck": null}, ...]}
+Responses: {"command": <index>, "op": ..., "ok": true, ...}   zero or more per command
+           {"command": <index>, "op": ..., "ok": false, "error": "..."}
+           {"done": true}                                      after the last command
+
+Commands:
+    ping                     -> {"version": 1}
+    show                     bring the settings window to the front
+    lookup  {word}           -> {"word", "definition", "part_of_speech", "phonetic"}
+    add     {words, deck}    -> one {"word", "note_id", "definition"} per word
+    diagnostics {directory}  -> {"path"} of a diagnostics bundle (see diagnostics.py)
+"""
+
+import json
+import os
+import secrets
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+from core import NO_DEFAULT_DECK
+
+
+PROTOCOL_VERSION = 1
+AUTHKEY_FILE = Path.home() / '.lexi_snap_ipc_key'
+
+
+class IPCError(Exception):
+    """The running instance could not be reached or rejected the request."""
+
+
+def load_authkey(path=AUTHKEY_FILE):
+    """Read the per-user IPC key, creating it (readable by the user only) on first use."""
+    path = Path(path)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    key = secrets.token_hex(32).encode()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return path.read_bytes()  # another process created it first
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+class CommandHandler:
+    """Runs IPC commands against the capture pipeline."""
+
+    def __init__(self, pipeline, show_window=None, dump_diagnostics=None):
+        self.pipeline = pipeline
+        self.show_window = show_window
+        self.dump_diagnostics = dump_diagnostics
+
+    def run(self, commands):
+        """Run a batch of commands in order, yielding response messages."""
+        for index, command in enumerate(commands):
+            op = command.get('op')
+            method = getattr(self, f"_op_{op}", None)
+            if method is None:
+                yield {'command': index, 'op': op, 'ok': False, 'error': f"unknown command: {op}"}
+                continue
+            try:
+                for result in method(command):
+                    yield dict(result, command=index, op=op, ok=True)
+            except Exception as e:
+                yield {'command': index, 'op': op, 'ok': False, 'error': str(e)}
+
+    def _op_ping(self, command):
+        yield {'version': PROTOCOL_VERSION}
+
+    def _op_show(self, command):
+        if self.show_window is None:
+            raise IPCError("no window to show")
+        self.show_window()
+        yield {}
+
+    def _op_diagnostics(self, command):
+        if self.dump_diagnostics is None:
+            raise IPCError("diagnostics are only available from the running app")
+        yield {'path': str(self.dump_diagnostics(command.get('directory')))}
+
+    def _op_lookup(self, command):
+        word = command['word']
+        entry = self.pipeline.lookup_entry(word)
+        fields = entry.as_fields() if entry else {}
+        yield {
+            'word': word,
+            'definition': fields.get('definition'),
+            'part_of_speech': fields.get('part_of_speech'),
+            'phonetic': fields.get('phonetic'),
+        }
+
+    def _op_add(self, command):
+        deck = command.get('deck') or self.pipeline.settings_manager.get('default_deck')
+        if not deck or deck == NO_DEFAULT_DECK:
+            raise IPCError("no deck given and no default deck set")
+        for word, note_id, definition in self.pipeline.add_words(command['words'], deck):
+            yield {'word': word, 'note_id': note_id, 'definition': definition}
+
+
+class IPCServer:
+    """Accepts command connections on a daemon thread, one handler thread per client."""
+
+    def __init__(self, address, handler, authkey=None):
+        self.address = address
+        self.handler = handler
+        self.authkey = authkey or load_authkey()
+        self.listener = None
+        self._running = False
+
+    def start(self):
+        # We hold the instance lock, so a leftover socket file is from a crashed run
+        if not self.address.startswith('\\\\'):
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+        self.listener = Listener(self.address, authkey=self.authkey)
+        self._running = True
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self.listener:
+            try:
+                self.listener.close()
+            except OSError:
+                pass
+
+    def _serve(self):
+        while self._running:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                if not self._running:
+                    return
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        try:
+            with conn:
+                request = json.loads(conn.recv_bytes())
+                if request.get('version') != PROTOCOL_VERSION:
+                    conn.send_bytes(json.dumps({
+                        'command': None, 'ok': False,
+                        'error': f"protocol version {request.get('version')} not supported",
+                    }).encode())
+                else:
+                    for message in self.handler.run(request.get('commands') or []):
+                        conn.send_bytes(json.dumps(message).encode())
+                conn.send_bytes(json.dumps({'done': True}).encode())
+        except (EOFError, OSError, ValueError) as e:
+            print(f"IPC connection error: {e}")
+
+
+def send_commands(address, commands, authkey=None, idle_timeout=120):
+    """Send a command batch to the running instance and yield its responses.
+
+    Raises IPCError if no instance is listening, authentication fails, or a
+    response takes longer than `idle_timeout` seconds.
+    """
+    try:
+        conn = Client(address, authkey=authkey or load_authkey())
+    except (OSError, AuthenticationError) as e:
+        raise IPCError(f"Lexi Snap is not responding: {e}") from e
+    with conn:
+        conn.send_bytes(json.dumps({'version': PROTOCOL_VERSION, 'commands': commands}).encode())
+        while True:
+            if not conn.poll(idle_timeout):
+                raise IPCError("Timed out waiting for Lexi Snap")
+            try:
+                message = json.loads(conn.recv_bytes())
+            except (EOFError, OSError) as e:
+                raise IPCError(f"Connection to Lexi Snap lost: {e}") from e
+            if message.get('done'):
+                return
+            yield message
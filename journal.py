@@ -0,0 +1,170 @@
+"""Crash-safe journal of hotkey captures, so a capture survives the app dying mid-way.
+
+Each capture appends one line per stage it reaches:
+
+    captured  the selection was read (word, deck, route, source context)
+    adding    the card's note is about to be sent to Anki (corrected word, definition)
+    added     Anki returned the note id
+    done      the card is in the history, or the capture ended without one
+              (`outcome` is 'added', 'failed' or 'cancelled')
+
+Lines are written and flushed to the OS straight away, which is all that
+surviving a crash or kill of the process needs. fsync (against power loss)
+is batched on a daemon thread every `sync_interval`, so a capture never
+waits for the disk. On the next start the captures without a 'done' line
+are recovered with the last state they reached; the pipeline replays them
+(see CapturePipeline.replay_journal), looking in Anki before re-adding one
+that got as far as 'adding', so a card is added at least once and never twice.
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+
+JOURNAL_FILE = Path.home() / '.lexi_snap_journal.jsonl'
+COMPACT_SIZE = 64 * 1024  # truncate the file past this size once no capture is open
+
+
+class CaptureJournal:
+    """The journal file: thread-safe appends with batched fsync, and the captures recovered at startup."""
+
+    def __init__(self, path=JOURNAL_FILE, sync_interval=0.05):
+        self.path = Path(path)
+        self.sync_interval = sync_interval
+        self.syncs = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._open = set()  # ids of captures without a 'done' line
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None  # the fsync thread, started by the first write
+        self._recovered = self._recover()
+
+    def _recover(self):
+        """Merge the file's lines per capture; keep the unfinished ones and rewrite the file with just those."""
+        captures = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # the line being written when the process died
+                    if isinstance(record, dict) and 'id' in record:
+                        captures.setdefault(record['id'], {}).update(record)
+        except OSError:
+            pass
+        pending = [capture for capture in captures.values() if capture.get('stage') != 'done']
+        text = ''.join(self._line(capture) for capture in pending)
+        tmp = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not rewrite capture journal: {e}")
+        self._size = len(text.encode('utf-8'))
+        self._open.update(capture['id'] for capture in pending)
+        return pending
+
+    @staticmethod
+    def _line(record):
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _write(self, record):
+        line = self._line(record)
+        with self._lock:
+            if record['stage'] == 'done':
+                self._open.discard(record['id'])
+            else:
+                self._open.add(record['id'])
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                if not self._open and self._size > COMPACT_SIZE:
+                    # Every capture in the file is finished: start it over
+                    self._file.truncate(0)
+                    self._size = 0
+                    return
+                self._file.write(line)
+                self._file.flush()
+                self._size += len(line.encode('utf-8'))
+            except OSError as e:
+                print(f"Could not write capture journal: {e}")
+                return
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._sync_loop, daemon=True, name='journal-sync')
+                self._thread.start()
+        self._dirty.set()
+
+    def _sync_loop(self):
+        while True:
+            self._dirty.wait()
+            if self._stop.is_set():
+                return
+            # Let the rest of a burst of lines in, then make them all durable at once
+            if self._stop.wait(self.sync_interval):
+                return
+            self.sync()
+
+    def sync(self):
+        """fsync what has been written so far."""
+        with self._lock:
+            self._dirty.clear()
+            if self._file is None:
+                return
+            try:
+                os.fsync(self._file.fileno())
+                self.syncs += 1
+            except (OSError, ValueError) as e:
+                print(f"Could not sync capture journal: {e}")
+
+    def close(self):
+        """Stop the fsync thread and sync what is left. Later writes are still flushed, but not fsynced."""
+        with self._lock:
+            self._stop.set()
+            thread = self._thread
+        self._dirty.set()
+        if thread is not None:
+            thread.join()
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ==================== STAGES ====================
+
+    def captured(self, word, deck, route, source):
+        """Journal a new capture. `deck` is None if the user is asked for one. Returns its id."""
+        capture_id = uuid.uuid4().hex
+        self._write({'id': capture_id, 'stage': 'captured', 'word': word, 'deck': deck,
+                     'route': route.to_spec(), 'source': source.to_history()})
+        return capture_id
+
+    def adding(self, capture_id, word, deck, definition):
+        self._write({'id': capture_id, 'stage': 'adding', 'word': word, 'deck': deck,
+                     'definition': definition})
+
+    def added(self, capture_id, note_id):
+        self._write({'id': capture_id, 'stage': 'added', 'note_id': note_id})
+
+    def done(self, capture_id, outcome='added'):
+        self._write({'id': capture_id, 'stage': 'done', 'outcome': outcome})
+
+    def take_recovered(self):
+        """The captures a previous run left unfinished (each its merged state), once."""
+        with self._lock:
+            recovered, self._recovered = self._recovered, []
+        return recovered
+
+    def pending(self):
+        """How many captures, recovered or from this run, are not finished."""
+        with self._lock:
+            return len(self._open)
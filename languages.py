@@ -0,0 +1,90 @@
+"""Fast local guess of a selection's language, from its script and letters.
+
+Good enough to route a lookup to the right dictionary before any request
+is made: non-Latin scripts identify the language (or a short list of
+candidates), and accented Latin letters vote for the languages that use
+them. Plain ASCII returns None - the caller's default language (English)
+applies. `candidates` (the languages the user studies) breaks ties, e.g.
+Cyrillic -> 'uk' rather than 'ru' for someone learning Ukrainian.
+"""
+
+from bisect import bisect_right
+
+
+# (first code point, last code point, languages using the script, most likely first)
+SCRIPT_RANGES = (
+    (0x0370, 0x03FF, ('el',)),
+    (0x0400, 0x04FF, ('ru', 'uk', 'bg', 'sr')),
+    (0x0530, 0x058F, ('hy',)),
+    (0x0590, 0x05FF, ('he', 'yi')),
+    (0x0600, 0x06FF, ('ar', 'fa', 'ur')),
+    (0x0900, 0x097F, ('hi', 'mr', 'ne')),
+    (0x0E00, 0x0E7F, ('th',)),
+    (0x10A0, 0x10FF, ('ka',)),
+    (0x1100, 0x11FF, ('ko',)),
+    (0x3040, 0x30FF, ('ja',)),            # hiragana and katakana
+    (0x3400, 0x4DBF, ('zh', 'ja')),
+    (0x4E00, 0x9FFF, ('zh', 'ja')),       # CJK ideographs: kana decide for Japanese
+    (0xAC00, 0xD7AF, ('ko',)),
+)
+_RANGE_STARTS = tuple(start for start, _, _ in SCRIPT_RANGES)
+
+# Accented Latin letters -> languages that use them, most common first
+LATIN_LETTERS = {
+    'ß': ('de',), 'ä': ('de', 'sv', 'fi'), 'ö': ('de', 'sv', 'fi', 'tr', 'hu'),
+    'ü': ('de', 'tr', 'hu'), 'ñ': ('es',), '¿': ('es',), '¡': ('es',),
+    'ç': ('fr', 'pt', 'tr'), 'œ': ('fr',), 'æ': ('da', 'no'), 'ø': ('da', 'no'),
+    'å': ('sv', 'da', 'no'), 'é': ('fr', 'es', 'pt', 'it'), 'è': ('fr', 'it'),
+    'ê': ('fr', 'pt'), 'ë': ('fr', 'nl'), 'à': ('fr', 'it', 'pt'), 'â': ('fr', 'pt'),
+    'î': ('fr',), 'ï': ('fr', 'nl'), 'ô': ('fr', 'pt'), 'û': ('fr',), 'ù': ('fr', 'it'),
+    'á': ('es', 'pt', 'hu'), 'í': ('es', 'pt', 'it', 'hu'), 'ó': ('es', 'pt', 'it', 'pl', 'hu'),
+    'ú': ('es', 'pt', 'hu'), 'ã': ('pt',), 'õ': ('pt',), 'ì': ('it',), 'ò': ('it',),
+    'ą': ('pl',), 'ę': ('pl',), 'ł': ('pl',), 'ń': ('pl',), 'ś': ('pl',), 'ź': ('pl',),
+    'ż': ('pl',), 'ć': ('pl',), 'č': ('cs',), 'ř': ('cs',), 'ě': ('cs',), 'ů': ('cs',),
+    'š': ('cs',), 'ž': ('cs',), 'ğ': ('tr',), 'ş': ('tr',), 'ı': ('tr',),
+    'ő': ('hu',), 'ű': ('hu',),
+}
+
+
+def _pick(languages, candidates):
+    if candidates:
+        for language in languages:
+            if language in candidates:
+                return language
+    return languages[0]
+
+
+def detect_language(text, candidates=()):
+    """Guess the language code of `text`, or None for plain ASCII / no clue."""
+    if text.isascii():
+        return None
+    votes = {}
+    order = []
+    for ch in text.lower():
+        if ch < '¡':
+            continue
+        code = ord(ch)
+        if code >= 0x0370:
+            i = bisect_right(_RANGE_STARTS, code) - 1
+            if i >= 0 and code <= SCRIPT_RANGES[i][1]:
+                languages = SCRIPT_RANGES[i][2]
+                if 'ja' in languages and _has_kana(text):
+                    return 'ja'  # ideographs alongside kana
+                return _pick(languages, candidates)
+            continue
+        for language in LATIN_LETTERS.get(ch, ()):
+            if language not in votes:
+                votes[language] = 0
+                order.append(language)
+            votes[language] += 1
+    if not votes:
+        return None
+    if candidates:
+        preferred = [language for language in order if language in candidates]
+        if preferred:
+            order = preferred
+    return max(order, key=lambda language: votes[language])
+
+
+def _has_kana(text):
+    return any('぀' <= ch <= 'ヿ' for ch in text)
@@ -0,0 +1,211 @@
+"""Rolling latency histograms per endpoint, adaptive timeouts and hedged requests.
+
+A fixed timeout is wrong both ways: far too long for a local AnkiConnect
+that answers in milliseconds, too short for a dictionary on a slow link.
+Each Endpoint keeps a histogram of its recent latencies and derives:
+
+- its timeout: `factor` times the p99, clamped to [floor, ceiling], or the
+  endpoint's default until `min_samples` requests have been seen (a p99
+  needs a hundred or so to mean anything);
+- its hedge delay, the p95, once there are `hedge_samples`: an idempotent
+  request still running after it gets a duplicate, and whichever answers
+  first with a usable response wins, so one request stuck in the slow tail doesn't hold up a
+  capture. Hedges are capped at `hedge_ratio` of requests (plus a small
+  burst), so a slow server never sees double the load.
+
+Endpoints are used from coroutines on the network event loop.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import Counter
+
+from aio import HTTPTimeout
+
+
+MIN_LATENCY = 0.0005  # upper bound of the first bucket, in seconds
+GROWTH = 1.25         # each bucket is 25% wider than the one before
+BUCKETS = 56          # up to about 2 minutes
+_LOG_GROWTH = math.log(GROWTH)
+
+
+def _retrieve(task):
+    """Mark an unawaited attempt's error as seen."""
+    if not task.cancelled():
+        task.exception()
+
+
+class LatencyHistogram:
+    """Latencies of the last `window` to 2 * `window` requests, in log-spaced buckets.
+
+    Two generations of counts: when the current one has `window` samples it
+    becomes the previous one, and the old previous one is dropped.
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._current = [0] * BUCKETS
+        self._previous = [0] * BUCKETS
+        self._count = 0
+        self._previous_count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count + self._previous_count
+
+    def observe(self, seconds):
+        if seconds <= MIN_LATENCY:
+            bucket = 0
+        else:
+            bucket = min(BUCKETS - 1, math.ceil(math.log(seconds / MIN_LATENCY) / _LOG_GROWTH))
+        with self._lock:
+            if self._count >= self.window:
+                self._previous, self._current = self._current, [0] * BUCKETS
+                self._previous_count, self._count = self._count, 0
+            self._current[bucket] += 1
+            self._count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the `q` quantile (0-1), or None without samples."""
+        with self._lock:
+            counts = [a + b for a, b in zip(self._current, self._previous)]
+            total = self._count + self._previous_count
+        if not total:
+            return None
+        rank = q * total
+        running = 0
+        for bucket, count in enumerate(counts):
+            running += count
+            if running >= rank:
+                return MIN_LATENCY * GROWTH ** bucket
+        return MIN_LATENCY * GROWTH ** (BUCKETS - 1)
+
+
+class Endpoint:
+    """Latency history, timeout and hedging policy of one endpoint (a host and operation)."""
+
+    def __init__(self, default, floor, ceiling, factor=3.0, min_samples=100, window=200,
+                 hedge_samples=20, hedge_ratio=0.05, hedge_burst=2.0):
+        self.default = default
+        self.floor = floor
+        self.ceiling = max(ceiling, default)
+        self.factor = factor
+        self.min_samples = min_samples
+        self.hedge_samples = hedge_samples
+        self.hedge_ratio = hedge_ratio
+        self.hedge_burst = hedge_burst
+        self.histogram = LatencyHistogram(window)
+        self.counters = Counter()  # requests, timeouts, hedges, hedge_wins
+        self._hedge_tokens = hedge_burst
+
+    def timeout(self):
+        """Seconds to allow a request before giving up on it."""
+        if len(self.histogram) < self.min_samples:
+            return self.default
+        return min(self.ceiling, max(self.floor, self.histogram.quantile(0.99) * self.factor))
+
+    def hedge_delay(self):
+        """Seconds after which a request gets a hedge (the p95), or None while there's too little history."""
+        if len(self.histogram) < self.hedge_samples:
+            return None
+        return self.histogram.quantile(0.95)
+
+    async def _timed(self, attempt, timeout):
+        start = time.perf_counter()
+        try:
+            result = await attempt(timeout)
+        except HTTPTimeout:
+            self.counters['timeouts'] += 1
+            self.histogram.observe(timeout)  # it would have taken at least this long
+            raise
+        self.histogram.observe(time.perf_counter() - start)
+        return result
+
+    async def call(self, attempt, timeout=None, hedge=True, accept=None):
+        """Await `attempt(timeout)`, a coroutine function sending one request, and return its result.
+
+        `timeout` defaults to the adaptive one. With `hedge` true (or a
+        callable returning true when a hedge may be sent now, e.g. if a rate
+        limit has room), an attempt still running after the hedge delay gets a
+        second one and the first to succeed wins. A result `accept(result)`
+        turns down (a 429 or a 5xx, say) is not a success: the other attempt
+        is still waited for. The loser is left to finish unawaited: cancelling
+        it would drop the slow tail from the history and with it the timeout.
+        If no attempt succeeds, the first turned-down result is returned, or
+        else the first attempt's error is raised.
+        """
+        if timeout is None:
+            timeout = self.timeout()
+        self.counters['requests'] += 1
+        self._hedge_tokens = min(self.hedge_burst, self._hedge_tokens + self.hedge_ratio)
+        delay = self.hedge_delay() if hedge else None
+        first = asyncio.ensure_future(self._timed(attempt, timeout))
+        if delay is None or delay >= timeout:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._hedge_tokens >= 1 and (hedge is True or hedge()):
+                self._hedge_tokens -= 1
+                self.counters['hedges'] += 1
+                tasks.append(asyncio.ensure_future(self._timed(attempt, timeout)))
+            turned_down = []
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda task: task is not first):
+                    if task.exception() is not None:
+                        continue
+                    if accept is not None and not accept(task.result()):
+                        turned_down.append(task)
+                        continue
+                    if task is not first:
+                        self.counters['hedge_wins'] += 1
+                    for other in pending:
+                        other.add_done_callback(_retrieve)
+                    return task.result()
+                if not pending:
+                    return (turned_down[0] if turned_down else first).result()
+                tasks = list(pending)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def snapshot(self):
+        """Counters plus the current percentiles and timeout, in milliseconds."""
+        snapshot = dict(self.counters)
+        for name, q in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            value = self.histogram.quantile(q)
+            snapshot[name] = round(value * 1000, 1) if value is not None else None
+        snapshot['timeout_ms'] = round(self.timeout() * 1000, 1)
+        return snapshot
+
+
+class Endpoints:
+    """The Endpoints of one upstream, created on first use with shared settings.
+
+    `defaults` gives some endpoints their own cold-start timeout (e.g. a
+    quick status check), which also caps their floor.
+    """
+
+    def __init__(self, default, floor, ceiling, defaults=None, **options):
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self.defaults = defaults or {}
+        self.options = options
+        self._endpoints = {}
+
+    def get(self, name):
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            default = self.defaults.get(name, self.default)
+            endpoint = self._endpoints[name] = Endpoint(
+                default, min(self.floor, default), self.ceiling, **self.options)
+        return endpoint
+
+    def snapshot(self):
+        return {name: endpoint.snapshot() for name, endpoint in list(self._endpoints.items())}
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets', 'assets')],
-    hiddenimports=['pynput.keyboard._win32', 'pynput.mouse._win32'],
+    hiddenimports=['pynput.keyboard._win32', 'pynput.mouse._win32', 'platforms.windows'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,258 @@
+"""Words the user already studies, imported from their own Anki decks.
+
+The importer reads the front (first field) of every note in the chosen
+decks: `findNotes` for the ids, then `notesInfo` a page at a time, several
+pages to one `multi` request. Only one request's notes are held at once,
+so memory stays bounded however big the deck is. Words are appended to
+~/.lexi_snap_lexicon.tsv as "deck<TAB>word" lines; later imports of a deck
+only ask for notes edited since its checkpoint (added notes count as
+edited), and a full re-import replaces the deck's lines.
+
+In memory the lexicon is a sorted array of 64-bit word hashes (8 bytes a
+word) plus a small set of recent additions, rebuilt from the file at
+startup; membership is a binary search.
+"""
+
+import heapq
+import html
+import json
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from aio import LoopStopped
+from anki import AnkiError
+from dictionary import HTML_TAG
+
+
+LEXICON_FILE = Path.home() / '.lexi_snap_lexicon.tsv'
+SOUND_TAG = re.compile(r'\[sound:[^\]]*\]')
+EDGE_PUNCTUATION = ' .,;:!?"\'()[]{}«»“”‘’¿¡'
+MERGE_AT = 4096  # recent additions kept in a set before being merged into the array
+
+
+def normalize_word(text):
+    """The lexicon form of a note front or selection: plain text, case-folded, trimmed."""
+    if '<' in text or '&' in text or '[' in text:
+        text = html.unescape(HTML_TAG.sub(' ', SOUND_TAG.sub('', text)))
+    return ' '.join(text.split()).strip(EDGE_PUNCTUATION).casefold()
+
+
+def note_front(note):
+    """The first field's value of a notesInfo result, or ''."""
+    fields = note.get('fields') if isinstance(note, dict) else None
+    if not fields:
+        return ''
+    first = min(fields.values(), key=lambda field: field.get('order', 0))
+    return first.get('value', '')
+
+
+def _in_sorted(hashes, key):
+    i = bisect_left(hashes, key)
+    return i < len(hashes) and hashes[i] == key
+
+
+def deck_query(deck):
+    """Anki search term for the notes in `deck`."""
+    return 'deck:"' + deck.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class Lexicon:
+    """Known words from the user's decks, with incremental import from AnkiConnect.
+
+    `decks` maps each imported deck to {'checkpoint': time of its last
+    import}; it is kept in a JSON file next to the word file.
+    """
+
+    def __init__(self, path=LEXICON_FILE, page_size=500, pages_per_request=4):
+        self.path = Path(path) if path else None
+        self.meta_path = self.path.with_suffix('.json') if self.path else None
+        self.page_size = page_size
+        self.pages_per_request = pages_per_request
+        self.decks = {}
+        self._hashes = array('q')
+        self._recent = set()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes) + len(self._recent)
+
+    def __contains__(self, word):
+        key = hash(normalize_word(word))
+        with self._lock:
+            return key in self._recent or _in_sorted(self._hashes, key)
+
+    def add(self, words):
+        """Add normalized words to the in-memory index (not to the file)."""
+        with self._lock:
+            self._recent.update(hash(word) for word in words)
+            if len(self._recent) >= MERGE_AT:
+                self._merge()
+
+    def _merge(self):
+        # A sorted merge, so the only copy made is the new array itself
+        hashes = self._hashes
+        new = sorted(key for key in self._recent if not _in_sorted(hashes, key))
+        self._hashes = array('q', heapq.merge(hashes, new))
+        self._recent = set()
+
+    # ==================== FILE ====================
+
+    def load(self):
+        """Rebuild the index from the word file, and the deck checkpoints from theirs."""
+        if not self.path:
+            return
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                decks = json.load(f)
+        except (OSError, ValueError):
+            decks = {}
+        hashes = set()
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    _, _, word = line.rstrip('\n').partition('\t')
+                    if word:
+                        hashes.add(hash(word))
+        except OSError:
+            pass
+        with self._lock:
+            self.decks = decks if isinstance(decks, dict) else {}
+            self._hashes = array('q', sorted(hashes))
+            self._recent = set()
+        # Re-imported edits append their words again; drop the repeats once they pile up
+        if lines > 2 * len(hashes) + 1000:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the word file with each deck's word once."""
+        if not self.path or not self.path.exists():
+            return
+        seen = set()
+        tmp = self.path.with_suffix('.tmp')
+        with self._file_lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as src, open(tmp, 'w', encoding='utf-8') as dst:
+                    for line in src:
+                        key = hash(line)
+                        if key not in seen:
+                            seen.add(key)
+                            dst.write(line)
+                tmp.replace(self.path)
+            except OSError as e:
+                print(f"Could not compact lexicon: {e}")
+
+    def _save_decks(self):
+        if not self.meta_path:
+            return
+        try:
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump(self.decks, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"Could not save lexicon decks: {e}")
+
+    def _drop_lines(self, decks):
+        """Rewrite the word file without the lines of `decks`."""
+        if not self.path or not self.path.exists():
+            return
+        prefixes = tuple(deck + '\t' for deck in decks)
+        tmp = self.path.with_suffix('.tmp')
+        with self._file_lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as src, open(tmp, 'w', encoding='utf-8') as dst:
+                    dst.writelines(line for line in src if not line.startswith(prefixes))
+                tmp.replace(self.path)
+            except OSError as e:
+                print(f"Could not rewrite lexicon: {e}")
+
+    def _append(self, deck, words):
+        if not self.path or not words:
+            return
+        with self._file_lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(f"{deck}\t{word}\n" for word in words))
+            except OSError as e:
+                print(f"Could not write lexicon: {e}")
+
+    def forget(self, decks):
+        """Remove decks and their words."""
+        decks = [deck for deck in decks if deck in self.decks]
+        if not decks:
+            return
+        self._drop_lines(decks)
+        for deck in decks:
+            del self.decks[deck]
+        self._save_decks()
+        self.load()
+
+    # ==================== IMPORT ====================
+
+    async def aimport_decks(self, anki, decks, full=False, progress=None):
+        """Import note fronts from `decks`; returns the number of notes read.
+
+        Decks seen before only contribute notes edited since their
+        checkpoint unless `full` is set. `progress(deck, done, total)` is
+        called after every request. Raises AnkiError if Anki can't be reached.
+        """
+        notes = 0
+        for deck in decks:
+            notes += await self._aimport_deck(anki, deck.replace('\t', ' '), full, progress)
+        return notes
+
+    async def _aimport_deck(self, anki, deck, full, progress):
+        started = time.time()
+        since = self.decks.get(deck, {}).get('checkpoint', 0)
+        full = full or not since
+        query = deck_query(deck)
+        if not full:
+            # edited: counts whole days back from today, so round up and add today
+            query += f' edited:{math.ceil((started - since) / 86400) + 1}'
+        note_ids = await anki.ainvoke('findNotes', query=query) or []
+        if full and deck in self.decks:
+            self._drop_lines([deck])
+            self.load()
+        if progress:
+            progress(deck, 0, len(note_ids))
+
+        step = self.page_size * self.pages_per_request
+        for start in range(0, len(note_ids), step):
+            chunk = note_ids[start:start + step]
+            results = await anki.amulti([
+                ('notesInfo', {'notes': chunk[i:i + self.page_size]})
+                for i in range(0, len(chunk), self.page_size)
+            ])
+            words = []
+            for result in results:
+                if isinstance(result, AnkiError):
+                    raise result
+                for note in result or ():
+                    word = normalize_word(note_front(note))
+                    if word:
+                        words.append(word)
+            self._append(deck, words)
+            self.add(words)
+            if progress:
+                progress(deck, start + len(chunk), len(note_ids))
+
+        self.decks[deck] = {'checkpoint': started}
+        self._save_decks()
+        with self._lock:
+            self._merge()
+        return len(note_ids)
+
+    def import_decks(self, anki, decks, full=False, progress=None):
+        """Blocking aimport_decks()."""
+        try:
+            return anki.loop.run(self.aimport_decks(anki, decks, full, progress))
+        except LoopStopped as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
@@ -0,0 +1,221 @@
+"""Pronunciation audio: a content-addressed local media cache and Anki upload."""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+from aio import HTTPClient, HTTPError, LoopStopped, default_loop
+from anki import AnkiError
+from ratelimit import parse_retry_after
+
+
+PREDICTED_AUDIO_URL = "https://api.dictionaryapi.dev/media/pronunciations/en/{word}-us.mp3"
+
+
+class MediaCache:
+    """Downloaded media files named by the SHA-1 of their content.
+
+    An index maps source URLs to file names and remembers which files were
+    already sent to Anki. The total size is capped; least recently used files
+    are evicted first.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_file = directory / 'index.json'
+        self._lock = threading.Lock()
+        self._urls = {}      # source url -> file name
+        self._used = {}      # file name -> last use time
+        self._sizes = {}     # file name -> size in bytes
+        self._uploaded = set()
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        for name, used in index.get('used', {}).items():
+            path = self.directory / name
+            if path.exists():
+                self._used[name] = used
+                self._sizes[name] = path.stat().st_size
+        self._urls = {url: name for url, name in index.get('urls', {}).items() if name in self._used}
+        self._uploaded = {name for name in index.get('uploaded', []) if name in self._used}
+
+    def _save_index(self):
+        index = {'urls': self._urls, 'used': self._used, 'uploaded': sorted(self._uploaded)}
+        tmp = self.index_file.with_suffix('.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            tmp.replace(self.index_file)
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def path(self, name):
+        return self.directory / name
+
+    def lookup(self, url):
+        """Return the cached file name for a source URL, or None."""
+        with self._lock:
+            name = self._urls.get(url)
+            if name is not None:
+                self._used[name] = time.time()
+            return name
+
+    def store(self, url, data, extension='.mp3'):
+        """Store downloaded bytes and return the content-addressed file name."""
+        name = f"lexi-snap-{hashlib.sha1(data).hexdigest()[:16]}{extension}"
+        with self._lock:
+            if name not in self._sizes:
+                tmp = self.directory / (name + '.part')
+                try:
+                    with open(tmp, 'wb') as f:
+                        f.write(data)
+                    tmp.replace(self.directory / name)
+                except OSError:
+                    return None
+                self._sizes[name] = len(data)
+            self._urls[url] = name
+            self._used[name] = time.time()
+            self._evict(keep=name)
+            self._save_index()
+        return name
+
+    def _evict(self, keep=None):
+        total = sum(self._sizes.values())
+        if total <= self.max_bytes:
+            return
+        for name in sorted(self._used, key=self._used.get):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(self.directory / name)
+            except OSError:
+                pass
+            total -= self._sizes.pop(name, 0)
+            del self._used[name]
+            self._uploaded.discard(name)
+        self._urls = {url: n for url, n in self._urls.items() if n in self._used}
+
+    def is_uploaded(self, name):
+        with self._lock:
+            return name in self._uploaded
+
+    def mark_uploaded(self, name):
+        with self._lock:
+            if name in self._used and name not in self._uploaded:
+                self._uploaded.add(name)
+                self._save_index()
+
+
+class PronunciationFetcher:
+    """Downloads pronunciation audio alongside the definition lookup.
+
+    `prefetch` starts a download before the dictionary entry is known (using
+    the cached entry's URL, or the API's predictable URL scheme); `resolve`
+    then picks the right file once the entry arrives. Downloads run on the
+    network event loop, so a prefetch costs no thread.
+
+    Audio files are static, so downloads take no tokens from the dictionary's
+    request budget (a guessed URL that misses would otherwise spend a lookup's
+    token); they only stay away while a 429 from the host has it blocked.
+    """
+
+    def __init__(self, cache, anki, predicted_url=PREDICTED_AUDIO_URL, timeout=3, budget=None, loop=None):
+        self.cache = cache
+        self.anki = anki
+        self.budget = budget  # the dictionary client's - same upstream host, so a 429 pauses both
+        self.predicted_url = predicted_url
+        self.timeout = timeout
+        self.loop = loop or default_loop()
+        self.http = HTTPClient(self.loop)
+
+    @staticmethod
+    def preferred_url(entry):
+        """Pick the US recording if there is one, else the first available."""
+        if entry is None or not entry.audio_urls:
+            return None
+        for url in entry.audio_urls:
+            if url.endswith('-us.mp3'):
+                return url
+        return entry.audio_urls[0]
+
+    async def afetch(self, url):
+        """Return the cached file name for an audio URL, downloading it if needed."""
+        name = self.cache.lookup(url)
+        if name is not None:
+            return name
+        if self.budget is not None and self.budget.blocked_for() > 0:
+            return None
+        try:
+            response = await self.http.request('GET', url, timeout=self.timeout)
+        except HTTPError:
+            return None
+        if response.status == 429 and self.budget is not None:
+            self.budget.throttle(parse_retry_after(response.headers.get('retry-after'), default=5.0))
+            return None
+        if response.status != 200 or not response.body:
+            return None
+        extension = os.path.splitext(url.split('?', 1)[0])[1] or '.mp3'
+        return self.cache.store(url, response.body, extension)
+
+    def fetch(self, url):
+        """Blocking afetch() for callers that are not on the event loop."""
+        try:
+            return self.loop.run(self.afetch(url))
+        except LoopStopped:
+            return None
+
+    def prefetch(self, word, known_entry=None):
+        """Start downloading the likely audio for a word. Returns (url, future)."""
+        url = self.preferred_url(known_entry)
+        if url is None:
+            url = self.predicted_url.format(word=quote(word.strip().lower(), safe=''))
+        return url, self.loop.submit(self.afetch(url))
+
+    def resolve(self, entry, prefetched=None):
+        """Return the local file name of the entry's pronunciation, or None."""
+        url = self.preferred_url(entry)
+        if url is None:
+            return None
+        if prefetched is not None:
+            prefetched_url, future = prefetched
+            if prefetched_url == url:
+                try:
+                    return future.result(timeout=self.timeout)
+                except Exception:
+                    future.cancel()
+                    return None
+        return self.fetch(url)
+
+    def sound_tag(self, name):
+        """Make sure the file is in Anki's media folder and return its [sound:] tag.
+
+        Each file is uploaded once; later cards reference the existing copy.
+        """
+        if not name:
+            return ''
+        if not self.cache.is_uploaded(name):
+            try:
+                with open(self.cache.path(name), 'rb') as f:
+                    data = base64.b64encode(f.read()).decode('ascii')
+                self.anki.invoke('storeMediaFile', filename=name, data=data)
+            except (OSError, AnkiError) as e:
+                print(f"Failed to store pronunciation: {e}")
+                return ''
+            self.cache.mark_uploaded(name)
+        return f"[sound:{name}]"
@@ -0,0 +1,50 @@
+"""In-process counters and timings, reported by the local API's /metrics endpoint."""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Thread-safe event counters and per-operation timings (count, total, max)."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = Counter()
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Plain-dict copy: {'uptime', 'counters', 'timings': {name: {count, avg_ms, max_ms}}}."""
+        with self._lock:
+            return {
+                'uptime': round(time.time() - self.started, 1),
+                'counters': dict(self.counters),
+                'timings': {
+                    name: {'count': count, 'avg_ms': round(total / count * 1000, 2),
+                           'max_ms': round(peak * 1000, 2)}
+                    for name, (count, total, peak) in self.timings.items()
+                },
+            }
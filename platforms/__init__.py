@@ -0,0 +1,36 @@
+"""Platform backends for clipboard, hotkeys, tray, single-instance lock and autostart.
+
+`get_platform()` picks the backend for the running OS. Set LEXI_SNAP_PLATFORM
+to 'windows', 'linux' or 'fake' to override (the fake backend needs no
+display and is what the benchmarks use).
+"""
+
+import os
+import sys
+
+from platforms.base import (
+    MODIFIERS, Autostart, Capture, Clipboard, HotkeyBackend, InstanceLock, Platform, Tray,
+)
+
+
+def get_platform(name=None):
+    """Create the platform backend by name, defaulting to the current OS."""
+    name = name or os.environ.get('LEXI_SNAP_PLATFORM')
+    if not name:
+        name = 'windows' if sys.platform == 'win32' else 'linux'
+    if name == 'windows':
+        from platforms.windows import WindowsPlatform
+        return WindowsPlatform()
+    if name == 'linux':
+        from platforms.linux import LinuxPlatform
+        return LinuxPlatform()
+    if name == 'fake':
+        from platforms.fake import FakePlatform
+        return FakePlatform()
+    raise ValueError(f"Unknown platform: {name}")
+
+
+__all__ = [
+    'MODIFIERS', 'Autostart', 'Capture', 'Clipboard', 'HotkeyBackend', 'InstanceLock', 'Platform', 'Tray',
+    'get_platform',
+]
@@ -0,0 +1,234 @@
+"""pynput keyboard hooks and pystray tray icon, shared by the Windows and Linux backends."""
+
+import ctypes
+import sys
+import threading
+import time
+
+import pystray
+from pynput import keyboard
+
+from diagnostics import swallowed
+from platforms.base import HotkeyBackend, Tray
+from platforms.hotkeys import MODIFIER_KEYS, HotkeyMatcher, parse_hotkey
+
+
+KEY_NAME_ALIASES = {
+    'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift',
+    'cmd': 'win', 'cmd_l': 'win', 'cmd_r': 'win',
+}
+
+# Windows virtual key codes of the modifier keys (generic, left, right)
+MODIFIER_VKS = frozenset({0x10, 0x11, 0x12, 0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0x5B, 0x5C})
+
+
+# State bit (see MODIFIER_KEYS) of each left/right modifier, by Windows virtual key and X11 keysym name
+MODIFIER_STATE_VKS = ((0xA2, 0x01), (0xA3, 0x02), (0xA4, 0x04), (0xA5, 0x08),
+                      (0xA0, 0x10), (0xA1, 0x20), (0x5B, 0x40), (0x5C, 0x80))
+MODIFIER_STATE_KEYSYMS = (('Control_L', 0x01), ('Control_R', 0x02), ('Alt_L', 0x04), ('Alt_R', 0x08),
+                          ('ISO_Level3_Shift', 0x08), ('Shift_L', 0x10), ('Shift_R', 0x20),
+                          ('Super_L', 0x40), ('Super_R', 0x80))
+
+
+def modifier_reader():
+    """A function returning the state bits of the modifiers the OS has down, or None if unavailable.
+
+    Only called from the listener thread, so the X11 connection is its own.
+    """
+    if sys.platform == 'win32':
+        get_key_state = ctypes.windll.user32.GetAsyncKeyState
+
+        def held():
+            state = 0
+            for vk, bit in MODIFIER_STATE_VKS:
+                if get_key_state(vk) & 0x8000:
+                    state |= bit
+            return state
+        return held
+    try:
+        from Xlib import XK, display
+        connection = display.Display()
+        keycodes = [(connection.keysym_to_keycode(XK.string_to_keysym(name)), bit)
+                    for name, bit in MODIFIER_STATE_KEYSYMS]
+        keycodes = [(code, bit) for code, bit in keycodes if code]
+    except Exception:
+        swallowed()  # Wayland without XWayland, or no python-xlib: trust the key stream
+        return None
+
+    def held():
+        try:
+            keymap = connection.query_keymap()
+        except Exception:
+            swallowed()
+            return None
+        state = 0
+        for code, bit in keycodes:
+            if keymap[code >> 3] >> (code & 7) & 1:
+                state |= bit
+        return state
+    return held
+
+
+def key_name(key):
+    """Convert pynput key to readable name."""
+    try:
+        if hasattr(key, 'name') and key.name:
+            name = key.name.lower()
+            return KEY_NAME_ALIASES.get(name, name)
+
+        if hasattr(key, 'char') and key.char:
+            return key.char.lower()
+
+        if hasattr(key, 'vk') and key.vk:
+            vk = key.vk
+            if 65 <= vk <= 90:
+                return chr(vk).lower()
+            if 48 <= vk <= 57:
+                return chr(vk)
+            if 112 <= vk <= 123:
+                return f'f{vk - 111}'
+    except Exception as e:
+        print(f"Key detection error: {e}")
+    return None
+
+
+def trigger_tokens(name):
+    """Every token the non-modifier key `name` can arrive as.
+
+    Tokens are what the listener passes to the matcher: pynput Key members
+    as-is, KeyCodes by virtual key code (or by char when they have none).
+    """
+    tokens = set()
+    special = getattr(keyboard.Key, name, None)
+    if special is not None:
+        tokens.add(special)
+        if sys.platform == 'win32' and special.value.vk is not None:
+            tokens.add(special.value.vk)
+    elif len(name) == 1:
+        tokens.update((name, name.upper()))
+        if sys.platform == 'win32':
+            # Letters arrive by virtual key (Ctrl turns their char into a control code)
+            scan = ctypes.windll.user32.VkKeyScanW(ord(name))
+            if scan != -1:
+                tokens.add(scan & 0xFF)
+        else:
+            tokens.update((ord(name), ord(name.upper())))  # X11 keysyms of Latin-1 keys
+    else:
+        raise ValueError(f"Unknown key: {name!r}")
+    return tokens
+
+
+class PynputHotkeys(HotkeyBackend):
+    """Global hotkeys on one pynput keyboard listener, matched by HotkeyMatcher.
+
+    On Windows a low-level event filter drops every key that is neither a
+    modifier nor a hotkey trigger before pynput turns it into a key object.
+    """
+
+    def __init__(self):
+        self.listener = None
+        self.matcher = None
+
+    def register_many(self, bindings):
+        self.unregister()
+        modifier_bits = {getattr(keyboard.Key, name): bit for name, bit in MODIFIER_KEYS.items()
+                         if hasattr(keyboard.Key, name)}
+        self.matcher = matcher = HotkeyMatcher(modifier_bits, held=modifier_reader())
+        registered = []
+        relevant = set(MODIFIER_VKS)
+        for hotkey, callback in bindings.items():
+            try:
+                modifiers, trigger = parse_hotkey(hotkey)
+                triggers = trigger_tokens(trigger)
+            except ValueError as e:
+                print(f"Skipping hotkey: {e}")
+                continue
+            matcher.add(modifiers, triggers, callback)
+            relevant.update(token for token in triggers if token.__class__ is int)
+            registered.append('+'.join(sorted(modifiers) + [trigger]))
+        if not registered:
+            self.matcher = None
+            return registered
+        press, release, KeyCode = matcher.press, matcher.release, keyboard.KeyCode
+
+        def on_press(key, injected=False):
+            if key.__class__ is KeyCode:
+                key = key.vk if key.vk is not None else key.char
+            press(key)
+
+        def on_release(key, injected=False):
+            if key.__class__ is KeyCode:
+                key = key.vk if key.vk is not None else key.char
+            release(key)
+
+        options = {}
+        if sys.platform == 'win32':
+            relevant = frozenset(relevant)
+
+            def win32_event_filter(msg, data):
+                return data.vkCode in relevant
+            options['win32_event_filter'] = win32_event_filter
+
+        self.listener = keyboard.Listener(on_press=on_press, on_release=on_release, **options)
+        self.listener.start()
+        return registered
+
+    def unregister(self):
+        if self.listener:
+            try:
+                self.listener.stop()
+            except Exception:
+                swallowed()
+            self.listener = None
+            self.matcher = None
+
+    def listen_keys(self, on_press, on_release):
+        listener = keyboard.Listener(
+            on_press=lambda key: on_press(key_name(key)),
+            on_release=lambda key: on_release(key_name(key)),
+        )
+        listener.start()
+        return listener
+
+
+def send_copy():
+    """Release held modifiers (from the hotkey itself) and send Ctrl+C."""
+    kb = keyboard.Controller()
+    for key in [keyboard.Key.ctrl, keyboard.Key.alt, keyboard.Key.shift]:
+        try:
+            kb.release(key)
+        except Exception:
+            swallowed()
+    time.sleep(0.05)
+    with kb.pressed(keyboard.Key.ctrl):
+        kb.tap('c')
+
+
+class PystrayTray(Tray):
+    """Tray icon running pystray on its own thread."""
+
+    def __init__(self):
+        self.icon = None
+
+    def start(self, image, title, on_show, on_quit, actions=()):
+        menu = pystray.Menu(
+            pystray.MenuItem("Show Settings", lambda icon, item: on_show(), default=True),
+            *(pystray.MenuItem(label, lambda icon, item, callback=callback: callback())
+              for label, callback in actions),
+            pystray.MenuItem("Quit", lambda icon, item: on_quit())
+        )
+        self.icon = pystray.Icon("lexi-snap", image, title, menu)
+        threading.Thread(target=self.icon.run, daemon=True, name='tray').start()
+
+    def set_image(self, image):
+        if self.icon:
+            self.icon.icon = image
+
+    def stop(self):
+        if self.icon:
+            try:
+                self.icon.stop()
+            except Exception:
+                swallowed()
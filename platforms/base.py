@@ -0,0 +1,149 @@
+"""Interfaces the core pipeline and GUI use to talk to the operating system.
+
+The services are abstract base classes, so a backend that misses a method
+fails when it is constructed rather than when the method is first called.
+"""
+
+from abc import ABC, abstractmethod
+
+
+MODIFIERS = frozenset({'ctrl', 'alt', 'shift', 'win', 'cmd'})
+
+
+class Capture:
+    """One capture pass: the selected text, plus what the platform had at hand.
+
+    `buffer` is text that may surround the selection - e.g. what was on the
+    clipboard before the copy - and `window_title` / `process` describe the
+    foreground window. All three are empty unless context was asked for.
+    """
+
+    __slots__ = ('text', 'buffer', 'window_title', 'process')
+
+    def __init__(self, text, buffer='', window_title='', process=''):
+        self.text = text
+        self.buffer = buffer
+        self.window_title = window_title
+        self.process = process
+
+
+class Clipboard(ABC):
+    """Reads the user's current text selection."""
+
+    @abstractmethod
+    def copy_selection(self):
+        """Return the selected text in the foreground app ('' if nothing is selected)."""
+        raise NotImplementedError
+
+    def capture(self, with_context=False):
+        """Return a Capture of the selection; with_context also fills in what
+        this platform can get in the same pass (no second copy, no extra wait)."""
+        return Capture(self.copy_selection())
+
+
+class HotkeyBackend(ABC):
+    """System-wide keyboard hooks."""
+
+    def register(self, hotkey, callback):
+        """Call `callback()` whenever `hotkey` (e.g. 'ctrl+alt+d') is pressed.
+
+        Replaces any previously registered hotkeys. Raises on failure.
+        """
+        registered = self.register_many({hotkey: callback})
+        if not registered:
+            raise ValueError(f"Invalid hotkey: {hotkey!r}")
+        return registered[0]
+
+    @abstractmethod
+    def register_many(self, bindings):
+        """Listen for several hotkeys ({hotkey: callback}) on one keyboard hook.
+
+        Replaces any previously registered hotkeys. Invalid hotkeys are
+        skipped with a message; returns the ones that were registered.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def unregister(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def listen_keys(self, on_press, on_release):
+        """Report every key press/release by normalized name ('ctrl', 'a', 'f5', ...).
+
+        Used to record a new hotkey. Either callback returning False stops the
+        listener. Returns an object with a `stop()` method.
+        """
+        raise NotImplementedError
+
+
+class Tray(ABC):
+    """System tray icon with a Show/Quit menu; `actions` are extra (label, callback) items between them."""
+
+    @abstractmethod
+    def start(self, image, title, on_show, on_quit, actions=()):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_image(self, image):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self):
+        raise NotImplementedError
+
+
+class InstanceLock(ABC):
+    """Ensures only one copy of the app runs per user session."""
+
+    @abstractmethod
+    def acquire(self):
+        """Return True if this process now holds the lock."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self):
+        raise NotImplementedError
+
+
+class Autostart(ABC):
+    """Start-on-login registration."""
+
+    @abstractmethod
+    def is_enabled(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_enabled(self, enabled):
+        """Enable or disable start on login. Returns True on success."""
+        raise NotImplementedError
+
+
+class Platform:
+    """Bundle of the platform services, plus a few small window helpers."""
+
+    name = 'base'
+    # Whether the toolkit supports -transparentcolor (rounded toast corners)
+    transparent_windows = False
+
+    def __init__(self, clipboard, hotkeys, tray, instance_lock, autostart):
+        self.clipboard = clipboard
+        self.hotkeys = hotkeys
+        self.tray = tray
+        self.instance_lock = instance_lock
+        self.autostart = autostart
+
+    def work_area_at_cursor(self):
+        """(left, top, right, bottom) of the work area on the cursor's monitor, or None."""
+        return None
+
+    def ipc_address(self):
+        """Address of the running instance's command endpoint, or None if unsupported."""
+        return None
+
+    def set_app_id(self, app_id):
+        """Set the taskbar grouping id, where the platform has one."""
+
+    def show_message(self, title, text):
+        """Show a blocking message box (used before the GUI exists)."""
+        print(f"{title}: {text}")
@@ -0,0 +1,152 @@
+"""In-process fake backend for benchmarks and headless runs.
+
+Nothing here touches the display, the real clipboard or the registry, so the
+whole capture path can run on a CI box.
+"""
+
+import threading
+from collections import deque
+
+from platforms.base import Autostart, Capture, Clipboard, HotkeyBackend, InstanceLock, Platform, Tray
+
+
+class FakeClipboard(Clipboard):
+    """Returns queued selections (text or Capture objects) in order, then `default`.
+
+    `clipboard` is the clipboard's text, the buffer of a selection queued
+    without one. With `copies_selection` a capture copies the selection onto
+    the clipboard, as on Windows; without it the selection is separate from
+    the clipboard, as PRIMARY is on Linux.
+    """
+
+    def __init__(self, selections=(), default='', copies_selection=False):
+        self.selections = deque(selections)
+        self.default = default
+        self.copies_selection = copies_selection
+        self.clipboard = ''
+        self._lock = threading.Lock()
+
+    def copy(self, text):
+        """Put text on the clipboard, as the user pressing Ctrl+C would."""
+        with self._lock:
+            self.clipboard = text
+
+    def select(self, text, buffer=None, window_title='', process=''):
+        """Queue the text the next capture will 'see' selected, and its context.
+
+        A `buffer` of None is whatever is on the clipboard when it is captured.
+        """
+        with self._lock:
+            self.selections.append(Capture(text, buffer, window_title, process))
+
+    def copy_selection(self):
+        return self.capture().text
+
+    def capture(self, with_context=False):
+        with self._lock:
+            item = self.selections.popleft() if self.selections else self.default
+            if not isinstance(item, Capture):
+                item = Capture(item)
+            elif item.buffer is None:
+                item = Capture(item.text, self.clipboard, item.window_title, item.process)
+            if self.copies_selection:
+                self.clipboard = item.text
+        return item if with_context else Capture(item.text)
+
+
+class FakeHotkeys(HotkeyBackend):
+    """Records the registered hotkeys; `press()` fires one."""
+
+    def __init__(self):
+        self.bindings = {}
+
+    @property
+    def hotkey(self):
+        """The first registered hotkey, or None."""
+        return next(iter(self.bindings), None)
+
+    def register_many(self, bindings):
+        self.bindings = dict(bindings)
+        return list(self.bindings)
+
+    def unregister(self):
+        self.bindings = {}
+
+    def press(self, hotkey=None):
+        """Simulate the user pressing `hotkey` (default: the first registered one)."""
+        callback = self.bindings.get(hotkey or self.hotkey)
+        if callback:
+            callback()
+
+    def listen_keys(self, on_press, on_release):
+        return _Stoppable()
+
+
+class _Stoppable:
+    def stop(self):
+        pass
+
+
+class FakeTray(Tray):
+    def __init__(self):
+        self.image = None
+        self.running = False
+        self.actions = {}
+
+    def start(self, image, title, on_show, on_quit, actions=()):
+        self.image = image
+        self.running = True
+        self.actions = dict(actions)
+
+    def set_image(self, image):
+        self.image = image
+
+    def stop(self):
+        self.running = False
+
+
+class FakeInstanceLock(InstanceLock):
+    """Process-wide lock so tests can check second-instance handling."""
+
+    _held = threading.Lock()
+
+    def __init__(self):
+        self.owned = False
+
+    def acquire(self):
+        self.owned = self._held.acquire(blocking=False)
+        return self.owned
+
+    def release(self):
+        if self.owned:
+            self._held.release()
+            self.owned = False
+
+
+class FakeAutostart(Autostart):
+    def __init__(self):
+        self.enabled = False
+
+    def is_enabled(self):
+        return self.enabled
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        return True
+
+
+class FakePlatform(Platform):
+    name = 'fake'
+
+    def __init__(self, selections=(), ipc_address=None, copies_selection=False):
+        self._ipc_address = ipc_address
+        super().__init__(
+            clipboard=FakeClipboard(selections, copies_selection=copies_selection),
+            hotkeys=FakeHotkeys(),
+            tray=FakeTray(),
+            instance_lock=FakeInstanceLock(),
+            autostart=FakeAutostart(),
+        )
+
+    def ipc_address(self):
+        return self._ipc_address
@@ -0,0 +1,126 @@
+"""Global hotkey matching on the raw key stream, with no work for unrelated keys.
+
+The keyboard hook sees every key the user types all day, so the per-event
+path is kept to one dict lookup for most keys and allocates nothing:
+
+- Each modifier key (left/right ctrl, alt, shift, win) owns one bit of an
+  8-bit state, so the state is always a cached small int.
+- Whether the held modifiers are exactly the hotkey's is a lookup in a
+  256-entry table built when the hotkey is registered.
+- Any other key is rejected on one dict lookup unless it triggers a hotkey.
+- A release the hook never saw (focus moved to a UAC prompt, the session was
+  locked) would leave a modifier held for good, so when a trigger key comes
+  with modifiers held the state is re-read from the OS, if the backend can.
+
+Keys are identified by opaque "tokens" chosen by the backend (pynput Key
+members, virtual key codes, characters); nothing here imports pynput.
+"""
+
+from platforms.base import MODIFIERS
+
+
+# (left or generic key, right key) bits per modifier group
+GROUP_BITS = {
+    'ctrl': (0x01, 0x02),
+    'alt': (0x04, 0x08),
+    'shift': (0x10, 0x20),
+    'win': (0x40, 0x80),
+}
+
+# pynput Key member names -> state bit
+MODIFIER_KEYS = {
+    'ctrl': 0x01, 'ctrl_l': 0x01, 'ctrl_r': 0x02,
+    'alt': 0x04, 'alt_l': 0x04, 'alt_r': 0x08, 'alt_gr': 0x08,
+    'shift': 0x10, 'shift_l': 0x10, 'shift_r': 0x20,
+    'cmd': 0x40, 'cmd_l': 0x40, 'cmd_r': 0x80,
+}
+
+
+def parse_hotkey(hotkey):
+    """'ctrl+alt+d' -> (frozenset({'ctrl', 'alt'}), 'd'). Raises ValueError if malformed."""
+    parts = [part.strip() for part in hotkey.lower().split('+') if part.strip()]
+    modifiers = frozenset('win' if part == 'cmd' else part for part in parts if part in MODIFIERS)
+    keys = [part for part in parts if part not in MODIFIERS]
+    if len(keys) != 1:
+        raise ValueError(f"Hotkey {hotkey!r} needs exactly one non-modifier key")
+    return modifiers, keys[0]
+
+
+def accept_table(modifiers):
+    """bytes(256): 1 where a modifier state holds exactly the groups in `modifiers`."""
+    table = bytearray(256)
+    for state in range(256):
+        held = {group for group, (left, right) in GROUP_BITS.items() if state & (left | right)}
+        table[state] = held == modifiers
+    return bytes(table)
+
+
+class _Binding:
+    __slots__ = ('accepts', 'callback', 'fired')
+
+    def __init__(self, accepts, callback):
+        self.accepts = accepts
+        self.callback = callback
+        self.fired = False
+
+
+class HotkeyMatcher:
+    """Serves any number of hotkeys from one key stream.
+
+    `modifier_bits` maps modifier tokens to state bits (see MODIFIER_KEYS).
+    `held`, if given, returns the state bits of the modifiers the OS has
+    down (or None if it can't tell); it is asked before a trigger key is
+    matched against modifiers the stream says are held. Each binding added with `add()` fires its callback when one of its
+    trigger tokens is pressed while exactly its modifiers are held; holding
+    the trigger down (auto-repeat) fires once. The per-key cost does not
+    grow with the number of bindings: a combined table rejects keys pressed
+    without any bound modifier combination, then one dict lookup by token
+    finds the bindings that key could trigger.
+    """
+
+    __slots__ = ('_bits', '_held', '_any', '_routes', '_state', '_fired')
+
+    def __init__(self, modifier_bits, held=None):
+        self._bits = dict(modifier_bits)
+        self._held = held
+        self._any = bytes(256)
+        self._routes = {}  # trigger token -> [_Binding, ...]
+        self._state = 0
+        self._fired = 0
+
+    def add(self, modifiers, triggers, callback):
+        binding = _Binding(accept_table(frozenset(modifiers)), callback)
+        for token in triggers:
+            self._routes.setdefault(token, []).append(binding)
+        self._any = bytes(a | b for a, b in zip(self._any, binding.accepts))
+
+    def press(self, token):
+        bit = self._bits.get(token)
+        if bit is not None:
+            self._state |= bit
+            return
+        bindings = self._routes.get(token)
+        if bindings is None:
+            return
+        state = self._state
+        if state and self._held is not None:
+            held = self._held()
+            if held is not None:
+                state = self._state = held
+        if self._any[state]:
+            for binding in bindings:
+                if binding.accepts[state] and not binding.fired:
+                    binding.fired = True
+                    self._fired += 1
+                    binding.callback()
+
+    def release(self, token):
+        bit = self._bits.get(token)
+        if bit is not None:
+            if self._state & bit:
+                self._state ^= bit
+        elif self._fired:
+            for binding in self._routes.get(token, ()):
+                if binding.fired:
+                    binding.fired = False
+                    self._fired -= 1
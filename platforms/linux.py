@@ -0,0 +1,205 @@
+"""Linux backend: PRIMARY-selection clipboard, flock instance lock, XDG autostart.
+
+Hotkeys and the tray use pynput/pystray and need a display; they are
+imported on first use so the rest of the backend works headless.
+"""
+
+import fcntl
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from platforms.base import Autostart, Capture, Clipboard, HotkeyBackend, InstanceLock, Platform, Tray
+
+
+def _run_all(commands, timeout=1):
+    """Run commands concurrently; their stdout as text ('' for any that failed)."""
+    processes = []
+    for command in commands:
+        try:
+            processes.append(subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                             if command else None)
+        except OSError:
+            processes.append(None)
+    outputs = []
+    for process in processes:
+        if process is None:
+            outputs.append('')
+            continue
+        try:
+            out, _ = process.communicate(timeout=timeout)
+            outputs.append(out.decode('utf-8', 'replace'))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            outputs.append('')
+    return outputs
+
+
+class SelectionClipboard(Clipboard):
+    """Reads the PRIMARY selection, which X11/Wayland keep for highlighted text.
+
+    No synthetic Ctrl+C and no sleeps: the selection is already available.
+    Highlighting doesn't touch the regular clipboard, so with context the
+    clipboard (e.g. a paragraph copied earlier) is read alongside as the
+    buffer, and on X11 the active window comes from xdotool.
+    """
+
+    COMMANDS = (
+        ('wl-paste', '--primary', '--no-newline'),
+        ('xclip', '-o', '-selection', 'primary'),
+        ('xsel', '--primary', '--output'),
+    )
+    CLIPBOARD_COMMANDS = (
+        ('wl-paste', '--no-newline'),
+        ('xclip', '-o', '-selection', 'clipboard'),
+        ('xsel', '--clipboard', '--output'),
+    )
+    WINDOW_COMMAND = ('xdotool', 'getactivewindow', 'getwindowpid', 'getwindowname')
+
+    def __init__(self):
+        self.command = next((cmd for cmd in self.COMMANDS if shutil.which(cmd[0])), None)
+        self.clipboard_command = next((cmd for cmd in self.CLIPBOARD_COMMANDS if shutil.which(cmd[0])), None)
+        self.window_command = self.WINDOW_COMMAND if shutil.which('xdotool') else None
+
+    def copy_selection(self):
+        return self.capture().text
+
+    def capture(self, with_context=False):
+        if self.command is None:
+            return Capture('')
+        if not with_context:
+            return Capture(_run_all([self.command])[0].strip())
+        selection, buffer, window = _run_all([self.command, self.clipboard_command, self.window_command])
+        pid, _, title = window.strip().partition('\n')
+        process = ''
+        if pid.isdigit():
+            try:
+                process = (Path('/proc') / pid / 'comm').read_text().strip()
+            except OSError:
+                pass
+        return Capture(selection.strip(), buffer, title, process)
+
+
+class LazyHotkeys(HotkeyBackend):
+    """pynput hotkeys, imported on first use (pynput needs a display on Linux)."""
+
+    def __init__(self):
+        self._backend = None
+
+    def _get(self):
+        if self._backend is None:
+            from platforms._desktop import PynputHotkeys
+            self._backend = PynputHotkeys()
+        return self._backend
+
+    def register_many(self, bindings):
+        return self._get().register_many(bindings)
+
+    def unregister(self):
+        if self._backend is not None:
+            self._backend.unregister()
+
+    def listen_keys(self, on_press, on_release):
+        return self._get().listen_keys(on_press, on_release)
+
+
+class LazyTray(Tray):
+    """pystray tray icon, imported on first use."""
+
+    def __init__(self):
+        self._tray = None
+
+    def start(self, image, title, on_show, on_quit, actions=()):
+        from platforms._desktop import PystrayTray
+        self._tray = PystrayTray()
+        self._tray.start(image, title, on_show, on_quit, actions)
+
+    def set_image(self, image):
+        if self._tray:
+            self._tray.set_image(image)
+
+    def stop(self):
+        if self._tray:
+            self._tray.stop()
+
+
+def runtime_dir():
+    """$XDG_RUNTIME_DIR (private to the user), falling back to the home directory."""
+    return Path(os.environ.get('XDG_RUNTIME_DIR') or Path.home())
+
+
+class FlockInstanceLock(InstanceLock):
+    """Exclusive flock on a file in the user's runtime directory."""
+
+    def __init__(self, path=None):
+        self.path = path or runtime_dir() / 'lexi-snap.lock'
+        self.fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class XdgAutostart(Autostart):
+    """~/.config/autostart/lexi-snap.desktop."""
+
+    def __init__(self):
+        config = os.environ.get('XDG_CONFIG_HOME') or str(Path.home() / '.config')
+        self.path = Path(config) / 'autostart' / 'lexi-snap.desktop'
+
+    def command(self):
+        if getattr(sys, 'frozen', False):
+            return f'{shlex.quote(sys.executable)} --minimized'
+        return f'{shlex.quote(sys.executable)} {shlex.quote(os.path.abspath(sys.argv[0]))} --minimized'
+
+    def is_enabled(self):
+        return self.path.exists()
+
+    def set_enabled(self, enabled):
+        try:
+            if enabled:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.path.write_text(
+                    "[Desktop Entry]\n"
+                    "Type=Application\n"
+                    "Name=Lexi Snap\n"
+                    f"Exec={self.command()}\n"
+                    "X-GNOME-Autostart-enabled=true\n"
+                )
+            elif self.path.exists():
+                self.path.unlink()
+            return True
+        except OSError as e:
+            print(f"Failed to update startup setting: {e}")
+            return False
+
+
+class LinuxPlatform(Platform):
+    name = 'linux'
+
+    def __init__(self):
+        super().__init__(
+            clipboard=SelectionClipboard(),
+            hotkeys=LazyHotkeys(),
+            tray=LazyTray(),
+            instance_lock=FlockInstanceLock(),
+            autostart=XdgAutostart(),
+        )
+
+    def ipc_address(self):
+        return str(runtime_dir() / 'lexi-snap.sock')
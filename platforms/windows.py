@@ -0,0 +1,195 @@
+"""Windows backend: Win32 mutex, registry autostart, pynput hooks, pystray tray."""
+
+import ctypes
+import getpass
+import os
+import sys
+import time
+import winreg
+from ctypes import wintypes
+
+import pyperclip
+
+from platforms._desktop import PynputHotkeys, PystrayTray, send_copy
+from platforms.base import Autostart, Capture, Clipboard, InstanceLock, Platform
+
+
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+def foreground_window():
+    """(title, executable path) of the foreground window; empty strings if unavailable."""
+    try:
+        user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+        hwnd = user32.GetForegroundWindow()
+        length = user32.GetWindowTextLengthW(hwnd)
+        title = ctypes.create_unicode_buffer(length + 1)
+        user32.GetWindowTextW(hwnd, title, length + 1)
+
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        process = ''
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid.value)
+        if handle:
+            try:
+                path = ctypes.create_unicode_buffer(260)
+                size = wintypes.DWORD(260)
+                if kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                    process = path.value
+            finally:
+                kernel32.CloseHandle(handle)
+        return title.value, process
+    except Exception:
+        return '', ''
+
+
+class WindowsClipboard(Clipboard):
+    """Copies the selection with a synthetic Ctrl+C and reads the clipboard."""
+
+    def copy_selection(self):
+        return self.capture().text
+
+    def capture(self, with_context=False):
+        """With context, the clipboard's previous text (often the copied paragraph the
+        word was then selected in) and the foreground window are read before the copy.
+
+        As with CLIPBOARD on Linux, a buffer that doesn't contain the word
+        yields no sentence (see context.extract_sentence).
+        """
+        time.sleep(0.15)
+        buffer, title, process = '', '', ''
+        if with_context:
+            try:
+                buffer = pyperclip.paste()
+            except Exception:
+                buffer = ''
+            title, process = foreground_window()
+        pyperclip.copy("")
+        send_copy()
+        time.sleep(0.2)
+        return Capture(pyperclip.paste().strip(), buffer, title, process)
+
+
+class MutexInstanceLock(InstanceLock):
+    """Named Win32 mutex."""
+
+    MUTEX_NAME = "lexi-snap_SingleInstance_Mutex"
+    ERROR_ALREADY_EXISTS = 183
+
+    def __init__(self):
+        self.handle = None
+
+    def acquire(self):
+        kernel32 = ctypes.windll.kernel32
+        self.handle = kernel32.CreateMutexW(None, True, self.MUTEX_NAME)
+        if kernel32.GetLastError() == self.ERROR_ALREADY_EXISTS:
+            self.release()
+            return False
+        return True
+
+    def release(self):
+        if self.handle:
+            ctypes.windll.kernel32.CloseHandle(self.handle)
+            self.handle = None
+
+
+class RegistryAutostart(Autostart):
+    """HKCU Run key entry."""
+
+    STARTUP_REG_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
+    STARTUP_APP_NAME = "lexi-snap"
+
+    def command(self):
+        """Get the appropriate command for startup - exe or script."""
+        if getattr(sys, 'frozen', False):
+            return f'"{sys.executable}" --minimized'
+        python_exe = sys.executable
+        script_path = os.path.abspath(sys.argv[0])
+        pythonw = python_exe.replace('python.exe', 'pythonw.exe')
+        if os.path.exists(pythonw):
+            return f'"{pythonw}" "{script_path}" --minimized'
+        return f'"{python_exe}" "{script_path}" --minimized'
+
+    def is_enabled(self):
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.STARTUP_REG_KEY, 0, winreg.KEY_READ) as key:
+                winreg.QueryValueEx(key, self.STARTUP_APP_NAME)
+                return True
+        except FileNotFoundError:
+            return False
+        except Exception:
+            return False
+
+    def set_enabled(self, enabled):
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.STARTUP_REG_KEY, 0, winreg.KEY_SET_VALUE) as key:
+                if enabled:
+                    winreg.SetValueEx(key, self.STARTUP_APP_NAME, 0, winreg.REG_SZ, self.command())
+                else:
+                    try:
+                        winreg.DeleteValue(key, self.STARTUP_APP_NAME)
+                    except FileNotFoundError:
+                        pass
+            return True
+        except Exception as e:
+            print(f"Failed to update startup setting: {e}")
+            return False
+
+
+class POINT(ctypes.Structure):
+    _fields_ = [('x', ctypes.c_long), ('y', ctypes.c_long)]
+
+
+class MONITORINFO(ctypes.Structure):
+    _fields_ = [
+        ('cbSize', ctypes.c_ulong),
+        ('rcMonitor', wintypes.RECT),
+        ('rcWork', wintypes.RECT),
+        ('dwFlags', ctypes.c_ulong)
+    ]
+
+
+class WindowsPlatform(Platform):
+    name = 'windows'
+    transparent_windows = True
+
+    def __init__(self):
+        super().__init__(
+            clipboard=WindowsClipboard(),
+            hotkeys=PynputHotkeys(),
+            tray=PystrayTray(),
+            instance_lock=MutexInstanceLock(),
+            autostart=RegistryAutostart(),
+        )
+
+    def work_area_at_cursor(self):
+        try:
+            # Get cursor position
+            pt = POINT()
+            ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
+
+            # Get monitor from cursor position
+            MONITOR_DEFAULTTONEAREST = 2
+            hMonitor = ctypes.windll.user32.MonitorFromPoint(pt, MONITOR_DEFAULTTONEAREST)
+
+            # Get monitor info; the work area excludes the taskbar
+            mi = MONITORINFO()
+            mi.cbSize = ctypes.sizeof(MONITORINFO)
+            ctypes.windll.user32.GetMonitorInfoW(hMonitor, ctypes.byref(mi))
+            return mi.rcWork.left, mi.rcWork.top, mi.rcWork.right, mi.rcWork.bottom
+        except Exception:
+            return None
+
+    def ipc_address(self):
+        # Per-user named pipe
+        return rf'\\.\pipe\lexi-snap-{getpass.getuser()}'
+
+    def set_app_id(self, app_id):
+        # Set AppUserModelID for Windows taskbar grouping and icon
+        try:
+            ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
+        except Exception:
+            pass
+
+    def show_message(self, title, text):
+        ctypes.windll.user32.MessageBoxW(0, text, title, 0x40)
@@ -0,0 +1,153 @@
+"""Request budget for the dictionary API: token bucket, priorities and single-flight."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# Priority classes - lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+def parse_retry_after(value, default=None):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestBudget:
+    """Token bucket shared by every caller of one upstream API.
+
+    `rate` tokens per second refill a bucket of `burst` tokens. Background
+    callers wait while any interactive caller is waiting, and leave
+    `reserve` tokens in the bucket so a capture never queues behind them.
+    After a 429, `throttle()` empties the bucket and blocks everyone until the
+    server's Retry-After has passed.
+    """
+
+    def __init__(self, rate=1.5, burst=10, reserve=2):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = min(reserve, burst - 1)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = [0, 0]
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """Take one token, waiting up to `timeout` seconds. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        needed = 1 if priority == INTERACTIVE else 1 + self.reserve
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    wait = self._take(priority, needed)
+                    if wait == 0:
+                        return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    async def acquire_async(self, priority=INTERACTIVE, timeout=None):
+        """Coroutine version of acquire(): waits with asyncio.sleep, never blocking the loop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        needed = 1 if priority == INTERACTIVE else 1 + self.reserve
+        with self._cond:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._take(priority, needed)
+                if wait == 0:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                # Thread waiters get notified; loop waiters re-check at least every 50ms
+                await asyncio.sleep(0.05 if wait is None else min(wait, 0.05))
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def _take(self, priority, needed):
+        """Take a token if allowed now (returns 0), else return seconds to wait. Hold the lock.
+
+        Behind a higher-priority waiter the wait lasts until that one's token
+        and this one's are both in; if they already are, it returns None:
+        wait until the waiter ahead leaves (it notifies on the way out).
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if any(self._waiting[p] for p in range(priority)):
+            wait = max(self._blocked_until - now, (needed + 1 - self._tokens) / self.rate)
+            return wait if wait > 0 else None
+        if now >= self._blocked_until and self._tokens >= needed:
+            self._tokens -= 1
+            return 0
+        return max(self._blocked_until - now, (needed - self._tokens) / self.rate, 0.001)
+
+    def throttle(self, retry_after):
+        """The server said slow down: block all callers for `retry_after` seconds."""
+        with self._cond:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._tokens = 0.0
+            self._updated = now
+            self._cond.notify_all()
+
+    def blocked_for(self):
+        """Seconds until requests are allowed again after a throttle (0 if not blocked)."""
+        with self._cond:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    For coroutines on a single event loop: later callers await the first
+    caller's task. A caller that is cancelled (e.g. by its timeout) stops
+    waiting without cancelling the shared call for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def running(self, key):
+        return key in self._tasks
+
+    async def do(self, key, factory):
+        """Await factory() unless a call for `key` is already running; then share its outcome."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,220 @@
+"""Background re-resolution of missing and stale definitions."""
+
+import threading
+import time
+from datetime import datetime
+
+from anki import AnkiError
+from dictionary import NO_DEFINITION, DictionaryUnavailable
+from history import item_key
+from ratelimit import BACKGROUND
+from templates import APP_TAG, DEFAULT_TEMPLATE, build_context
+
+
+def _search_escape(text):
+    """Escape text for use inside a quoted Anki search term."""
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _captured_at(item):
+    """When a history item's card was added, for the note's {timestamp} and {date}; None if unknown."""
+    try:
+        return datetime.fromisoformat(item['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class DefinitionRefresher:
+    """Low-priority job that fixes cards which got "No definition found".
+
+    Runs only while the app is idle (`is_idle()` returns True). Each pass
+    re-fetches missing definitions from the history log and stale cache entries one
+    at a time, at most one request every `min_interval` seconds and at
+    background priority in the dictionary's shared request budget, and stops
+    as soon as a capture starts or the API pushes back. Fixed notes are updated in Anki with a single
+    `multi` request of `updateNoteFields` actions.
+
+    The log is read from where the last pass stopped, keeping the current
+    state of every card still missing its definition. A word the dictionary
+    doesn't have is not asked for again for `retry_after` seconds, doubling
+    with every miss up to `max_retry_after`.
+    """
+
+    def __init__(self, dictionary, anki, settings_manager, templates, is_idle,
+                 on_updated=None, check_interval=60, min_interval=2.0,
+                 stale_after=30 * 86400, batch_size=20, retry_after=3600, max_retry_after=7 * 86400):
+        self.dictionary = dictionary
+        self.anki = anki
+        self.settings_manager = settings_manager
+        self.templates = templates
+        self.is_idle = is_idle
+        self.on_updated = on_updated
+        self.check_interval = check_interval
+        self.min_interval = min_interval
+        self.stale_after = stale_after
+        self.batch_size = batch_size
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_request = 0.0
+        self._scan_lock = threading.Lock()
+        self._scanned = 0  # history log offset read up to
+        self._missing = {}  # item_key() -> latest state of a history item without a definition
+        self._misses = {}  # (word, language) -> (misses so far, time of the next attempt)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            if not self.settings_manager.get('background_refresh', True) or not self.is_idle():
+                continue
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"Definition refresh failed: {e}")
+
+    def _may_continue(self):
+        return not self._stop.is_set() and self.is_idle()
+
+    def _fetch(self, word, language=None):
+        """Re-fetch one word into the cache. Returns (entry, ok); ok is False to end the pass."""
+        wait = self._last_request + self.min_interval - time.monotonic()
+        if wait > 0 and self._stop.wait(wait):
+            return None, False
+        if not self._may_continue():
+            return None, False
+        self._last_request = time.monotonic()
+        try:
+            return self.dictionary.refresh(word, priority=BACKGROUND, language=language), True
+        except DictionaryUnavailable:
+            return None, False
+
+    def run_pass(self):
+        """Re-resolve one batch. Returns the number of history items fixed."""
+        fixed = self._refresh_missing()
+        self._refresh_stale()
+        return fixed
+
+    def _scan_history(self):
+        """Bring the missing items up to date with the lines appended to the log since the last pass."""
+        log = self.settings_manager.history_log
+        with self._scan_lock:
+            if log.size() < self._scanned:
+                self._scanned = 0  # the log was replaced
+                self._missing.clear()
+            for self._scanned, item in log.read(self._scanned):
+                key = item_key(item)
+                if item.get('definition') == NO_DEFINITION:
+                    self._missing[key] = item
+                else:
+                    self._missing.pop(key, None)
+
+    def missing_count(self):
+        """How many cards in the whole history have no definition yet."""
+        self._scan_history()
+        return len(self._missing)
+
+    def _refresh_missing(self):
+        self._scan_history()
+        resolved = []
+        fetched = 0
+        with self._scan_lock:
+            missing = list(self._missing.values())
+        for item in missing:
+            word_key = (item['word'], item.get('language'))
+            if fetched == self.batch_size:
+                break
+            if self._misses.get(word_key, (0, 0))[1] > time.time():
+                continue
+            entry, ok = self._fetch(*word_key)
+            fetched += 1
+            if not ok:
+                break
+            if entry is None:
+                misses = self._misses.get(word_key, (0, 0))[0]
+                delay = min(self.retry_after * 2 ** misses, self.max_retry_after)
+                self._misses[word_key] = (misses + 1, time.time() + delay)
+                continue
+            self._misses.pop(word_key, None)
+            resolved.append((item, entry))
+        if not resolved:
+            return 0
+        try:
+            failed = self._update_notes(resolved)
+        except AnkiError as e:
+            # Leave history untouched so the next pass retries the notes
+            print(f"Could not update refreshed notes: {e}")
+            return 0
+        if failed:
+            print(f"Could not update {len(failed)} refreshed note(s): {failed[0][1]}")
+            failed_keys = {item_key(item) for item, _ in failed}
+            resolved = [(item, entry) for item, entry in resolved if item_key(item) not in failed_keys]
+        for item, entry in resolved:
+            self.settings_manager.update_history_item(item, definition=entry.definition)
+            with self._scan_lock:
+                self._missing.pop(item_key(item), None)
+        if self.on_updated:
+            self.on_updated()
+        return len(resolved)
+
+    def _update_notes(self, resolved):
+        """Rewrite the fields that still say "No definition found", in one request.
+
+        Returns (item, AnkiError) for each note Anki failed to update; those stay missing.
+        """
+        unknown = [item for item, _ in resolved if not item.get('note_id')]
+        if unknown:
+            found = self.anki.multi([
+                ('findNotes', {'query': f'tag:{APP_TAG} "{NO_DEFINITION}" "{_search_escape(item["word"])}"'})
+                for item in unknown
+            ])
+            for item, ids in zip(unknown, found):
+                if isinstance(ids, list) and len(ids) == 1:
+                    item['note_id'] = ids[0]
+
+        targets = [(item, entry) for item, entry in resolved if item.get('note_id')]
+        if not targets:
+            return []
+        notes = self.anki.invoke('notesInfo', notes=[item['note_id'] for item, _ in targets]) or []
+        updated, actions = [], []
+        for (item, entry), note in zip(targets, notes):
+            if not note or 'fields' not in note:
+                continue
+            template = self.templates.get(item.get('template')) or self.templates[DEFAULT_TEMPLATE['name']]
+            rendered = template.render(build_context(
+                item['word'], entry, deck=item.get('deck'), source_app=item.get('source'),
+                timestamp=_captured_at(item), sentence=item.get('sentence'), window_title=item.get('window')))
+            fields = {
+                name: rendered[name]
+                for name, value in note['fields'].items()
+                if name in rendered and NO_DEFINITION in value.get('value', '')
+            }
+            if fields:
+                updated.append(item)
+                actions.append(('updateNoteFields', {'note': {'id': item['note_id'], 'fields': fields}}))
+        if not actions:
+            return []
+        results = self.anki.multi(actions)
+        results += [AnkiError("no result for the update")] * (len(actions) - len(results))
+        return [(item, result) for item, result in zip(updated, results) if isinstance(result, AnkiError)]
+
+    def _refresh_stale(self):
+        cutoff = time.time() - self.stale_after
+        stale = [(language, key, entry)
+                 for language, cache in self.dictionary.partitions()
+                 for key, entry in cache.entries() if entry.fetched_at < cutoff]
+        for language, key, entry in stale[:self.batch_size]:
+            # Keys are lower-cased; Wiktionary titles aren't ("Haus"), so prefer the entry's spelling
+            word = entry.word if entry.word.lower() == key else key
+            _, ok = self._fetch(word, language)
+            if not ok:
+                break
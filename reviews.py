@@ -0,0 +1,290 @@
+"""Review state of lexi-snap cards, synced incrementally from AnkiConnect.
+
+Each sync asks Anki only for what may have changed since the last one: a
+`findCards` search narrowed to cards answered or added in the days since
+the checkpoint, then `cardsModTime` for those ids (a few bytes each),
+and `cardsInfo` only for the cards whose modification time actually
+differs from the stored copy. Ids are sent in pages, several pages to one
+`multi` request, so a sync's cost follows the number of changed cards
+rather than the size of the collection.
+
+Changes the day-based search can't see (a card suspended or rescheduled in
+the browser, a deleted note) are picked up by a full pass - every tagged
+card id, still with `cardsInfo` only for changed cards - on the first sync
+and then once every `full_every` seconds.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from pathlib import Path
+
+from aio import LoopStopped
+from anki import AnkiError
+from templates import APP_TAG
+
+
+REVIEWS_FILE = Path.home() / '.lexi_snap_reviews.jsonl'
+MATURE_INTERVAL = 21  # days; Anki's own threshold for "mature" cards
+
+# Card states, in the order a note with several cards reports them (first wins)
+STATES = ('relearning', 'learning', 'new', 'young', 'mature', 'suspended')
+STATE_LABELS = {
+    'relearning': 'Lapsed', 'learning': 'Learning', 'new': 'New',
+    'young': 'Young', 'mature': 'Learned', 'suspended': 'Suspended',
+}
+
+
+def card_state(card_type, queue, interval):
+    """Anki's card type/queue/interval -> one of STATES."""
+    if queue == -1:
+        return 'suspended'
+    if card_type == 0:
+        return 'new'
+    if card_type == 1:
+        return 'learning'
+    if card_type == 3:
+        return 'relearning'
+    return 'mature' if interval >= MATURE_INTERVAL else 'young'
+
+
+class CardReview:
+    """What the stats need from one card's `cardsInfo`."""
+
+    __slots__ = ('note', 'deck', 'state', 'interval', 'reps', 'lapses', 'mod')
+
+    def __init__(self, note, deck, state, interval, reps, lapses, mod):
+        self.note = note
+        self.deck = deck
+        self.state = state
+        self.interval = interval
+        self.reps = reps
+        self.lapses = lapses
+        self.mod = mod
+
+    @classmethod
+    def from_info(cls, info):
+        return cls(
+            info['note'], info.get('deckName', ''),
+            card_state(info.get('type', 0), info.get('queue', 0), info.get('interval', 0)),
+            info.get('interval', 0), info.get('reps', 0), info.get('lapses', 0), info.get('mod', 0),
+        )
+
+    def to_json(self):
+        return [self.note, self.deck, self.state, self.interval, self.reps, self.lapses, self.mod]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(*data)
+
+
+class ReviewStats:
+    """Local copy of the review state of every lexi-snap card, and its sync.
+
+    `summary()` and `note_status()` read the local copy only. `pull()`
+    (or the `apull()` coroutine on the network loop) brings it up to
+    date and returns how many cards changed, raising AnkiError if Anki
+    can't be reached.
+    """
+
+    def __init__(self, anki, path=REVIEWS_FILE, page_size=100, pages_per_request=5,
+                 full_every=7 * 86400):
+        self.anki = anki
+        self.path = Path(path) if path else None
+        self.page_size = page_size
+        self.pages_per_request = pages_per_request
+        self.full_every = full_every
+        self.cards = {}  # card id -> CardReview
+        self.due = frozenset()  # card ids due now
+        self.checkpoint = 0.0  # time of the last successful sync
+        self.full_at = 0.0  # time of the last full pass
+        self.requests = 0  # AnkiConnect requests made by syncs, for benchmarks
+        self._lock = threading.Lock()
+        self._sync_lock = None  # asyncio.Lock, created on the loop
+        self._log_lines = 0
+        self.load()
+
+    # ==================== FILE ====================
+
+    @staticmethod
+    def _line(record):
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def load(self):
+        """Replay the log, compacting it if it has grown well past the live set."""
+        if not self.path or not self.path.exists():
+            return
+        lines = 0
+        cards = {}
+        due, checkpoint, full_at = (), 0.0, 0.0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                        if record[0] == 'card':
+                            cards[record[1]] = CardReview.from_json(record[2])
+                        elif record[0] == 'drop':
+                            cards.pop(record[1], None)
+                        elif record[0] == 'sync':
+                            checkpoint, full_at, due = record[1], record[2], record[3]
+                    except (ValueError, TypeError, IndexError):
+                        continue
+        except OSError:
+            return
+        with self._lock:
+            self.cards = cards
+            self.due = frozenset(due)
+            self.checkpoint = checkpoint
+            self.full_at = full_at
+            self._log_lines = lines
+        if lines > 2 * len(cards) + 100:
+            self.compact()
+
+    def _append(self, updates, removed):
+        """Log one sync: changed cards, dropped cards, then the new checkpoint and due set."""
+        if not self.path:
+            return
+        records = [('card', cid, card.to_json()) for cid, card in updates.items()]
+        records += [('drop', cid) for cid in removed]
+        with self._lock:
+            records.append(('sync', self.checkpoint, self.full_at, sorted(self.due)))
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(self._line(record) for record in records))
+                self._log_lines += len(records)
+            except OSError as e:
+                print(f"Could not save review stats: {e}")
+
+    def compact(self):
+        """Rewrite the log with one line per card."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp = self.path.with_suffix('.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    for cid, card in self.cards.items():
+                        f.write(self._line(('card', cid, card.to_json())))
+                    f.write(self._line(('sync', self.checkpoint, self.full_at, sorted(self.due))))
+                tmp.replace(self.path)
+                self._log_lines = len(self.cards) + 1
+            except OSError as e:
+                print(f"Could not save review stats: {e}")
+
+    # ==================== SYNC ====================
+
+    def _query(self, full, now):
+        if full:
+            return f'tag:{APP_TAG}'
+        # rated:/added: count whole days back from today, so round up and add today
+        days = math.ceil((now - self.checkpoint) / 86400) + 1
+        return f'tag:{APP_TAG} (rated:{days} OR added:{days})'
+
+    async def _multi(self, actions):
+        self.requests += 1
+        results = await self.anki.amulti(actions)
+        for result in results:
+            if isinstance(result, AnkiError):
+                raise result
+        return results
+
+    async def _paged(self, action, card_ids):
+        """Run `action` on `card_ids` a page at a time, pages_per_request pages per request."""
+        pages = [card_ids[i:i + self.page_size] for i in range(0, len(card_ids), self.page_size)]
+        out = []
+        for i in range(0, len(pages), self.pages_per_request):
+            for result in await self._multi([(action, {'cards': page})
+                                             for page in pages[i:i + self.pages_per_request]]):
+                out.extend(result or ())
+        return out
+
+    async def apull(self, full=False):
+        """Pull review data for cards changed since the checkpoint; return the number changed."""
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:  # a second caller waits, then finds nothing new
+            return await self._pull(full)
+
+    async def _pull(self, full):
+        now = time.time()
+        full = full or not self.checkpoint or now - self.full_at > self.full_every
+        card_ids, due = await self._multi([
+            ('findCards', {'query': self._query(full, now)}),
+            ('findCards', {'query': f'tag:{APP_TAG} is:due'}),
+        ])
+        card_ids = card_ids or []
+        mods = await self._paged('cardsModTime', card_ids)
+        with self._lock:
+            changed = [item['cardId'] for item in mods
+                       if getattr(self.cards.get(item['cardId']), 'mod', None) != item['mod']]
+            removed = set(self.cards).difference(card_ids) if full else ()
+        updates = {info['cardId']: CardReview.from_info(info)
+                   for info in await self._paged('cardsInfo', changed) if info}
+        due = frozenset(due or ())
+        with self._lock:
+            self.cards.update(updates)
+            for cid in removed:
+                self.cards.pop(cid, None)
+            dirty = bool(updates or removed or full) or due != self.due
+            self.due = due
+            self.checkpoint = now
+            if full:
+                self.full_at = now
+        # An unlogged checkpoint only widens the next run's search a little
+        if dirty:
+            self._append(updates, removed)
+        return len(updates) + len(removed)
+
+    def pull(self, full=False):
+        """Blocking apull()."""
+        try:
+            return self.anki.loop.run(self.apull(full))
+        except LoopStopped as e:
+            raise AnkiError(f"AnkiConnect unreachable: {e}") from e
+
+    # ==================== STATS ====================
+
+    def note_status(self, note_id):
+        """(state, due) of a note, from its cards; (None, False) if it hasn't been synced."""
+        with self._lock:
+            cards = [(cid, card) for cid, card in self.cards.items() if card.note == note_id]
+            due = self.due
+        if not cards:
+            return None, False
+        state = min((card.state for _, card in cards), key=STATES.index)
+        return state, any(cid in due for cid, _ in cards)
+
+    def note_statuses(self):
+        """{note id: (state, due)} for every synced note, in one pass."""
+        statuses = {}
+        with self._lock:
+            for cid, card in self.cards.items():
+                state, due = statuses.get(card.note, (card.state, False))
+                if STATES.index(card.state) < STATES.index(state):
+                    state = card.state
+                statuses[card.note] = (state, due or cid in self.due)
+        return statuses
+
+    def summary(self):
+        """Counts for the stats view: cards per state, due now, lapses and reviews overall."""
+        counts = dict.fromkeys(STATES, 0)
+        lapses = reps = 0
+        with self._lock:
+            for card in self.cards.values():
+                counts[card.state] += 1
+                lapses += card.lapses
+                reps += card.reps
+            due = len(self.due)
+            synced = self.checkpoint
+        return {
+            'cards': sum(counts.values()),
+            'states': counts,
+            'due': due,
+            'lapses': lapses,
+            'reviews': reps,
+            'synced_at': synced,
+        }
@@ -0,0 +1,276 @@
+"""Application settings and card history, stored as JSON in the user's home directory.
+
+The settings file may be edited by hand or synced between machines while
+the app runs. `watch()` polls its size and mtime (backing off while it
+doesn't change) and merges an edit in three ways against the contents last
+read or written: keys only the file changed are taken, keys only the app
+changed are kept, and a key both changed keeps the app's value. Saves merge
+first too, so they never overwrite an edit made since. Every change, from
+the file or from `set()`, is published as a SettingChange to subscribers.
+"""
+
+import copy
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from history import HistoryLog, item_key
+from templates import DEFAULT_TEMPLATE
+
+
+DEFAULTS = {
+    'hotkey': 'ctrl+alt+d',
+    'hotkey_bindings': [],  # Extra hotkeys with their own deck/language/template (see core.CaptureRoute)
+    'default_deck': None,
+    'start_on_startup': False,
+    'notification_badge_enabled': True,
+    'notification_toast_enabled': False,
+    'card_history': [],  # List of {id, word, definition, timestamp}
+    'study_languages': [],  # Language codes preferred when detecting a selection's language
+    'dictionary_providers': {},  # Language code -> 'dictionaryapi' or 'wiktionary' (see dictionary.py)
+    'glossary_files': [],  # CSV/JSON files of the user's own definitions (see glossary.py)
+    'spell_correction': True,  # Retry words the dictionary doesn't know with a close spelling
+    'headword_lists': [],  # Word list files to suggest spellings from (see fuzzy.py)
+    'note_templates': [],  # User-defined note templates (see templates.py)
+    'note_template': DEFAULT_TEMPLATE['name'],  # Active template name
+    'pronunciation_audio': False,  # Attach pronunciation audio to cards
+    'capture_context': False,  # Record the sentence and window a word came from (see context.py)
+    'lexicon_decks': [],  # Decks whose note fronts count as known words (see lexicon.py)
+    'skip_known_words': True,  # Don't add words already in one of those decks
+    'background_refresh': True,  # Re-resolve missing definitions while idle
+    'api_enabled': False,  # Serve the local HTTP API (see http_api.py)
+    'api_port': 8766,
+    'api_token': '',  # If set, API clients must send "Authorization: Bearer <token>"
+    'diagnostics_enabled': False,  # Run the sampling profiler (see diagnostics.py)
+}
+_MISSING = object()
+
+
+class SettingChange:
+    """A setting that changed: `origin` is 'file' (edited on disk) or 'app' (set() here)."""
+
+    __slots__ = ('key', 'old', 'new', 'origin')
+
+    def __init__(self, key, old, new, origin):
+        self.key = key
+        self.old = old
+        self.new = new
+        self.origin = origin
+
+    def __repr__(self):
+        return f"SettingChange({self.key!r}, {self.old!r} -> {self.new!r}, {self.origin})"
+
+
+class SettingsManager:
+    """Manage application settings."""
+
+    def __init__(self, settings_file=None):
+        self.settings_file = Path(settings_file or Path.home() / '.lexi_snap_settings.json')
+        self._lock = threading.RLock()
+        self._disk = {}          # the file's contents as last read or written: the merge base
+        self._signature = None   # (size, mtime_ns) of the file at that point
+        self._listeners = []     # (keys or None, callback)
+        self._watcher = None
+        self._stop = threading.Event()
+        self.settings = self.load_settings()
+        # Every card ever added, next to the settings file (card_history keeps the last 10)
+        self.history_log = HistoryLog(self.settings_file.with_name('.lexi_snap_history.jsonl'))
+        if not self.history_log.exists() and self.settings['card_history']:
+            self.history_log.extend(reversed(self.settings['card_history']))
+
+    def load_settings(self):
+        settings = copy.deepcopy(DEFAULTS)
+        signature, data = self._read()
+        self._signature = signature
+        if data is not None:
+            self._disk = data
+            settings.update(copy.deepcopy(data))
+        return settings
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.settings_file)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read(self):
+        """(signature, contents) of the settings file; contents are None if missing or unparsable."""
+        signature = self._stat()
+        if signature is None:
+            return None, None
+        try:
+            with open(self.settings_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read settings: {e}")
+            return signature, None
+        return signature, data if isinstance(data, dict) else None
+
+    def save_settings(self):
+        changes = []
+        with self._lock:
+            # Merge an edit made since the last read first, rather than overwrite it
+            if self._stat() != self._signature:
+                changes = self._merge_from_disk()
+            text = json.dumps(self.settings, indent=2)
+            tmp = self.settings_file.with_suffix('.tmp')
+            try:
+                with open(tmp, 'w') as f:
+                    f.write(text)
+                os.replace(tmp, self.settings_file)
+                self._disk = json.loads(text)
+                self._signature = self._stat()
+            except OSError as e:
+                print(f"Could not save settings: {e}")
+        self._publish(changes)
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            old = self.settings.get(key)
+            self.settings[key] = value
+            self.save_settings()
+        if old != value:
+            self._publish([SettingChange(key, old, value, 'app')])
+
+    # ==================== WATCHING ====================
+
+    def subscribe(self, callback, keys=None):
+        """Call `callback(change)` for every SettingChange (of one of `keys`, if given).
+
+        Changes from the file are published on the watcher thread, the
+        app's own on the thread that called set().
+        """
+        self._listeners.append((frozenset(keys) if keys else None, callback))
+
+    def _publish(self, changes):
+        for change in changes:
+            for keys, callback in list(self._listeners):
+                if keys is None or change.key in keys:
+                    try:
+                        callback(change)
+                    except Exception as e:
+                        print(f"Settings listener failed for {change.key!r}: {e}")
+
+    def _valid(self, key, value):
+        """A hand edit must keep a setting's type (a hotkey stays a string, a switch a bool)."""
+        default = DEFAULTS.get(key)
+        return default is None or isinstance(value, type(default))
+
+    def _merge_from_disk(self):
+        """Three-way merge of the file into the settings. Returns the changes it made. Hold the lock."""
+        signature, theirs = self._read()
+        self._signature = signature
+        if theirs is None:
+            return []  # missing or half-written: keep what we have; the next save rewrites it
+        base, self._disk = self._disk, theirs
+        changes = []
+        for key in base.keys() | theirs.keys():
+            before = base.get(key, _MISSING)
+            after = theirs.get(key, _MISSING)
+            if after == before:
+                continue
+            if after is _MISSING:
+                after = DEFAULTS.get(key, _MISSING)  # deleted from the file: back to the default
+            elif not self._valid(key, after):
+                print(f"Ignoring settings edit: {key!r} should be a {type(DEFAULTS[key]).__name__}")
+                continue
+            ours = self.settings.get(key, _MISSING)
+            if before is _MISSING:
+                before = DEFAULTS.get(key, _MISSING)
+            if ours == after:
+                continue
+            if ours != before:
+                print(f"Settings conflict on {key!r}: keeping this app's value over the file's")
+                continue
+            if after is _MISSING:
+                del self.settings[key]
+            else:
+                self.settings[key] = copy.deepcopy(after)
+            changes.append(SettingChange(key, None if ours is _MISSING else ours,
+                                         None if after is _MISSING else after, 'file'))
+        return changes
+
+    def check(self):
+        """Merge the file in if it changed since it was last read or written. Returns the changes."""
+        if self._stat() == self._signature:
+            return []
+        with self._lock:
+            changes = self._merge_from_disk()
+        self._publish(changes)
+        return changes
+
+    def watch(self, interval=0.5, max_interval=8.0):
+        """Check for edits on a daemon thread: every `interval` seconds after a change,
+        doubling up to `max_interval` while the file stays the same."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            wait = interval
+            while not self._stop.wait(wait):
+                if self._stat() == self._signature:
+                    wait = min(wait * 2, max_interval)
+                    continue
+                wait = interval
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Settings watcher error: {e}")
+
+        self._watcher = threading.Thread(target=run, name='settings-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        self._watcher = None
+
+    # ==================== HISTORY ====================
+
+    def add_to_history(self, word, definition, note_id=None, deck=None, template=None, language=None,
+                       context=None):
+        """Add a card to history (the full log, and the 10 most recent here).
+
+        `context` holds the set parts of the card's source context
+        ('sentence', 'source', 'window'); absent parts take no space.
+        """
+        item = {
+            'id': uuid.uuid4().hex,
+            'word': word,
+            'definition': definition,
+            'timestamp': datetime.now().isoformat(),
+            'note_id': note_id,
+            'deck': deck,
+            'template': template,
+            'language': language,
+        }
+        item.update(context or {})
+        self.history_log.append(item)
+        with self._lock:
+            history = self.settings.get('card_history', [])
+            history.insert(0, item)
+            # Keep only 10 most recent
+            self.settings['card_history'] = history[:10]
+            self.save_settings()
+
+    def update_history_item(self, item, **changes):
+        """Update a history entry in place and save; the log gets the updated item.
+
+        `item` may come from the log rather than card_history: the recent
+        entry for the same card (same id) is updated too.
+        """
+        with self._lock:
+            item.update(changes)
+            key = item_key(item)
+            for recent in self.settings.get('card_history', []):
+                if recent is not item and item_key(recent) == key:
+                    recent.update(changes)
+            self.history_log.append_update(item)
+            self.save_settings()
@@ -0,0 +1,172 @@
+"""Note templates: map captured data onto the fields of any Anki note model.
+
+A template is a small dict stored in settings:
+
+    {
+        "name": "Vocab",
+        "model": "Basic (and reversed card)",
+        "fields": {"Front": "{word}", "Back": "{definition}<br><i>{example}</i>"},
+        "tags": ["lexi-snap", "vocab"]
+    }
+
+Field text uses `{placeholder}` syntax. Each template is compiled once into
+render functions, so building a note is just a few dict lookups and a join.
+"""
+
+import html
+import string
+from datetime import datetime
+
+from dictionary import NO_DEFINITION
+
+
+APP_TAG = 'lexi-snap'
+
+PLACEHOLDERS = (
+    'word', 'definition', 'part_of_speech', 'phonetic', 'senses', 'examples',
+    'example', 'synonyms', 'audio', 'deck', 'source_app', 'window_title', 'sentence',
+    'timestamp', 'date',
+)
+
+DEFAULT_TEMPLATE = {
+    'name': 'Basic',
+    'model': 'Basic',
+    'fields': {'Front': '{word}', 'Back': '{definition}{audio}'},
+    'tags': [APP_TAG],
+}
+
+
+class TemplateError(Exception):
+    """A template is malformed or doesn't match its Anki model."""
+
+
+def compile_field(text):
+    """Compile a field template into a function of the render context."""
+    try:
+        parsed = list(string.Formatter().parse(text))
+    except ValueError as e:
+        raise TemplateError(f"Bad template {text!r}: {e}") from e
+
+    parts = []
+    for literal, name, spec, conversion in parsed:
+        if literal:
+            parts.append((True, literal))
+        if name is None:
+            continue
+        if spec or conversion:
+            raise TemplateError(f"Format specs are not supported: {{{name}}}")
+        if name not in PLACEHOLDERS:
+            raise TemplateError(f"Unknown placeholder {{{name}}} (known: {', '.join(PLACEHOLDERS)})")
+        parts.append((False, name))
+
+    if not parts:
+        return lambda context: ''
+    if len(parts) == 1:
+        is_literal, value = parts[0]
+        if is_literal:
+            return lambda context: value
+        return lambda context: context.get(value, '')
+
+    parts = tuple(parts)
+
+    def render(context):
+        get = context.get
+        return ''.join([value if is_literal else get(value, '') for is_literal, value in parts])
+
+    return render
+
+
+class NoteTemplate:
+    """A compiled note template."""
+
+    def __init__(self, name, model, fields, tags=None):
+        if not fields:
+            raise TemplateError(f"Template {name!r} has no fields")
+        self.name = name
+        self.model = model
+        self.fields = dict(fields)
+        tags = list(tags or [])
+        if APP_TAG not in tags:
+            tags.append(APP_TAG)
+        self.tags = tags
+        self._renderers = tuple((field, compile_field(text)) for field, text in self.fields.items())
+        self._validated = False
+
+    @classmethod
+    def from_spec(cls, spec):
+        try:
+            return cls(spec['name'], spec['model'], spec['fields'], spec.get('tags'))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise TemplateError(f"Invalid template spec: {spec!r}") from e
+
+    def render(self, context):
+        """Render the model fields for one card."""
+        return {field: render(context) for field, render in self._renderers}
+
+    def build_note(self, deck, context):
+        return {
+            'deckName': deck,
+            'modelName': self.model,
+            'fields': self.render(context),
+            'tags': list(self.tags),
+        }
+
+    def validate(self, anki):
+        """Check the template's fields against the model (once, then cached)."""
+        if self._validated:
+            return
+        model_fields = anki.model_field_names(self.model)
+        if not model_fields:
+            raise TemplateError(f"Note type {self.model!r} not found in Anki")
+        missing = [f for f in self.fields if f not in model_fields]
+        if missing:
+            raise TemplateError(
+                f"Note type {self.model!r} has no field(s) {', '.join(missing)} "
+                f"(fields: {', '.join(model_fields)})"
+            )
+        self._validated = True
+
+    def invalidate(self):
+        self._validated = False
+
+
+def load_templates(specs):
+    """Compile user template specs from settings. The Basic template is always available."""
+    templates = {DEFAULT_TEMPLATE['name']: NoteTemplate.from_spec(DEFAULT_TEMPLATE)}
+    for spec in specs or []:
+        try:
+            template = NoteTemplate.from_spec(spec)
+        except TemplateError as e:
+            print(f"Skipping note template: {e}")
+            continue
+        templates[template.name] = template
+    return templates
+
+
+def _html(text):
+    return html.escape(text, quote=False).replace('\n', '<br>')
+
+
+def build_context(word, entry=None, deck=None, source_app=None, timestamp=None, audio='', definition=None,
+                  sentence=None, window_title=None):
+    """Collect the captured data for one card into a render context.
+
+    `audio` is an Anki [sound:] tag (or empty) and is inserted as-is.
+    `definition` is used when there is no entry (default: NO_DEFINITION).
+    `sentence` and `window_title` come from the capture's source context.
+    """
+    if entry is not None:
+        values = entry.as_fields()
+        values['word'] = word
+    else:
+        values = {'word': word, 'definition': NO_DEFINITION if definition is None else definition}
+    timestamp = timestamp or datetime.now()
+    values['deck'] = deck or ''
+    values['source_app'] = source_app or ''
+    values['window_title'] = window_title or ''
+    values['sentence'] = sentence or ''
+    values['timestamp'] = timestamp.strftime('%Y-%m-%d %H:%M')
+    values['date'] = timestamp.strftime('%Y-%m-%d')
+    context = {key: _html(value) for key, value in values.items()}
+    context['audio'] = audio
+    return context